@@ -4,7 +4,7 @@ from typing import Dict, List
 
 from .routers import logs, runs
 # 导入新增的路由器
-from .routers import agents, workflow, analysis, api_runs
+from .routers import agents, workflow, analysis, api_runs, llm
 
 # Create FastAPI app instance
 app = FastAPI(
@@ -35,6 +35,7 @@ app.include_router(agents.router)
 app.include_router(workflow.router)
 app.include_router(analysis.router)
 app.include_router(api_runs.router)
+app.include_router(llm.router)
 
 # 根端点API导航
 
@@ -51,7 +52,8 @@ def read_root():
                     "代理": "/api/agents/",
                     "分析": "/api/analysis/",
                     "运行": "/api/runs/",
-                    "工作流": "/api/workflow/"
+                    "工作流": "/api/workflow/",
+                    "LLM指标": "/api/llm/metrics"
                 }
             },
             "旧API": {
@@ -13,3 +13,4 @@ from . import agents
 from . import workflow
 from . import analysis
 from . import api_runs
+from . import llm
@@ -0,0 +1,29 @@
+"""
+LLM 调用指标路由模块
+
+此模块提供按路由（Agent）和按 provider 统计的 LLM 调用延迟与 token 用量
+"""
+
+from fastapi import APIRouter
+from typing import Dict
+
+from ..models.api_models import ApiResponse
+
+# 创建路由器
+router = APIRouter(prefix="/api/llm", tags=["LLM"])
+
+
+@router.get("/metrics", response_model=ApiResponse[Dict])
+async def get_llm_metrics():
+    """获取当前进程内的 LLM 调用指标
+
+    - routes: 每个路由的模型、调用次数、失败与缓存命中次数、延迟分位数和 token 用量
+    - providers: 每个 provider 的延迟分位数
+    注意：指标保存在内存中，服务重启后清零。
+    """
+    from src.utils.llm_metrics import latency_snapshot, route_snapshot
+
+    return ApiResponse(data={
+        "routes": route_snapshot(),
+        "providers": latency_snapshot(),
+    })
@@ -1,6 +1,6 @@
 from langchain_core.messages import HumanMessage
 from src.agents.state import AgentState, show_agent_reasoning, show_workflow_status
-from src.tools.openrouter_config import get_chat_completion
+from src.tools.openrouter_config import get_chat_completion, get_chat_completion_async
 from src.utils.api_utils import agent_endpoint, log_llm_interaction
 import json
 import ast
@@ -10,11 +10,9 @@ import logging
 logger = logging.getLogger('debate_room')
 
 
-@agent_endpoint("debate_room", "辩论室，分析多空双方观点，得出平衡的投资结论")
-def debate_room_agent(state: AgentState):
-    """Facilitates debate between bull and bear researchers to reach a balanced conclusion."""
+def _prepare_debate(state: AgentState) -> dict:
+    """Collects the researcher theses and builds the LLM messages for the debate."""
     show_workflow_status("Debate Room")
-    show_reasoning = state["metadata"]["show_reasoning"]
     logger.info("开始分析研究员观点并进行辩论...")
 
     # 收集所有研究员信息 - 向前兼容设计（添加防御性检查）
@@ -114,48 +112,69 @@ def debate_room_agent(state: AgentState):
 务必确保你的回复是有效的 JSON 格式，且包含上述所有字段。回复必须使用英文，不要使用中文或其他语言。
 """
 
-    # 调用 LLM 获取第三方观点
-    llm_response = None
+    messages = [
+        {"role": "system", "content": "You are a professional financial analyst. Please provide your analysis in English only, not in Chinese or any other language."},
+        {"role": "user", "content": llm_prompt}
+    ]
+    return {
+        "bull_confidence": bull_confidence,
+        "bear_confidence": bear_confidence,
+        "debate_summary": debate_summary,
+        "messages": messages,
+    }
+
+
+def _is_llm_analysis(llm_response) -> bool:
+    """Whether the reply contains a parseable JSON object; unparseable replies are not cached."""
+    json_start = llm_response.find('{')
+    json_end = llm_response.rfind('}') + 1
+    if json_start < 0 or json_end <= json_start:
+        return False
+    try:
+        return isinstance(json.loads(llm_response[json_start:json_end]), dict)
+    except json.JSONDecodeError:
+        return False
+
+
+def _parse_llm_analysis(llm_response):
+    """Parses the third-party LLM analysis, returning (llm_analysis, llm_score)."""
     llm_analysis = None
     llm_score = 0  # 默认为中性
-    try:
-        logger.info("开始调用 LLM 获取第三方分析...")
-        messages = [
-            {"role": "system", "content": "You are a professional financial analyst. Please provide your analysis in English only, not in Chinese or any other language."},
-            {"role": "user", "content": llm_prompt}
-        ]
+    # 解析 LLM 返回的 JSON
+    if llm_response:
+        try:
+            # 尝试提取 JSON 部分
+            json_start = llm_response.find('{')
+            json_end = llm_response.rfind('}') + 1
+            if json_start >= 0 and json_end > json_start:
+                json_str = llm_response[json_start:json_end]
+                llm_analysis = json.loads(json_str)
+                llm_score = float(llm_analysis.get("score", 0))
+                # 确保分数在有效范围内
+                llm_score = max(min(llm_score, 1.0), -1.0)
+                logger.info(f"成功解析 LLM 回复，评分: {llm_score}")
+                logger.debug(
+                    f"LLM 分析内容: {llm_analysis.get('analysis', '未提供分析')[:100]}...")
+        except Exception as e:
+            # 如果解析失败，记录错误并使用默认值
+            logger.error(f"解析 LLM 回复失败: {e}")
+            llm_analysis = {"analysis": "Failed to parse LLM response",
+                            "score": 0, "reasoning": "Parsing error"}
+    return llm_analysis, llm_score
 
-        # 使用log_llm_interaction装饰器记录LLM交互
-        llm_response = log_llm_interaction(state)(
-            lambda: get_chat_completion(messages)
-        )()
 
-        logger.info("LLM 返回响应完成")
+def _llm_call_failed(e: Exception):
+    logger.error(f"调用 LLM 失败: {e}")
+    return {"analysis": "LLM API call failed",
+            "score": 0, "reasoning": "API error"}, 0
 
-        # 解析 LLM 返回的 JSON
-        if llm_response:
-            try:
-                # 尝试提取 JSON 部分
-                json_start = llm_response.find('{')
-                json_end = llm_response.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = llm_response[json_start:json_end]
-                    llm_analysis = json.loads(json_str)
-                    llm_score = float(llm_analysis.get("score", 0))
-                    # 确保分数在有效范围内
-                    llm_score = max(min(llm_score, 1.0), -1.0)
-                    logger.info(f"成功解析 LLM 回复，评分: {llm_score}")
-                    logger.debug(
-                        f"LLM 分析内容: {llm_analysis.get('analysis', '未提供分析')[:100]}...")
-            except Exception as e:
-                # 如果解析失败，记录错误并使用默认值
-                logger.error(f"解析 LLM 回复失败: {e}")
-                llm_analysis = {"analysis": "Failed to parse LLM response",
-                                "score": 0, "reasoning": "Parsing error"}
-    except Exception as e:
-        logger.error(f"调用 LLM 失败: {e}")
-        llm_analysis = {"analysis": "LLM API call failed",
-                        "score": 0, "reasoning": "API error"}
+
+def _debate_result(state: AgentState, debate: dict, llm_analysis, llm_score) -> dict:
+    """Blends the researcher confidences with the LLM score into the final debate signal."""
+    show_reasoning = state["metadata"]["show_reasoning"]
+    bull_confidence = debate["bull_confidence"]
+    bear_confidence = debate["bear_confidence"]
+    debate_summary = debate["debate_summary"]
 
     # 计算混合置信度差异
     confidence_diff = bull_confidence - bear_confidence
@@ -222,3 +241,42 @@ def debate_room_agent(state: AgentState):
         },
         "metadata": state["metadata"],
     }
+
+
+@agent_endpoint("debate_room", "辩论室，分析多空双方观点，得出平衡的投资结论")
+def debate_room_agent(state: AgentState):
+    """Facilitates debate between bull and bear researchers to reach a balanced conclusion."""
+    debate = _prepare_debate(state)
+
+    # 调用 LLM 获取第三方观点
+    try:
+        logger.info("开始调用 LLM 获取第三方分析...")
+        # 使用log_llm_interaction装饰器记录LLM交互
+        llm_response = log_llm_interaction(state)(
+            lambda: get_chat_completion(debate["messages"], route="debate_room",
+                                        validate=_is_llm_analysis)
+        )()
+        logger.info("LLM 返回响应完成")
+        llm_analysis, llm_score = _parse_llm_analysis(llm_response)
+    except Exception as e:
+        llm_analysis, llm_score = _llm_call_failed(e)
+
+    return _debate_result(state, debate, llm_analysis, llm_score)
+
+
+@agent_endpoint("debate_room", "辩论室，分析多空双方观点，得出平衡的投资结论")
+async def debate_room_agent_async(state: AgentState):
+    """Async variant of debate_room_agent; awaits the LLM without holding a thread."""
+    debate = _prepare_debate(state)
+
+    try:
+        logger.info("开始调用 LLM 获取第三方分析...")
+        llm_response = await get_chat_completion_async(debate["messages"], route="debate_room",
+                                                       validate=_is_llm_analysis)
+        log_llm_interaction(state)(lambda: llm_response)()
+        logger.info("LLM 返回响应完成")
+        llm_analysis, llm_score = _parse_llm_analysis(llm_response)
+    except Exception as e:
+        llm_analysis, llm_score = _llm_call_failed(e)
+
+    return _debate_result(state, debate, llm_analysis, llm_score)
@@ -4,25 +4,17 @@ from src.tools.news_crawler import get_stock_news
 from src.utils.logging_config import setup_logger
 from src.utils.api_utils import agent_endpoint, log_llm_interaction
 import json
+import asyncio
 from datetime import datetime, timedelta
-from src.tools.openrouter_config import get_chat_completion
+from src.tools.openrouter_config import get_chat_completion, get_chat_completion_async
+from src.utils.prompt_budget import build_item_list, render_news, routed_model
 
 # 设置日志记录
 logger = setup_logger('macro_analyst_agent')
 
 
-@agent_endpoint("macro_analyst", "宏观分析师，分析宏观经济环境对目标股票的影响")
-def macro_analyst_agent(state: AgentState):
-    """Responsible for macro analysis"""
-    show_workflow_status("Macro Analyst")
-    show_reasoning = state["metadata"]["show_reasoning"]
-    data = state["data"]
-    symbol = data["ticker"]
-    logger.info(f"正在进行宏观分析: {symbol}")
-
-    # 获取 end_date 并传递给 get_stock_news
-    end_date = data.get("end_date")  # 从 run_hedge_fund 传递来的 end_date
-
+def _fetch_recent_news(symbol: str, end_date) -> list:
+    """Fetches up to 100 news items for the ticker and keeps the last 7 days."""
     # 获取大量新闻数据（最多100条），传递正确的日期参数
     news_list = get_stock_news(symbol, max_news=100, date=end_date)
 
@@ -44,20 +36,23 @@ def macro_analyst_agent(state: AgentState):
             recent_news.append(news)
 
     logger.info(f"获取到 {len(recent_news)} 条七天内的新闻")
+    return recent_news
 
-    # 如果没有获取到新闻，返回默认结果
-    if not recent_news:
-        logger.warning(f"未获取到 {symbol} 的最近新闻，无法进行宏观分析")
-        message_content = {
-            "macro_environment": "neutral",
-            "impact_on_stock": "neutral",
-            "key_factors": [],
-            "reasoning": "未获取到最近新闻，无法进行宏观分析"
-        }
-    else:
-        # 获取宏观分析结果
-        macro_analysis = get_macro_news_analysis(recent_news)
-        message_content = macro_analysis
+
+def _no_news_result(symbol: str) -> dict:
+    logger.warning(f"未获取到 {symbol} 的最近新闻，无法进行宏观分析")
+    return {
+        "macro_environment": "neutral",
+        "impact_on_stock": "neutral",
+        "key_factors": [],
+        "reasoning": "未获取到最近新闻，无法进行宏观分析"
+    }
+
+
+def _macro_result(state: AgentState, message_content: dict) -> dict:
+    """Builds the agent output from the macro analysis."""
+    show_reasoning = state["metadata"]["show_reasoning"]
+    data = state["data"]
 
     # 如果需要显示推理过程
     if show_reasoning:
@@ -85,6 +80,45 @@ def macro_analyst_agent(state: AgentState):
     }
 
 
+@agent_endpoint("macro_analyst", "宏观分析师，分析宏观经济环境对目标股票的影响")
+def macro_analyst_agent(state: AgentState):
+    """Responsible for macro analysis"""
+    show_workflow_status("Macro Analyst")
+    data = state["data"]
+    symbol = data["ticker"]
+    logger.info(f"正在进行宏观分析: {symbol}")
+
+    # 获取 end_date 并传递给 get_stock_news
+    end_date = data.get("end_date")  # 从 run_hedge_fund 传递来的 end_date
+
+    recent_news = _fetch_recent_news(symbol, end_date)
+    # 如果没有获取到新闻，返回默认结果
+    if not recent_news:
+        message_content = _no_news_result(symbol)
+    else:
+        # 获取宏观分析结果
+        message_content = get_macro_news_analysis(recent_news)
+    return _macro_result(state, message_content)
+
+
+@agent_endpoint("macro_analyst", "宏观分析师，分析宏观经济环境对目标股票的影响")
+async def macro_analyst_agent_async(state: AgentState):
+    """Async variant of macro_analyst_agent; the news crawl runs in a worker thread."""
+    show_workflow_status("Macro Analyst")
+    data = state["data"]
+    symbol = data["ticker"]
+    logger.info(f"正在进行宏观分析: {symbol}")
+    end_date = data.get("end_date")
+
+    # 新闻爬取仍是同步实现，放到线程中执行以免阻塞事件循环
+    recent_news = await asyncio.to_thread(_fetch_recent_news, symbol, end_date)
+    if not recent_news:
+        message_content = _no_news_result(symbol)
+    else:
+        message_content = await get_macro_news_analysis_async(recent_news)
+    return _macro_result(state, message_content)
+
+
 def get_macro_news_analysis(news_list: list) -> dict:
     """分析宏观经济新闻对股票的影响
 
@@ -102,31 +136,38 @@ def get_macro_news_analysis(news_list: list) -> dict:
             "reasoning": "没有足够的新闻数据进行宏观分析"
         }
 
-    # 检查缓存
-    import os
-    cache_file = "src/data/macro_analysis_cache.json"
-    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    messages = _macro_analysis_messages(news_list)
+    try:
+        # 获取LLM分析结果
+        logger.info("正在调用LLM进行宏观分析...")
+        result = get_chat_completion(messages, route="macro_analyst", validate=_is_macro_analysis)
+        return _parse_macro_analysis(result)
+    except Exception as e:
+        return _macro_analysis_error(e)
 
-    # 生成新闻内容的唯一标识
-    news_key = "|".join([
-        f"{news['title']}|{news['publish_time']}"
-        for news in news_list[:20]  # 使用前20条新闻作为标识
-    ])
 
-    # 检查缓存
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache = json.load(f)
-                if news_key in cache:
-                    logger.info("使用缓存的宏观分析结果")
-                    return cache[news_key]
-        except Exception as e:
-            logger.error(f"读取宏观分析缓存出错: {e}")
-            cache = {}
-    else:
-        logger.info("未找到宏观分析缓存文件，将创建新文件")
-        cache = {}
+async def get_macro_news_analysis_async(news_list: list) -> dict:
+    """get_macro_news_analysis 的异步版本，参数和返回值相同"""
+    if not news_list:
+        return {
+            "macro_environment": "neutral",
+            "impact_on_stock": "neutral",
+            "key_factors": [],
+            "reasoning": "没有足够的新闻数据进行宏观分析"
+        }
+
+    messages = _macro_analysis_messages(news_list)
+    try:
+        logger.info("正在调用LLM进行宏观分析...")
+        result = await get_chat_completion_async(messages, route="macro_analyst", validate=_is_macro_analysis)
+        return _parse_macro_analysis(result)
+    except Exception as e:
+        return _macro_analysis_error(e)
+
+
+def _macro_analysis_messages(news_list: list) -> list:
+    """构建宏观分析的 LLM 消息"""
+    # 相同新闻的分析结果由 get_chat_completion 的共享 LLM 缓存直接返回
 
     # 准备系统消息
     system_message = {
@@ -155,81 +196,85 @@ def get_macro_news_analysis(news_list: list) -> dict:
     }
 
     # 准备新闻内容
-    news_content = "\n\n".join([
-        f"标题：{news['title']}\n"
-        f"来源：{news['source']}\n"
-        f"时间：{news['publish_time']}\n"
-        f"内容：{news['content']}"
-        # 使用前50条新闻进行分析，注意这里不是100，因为可能超过上下文限制，可根据自己的LLM来自行设置
-        for news in news_list[:50]
-    ])
+    # 按 token 预算（PROMPT_TOKEN_BUDGET_MACRO_ANALYST）保留最新的新闻，避免超过上下文限制
+    news_content, _ = build_item_list(
+        "macro_analyst", news_list, render=render_news,
+        priority=lambda news: news.get("publish_time", ""), model=routed_model("macro_analyst"))
 
     user_message = {
         "role": "user",
         "content": f"请分析以下新闻，评估当前宏观经济环境及其对相关A股上市公司的影响：\n\n{news_content}\n\n请以JSON格式返回结果，包含以下字段：macro_environment（宏观环境：positive/neutral/negative）、impact_on_stock（对股票影响：positive/neutral/negative）、key_factors（关键因素数组）、reasoning（详细推理）。"
     }
 
-    try:
-        # 获取LLM分析结果
-        logger.info("正在调用LLM进行宏观分析...")
-        result = get_chat_completion([system_message, user_message])
-        if result is None:
-            logger.error("LLM分析失败，无法获取宏观分析结果")
-            return {
-                "macro_environment": "neutral",
-                "impact_on_stock": "neutral",
-                "key_factors": [],
-                "reasoning": "LLM分析失败，无法获取宏观分析结果"
-            }
+    return [system_message, user_message]
 
-        # 解析JSON结果
+
+def _is_macro_analysis(result) -> bool:
+    """回答能否解析为宏观分析 JSON（无法解析的回答不写入 LLM 缓存）"""
+    import re
+    json_match = re.search(r'```json\s*(.*?)\s*```', result, re.DOTALL)
+    for text in (result.strip(), json_match.group(1).strip() if json_match else None):
+        if text is None:
+            continue
         try:
-            # 尝试直接解析
-            analysis_result = json.loads(result.strip())
-            logger.info("成功解析LLM返回的JSON结果")
+            json.loads(text)
+            return True
         except json.JSONDecodeError:
-            # 如果直接解析失败，尝试提取JSON部分
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', result, re.DOTALL)
-            if json_match:
-                try:
-                    analysis_result = json.loads(json_match.group(1).strip())
-                    logger.info("成功从代码块中提取并解析JSON结果")
-                except:
-                    # 如果仍然失败，返回默认结果
-                    logger.error("无法解析代码块中的JSON结果")
-                    return {
-                        "macro_environment": "neutral",
-                        "impact_on_stock": "neutral",
-                        "key_factors": [],
-                        "reasoning": "无法解析LLM返回的JSON结果"
-                    }
-            else:
-                # 如果没有找到JSON，返回默认结果
-                logger.error("LLM未返回有效的JSON格式结果")
+            continue
+    return False
+
+
+def _parse_macro_analysis(result) -> dict:
+    """解析 LLM 返回的宏观分析 JSON，失败时返回中性结果"""
+    if result is None:
+        logger.error("LLM分析失败，无法获取宏观分析结果")
+        return {
+            "macro_environment": "neutral",
+            "impact_on_stock": "neutral",
+            "key_factors": [],
+            "reasoning": "LLM分析失败，无法获取宏观分析结果"
+        }
+
+    # 解析JSON结果
+    try:
+        # 尝试直接解析
+        analysis_result = json.loads(result.strip())
+        logger.info("成功解析LLM返回的JSON结果")
+    except json.JSONDecodeError:
+        # 如果直接解析失败，尝试提取JSON部分
+        import re
+        json_match = re.search(r'```json\s*(.*?)\s*```', result, re.DOTALL)
+        if json_match:
+            try:
+                analysis_result = json.loads(json_match.group(1).strip())
+                logger.info("成功从代码块中提取并解析JSON结果")
+            except:
+                # 如果仍然失败，返回默认结果
+                logger.error("无法解析代码块中的JSON结果")
                 return {
                     "macro_environment": "neutral",
                     "impact_on_stock": "neutral",
                     "key_factors": [],
-                    "reasoning": "LLM未返回有效的JSON格式结果"
+                    "reasoning": "无法解析LLM返回的JSON结果"
                 }
+        else:
+            # 如果没有找到JSON，返回默认结果
+            logger.error("LLM未返回有效的JSON格式结果")
+            return {
+                "macro_environment": "neutral",
+                "impact_on_stock": "neutral",
+                "key_factors": [],
+                "reasoning": "LLM未返回有效的JSON格式结果"
+            }
 
-        # 缓存结果
-        cache[news_key] = analysis_result
-        try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, ensure_ascii=False, indent=2)
-            logger.info("宏观分析结果已缓存")
-        except Exception as e:
-            logger.error(f"写入宏观分析缓存出错: {e}")
+    return analysis_result
 
-        return analysis_result
 
-    except Exception as e:
-        logger.error(f"宏观分析出错: {e}")
-        return {
-            "macro_environment": "neutral",
-            "impact_on_stock": "neutral",
-            "key_factors": [],
-            "reasoning": f"分析过程中出错: {str(e)}"
-        }
+def _macro_analysis_error(e: Exception) -> dict:
+    logger.error(f"宏观分析出错: {e}")
+    return {
+        "macro_environment": "neutral",
+        "impact_on_stock": "neutral",
+        "key_factors": [],
+        "reasoning": f"分析过程中出错: {str(e)}"
+    }
@@ -1,5 +1,9 @@
 import os
 import json
+import asyncio
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import akshare as ak
 from src.utils.logging_config import setup_logger
@@ -8,7 +12,8 @@ from src.utils.logging_config import setup_logger
 from src.agents.state import AgentState, show_agent_reasoning, show_workflow_status
 from typing import Dict, Any, List
 from src.utils.api_utils import agent_endpoint  # Added for alignment
-from src.tools.openrouter_config import get_chat_completion
+from src.tools.openrouter_config import get_chat_completion, get_chat_completion_async
+from src.utils.prompt_budget import build_item_list, compact_json, count_tokens, get_token_budget, routed_model
 from langchain_core.messages import HumanMessage  # Added import
 
 # LLM Prompt for analyzing full news data
@@ -27,135 +32,248 @@ LLM_PROMPT_MACRO_ANALYSIS = """你是一名资深的A股市场宏观分析师。
 {news_data_json_string}
 """
 
+# Map 阶段：对一组新闻提取要点
+LLM_PROMPT_MACRO_CHUNK = """你是一名资深的A股市场宏观分析师。以下是沪深300指数（代码：000300）当日新闻中的一部分。请提炼这些新闻中与宏观分析相关的要点，包括：市场情绪倾向及依据、涉及的热点板块或主题、潜在风险、重要政策变动。
+
+要点需简洁、客观，保留关键数据和事实，不超过300字。直接返回要点内容，不要包含任何额外说明。
+
+**新闻数据如下：**
+{news_data_json_string}
+"""
+
+# Reduce 阶段：基于各部分要点生成完整报告
+LLM_PROMPT_MACRO_REDUCE = """你是一名资深的A股市场宏观分析师。以下是沪深300指数（代码：000300）当日**全部新闻**按批次提炼出的要点，请综合这些要点生成一份专业的宏观总结报告。
+
+报告应包含以下几个方面：
+1.  **市场情绪解读**：整体评估当前市场情绪（如：乐观、谨慎、悲观），并简述判断依据。
+2.  **热点板块识别**：找出新闻中反映出的1-3个主要热点板块或主题，并说明其驱动因素。
+3.  **潜在风险提示**：揭示新闻中可能隐藏的1-2个宏观层面或市场层面的潜在风险点。
+4.  **政策影响分析**：如果新闻提及重要政策变动，请分析其可能对市场产生的短期和长期影响。
+5.  **综合展望**：基于以上分析，对短期市场走势给出一个简明扼要的展望。
+
+请确保分析客观、逻辑清晰，语言专业。直接返回分析报告内容，不要包含任何额外说明或客套话。
+
+**各批次新闻要点如下：**
+{partial_summaries}
+"""
+
 # 初始化 logger
 logger = setup_logger('macro_news_agent')
 
 
-@agent_endpoint("macro_news_agent", "获取沪深300全量新闻并进行宏观分析，为投资决策提供市场层面的宏观环境评估")
-def macro_news_agent(state: AgentState) -> Dict[str, Any]:
-    """
-    获取沪深300全量新闻，调用LLM进行宏观分析，并保存结果。
-    该Agent独立运行，不依赖特定上游数据，结果注入AgentState。
+def _summary_mode() -> str:
+    """新闻总结模式：single（单次调用）、map_reduce（分块总结后合并）或 auto（超出 token 预算时分块）"""
+    return os.getenv("MACRO_NEWS_SUMMARY_MODE", "auto").lower()
+
+
+def _chunk_news(news_list: List[Dict[str, str]], chunk_size: int = None) -> List[List[Dict[str, str]]]:
+    """按发布时间排序后切分新闻
+
+    块边界由新闻本身的哈希决定（内容定义分块），新增或移除新闻只影响其所在的块，
+    其余块的内容不变，可以直接命中共享 LLM 缓存。块大小平均为 chunk_size，
+    最大为 2 * chunk_size。
     """
-    agent_name = "macro_news_agent"
-    show_workflow_status(f"{agent_name}: --- Executing Macro News Agent ---")
-    symbol = "000300"  # 沪深300指数
+    chunk_size = chunk_size or int(os.getenv("MACRO_NEWS_CHUNK_SIZE", 20))
+    ordered = sorted(news_list, key=lambda news: (
+        news.get("publish_time", ""), news.get("title", "")))
+    chunks, current = [], []
+    for news in ordered:
+        current.append(news)
+        digest = hashlib.md5(
+            f"{news.get('publish_time', '')}|{news.get('title', '')}".encode("utf-8")).digest()
+        if int.from_bytes(digest[:4], "big") % chunk_size == 0 or len(current) >= 2 * chunk_size:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _use_map_reduce(news_list: List[Dict[str, str]], chunks: List[List[Dict[str, str]]]) -> bool:
+    """auto 模式下，全部新闻放不进 macro_news 的 token 预算（单次调用会丢弃新闻）时才分块"""
+    mode = _summary_mode()
+    if mode == "map_reduce":
+        return True
+    if mode != "auto" or len(chunks) < 2:
+        return False
+    return count_tokens(f"[{','.join(compact_json(news) for news in news_list)}]",
+                        model=routed_model("macro_news")) > get_token_budget("macro_news")
+
+
+def _chunk_messages(chunk: List[Dict[str, str]]) -> list:
+    items_json, _ = build_item_list(
+        "macro_news", chunk, render=compact_json, separator=",",
+        priority=lambda news: news.get("publish_time", ""), model=routed_model("macro_news"))
+    return [{"role": "user", "content": LLM_PROMPT_MACRO_CHUNK.format(
+        news_data_json_string=f"[{items_json}]")}]
+
+
+def _reduce_messages(agent_name: str, partial_summaries: List[str]) -> list:
+    """合并各块要点的 LLM 消息；所有块均失败时抛出异常"""
+    valid = [summary.strip() for summary in partial_summaries if summary]
+    if not valid:
+        raise RuntimeError("所有新闻分块的总结均失败")
+    show_workflow_status(
+        f"{agent_name}: {len(valid)}/{len(partial_summaries)} 个分块总结完成，开始合并。")
+    joined = "\n\n".join(
+        f"【第{i}批】\n{summary}" for i, summary in enumerate(valid, 1))
+    return [{"role": "user", "content": LLM_PROMPT_MACRO_REDUCE.format(partial_summaries=joined)}]
+
+
+def _map_concurrency() -> int:
+    return max(int(os.getenv("MACRO_NEWS_MAP_CONCURRENCY", 4)), 1)
+
+
+def _map_reduce_summary(agent_name: str, chunks: List[List[Dict[str, str]]]):
+    """分块并发总结（有界并发），再合并为最终报告"""
+    show_workflow_status(
+        f"{agent_name}: Map-reduce summarization over {len(chunks)} chunks.")
+    with ThreadPoolExecutor(max_workers=_map_concurrency()) as executor:
+        # 复制上下文，使工作线程的输出仍归属当前 Agent 的运行记录
+        futures = [
+            executor.submit(contextvars.copy_context().run,
+                            lambda chunk=chunk: get_chat_completion(messages=_chunk_messages(chunk), route="macro_news"))
+            for chunk in chunks
+        ]
+        partial_summaries = [future.result() for future in futures]
+    return get_chat_completion(messages=_reduce_messages(agent_name, partial_summaries), route="macro_news")
+
+
+async def _map_reduce_summary_async(agent_name: str, chunks: List[List[Dict[str, str]]]):
+    show_workflow_status(
+        f"{agent_name}: Map-reduce summarization over {len(chunks)} chunks.")
+    semaphore = asyncio.Semaphore(_map_concurrency())
+
+    async def summarize(chunk):
+        async with semaphore:
+            return await get_chat_completion_async(messages=_chunk_messages(chunk), route="macro_news")
+
+    partial_summaries = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+    return await get_chat_completion_async(messages=_reduce_messages(agent_name, partial_summaries), route="macro_news")
+
+
+def _load_cached_summary(agent_name: str, today_str: str, output_file_path: str):
+    """读取当日已保存的宏观总结，返回 (summary, retrieved_news_count)，未命中时 summary 为 None"""
+    if not os.path.exists(output_file_path):
+        return None, 0
+    try:
+        with open(output_file_path, 'r', encoding='utf-8') as f:
+            all_summaries = json.load(f)
+        if today_str in all_summaries and all_summaries[today_str].get("summary_content"):
+            cached_data = all_summaries[today_str]
+            summary = cached_data["summary_content"]
+            retrieved_news_count = cached_data.get(
+                "retrieved_news_count", 0)  # Get cached news count
+            show_workflow_status(
+                f"{agent_name}: 从缓存加载 {today_str} 的宏观新闻总结。")
+            show_agent_reasoning(
+                f"Loaded macro summary for {today_str} from cache. News count: {retrieved_news_count}", agent_name)
+            return summary, retrieved_news_count
+    except json.JSONDecodeError:
+        show_agent_reasoning(
+            f"JSONDecodeError for {output_file_path} when trying to load cache. Will fetch fresh data.", agent_name)
+    except Exception as e:
+        show_agent_reasoning(
+            f"Error loading cache from {output_file_path}: {str(e)}. Will fetch fresh data.", agent_name)
+    return None, 0
+
+
+def _fetch_index_news(agent_name: str, symbol: str) -> List[Dict[str, str]]:
+    """获取指数的全量新闻，转换为供 LLM 分析的列表"""
+    show_workflow_status(
+        f"{agent_name}: Fetching news for symbol {symbol}")
+    news_df = ak.stock_news_em(symbol=symbol)
+    if news_df is None or news_df.empty:
+        message = f"未获取到 {symbol} 的新闻数据。"
+        show_workflow_status(f"{agent_name}: {message}")
+        show_agent_reasoning(
+            f"No news found for {symbol}. Proceeding with no data summary.", agent_name)
+        return []
+
+    retrieved_news_count = len(news_df)
+    message = f"成功获取到 {symbol} 的 {retrieved_news_count} 条新闻数据。"
+    show_workflow_status(f"{agent_name}: {message}")
+    show_agent_reasoning(
+        f"Successfully fetched {retrieved_news_count} news items for {symbol}. Preparing for LLM analysis.", agent_name)
     news_list_for_llm: List[Dict[str, str]] = []
-    summary = f"宏观新闻分析过程中发生错误: 未知错误"  # Default error summary
-    retrieved_news_count = 0
-    from_cache = False  # Flag to indicate if summary was loaded from cache
+    for _, row in news_df.iterrows():
+        news_item = {
+            "title": str(row.get("新闻标题", "")).strip(),
+            "content": str(row.get("新闻内容", "")).strip(),  # 全量内容
+            "publish_time": str(row.get("发布时间", "")).strip()
+        }
+        news_list_for_llm.append(news_item)
+    return news_list_for_llm
 
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    output_file_path = os.path.join("src", "data", "macro_summary.json")
 
-    # Attempt to load from cache first
+def _macro_news_messages(agent_name: str, news_list_for_llm: List[Dict[str, str]]) -> list:
+    # 紧凑序列化并按 token 预算保留最新的新闻，超长正文截断
+    items_json, _ = build_item_list(
+        "macro_news", news_list_for_llm, render=compact_json, separator=",",
+        priority=lambda news: news.get("publish_time", ""), model=routed_model("macro_news"),
+        original_render=lambda items: json.dumps(items, ensure_ascii=False, indent=2))
+    news_data_json_string = f"[{items_json}]"
+    prompt_filled = LLM_PROMPT_MACRO_ANALYSIS.format(
+        news_data_json_string=news_data_json_string)
+
+    show_workflow_status(
+        f"{agent_name}: Calling LLM for analysis.")
+    return [{"role": "user", "content": prompt_filled}]
+
+
+def _summary_from_llm(agent_name: str, llm_response) -> str:
+    summary = llm_response.strip() if llm_response else "LLM分析未能返回有效结果。"
+    show_workflow_status(f"{agent_name}: LLM宏观分析结果获取成功.")
+    show_agent_reasoning(
+        f"LLM analysis complete. Summary (first 100 chars): {summary[:100]}...", agent_name)
+    return summary
+
+
+def _summary_from_error(agent_name: str, e: Exception) -> str:
+    error_message = f"{agent_name}: 执行出错: {e}"
+    show_workflow_status(error_message)
+    show_agent_reasoning(
+        f"Exception during execution: {str(e)}", agent_name)
+    return f"宏观新闻分析过程中发生错误: {str(e)}"
+
+
+def _save_summary(agent_name: str, today_str: str, output_file_path: str,
+                  summary: str, retrieved_news_count: int) -> None:
+    """将当日总结写入 macro_summary.json（保留其他日期的记录）"""
+    show_workflow_status(
+        f"{agent_name}: Preparing to save summary to {output_file_path}")
+
+    all_summaries = {}
     if os.path.exists(output_file_path):
         try:
             with open(output_file_path, 'r', encoding='utf-8') as f:
                 all_summaries = json.load(f)
-            if today_str in all_summaries and all_summaries[today_str].get("summary_content"):
-                cached_data = all_summaries[today_str]
-                summary = cached_data["summary_content"]
-                retrieved_news_count = cached_data.get(
-                    "retrieved_news_count", 0)  # Get cached news count
-                from_cache = True
-                show_workflow_status(
-                    f"{agent_name}: 从缓存加载 {today_str} 的宏观新闻总结。")
-                show_agent_reasoning(
-                    f"Loaded macro summary for {today_str} from cache. News count: {retrieved_news_count}", agent_name)
-        except json.JSONDecodeError:
-            show_agent_reasoning(
-                f"JSONDecodeError for {output_file_path} when trying to load cache. Will fetch fresh data.", agent_name)
-            all_summaries = {}  # Reset if file is corrupt
-        except Exception as e:
-            show_agent_reasoning(
-                f"Error loading cache from {output_file_path}: {str(e)}. Will fetch fresh data.", agent_name)
-            all_summaries = {}  # Reset on other errors
+        except (json.JSONDecodeError, OSError):
+            all_summaries = {}  # If still error, start fresh
 
-    if not from_cache:
-        show_workflow_status(f"{agent_name}: 缓存中未找到今日总结或缓存无效，开始获取实时新闻。")
-        try:
-            show_workflow_status(
-                f"{agent_name}: Fetching news for symbol {symbol}")
-            news_df = ak.stock_news_em(symbol=symbol)
-            if news_df is None or news_df.empty:
-                message = f"未获取到 {symbol} 的新闻数据。"
-                show_workflow_status(f"{agent_name}: {message}")
-                show_agent_reasoning(
-                    f"No news found for {symbol}. Proceeding with no data summary.", agent_name)
-                summary = "今日未获取到相关宏观新闻数据。"
-            else:
-                retrieved_news_count = len(news_df)
-                message = f"成功获取到 {symbol} 的 {retrieved_news_count} 条新闻数据。"
-                show_workflow_status(f"{agent_name}: {message}")
-                show_agent_reasoning(
-                    f"Successfully fetched {retrieved_news_count} news items for {symbol}. Preparing for LLM analysis.", agent_name)
-                for _, row in news_df.iterrows():
-                    news_item = {
-                        "title": str(row.get("新闻标题", "")).strip(),
-                        "content": str(row.get("新闻内容", "")).strip(),  # 全量内容
-                        "publish_time": str(row.get("发布时间", "")).strip()
-                    }
-                    news_list_for_llm.append(news_item)
-
-                news_data_json_string = json.dumps(
-                    news_list_for_llm, ensure_ascii=False, indent=2)
-                prompt_filled = LLM_PROMPT_MACRO_ANALYSIS.format(
-                    news_data_json_string=news_data_json_string)
-
-                show_workflow_status(
-                    f"{agent_name}: Calling LLM for analysis.")
-                llm_response = get_chat_completion(
-                    messages=[{"role": "user", "content": prompt_filled}]
-                )
-                summary = llm_response.strip() if llm_response else "LLM分析未能返回有效结果。"
-                show_workflow_status(f"{agent_name}: LLM宏观分析结果获取成功.")
-                show_agent_reasoning(
-                    f"LLM analysis complete. Summary (first 100 chars): {summary[:100]}...", agent_name)
+    os.makedirs(os.path.dirname(output_file_path),
+                exist_ok=True)  # Ensure directory exists
 
-        except Exception as e:
-            error_message = f"{agent_name}: 执行出错: {e}"
-            show_workflow_status(error_message)
-            show_agent_reasoning(
-                f"Exception during execution: {str(e)}", agent_name)
-            summary = f"宏观新闻分析过程中发生错误: {str(e)}"
+    current_summary_details = {
+        "summary_content": summary,
+        "retrieved_news_count": retrieved_news_count,
+        "last_updated": datetime.now().isoformat()
+    }
+    all_summaries[today_str] = current_summary_details
 
-    # 保存总结到JSON文件 (only if not from cache and successful, or if updating existing)
-    if not from_cache:  # Also save if summary was updated, even if initially from cache but e.g. re-analyzed
+    try:
+        with open(output_file_path, 'w', encoding='utf-8') as f:
+            json.dump(all_summaries, f, ensure_ascii=False, indent=4)
         show_workflow_status(
-            f"{agent_name}: Preparing to save summary to {output_file_path}")
-
-        # Ensure all_summaries is initialized if cache loading failed or file didn't exist
-        if not os.path.exists(output_file_path) or 'all_summaries' not in locals():
-            all_summaries = {}
-            # if file exists but all_summaries wasn't set (e.g. decode error)
-            if os.path.exists(output_file_path):
-                try:
-                    with open(output_file_path, 'r', encoding='utf-8') as f:
-                        all_summaries = json.load(f)
-                except json.JSONDecodeError:
-                    all_summaries = {}  # If still error, start fresh
-
-        os.makedirs(os.path.dirname(output_file_path),
-                    exist_ok=True)  # Ensure directory exists
-
-        current_summary_details = {
-            "summary_content": summary,
-            "retrieved_news_count": retrieved_news_count,
-            "last_updated": datetime.now().isoformat()
-        }
-        all_summaries[today_str] = current_summary_details
+            f"{agent_name}: 宏观新闻总结已保存到: {output_file_path}")
+    except Exception as e:
+        show_workflow_status(f"{agent_name}: 保存宏观新闻总结文件失败: {e}")
+        show_agent_reasoning(
+            f"Failed to save summary to {output_file_path}: {str(e)}", agent_name)
 
-        try:
-            with open(output_file_path, 'w', encoding='utf-8') as f:
-                json.dump(all_summaries, f, ensure_ascii=False, indent=4)
-            show_workflow_status(
-                f"{agent_name}: 宏观新闻总结已保存到: {output_file_path}")
-        except Exception as e:
-            show_workflow_status(f"{agent_name}: 保存宏观新闻总结文件失败: {e}")
-            show_agent_reasoning(
-                f"Failed to save summary to {output_file_path}: {str(e)}", agent_name)
 
+def _macro_news_result(state: AgentState, agent_name: str, today_str: str, summary: str,
+                       retrieved_news_count: int, from_cache: bool) -> Dict[str, Any]:
     show_workflow_status(f"{agent_name}: Execution finished.")
 
     new_message_content = f"Macro News Agent Analysis for {today_str} (from_cache={from_cache}):\\n{summary}"
@@ -167,9 +285,6 @@ def macro_news_agent(state: AgentState) -> Dict[str, Any]:
         "llm_summary_preview": summary[:150] + "..." if len(summary) > 150 else summary,
         "loaded_from_cache": from_cache
     }
-    # logger.info(f"--- DEBUG: macro_news_agent COMPLETED ---")
-    # logger.info(
-    # f"--- DEBUG: macro_news_agent RETURN messages: {[msg.name for msg in [new_message]]} ---")
     return {
         "messages": [new_message],
         "data": {**state["data"], "macro_news_analysis_result": summary},
@@ -178,3 +293,91 @@ def macro_news_agent(state: AgentState) -> Dict[str, Any]:
             f"{agent_name}_details": agent_details_for_metadata
         }
     }
+
+
+@agent_endpoint("macro_news_agent", "获取沪深300全量新闻并进行宏观分析，为投资决策提供市场层面的宏观环境评估")
+def macro_news_agent(state: AgentState) -> Dict[str, Any]:
+    """
+    获取沪深300全量新闻，调用LLM进行宏观分析，并保存结果。
+    该Agent独立运行，不依赖特定上游数据，结果注入AgentState。
+    """
+    agent_name = "macro_news_agent"
+    show_workflow_status(f"{agent_name}: --- Executing Macro News Agent ---")
+    symbol = "000300"  # 沪深300指数
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    output_file_path = os.path.join("src", "data", "macro_summary.json")
+
+    # Attempt to load from cache first
+    summary, retrieved_news_count = _load_cached_summary(
+        agent_name, today_str, output_file_path)
+    from_cache = summary is not None
+
+    if not from_cache:
+        show_workflow_status(f"{agent_name}: 缓存中未找到今日总结或缓存无效，开始获取实时新闻。")
+        try:
+            news_list_for_llm = _fetch_index_news(agent_name, symbol)
+            retrieved_news_count = len(news_list_for_llm)
+            if not news_list_for_llm:
+                summary = "今日未获取到相关宏观新闻数据。"
+            else:
+                chunks = _chunk_news(news_list_for_llm)
+                if _use_map_reduce(news_list_for_llm, chunks):
+                    llm_response = _map_reduce_summary(agent_name, chunks)
+                else:
+                    llm_response = get_chat_completion(
+                        messages=_macro_news_messages(agent_name, news_list_for_llm),
+                        route="macro_news"
+                    )
+                summary = _summary_from_llm(agent_name, llm_response)
+        except Exception as e:
+            summary = _summary_from_error(agent_name, e)
+
+        # 保存总结到JSON文件 (only if not from cache)
+        _save_summary(agent_name, today_str, output_file_path,
+                      summary, retrieved_news_count)
+
+    return _macro_news_result(state, agent_name, today_str, summary,
+                              retrieved_news_count, from_cache)
+
+
+@agent_endpoint("macro_news_agent", "获取沪深300全量新闻并进行宏观分析，为投资决策提供市场层面的宏观环境评估")
+async def macro_news_agent_async(state: AgentState) -> Dict[str, Any]:
+    """
+    macro_news_agent 的异步版本：新闻获取在线程中执行，LLM 调用使用异步客户端。
+    """
+    agent_name = "macro_news_agent"
+    show_workflow_status(f"{agent_name}: --- Executing Macro News Agent ---")
+    symbol = "000300"  # 沪深300指数
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    output_file_path = os.path.join("src", "data", "macro_summary.json")
+
+    summary, retrieved_news_count = _load_cached_summary(
+        agent_name, today_str, output_file_path)
+    from_cache = summary is not None
+
+    if not from_cache:
+        show_workflow_status(f"{agent_name}: 缓存中未找到今日总结或缓存无效，开始获取实时新闻。")
+        try:
+            news_list_for_llm = await asyncio.to_thread(
+                _fetch_index_news, agent_name, symbol)
+            retrieved_news_count = len(news_list_for_llm)
+            if not news_list_for_llm:
+                summary = "今日未获取到相关宏观新闻数据。"
+            else:
+                chunks = _chunk_news(news_list_for_llm)
+                if _use_map_reduce(news_list_for_llm, chunks):
+                    llm_response = await _map_reduce_summary_async(agent_name, chunks)
+                else:
+                    llm_response = await get_chat_completion_async(
+                        messages=_macro_news_messages(agent_name, news_list_for_llm),
+                        route="macro_news"
+                    )
+                summary = _summary_from_llm(agent_name, llm_response)
+        except Exception as e:
+            summary = _summary_from_error(agent_name, e)
+
+        _save_summary(agent_name, today_str, output_file_path,
+                      summary, retrieved_news_count)
+
+    return _macro_news_result(state, agent_name, today_str, summary,
+                              retrieved_news_count, from_cache)
@@ -2,15 +2,45 @@ from langchain_core.messages import HumanMessage
 from src.tools.openrouter_config import get_chat_completion
 from src.agents.state import AgentState, show_agent_reasoning, show_workflow_status
 from src.tools.api import get_financial_metrics, get_financial_statements, get_market_data, get_price_history
+from src.tools.price_columns import PriceColumns
 from src.utils.logging_config import setup_logger
 from src.utils.api_utils import agent_endpoint, log_llm_interaction
 
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import contextvars
 from datetime import datetime, timedelta
+import os
+import time
 import pandas as pd
 
 # 设置日志记录
 logger = setup_logger('market_data_agent')
 
+# 全部数据源的总超时时间（秒），超时的数据源使用默认值继续
+FETCH_TIMEOUT = float(os.getenv("MARKET_DATA_FETCH_TIMEOUT", "60"))
+
+
+def _collect(futures: dict, defaults: dict, timeout: float) -> dict:
+    """等待所有数据获取任务，失败或超时的任务返回对应的默认值
+
+    超时从提交时统一计时，因此整体耗时取决于最慢的一个请求而不是各请求之和。
+    各任务须在独立的线程中立即开始执行，否则排队时间也会计入超时。
+    """
+    deadline = time.monotonic() + timeout
+    results = {}
+    for name, future in futures.items():
+        remaining = max(deadline - time.monotonic(), 0)
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.error(f"获取{name}超时（{timeout}秒），使用默认值继续")
+            results[name] = defaults[name]
+        except Exception as e:
+            logger.error(f"获取{name}失败: {str(e)}")
+            results[name] = defaults[name]
+    return results
+
 
 @agent_endpoint("market_data", "市场数据收集，负责获取股价历史、财务指标和市场信息")
 def market_data_agent(state: AgentState):
@@ -42,41 +72,50 @@ def market_data_agent(state: AgentState):
     # Get all required data
     ticker = data["ticker"]
 
-    # 获取价格数据并验证
-    prices_df = get_price_history(ticker, start_date, end_date)
+    # 并发获取价格数据、财务指标、财务报表和市场数据
+    # 每次运行使用自己的线程池（每个数据源一个线程），并发的运行之间不会互相排队；
+    # 在复制的上下文中执行，使工作线程的日志和输出归入当前Agent的捕获
+    tasks = {
+        "价格数据": (get_price_history, ticker, start_date, end_date),
+        "财务指标": (get_financial_metrics, ticker),
+        "财务报表": (get_financial_statements, ticker),
+        "市场数据": (get_market_data, ticker),
+    }
+    executor = ThreadPoolExecutor(
+        max_workers=len(tasks), thread_name_prefix="market_data")
+    try:
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, *task)
+            for name, task in tasks.items()
+        }
+        results = _collect(futures, {
+            "价格数据": None,
+            "财务指标": {},
+            "财务报表": {},
+            "市场数据": {"market_cap": 0},
+        }, FETCH_TIMEOUT)
+    finally:
+        # 不等待超时仍在运行的请求
+        executor.shutdown(wait=False)
+
+    # 验证价格数据
+    prices_df = results["价格数据"]
     if prices_df is None or prices_df.empty:
         logger.warning(f"警告：无法获取{ticker}的价格数据，将使用空数据继续")
         prices_df = pd.DataFrame(
             columns=['close', 'open', 'high', 'low', 'volume'])
 
-    # 获取财务指标
-    try:
-        financial_metrics = get_financial_metrics(ticker)
-    except Exception as e:
-        logger.error(f"获取财务指标失败: {str(e)}")
-        financial_metrics = {}
-
-    # 获取财务报表
-    try:
-        financial_line_items = get_financial_statements(ticker)
-    except Exception as e:
-        logger.error(f"获取财务报表失败: {str(e)}")
-        financial_line_items = {}
-
-    # 获取市场数据
-    try:
-        market_data = get_market_data(ticker)
-    except Exception as e:
-        logger.error(f"获取市场数据失败: {str(e)}")
-        market_data = {"market_cap": 0}
+    financial_metrics = results["财务指标"]
+    financial_line_items = results["财务报表"]
+    market_data = results["市场数据"]
 
     # 确保数据格式正确
     if not isinstance(prices_df, pd.DataFrame):
         prices_df = pd.DataFrame(
             columns=['close', 'open', 'high', 'low', 'volume'])
 
-    # 转换价格数据为字典格式
-    prices_dict = prices_df.to_dict('records')
+    # 转换价格数据为列式容器，下游 agent 直接得到共享内存的 DataFrame
+    price_columns = PriceColumns.from_dataframe(prices_df)
 
     # 保存推理信息到metadata供API使用
     market_data_summary = {
@@ -84,7 +123,7 @@ def market_data_agent(state: AgentState):
         "start_date": start_date,
         "end_date": end_date,
         "data_collected": {
-            "price_history": len(prices_dict) > 0,
+            "price_history": len(price_columns) > 0,
             "financial_metrics": len(financial_metrics) > 0,
             "financial_statements": len(financial_line_items) > 0,
             "market_data": len(market_data) > 0
@@ -100,7 +139,7 @@ def market_data_agent(state: AgentState):
         "messages": messages,
         "data": {
             **data,
-            "prices": prices_dict,
+            "prices": price_columns,
             "start_date": start_date,
             "end_date": end_date,
             "financial_metrics": financial_metrics,
@@ -4,8 +4,9 @@ import json
 from src.utils.logging_config import setup_logger
 
 from src.agents.state import AgentState, show_agent_reasoning, show_workflow_status
-from src.tools.openrouter_config import get_chat_completion
+from src.tools.openrouter_config import get_chat_completion, get_chat_completion_async
 from src.utils.api_utils import agent_endpoint, log_llm_interaction
+from src.utils.prompt_budget import compact_json_text, count_tokens, fit_sections, get_token_budget, routed_model
 
 # 初始化 logger
 logger = setup_logger('portfolio_management_agent')
@@ -26,9 +27,8 @@ def get_latest_message_by_name(messages: list, name: str):
     return HumanMessage(content=json.dumps({"signal": "error", "details": f"Message from {name} not found"}), name=name)
 
 
-@agent_endpoint("portfolio_management", "负责投资组合管理和最终交易决策")
-def portfolio_management_agent(state: AgentState):
-    """Responsible for portfolio management"""
+def _prepare_portfolio_decision(state: AgentState) -> dict:
+    """Collects the upstream agent signals and builds the LLM messages for the final decision."""
     agent_name = "portfolio_management_agent"
     logger.info(f"\n--- DEBUG: {agent_name} START ---")
 
@@ -142,6 +142,31 @@ def portfolio_management_agent(state: AgentState):
         "content": system_message_content
     }
 
+    # Compact the upstream JSON signals and fit them into the prompt token budget.
+    # 风险管理信号是硬约束，保持完整，不参与截断
+    original_sections = {
+        "technical": technical_content,
+        "fundamentals": fundamentals_content,
+        "sentiment": sentiment_content,
+        "valuation": valuation_content,
+        "macro": tool_based_macro_content,
+        "market_news": market_wide_news_summary_content,
+    }
+    compact_sections = {name: compact_json_text(content)
+                        for name, content in original_sections.items()}
+    risk_content = compact_json_text(risk_content)
+    model = routed_model("portfolio_management")
+    sections, _ = fit_sections(
+        agent_name, compact_sections,
+        budget=max(get_token_budget("portfolio_management") - count_tokens(risk_content, model=model), 0),
+        original_sections=original_sections, model=model)
+    technical_content = sections["technical"]
+    fundamentals_content = sections["fundamentals"]
+    sentiment_content = sections["sentiment"]
+    valuation_content = sections["valuation"]
+    tool_based_macro_content = sections["macro"]
+    market_wide_news_summary_content = sections["market_news"]
+
     user_message_content = f"""Based on the team's analysis below, make your trading decision.
 
             Technical Analysis Signal: {technical_content}
@@ -166,8 +191,27 @@ def portfolio_management_agent(state: AgentState):
     show_agent_reasoning(
         agent_name, f"Preparing LLM. User msg includes: TA, FA, Sent, Val, Risk, GeneralMacro, MarketNews.")
 
-    llm_interaction_messages = [system_message, user_message]
-    llm_response_content = get_chat_completion(llm_interaction_messages)
+    return {
+        "agent_name": agent_name,
+        "show_reasoning": show_reasoning_flag,
+        "cleaned_messages": cleaned_messages_for_processing,
+        "llm_messages": [system_message, user_message],
+    }
+
+
+def _is_decision_json(llm_response_content) -> bool:
+    """Whether the reply is the decision JSON; unparseable replies are not cached."""
+    try:
+        return isinstance(json.loads(llm_response_content), dict)
+    except (TypeError, json.JSONDecodeError):
+        return False
+
+
+def _portfolio_decision_result(state: AgentState, prepared: dict, llm_response_content) -> dict:
+    """Turns the LLM decision (or a conservative fallback) into the agent output."""
+    agent_name = prepared["agent_name"]
+    show_reasoning_flag = prepared["show_reasoning"]
+    cleaned_messages_for_processing = prepared["cleaned_messages"]
 
     current_metadata = state["metadata"]
     current_metadata["current_agent_name"] = agent_name
@@ -258,6 +302,24 @@ def portfolio_management_agent(state: AgentState):
     }
 
 
+@agent_endpoint("portfolio_management", "负责投资组合管理和最终交易决策")
+def portfolio_management_agent(state: AgentState):
+    """Responsible for portfolio management"""
+    prepared = _prepare_portfolio_decision(state)
+    llm_response_content = get_chat_completion(prepared["llm_messages"], route="portfolio_management",
+                                               validate=_is_decision_json)
+    return _portfolio_decision_result(state, prepared, llm_response_content)
+
+
+@agent_endpoint("portfolio_management", "负责投资组合管理和最终交易决策")
+async def portfolio_management_agent_async(state: AgentState):
+    """Async variant of portfolio_management_agent; awaits the LLM without holding a thread."""
+    prepared = _prepare_portfolio_decision(state)
+    llm_response_content = await get_chat_completion_async(prepared["llm_messages"], route="portfolio_management",
+                                                           validate=_is_decision_json)
+    return _portfolio_decision_result(state, prepared, llm_response_content)
+
+
 def format_decision(action: str, quantity: int, confidence: float, agent_signals: list, reasoning: str, market_wide_news_summary: str = "未提供") -> dict:
     """Format the trading decision into a standardized output format.
     Think in English but output analysis in Chinese."""
@@ -1,29 +1,20 @@
 from langchain_core.messages import HumanMessage
 from src.agents.state import AgentState, show_agent_reasoning, show_workflow_status
-from src.tools.news_crawler import get_stock_news, get_news_sentiment
+from src.tools.news_crawler import (
+    get_stock_news, get_news_sentiment, get_news_sentiment_async,
+    get_news_sentiment_batch, get_news_sentiment_batch_async)
 from src.utils.logging_config import setup_logger
 from src.utils.api_utils import agent_endpoint, log_llm_interaction
 import json
+import asyncio
 from datetime import datetime, timedelta
 
 # 设置日志记录
 logger = setup_logger('sentiment_agent')
 
 
-@agent_endpoint("sentiment", "情感分析师，分析市场新闻和社交媒体情绪")
-def sentiment_agent(state: AgentState):
-    """Responsible for sentiment analysis"""
-    show_workflow_status("Sentiment Analyst")
-    show_reasoning = state["metadata"]["show_reasoning"]
-    data = state["data"]
-    symbol = data["ticker"]
-    logger.info(f"正在分析股票: {symbol}")
-    # 从命令行参数获取新闻数量，默认为20条
-    num_of_news = data.get("num_of_news", 20)
-
-    # 获取 end_date 并传递给 get_stock_news
-    end_date = data.get("end_date")  # 从 run_hedge_fund 传递来的 end_date
-
+def _fetch_recent_news(symbol: str, num_of_news: int, end_date) -> list:
+    """Fetches news for the ticker and keeps the articles from the last 7 days."""
     # 获取新闻数据并分析情感，添加 date 参数
     news_list = get_stock_news(symbol, max_news=num_of_news, date=end_date)
 
@@ -43,8 +34,13 @@ def sentiment_agent(state: AgentState):
         else:
             # 如果没有publish_time字段，默认包含这条新闻
             recent_news.append(news)
+    return recent_news
 
-    sentiment_score = get_news_sentiment(recent_news, num_of_news=num_of_news)
+
+def _sentiment_result(state: AgentState, recent_news: list, sentiment_score: float) -> dict:
+    """Maps the sentiment score to a trading signal and builds the agent output."""
+    show_reasoning = state["metadata"]["show_reasoning"]
+    data = state["data"]
 
     # 根据情感分数生成交易信号和置信度
     if sentiment_score >= 0.5:
@@ -87,3 +83,54 @@ def sentiment_agent(state: AgentState):
         },
         "metadata": state["metadata"],
     }
+
+
+@agent_endpoint("sentiment", "情感分析师，分析市场新闻和社交媒体情绪")
+def sentiment_agent(state: AgentState):
+    """Responsible for sentiment analysis"""
+    show_workflow_status("Sentiment Analyst")
+    data = state["data"]
+    symbol = data["ticker"]
+    logger.info(f"正在分析股票: {symbol}")
+    # 从命令行参数获取新闻数量，默认为20条
+    num_of_news = data.get("num_of_news", 20)
+
+    # 获取 end_date 并传递给 get_stock_news
+    end_date = data.get("end_date")  # 从 run_hedge_fund 传递来的 end_date
+
+    recent_news = _fetch_recent_news(symbol, num_of_news, end_date)
+    sentiment_score = get_news_sentiment(recent_news, num_of_news=num_of_news)
+    return _sentiment_result(state, recent_news, sentiment_score)
+
+
+@agent_endpoint("sentiment", "情感分析师，分析市场新闻和社交媒体情绪")
+async def sentiment_agent_async(state: AgentState):
+    """Async variant of sentiment_agent; the news crawl runs in a worker thread."""
+    show_workflow_status("Sentiment Analyst")
+    data = state["data"]
+    symbol = data["ticker"]
+    logger.info(f"正在分析股票: {symbol}")
+    num_of_news = data.get("num_of_news", 20)
+    end_date = data.get("end_date")
+
+    # 新闻爬取仍是同步实现，放到线程中执行以免阻塞事件循环
+    recent_news = await asyncio.to_thread(
+        _fetch_recent_news, symbol, num_of_news, end_date)
+    sentiment_score = await get_news_sentiment_async(recent_news, num_of_news=num_of_news)
+    return _sentiment_result(state, recent_news, sentiment_score)
+
+
+def watchlist_sentiment(symbols: list, num_of_news: int = 20, end_date=None) -> dict:
+    """Scores a watchlist with batched LLM requests instead of one request per ticker."""
+    news_by_ticker = {symbol: _fetch_recent_news(symbol, num_of_news, end_date)
+                      for symbol in symbols}
+    return get_news_sentiment_batch(news_by_ticker, num_of_news=num_of_news)
+
+
+async def watchlist_sentiment_async(symbols: list, num_of_news: int = 20, end_date=None) -> dict:
+    """Async variant of watchlist_sentiment; the news crawls run concurrently in worker threads."""
+    news_lists = await asyncio.gather(*(
+        asyncio.to_thread(_fetch_recent_news, symbol, num_of_news, end_date)
+        for symbol in symbols))
+    return await get_news_sentiment_batch_async(
+        dict(zip(symbols, news_lists)), num_of_news=num_of_news)
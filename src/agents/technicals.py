@@ -1,4 +1,3 @@
-import math
 from typing import Dict
 from src.utils.logging_config import setup_logger
 
@@ -12,10 +11,20 @@ import pandas as pd
 import numpy as np
 
 from src.tools.api import prices_to_df
+from src.tools.indicators import get_indicator_context, get_panel_context
 
 # 初始化 logger
 logger = setup_logger('technical_analyst_agent')
 
+# Weights of the strategy ensemble
+STRATEGY_WEIGHTS = {
+    'trend': 0.30,
+    'mean_reversion': 0.25,  # Increased weight for mean reversion
+    'momentum': 0.25,
+    'volatility': 0.15,
+    'stat_arb': 0.05
+}
+
 
 ##### Technical Analyst #####
 @agent_endpoint("technical_analyst", "技术分析师，提供基于价格走势、指标和技术模式的交易信号")
@@ -34,53 +43,51 @@ def technical_analyst_agent(state: AgentState):
     data = state["data"]
     prices = data["prices"]
     prices_df = prices_to_df(prices)
+    # 让指标引擎按股票代码复用 market_data 阶段已计算的指标
+    prices_df.attrs["symbol"] = data.get("ticker")
+
+    # 传入增量指标状态时只推进新增的 K 线，否则基于完整历史计算
+    indicator_state = data.get("indicator_state")
+    if indicator_state is not None:
+        new_bars = indicator_state.update_from_dataframe(prices_df)
+        logger.info(f"增量指标状态推进 {new_bars} 根K线（共 {indicator_state.bars} 根）")
+        values = indicator_state.latest()
+    else:
+        values = latest_indicator_values(prices_df)
 
     # Initialize confidence variable
     confidence = 0.0
 
-    # Calculate indicators
-    # 1. MACD (Moving Average Convergence Divergence)
-    macd_line, signal_line = calculate_macd(prices_df)
-
-    # 2. RSI (Relative Strength Index)
-    rsi = calculate_rsi(prices_df)
-
-    # 3. Bollinger Bands (Bollinger Bands)
-    upper_band, lower_band = calculate_bollinger_bands(prices_df)
-
-    # 4. OBV (On-Balance Volume)
-    obv = calculate_obv(prices_df)
-
     # Generate individual signals
     signals = []
 
     # MACD signal
-    if macd_line.iloc[-2] < signal_line.iloc[-2] and macd_line.iloc[-1] > signal_line.iloc[-1]:
+    if values['macd_prev'] < values['macd_signal_prev'] and values['macd'] > values['macd_signal']:
         signals.append('bullish')
-    elif macd_line.iloc[-2] > signal_line.iloc[-2] and macd_line.iloc[-1] < signal_line.iloc[-1]:
+    elif values['macd_prev'] > values['macd_signal_prev'] and values['macd'] < values['macd_signal']:
         signals.append('bearish')
     else:
         signals.append('neutral')
 
     # RSI signal
-    if rsi.iloc[-1] < 30:
+    if values['rsi_14'] < 30:
         signals.append('bullish')
-    elif rsi.iloc[-1] > 70:
+    elif values['rsi_14'] > 70:
         signals.append('bearish')
     else:
         signals.append('neutral')
 
     # Bollinger Bands signal
-    current_price = prices_df['close'].iloc[-1]
-    if current_price < lower_band.iloc[-1]:
+    current_price = values['close']
+    if current_price < values['bb_lower']:
         signals.append('bullish')
-    elif current_price > upper_band.iloc[-1]:
+    elif current_price > values['bb_upper']:
         signals.append('bearish')
     else:
         signals.append('neutral')
 
     # OBV signal
-    obv_slope = obv.diff().iloc[-5:].mean()
+    obv_slope = values['obv_slope']
     if obv_slope > 0:
         signals.append('bullish')
     elif obv_slope < 0:
@@ -89,14 +96,13 @@ def technical_analyst_agent(state: AgentState):
         signals.append('neutral')
 
     # Calculate price drop
-    price_drop = (prices_df['close'].iloc[-1] -
-                  prices_df['close'].iloc[-5]) / prices_df['close'].iloc[-5]
+    price_drop = (values['close'] - values['close_5']) / values['close_5']
 
     # Add price drop signal
-    if price_drop < -0.05 and rsi.iloc[-1] < 40:  # 5% drop and RSI below 40
+    if price_drop < -0.05 and values['rsi_14'] < 40:  # 5% drop and RSI below 40
         signals.append('bullish')
         confidence += 0.2  # Increase confidence for oversold conditions
-    elif price_drop < -0.03 and rsi.iloc[-1] < 45:  # 3% drop and RSI below 45
+    elif price_drop < -0.03 and values['rsi_14'] < 45:  # 3% drop and RSI below 45
         signals.append('bullish')
         confidence += 0.1
 
@@ -108,7 +114,7 @@ def technical_analyst_agent(state: AgentState):
         },
         "RSI": {
             "signal": signals[1],
-            "details": f"RSI is {rsi.iloc[-1]:.2f} ({'oversold' if signals[1] == 'bullish' else 'overbought' if signals[1] == 'bearish' else 'neutral'})"
+            "details": f"RSI is {values['rsi_14']:.2f} ({'oversold' if signals[1] == 'bullish' else 'overbought' if signals[1] == 'bearish' else 'neutral'})"
         },
         "Bollinger": {
             "signal": signals[2],
@@ -148,36 +154,28 @@ def technical_analyst_agent(state: AgentState):
     }
 
     # 1. Trend Following Strategy
-    trend_signals = calculate_trend_signals(prices_df)
+    trend_signals = trend_signals_from_values(values)
 
     # 2. Mean Reversion Strategy
-    mean_reversion_signals = calculate_mean_reversion_signals(prices_df)
+    mean_reversion_signals = mean_reversion_signals_from_values(values)
 
     # 3. Momentum Strategy
-    momentum_signals = calculate_momentum_signals(prices_df)
+    momentum_signals = momentum_signals_from_values(values)
 
     # 4. Volatility Strategy
-    volatility_signals = calculate_volatility_signals(prices_df)
+    volatility_signals = volatility_signals_from_values(values)
 
     # 5. Statistical Arbitrage Signals
-    stat_arb_signals = calculate_stat_arb_signals(prices_df)
+    stat_arb_signals = stat_arb_signals_from_values(values)
 
     # Combine all signals using a weighted ensemble approach
-    strategy_weights = {
-        'trend': 0.30,
-        'mean_reversion': 0.25,  # Increased weight for mean reversion
-        'momentum': 0.25,
-        'volatility': 0.15,
-        'stat_arb': 0.05
-    }
-
     combined_signal = weighted_signal_combination({
         'trend': trend_signals,
         'mean_reversion': mean_reversion_signals,
         'momentum': momentum_signals,
         'volatility': volatility_signals,
         'stat_arb': stat_arb_signals
-    }, strategy_weights)
+    }, STRATEGY_WEIGHTS)
 
     # Generate detailed analysis report
     analysis_report = {
@@ -236,242 +234,267 @@ def technical_analyst_agent(state: AgentState):
     }
 
 
-def calculate_trend_signals(prices_df):
+def latest_indicator_values(prices_df: pd.DataFrame) -> Dict[str, float]:
     """
-    Advanced trend following strategy using multiple timeframes and indicators
+    Latest values of every indicator used by the technical strategies,
+    computed over the full price history.
+
+    The keys match IncrementalIndicatorState.latest(), so the strategy
+    decisions below work on either source.
     """
-    # Calculate EMAs for multiple timeframes
-    ema_8 = calculate_ema(prices_df, 8)
-    ema_21 = calculate_ema(prices_df, 21)
-    ema_55 = calculate_ema(prices_df, 55)
+    indicators = get_indicator_context(prices_df)
+    return _latest_values(indicators, calculate_hurst_exponent(prices_df['close'], max_lag=10))
 
-    # Calculate ADX for trend strength
-    adx = calculate_adx(prices_df, 14)
 
-    # Calculate Ichimoku Cloud
-    ichimoku = calculate_ichimoku(prices_df)
+def _at(obj, position=-1):
+    """Value at a row position: a scalar for a series, one entry per ticker for a panel"""
+    value = obj.iloc[position]
+    return value.to_numpy(dtype=float) if isinstance(value, pd.Series) else value
 
-    # Determine trend direction and strength
-    short_trend = ema_8 > ema_21
-    medium_trend = ema_21 > ema_55
 
-    # Combine signals with confidence weighting
-    trend_strength = adx['adx'].iloc[-1] / 100.0
-
-    if short_trend.iloc[-1] and medium_trend.iloc[-1]:
-        signal = 'bullish'
-        confidence = trend_strength
-    elif not short_trend.iloc[-1] and not medium_trend.iloc[-1]:
-        signal = 'bearish'
-        confidence = trend_strength
-    else:
-        signal = 'neutral'
-        confidence = 0.5
+def _latest_values(indicators, hurst) -> Dict:
+    """Latest indicator values from a single-ticker or panel indicator context"""
+    close = indicators.series('close')
+    macd = indicators.get("macd")
+    bands = indicators.get("bollinger", window=20)
+
+    # 波动率：使用更短的周期和最小周期要求
+    hist_vol = indicators.get("volatility", window=21, min_periods=10)
+
+    def rolling(source, window, stat, min_periods=None):
+        return _at(indicators.get("rolling", source=source, window=window,
+                                  min_periods=min_periods, stat=stat))
+
+    obv_slope = indicators.get("obv").diff().iloc[-5:].mean()
 
     return {
-        'signal': signal,
-        'confidence': confidence,
-        'metrics': {
-            'adx': float(adx['adx'].iloc[-1]),
-            'trend_strength': float(trend_strength),
-            # 'ichimoku': ichimoku
-        }
+        'close': _at(close),
+        'close_5': _at(close, -5),
+        'volume': _at(indicators.series('volume')),
+        'macd': _at(macd['macd']),
+        'macd_prev': _at(macd['macd'], -2),
+        'macd_signal': _at(macd['signal']),
+        'macd_signal_prev': _at(macd['signal'], -2),
+        'rsi_14': _at(indicators.get("rsi", period=14)),
+        'rsi_28': _at(indicators.get("rsi", period=28)),
+        'bb_upper': _at(bands['upper']),
+        'bb_lower': _at(bands['lower']),
+        'obv_slope': obv_slope.to_numpy(dtype=float) if isinstance(obv_slope, pd.Series) else obv_slope,
+        'ema_8': _at(indicators.get("ema", span=8)),
+        'ema_21': _at(indicators.get("ema", span=21)),
+        'ema_55': _at(indicators.get("ema", span=55)),
+        'adx': _at(indicators.get("adx", period=14)['adx']),
+        'ma_50': rolling("close", 50, "mean"),
+        'std_50': rolling("close", 50, "std"),
+        # 动量：短期允许较少数据点，中长期要求更多数据点
+        'mom_1m': rolling("returns", 21, "sum", min_periods=5),
+        'mom_3m': rolling("returns", 63, "sum", min_periods=42),
+        'mom_6m': rolling("returns", 126, "sum", min_periods=63),
+        'volume_ma': rolling("volume", 21, "mean", min_periods=10),
+        'hist_vol': _at(hist_vol),
+        'vol_ma': _at(hist_vol.rolling(42, min_periods=21).mean()),
+        'vol_std': _at(hist_vol.rolling(42, min_periods=21).std()),
+        'atr': _at(indicators.get("atr", period=14, min_periods=7)),
+        # 使用更短的周期计算偏度和峰度
+        'skew': rolling("returns", 42, "skew", min_periods=21),
+        'kurt': rolling("returns", 42, "kurt", min_periods=21),
+        'hurst': hurst,
     }
 
 
-def calculate_mean_reversion_signals(prices_df):
+def _strategy_result(signal, confidence, metrics):
+    """Package a strategy decision; 0-d inputs become plain Python values"""
+    signal = np.asarray(signal)
+    if signal.ndim == 0:
+        return {
+            'signal': str(signal),
+            'confidence': float(confidence),
+            'metrics': {k: float(v) for k, v in metrics.items()}
+        }
+    return {'signal': signal, 'confidence': np.asarray(confidence, dtype=float), 'metrics': metrics}
+
+
+def _values_as_arrays(values):
+    return {k: np.asarray(v, dtype=float) for k, v in values.items()}
+
+
+def trend_signals_from_values(values):
     """
-    Mean reversion strategy using statistical measures and Bollinger Bands
+    Trend following decision from the latest EMA/ADX values.
+
+    Accepts scalars (one ticker) or equally shaped arrays (many tickers).
     """
-    # Calculate z-score of price relative to moving average
-    ma_50 = prices_df['close'].rolling(window=50).mean()
-    std_50 = prices_df['close'].rolling(window=50).std()
-    z_score = (prices_df['close'] - ma_50) / std_50
-
-    # Calculate Bollinger Bands
-    bb_upper, bb_lower = calculate_bollinger_bands(prices_df)
-
-    # Calculate RSI with multiple timeframes
-    rsi_14 = calculate_rsi(prices_df, 14)
-    rsi_28 = calculate_rsi(prices_df, 28)
-
-    # Mean reversion signals
-    extreme_z_score = abs(z_score.iloc[-1]) > 2
-    price_vs_bb = (prices_df['close'].iloc[-1] - bb_lower.iloc[-1]
-                   ) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
-
-    # Combine signals
-    if z_score.iloc[-1] < -2 and price_vs_bb < 0.2:
-        signal = 'bullish'
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    elif z_score.iloc[-1] > 2 and price_vs_bb > 0.8:
-        signal = 'bearish'
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    else:
-        signal = 'neutral'
-        confidence = 0.5
+    v = _values_as_arrays(values)
+    short_trend = v['ema_8'] > v['ema_21']
+    medium_trend = v['ema_21'] > v['ema_55']
 
-    return {
-        'signal': signal,
-        'confidence': confidence,
-        'metrics': {
-            'z_score': float(z_score.iloc[-1]),
-            'price_vs_bb': float(price_vs_bb),
-            'rsi_14': float(rsi_14.iloc[-1]),
-            'rsi_28': float(rsi_28.iloc[-1])
-        }
-    }
+    # Combine signals with confidence weighting
+    trend_strength = v['adx'] / 100.0
+    bullish = short_trend & medium_trend
+    bearish = ~short_trend & ~medium_trend
+    signal = np.select([bullish, bearish], ['bullish', 'bearish'], 'neutral')
+    confidence = np.where(bullish | bearish, trend_strength, 0.5)
 
+    return _strategy_result(signal, confidence, {
+        'adx': v['adx'],
+        'trend_strength': trend_strength,
+    })
 
-def calculate_momentum_signals(prices_df):
+
+def mean_reversion_signals_from_values(values):
     """
-    Multi-factor momentum strategy with conservative settings
+    Mean reversion decision from the latest z-score, Bollinger and RSI values
     """
-    # Price momentum with adjusted min_periods
-    returns = prices_df['close'].pct_change()
-    mom_1m = returns.rolling(21, min_periods=5).sum()  # 短期动量允许较少数据点
-    mom_3m = returns.rolling(63, min_periods=42).sum()  # 中期动量要求更多数据点
-    mom_6m = returns.rolling(126, min_periods=63).sum()  # 长期动量保持严格要求
-
-    # Volume momentum
-    volume_ma = prices_df['volume'].rolling(21, min_periods=10).mean()
-    volume_momentum = prices_df['volume'] / volume_ma
+    v = _values_as_arrays(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_score = (v['close'] - v['ma_50']) / v['std_50']
+        price_vs_bb = (v['close'] - v['bb_lower']) / (v['bb_upper'] - v['bb_lower'])
+        reversion_confidence = np.minimum(np.abs(z_score) / 4, 1.0)
+
+    bullish = (z_score < -2) & (price_vs_bb < 0.2)
+    bearish = (z_score > 2) & (price_vs_bb > 0.8)
+    signal = np.select([bullish, bearish], ['bullish', 'bearish'], 'neutral')
+    confidence = np.where(bullish | bearish, reversion_confidence, 0.5)
+
+    return _strategy_result(signal, confidence, {
+        'z_score': z_score,
+        'price_vs_bb': price_vs_bb,
+        'rsi_14': v['rsi_14'],
+        'rsi_28': v['rsi_28'],
+    })
+
+
+def momentum_signals_from_values(values):
+    """
+    Multi-factor momentum decision with conservative settings
+    """
+    v = _values_as_arrays(values)
 
     # 处理NaN值
-    mom_1m = mom_1m.fillna(0)  # 短期动量可以用0填充
-    mom_3m = mom_3m.fillna(mom_1m)  # 中期动量可以用短期动量填充
-    mom_6m = mom_6m.fillna(mom_3m)  # 长期动量可以用中期动量填充
+    mom_1m = np.where(np.isnan(v['mom_1m']), 0, v['mom_1m'])  # 短期动量可以用0填充
+    mom_3m = np.where(np.isnan(v['mom_3m']), mom_1m, v['mom_3m'])  # 中期动量可以用短期动量填充
+    mom_6m = np.where(np.isnan(v['mom_6m']), mom_3m, v['mom_6m'])  # 长期动量可以用中期动量填充
 
     # Calculate momentum score with more weight on longer timeframes
     momentum_score = (
         0.2 * mom_1m +  # 降低短期权重
         0.3 * mom_3m +
         0.5 * mom_6m    # 增加长期权重
-    ).iloc[-1]
+    )
 
     # Volume confirmation
-    volume_confirmation = volume_momentum.iloc[-1] > 1.0
-
-    if momentum_score > 0.05 and volume_confirmation:
-        signal = 'bullish'
-        confidence = min(abs(momentum_score) * 5, 1.0)
-    elif momentum_score < -0.05 and volume_confirmation:
-        signal = 'bearish'
-        confidence = min(abs(momentum_score) * 5, 1.0)
-    else:
-        signal = 'neutral'
-        confidence = 0.5
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_momentum = v['volume'] / v['volume_ma']
+    volume_confirmation = volume_momentum > 1.0
 
-    return {
-        'signal': signal,
-        'confidence': confidence,
-        'metrics': {
-            'momentum_1m': float(mom_1m.iloc[-1]),
-            'momentum_3m': float(mom_3m.iloc[-1]),
-            'momentum_6m': float(mom_6m.iloc[-1]),
-            'volume_momentum': float(volume_momentum.iloc[-1])
-        }
-    }
+    bullish = (momentum_score > 0.05) & volume_confirmation
+    bearish = (momentum_score < -0.05) & volume_confirmation
+    signal = np.select([bullish, bearish], ['bullish', 'bearish'], 'neutral')
+    confidence = np.where(bullish | bearish,
+                          np.minimum(np.abs(momentum_score) * 5, 1.0), 0.5)
 
+    return _strategy_result(signal, confidence, {
+        'momentum_1m': mom_1m,
+        'momentum_3m': mom_3m,
+        'momentum_6m': mom_6m,
+        'volume_momentum': volume_momentum,
+    })
 
-def calculate_volatility_signals(prices_df):
+
+def volatility_signals_from_values(values):
     """
-    Optimized volatility calculation with shorter lookback periods
+    Volatility regime decision with shorter lookback periods
     """
-    returns = prices_df['close'].pct_change()
+    v = _values_as_arrays(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_regime = v['hist_vol'] / v['vol_ma']
+        vol_std = np.where(v['vol_std'] == 0, np.nan, v['vol_std'])
+        vol_z = (v['hist_vol'] - v['vol_ma']) / vol_std
+        atr_ratio = v['atr'] / v['close']
 
-    # 使用更短的周期和最小周期要求计算历史波动率
-    hist_vol = returns.rolling(21, min_periods=10).std() * math.sqrt(252)
+    # 如果关键指标为NaN，使用替代值而不是直接返回中性信号
+    vol_regime = np.where(np.isnan(vol_regime), 1.0, vol_regime)  # 假设处于正常波动率区间
+    vol_z = np.where(np.isnan(vol_z), 0.0, vol_z)  # 假设处于均值位置
 
-    # 使用更短的周期计算波动率均值，并允许更少的数据点
-    vol_ma = hist_vol.rolling(42, min_periods=21).mean()
-    vol_regime = hist_vol / vol_ma
+    # Low vol regime, potential for expansion / high vol regime, potential for contraction
+    bullish = (vol_regime < 0.8) & (vol_z < -1)
+    bearish = (vol_regime > 1.2) & (vol_z > 1)
+    signal = np.select([bullish, bearish], ['bullish', 'bearish'], 'neutral')
+    confidence = np.where(bullish | bearish, np.minimum(np.abs(vol_z) / 3, 1.0), 0.5)
 
-    # 使用更灵活的标准差计算
-    vol_std = hist_vol.rolling(42, min_periods=21).std()
-    vol_z_score = (hist_vol - vol_ma) / vol_std.replace(0, np.nan)
+    return _strategy_result(signal, confidence, {
+        'historical_volatility': v['hist_vol'],
+        'volatility_regime': vol_regime,
+        'volatility_z_score': vol_z,
+        'atr_ratio': atr_ratio,
+    })
 
-    # ATR计算优化
-    atr = calculate_atr(prices_df, period=14, min_periods=7)
-    atr_ratio = atr / prices_df['close']
 
-    # 如果关键指标为NaN，使用替代值而不是直接返回中性信号
-    if pd.isna(vol_regime.iloc[-1]):
-        vol_regime.iloc[-1] = 1.0  # 假设处于正常波动率区间
-    if pd.isna(vol_z_score.iloc[-1]):
-        vol_z_score.iloc[-1] = 0.0  # 假设处于均值位置
-
-    # Generate signal based on volatility regime
-    current_vol_regime = vol_regime.iloc[-1]
-    vol_z = vol_z_score.iloc[-1]
-
-    if current_vol_regime < 0.8 and vol_z < -1:
-        signal = 'bullish'  # Low vol regime, potential for expansion
-        confidence = min(abs(vol_z) / 3, 1.0)
-    elif current_vol_regime > 1.2 and vol_z > 1:
-        signal = 'bearish'  # High vol regime, potential for contraction
-        confidence = min(abs(vol_z) / 3, 1.0)
-    else:
-        signal = 'neutral'
-        confidence = 0.5
+def stat_arb_signals_from_values(values):
+    """
+    Statistical arbitrage decision from distribution statistics
+    """
+    v = _values_as_arrays(values)
 
-    return {
-        'signal': signal,
-        'confidence': confidence,
-        'metrics': {
-            'historical_volatility': float(hist_vol.iloc[-1]),
-            'volatility_regime': float(current_vol_regime),
-            'volatility_z_score': float(vol_z),
-            'atr_ratio': float(atr_ratio.iloc[-1])
-        }
-    }
+    # 处理NaN值
+    skew = np.where(np.isnan(v['skew']), 0.0, v['skew'])  # 假设正态分布
+    kurt = np.where(np.isnan(v['kurt']), 3.0, v['kurt'])  # 假设正态分布
+    hurst = v['hurst']
 
+    # Generate signal based on statistical properties
+    bullish = (hurst < 0.4) & (skew > 1)
+    bearish = (hurst < 0.4) & (skew < -1)
+    signal = np.select([bullish, bearish], ['bullish', 'bearish'], 'neutral')
+    confidence = np.where(bullish | bearish, (0.5 - hurst) * 2, 0.5)
 
-def calculate_stat_arb_signals(prices_df):
+    return _strategy_result(signal, confidence, {
+        'hurst_exponent': hurst,
+        'skewness': skew,
+        'kurtosis': kurt,
+    })
+
+
+def calculate_trend_signals(prices_df):
     """
-    Optimized statistical arbitrage signals with shorter lookback periods
+    Advanced trend following strategy using multiple timeframes and indicators
     """
-    # Calculate price distribution statistics
-    returns = prices_df['close'].pct_change()
+    return trend_signals_from_values(latest_indicator_values(prices_df))
 
-    # 使用更短的周期计算偏度和峰度
-    skew = returns.rolling(42, min_periods=21).skew()
-    kurt = returns.rolling(42, min_periods=21).kurt()
 
-    # 优化Hurst指数计算
-    hurst = calculate_hurst_exponent(prices_df['close'], max_lag=10)
+def calculate_mean_reversion_signals(prices_df):
+    """
+    Mean reversion strategy using statistical measures and Bollinger Bands
+    """
+    return mean_reversion_signals_from_values(latest_indicator_values(prices_df))
 
-    # 处理NaN值
-    if pd.isna(skew.iloc[-1]):
-        skew.iloc[-1] = 0.0  # 假设正态分布
-    if pd.isna(kurt.iloc[-1]):
-        kurt.iloc[-1] = 3.0  # 假设正态分布
 
-    # Generate signal based on statistical properties
-    if hurst < 0.4 and skew.iloc[-1] > 1:
-        signal = 'bullish'
-        confidence = (0.5 - hurst) * 2
-    elif hurst < 0.4 and skew.iloc[-1] < -1:
-        signal = 'bearish'
-        confidence = (0.5 - hurst) * 2
-    else:
-        signal = 'neutral'
-        confidence = 0.5
+def calculate_momentum_signals(prices_df):
+    """
+    Multi-factor momentum strategy with conservative settings
+    """
+    return momentum_signals_from_values(latest_indicator_values(prices_df))
 
-    return {
-        'signal': signal,
-        'confidence': confidence,
-        'metrics': {
-            'hurst_exponent': float(hurst),
-            'skewness': float(skew.iloc[-1]),
-            'kurtosis': float(kurt.iloc[-1])
-        }
-    }
+
+def calculate_volatility_signals(prices_df):
+    """
+    Optimized volatility calculation with shorter lookback periods
+    """
+    return volatility_signals_from_values(latest_indicator_values(prices_df))
+
+
+def calculate_stat_arb_signals(prices_df):
+    """
+    Optimized statistical arbitrage signals with shorter lookback periods
+    """
+    return stat_arb_signals_from_values(latest_indicator_values(prices_df))
 
 
 def weighted_signal_combination(signals, weights):
     """
     Combines multiple trading signals using a weighted approach
+
+    Signals and confidences may be scalars or equally shaped arrays
+    (one entry per ticker in panel mode).
     """
     # Convert signals to numeric values
     signal_values = {
@@ -484,31 +507,81 @@ def weighted_signal_combination(signals, weights):
     total_confidence = 0
 
     for strategy, signal in signals.items():
-        numeric_signal = signal_values[signal['signal']]
+        strategy_signal = np.asarray(signal['signal'])
+        numeric_signal = np.select(
+            [strategy_signal == name for name in signal_values],
+            list(signal_values.values()))
         weight = weights[strategy]
-        confidence = signal['confidence']
+        confidence = np.asarray(signal['confidence'], dtype=float)
 
         weighted_sum += numeric_signal * weight * confidence
         total_confidence += weight * confidence
 
     # Normalize the weighted sum
-    if total_confidence > 0:
-        final_score = weighted_sum / total_confidence
-    else:
-        final_score = 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        final_score = np.where(total_confidence > 0,
+                               weighted_sum / total_confidence, 0)
 
     # Convert back to signal
-    if final_score > 0.2:
-        signal = 'bullish'
-    elif final_score < -0.2:
-        signal = 'bearish'
-    else:
-        signal = 'neutral'
+    signal = np.select([final_score > 0.2, final_score < -0.2],
+                       ['bullish', 'bearish'], 'neutral')
 
+    if signal.ndim == 0:
+        return {
+            'signal': str(signal),
+            'confidence': float(abs(final_score))
+        }
     return {
         'signal': signal,
-        'confidence': abs(final_score)
+        'confidence': np.abs(final_score)
+    }
+
+
+def latest_panel_indicator_values(close: pd.DataFrame, high: pd.DataFrame,
+                                  low: pd.DataFrame, volume: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Panel counterpart of latest_indicator_values.
+
+    Every input is a dates x tickers matrix with the same index and columns.
+    The registry indicators run column-wise over the whole matrix at once,
+    and each value is an array with one entry per ticker.
+    """
+    indicators = get_panel_context(
+        {'close': close, 'high': high, 'low': low, 'volume': volume})
+    # Hurst 为每只股票一个标量，按列计算
+    hurst = np.array([calculate_hurst_exponent(close[ticker].dropna(), max_lag=10)
+                      for ticker in close.columns], dtype=float)
+    return _latest_values(indicators, hurst)
+
+
+def calculate_panel_signals(close: pd.DataFrame, high: pd.DataFrame,
+                            low: pd.DataFrame, volume: pd.DataFrame,
+                            weights: Dict[str, float] = None) -> pd.DataFrame:
+    """
+    Compute all five strategy signals and the weighted ensemble for every
+    ticker of a dates x tickers panel in one pass.
+
+    Returns:
+        DataFrame indexed by ticker with signal/confidence columns for each
+        strategy and for the combined signal
+    """
+    values = latest_panel_indicator_values(close, high, low, volume)
+    strategies = {
+        'trend': trend_signals_from_values(values),
+        'mean_reversion': mean_reversion_signals_from_values(values),
+        'momentum': momentum_signals_from_values(values),
+        'volatility': volatility_signals_from_values(values),
+        'stat_arb': stat_arb_signals_from_values(values),
     }
+    combined = weighted_signal_combination(strategies, weights or STRATEGY_WEIGHTS)
+
+    result = {}
+    for name, strategy in strategies.items():
+        result[f'{name}_signal'] = strategy['signal']
+        result[f'{name}_confidence'] = strategy['confidence']
+    result['signal'] = combined['signal']
+    result['confidence'] = combined['confidence']
+    return pd.DataFrame(result, index=close.columns)
 
 
 def normalize_pandas(obj):
@@ -525,33 +598,20 @@ def normalize_pandas(obj):
 
 
 def calculate_macd(prices_df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
-    ema_12 = prices_df['close'].ewm(span=12, adjust=False).mean()
-    ema_26 = prices_df['close'].ewm(span=26, adjust=False).mean()
-    macd_line = ema_12 - ema_26
-    signal_line = macd_line.ewm(span=9, adjust=False).mean()
-    return macd_line, signal_line
+    macd = get_indicator_context(prices_df).get("macd")
+    return macd['macd'], macd['signal']
 
 
 def calculate_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
-    delta = prices_df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return get_indicator_context(prices_df).get("rsi", period=period)
 
 
 def calculate_bollinger_bands(
     prices_df: pd.DataFrame,
     window: int = 20
 ) -> tuple[pd.Series, pd.Series]:
-    sma = prices_df['close'].rolling(window).mean()
-    std_dev = prices_df['close'].rolling(window).std()
-    upper_band = sma + (std_dev * 2)
-    lower_band = sma - (std_dev * 2)
-    return upper_band, lower_band
+    bands = get_indicator_context(prices_df).get("bollinger", window=window)
+    return bands['upper'], bands['lower']
 
 
 def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
@@ -565,7 +625,7 @@ def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
     Returns:
         pd.Series: EMA values
     """
-    return df['close'].ewm(span=window, adjust=False).mean()
+    return get_indicator_context(df).get("ema", span=window)
 
 
 def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
@@ -579,36 +639,7 @@ def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     Returns:
         DataFrame with ADX values
     """
-    # Calculate True Range
-    df['high_low'] = df['high'] - df['low']
-    df['high_close'] = abs(df['high'] - df['close'].shift())
-    df['low_close'] = abs(df['low'] - df['close'].shift())
-    df['tr'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
-
-    # Calculate Directional Movement
-    df['up_move'] = df['high'] - df['high'].shift()
-    df['down_move'] = df['low'].shift() - df['low']
-
-    df['plus_dm'] = np.where(
-        (df['up_move'] > df['down_move']) & (df['up_move'] > 0),
-        df['up_move'],
-        0
-    )
-    df['minus_dm'] = np.where(
-        (df['down_move'] > df['up_move']) & (df['down_move'] > 0),
-        df['down_move'],
-        0
-    )
-
-    # Calculate ADX
-    df['+di'] = 100 * (df['plus_dm'].ewm(span=period).mean() /
-                       df['tr'].ewm(span=period).mean())
-    df['-di'] = 100 * (df['minus_dm'].ewm(span=period).mean() /
-                       df['tr'].ewm(span=period).mean())
-    df['dx'] = 100 * abs(df['+di'] - df['-di']) / (df['+di'] + df['-di'])
-    df['adx'] = df['dx'].ewm(span=period).mean()
-
-    return df[['adx', '+di', '-di']]
+    return get_indicator_context(df).get("adx", period=period)
 
 
 def calculate_ichimoku(df: pd.DataFrame) -> Dict[str, pd.Series]:
@@ -663,14 +694,7 @@ def calculate_atr(df: pd.DataFrame, period: int = 14, min_periods: int = 7) -> p
     Returns:
         pd.Series: ATR values
     """
-    high_low = df['high'] - df['low']
-    high_close = abs(df['high'] - df['close'].shift())
-    low_close = abs(df['low'] - df['close'].shift())
-
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
-
-    return true_range.rolling(period, min_periods=min_periods).mean()
+    return get_indicator_context(df).get("atr", period=period, min_periods=min_periods)
 
 
 def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 10) -> float:
@@ -713,13 +737,4 @@ def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 10) -> floa
 
 
 def calculate_obv(prices_df: pd.DataFrame) -> pd.Series:
-    obv = [0]
-    for i in range(1, len(prices_df)):
-        if prices_df['close'].iloc[i] > prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] + prices_df['volume'].iloc[i])
-        elif prices_df['close'].iloc[i] < prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] - prices_df['volume'].iloc[i])
-        else:
-            obv.append(obv[-1])
-    prices_df['OBV'] = obv
-    return prices_df['OBV']
+    return get_indicator_context(prices_df).get("obv")
@@ -6,6 +6,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from src.tools.api import get_price_data
 from src.main import run_hedge_fund
+from src.tools.incremental_indicators import IncrementalIndicatorState
 import sys
 import matplotlib
 import os
@@ -35,6 +36,8 @@ class Backtester:
         self.portfolio = {"cash": initial_capital, "stock": 0}
         self.portfolio_values = []
         self.num_of_news = num_of_news
+        # 跨交易日复用的技术指标状态，每天只推进新增的K线
+        self.indicator_state = IncrementalIndicatorState()
         # 设置回测日志
         self.setup_backtest_logging()
         self.logger = self.setup_logging()
@@ -76,9 +79,11 @@ class Backtester:
             raise
 
     def get_agent_decision(self, current_date, lookback_start, portfolio):
-        """获取智能体决策，包含 API 限制处理"""
-        max_retries = 3
+        """获取智能体决策，包含 API 限制处理
 
+        LLM 调用的重试和熔断由 src.utils.llm_retry 统一处理，这里不再整体重跑
+        工作流；调用失败时返回默认的持有决策。
+        """
         # 检查并重置 API 时间窗口
         current_time = time.time()
         if current_time - self._api_window_start >= 60:
@@ -93,80 +98,72 @@ class Backtester:
                 self._api_call_count = 0
                 self._api_window_start = time.time()
 
-        for attempt in range(max_retries):
-            try:
-                # 确保调用间隔至少 6 秒
-                if self._last_api_call:
-                    time_since_last_call = time.time() - self._last_api_call
-                    if time_since_last_call < 6:
-                        sleep_time = 6 - time_since_last_call
-                        time.sleep(sleep_time)
-
-                # 更新调用时间和计数
-                self._last_api_call = time.time()
-                self._api_call_count += 1
-
-                # 调用智能体并解析结果
-                result = self.agent(
-                    ticker=self.ticker,
-                    start_date=lookback_start,
-                    end_date=current_date,
-                    portfolio=portfolio,
-                    num_of_news=self.num_of_news,
-                    run_id=f"backtest_{self.ticker}_{current_date.replace('-', '')}"
-                )
-
-                try:
-                    # 尝试解析返回的字符串为 JSON
-                    if isinstance(result, str):
-                        # 清理可能的markdown标记
-                        result = result.replace(
-                            '```json\n', '').replace('\n```', '').strip()
-                        print(f"---------------result------------\n: {result}")
-                        parsed_result = json.loads(result)
-
-                        # 构建标准格式的结果
-                        formatted_result = {
-                            "decision": parsed_result,  # 保持原始决策结构
-                            "analyst_signals": {}
-                        }
+        try:
+            # 确保调用间隔至少 6 秒
+            if self._last_api_call:
+                time_since_last_call = time.time() - self._last_api_call
+                if time_since_last_call < 6:
+                    sleep_time = 6 - time_since_last_call
+                    time.sleep(sleep_time)
+
+            # 更新调用时间和计数
+            self._last_api_call = time.time()
+            self._api_call_count += 1
+
+            # 调用智能体并解析结果
+            result = self.agent(
+                ticker=self.ticker,
+                start_date=lookback_start,
+                end_date=current_date,
+                portfolio=portfolio,
+                num_of_news=self.num_of_news,
+                indicator_state=self.indicator_state,
+                run_id=f"backtest_{self.ticker}_{current_date.replace('-', '')}"
+            )
+        except Exception as e:
+            self.logger.warning(f"获取智能体决策失败: {str(e)}")
+            return {"decision": {"action": "hold", "quantity": 0}, "analyst_signals": {}}
 
-                        # 处理智能体信号
-                        if "agent_signals" in parsed_result:
-                            formatted_result["analyst_signals"] = {
-                                signal["agent"]: {
-                                    "signal": signal.get("signal", "unknown"),
-                                    "confidence": signal.get("confidence", 0)
-                                }
-                                for signal in parsed_result["agent_signals"]
-                            }
-
-                        self.logger.info(
-                            f"解析后的决策: {formatted_result['decision']}")  # 添加日志
-                        return formatted_result
-                    return result
-                except json.JSONDecodeError as e:
-                    # 如果无法解析为 JSON，记录错误并返回默认决策
-                    self.logger.warning(f"JSON解析错误: {str(e)}")
-                    self.logger.warning(f"原始返回结果: {result}")
-                    return {
-                        "decision": {"action": "hold", "quantity": 0},
-                        "analyst_signals": {}
+        try:
+            # 尝试解析返回的字符串为 JSON
+            if isinstance(result, str):
+                # 清理可能的markdown标记
+                result = result.replace(
+                    '```json\n', '').replace('\n```', '').strip()
+                print(f"---------------result------------\n: {result}")
+                parsed_result = json.loads(result)
+
+                # 构建标准格式的结果
+                formatted_result = {
+                    "decision": parsed_result,  # 保持原始决策结构
+                    "analyst_signals": {}
+                }
+
+                # 处理智能体信号
+                if "agent_signals" in parsed_result:
+                    formatted_result["analyst_signals"] = {
+                        signal["agent"]: {
+                            "signal": signal.get("signal", "unknown"),
+                            "confidence": signal.get("confidence", 0)
+                        }
+                        for signal in parsed_result["agent_signals"]
                     }
 
-            except Exception as e:
-                if "AFC is enabled" in str(e):
-                    self.logger.warning(f"触发 AFC 限制，等待 60 秒后重试...")
-                    time.sleep(60)
-                    self._api_call_count = 0
-                    self._api_window_start = time.time()
-                    continue
-
-                self.logger.warning(
-                    f"获取智能体决策失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
-                if attempt == max_retries - 1:
-                    return {"decision": {"action": "hold", "quantity": 0}, "analyst_signals": {}}
-                time.sleep(2 ** attempt)
+                self.logger.info(
+                    f"解析后的决策: {formatted_result['decision']}")  # 添加日志
+                return formatted_result
+            return result
+        except json.JSONDecodeError as e:
+            # 如果无法解析为 JSON，记录错误并返回默认决策
+            self.logger.warning(f"JSON解析错误: {str(e)}")
+            self.logger.warning(f"原始返回结果: {result}")
+            return {
+                "decision": {"action": "hold", "quantity": 0},
+                "analyst_signals": {}
+            }
+        except Exception as e:
+            self.logger.warning(f"解析智能体决策失败: {str(e)}")
+            return {"decision": {"action": "hold", "quantity": 0}, "analyst_signals": {}}
 
     def parse_decision_from_text(self, text):
         """从文本中解析交易决策"""
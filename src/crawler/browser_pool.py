@@ -0,0 +1,311 @@
+import asyncio
+import atexit
+import os
+import threading
+import time
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:
+    # 未安装 playwright 时仍可导入本模块，启动浏览器时才报错
+    async_playwright = None
+
+from src.crawler.browser_state import (
+    BROWSER_LAUNCH_ARGS, STEALTH_SCRIPT, build_context_options, choose_google_domain,
+    load_saved_state, save_browser_state)
+from src.crawler.search_types import SearchOptions
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+
+def browser_pool_enabled() -> bool:
+    return os.getenv("SEARCH_BROWSER_POOL_ENABLED", "true").lower() != "false"
+
+
+@dataclass
+class PoolConfig:
+    """浏览器池配置
+
+    - size: 同时使用的浏览器上下文数（即最大并发搜索数）
+    - max_pages_per_context: 每个上下文打开多少个页面后回收重建
+    - health_check_interval: 后台健康检查间隔（秒），0 表示不检查
+    """
+    size: int = 2
+    max_pages_per_context: int = 50
+    health_check_interval: float = 60.0
+    headless: bool = True
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            size=max(1, int(os.getenv("SEARCH_BROWSER_POOL_SIZE", 2))),
+            max_pages_per_context=max(1, int(os.getenv("SEARCH_CONTEXT_MAX_PAGES", 50))),
+            health_check_interval=float(os.getenv("SEARCH_BROWSER_HEALTH_INTERVAL", 60)),
+            headless=os.getenv("SEARCH_BROWSER_HEADLESS", "true").lower() != "false",
+        )
+
+
+@dataclass
+class _PooledContext:
+    context: "BrowserContext"
+    created_at: float = field(default_factory=time.time)
+    pages: int = 0
+
+
+class BrowserPool:
+    """常驻 Chromium 浏览器与上下文池
+
+    浏览器、上下文和 playwright 对象都只在池自己的后台事件循环线程中使用：
+    - 浏览器只启动一次，断开后在下次使用时自动重新启动
+    - 上下文复用，打开 max_pages_per_context 个页面或搜索出错后回收重建
+    - 浏览器状态和指纹配置只在创建时读取一次，上下文回收和关闭时写回
+    - 后台定期检查浏览器连接和空闲上下文是否可用
+
+    同步调用方使用 submit，其他事件循环中的调用方使用 submit_async。
+    """
+
+    def __init__(self, state_file: str = "./browser-state.json", locale: str = "zh-CN",
+                 no_save_state: bool = False, config: Optional[PoolConfig] = None):
+        self.state_file = state_file
+        self.locale = locale
+        self.no_save_state = no_save_state
+        self.config = config or PoolConfig.from_env()
+
+        self._storage_state, self._saved_state = load_saved_state(state_file)
+        self.google_domain = choose_google_domain(self._saved_state)
+
+        self._playwright = None
+        self._browser: Optional["Browser"] = None
+        self._idle: List[_PooledContext] = []
+        self._counters = {"searches": 0, "browser_launches": 0,
+                          "contexts_created": 0, "contexts_recycled": 0}
+        self._closed = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        self.submit(self._init)
+
+    async def _init(self) -> None:
+        # asyncio 原语在池的事件循环中创建
+        self._semaphore = asyncio.Semaphore(self.config.size)
+        self._launch_lock = asyncio.Lock()
+        self._health_task = None
+        if self.config.health_check_interval > 0:
+            self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    # ---- 调用入口 ----
+
+    def submit(self, factory: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """在池的事件循环中运行 factory() 返回的协程并同步等待结果"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("不能在浏览器池的事件循环中同步等待，请直接 await")
+        return asyncio.run_coroutine_threadsafe(factory(), self._loop).result(timeout)
+
+    async def submit_async(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """submit 的异步版本，可在任意事件循环中 await"""
+        if threading.current_thread() is self._thread:
+            return await factory()
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(factory(), self._loop))
+
+    @asynccontextmanager
+    async def page(self):
+        """从池中借出一个上下文并打开新页面，用完后关闭页面并归还上下文
+
+        只能在池的事件循环中使用（通过 submit / submit_async 调度）。
+        """
+        async with self._semaphore:
+            pooled = await self._checkout()
+            try:
+                page = await pooled.context.new_page()
+            except Exception as e:
+                logger.warning(f"浏览器上下文不可用，重新创建: {e}")
+                await self._retire(pooled, save_state=False)
+                pooled = await self._new_context()
+                page = await pooled.context.new_page()
+
+            ok = False
+            try:
+                yield page
+                ok = True
+            finally:
+                await self._checkin(pooled, page, ok)
+
+    # ---- 浏览器与上下文管理 ----
+
+    async def _ensure_browser(self) -> "Browser":
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                logger.warning("浏览器连接已断开，重新启动")
+                self._idle.clear()
+            if self._playwright is None:
+                if async_playwright is None:
+                    raise ImportError(
+                        "请安装 playwright: pip install playwright && playwright install chromium")
+                self._playwright = await async_playwright().start()
+            started = time.perf_counter()
+            self._browser = await self._playwright.chromium.launch(
+                headless=self.config.headless, args=BROWSER_LAUNCH_ARGS)
+            self._counters["browser_launches"] += 1
+            logger.info(f"浏览器池已启动浏览器，耗时 {time.perf_counter() - started:.2f}s")
+            return self._browser
+
+    async def _new_context(self) -> _PooledContext:
+        browser = await self._ensure_browser()
+        context = await browser.new_context(
+            **build_context_options(self._saved_state, self.locale, self._storage_state))
+        await context.add_init_script(STEALTH_SCRIPT)
+        self._counters["contexts_created"] += 1
+        return _PooledContext(context=context)
+
+    async def _checkout(self) -> _PooledContext:
+        while self._idle:
+            pooled = self._idle.pop()
+            if self._browser is not None and self._browser.is_connected():
+                return pooled
+        return await self._new_context()
+
+    async def _checkin(self, pooled: _PooledContext, page: "Page", ok: bool) -> None:
+        try:
+            await page.close()
+        except Exception:
+            pass
+        pooled.pages += 1
+        self._counters["searches"] += 1
+        if not ok or pooled.pages >= self.config.max_pages_per_context or self._closed:
+            await self._retire(pooled)
+        else:
+            self._idle.append(pooled)
+
+    async def _retire(self, pooled: _PooledContext, save_state: bool = True) -> None:
+        """回收上下文：先保存浏览器状态，之后新建的上下文从该状态恢复"""
+        if save_state and not self.no_save_state:
+            try:
+                await save_browser_state(pooled.context, self.state_file,
+                                         self._saved_state, self.locale)
+                self._storage_state = self.state_file
+            except Exception as e:
+                logger.error(f"保存浏览器状态时出错: {e}")
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+        self._counters["contexts_recycled"] += 1
+
+    # ---- 健康检查 ----
+
+    async def _context_alive(self, pooled: _PooledContext) -> bool:
+        try:
+            page = await asyncio.wait_for(pooled.context.new_page(), timeout=10)
+            await page.close()
+            return True
+        except Exception:
+            return False
+
+    async def health_check(self) -> Dict[str, int]:
+        """检查浏览器连接和空闲上下文，移除不可用的上下文"""
+        if self._browser is not None and not self._browser.is_connected():
+            logger.warning("健康检查: 浏览器连接已断开，下次搜索时重新启动")
+            self._idle.clear()
+            return {"removed": 0, "idle": 0}
+        checking, self._idle = self._idle, []
+        removed = 0
+        for pooled in checking:
+            if await self._context_alive(pooled):
+                self._idle.append(pooled)
+            else:
+                removed += 1
+                await self._retire(pooled, save_state=False)
+        # 检查期间新建的上下文可能使空闲数超过池大小
+        while len(self._idle) > self.config.size:
+            await self._retire(self._idle.pop(0))
+        if removed:
+            logger.warning(f"健康检查: 移除了 {removed} 个不可用的浏览器上下文")
+        return {"removed": removed, "idle": len(self._idle)}
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.error(f"浏览器池健康检查出错: {e}")
+
+    # ---- 状态与关闭 ----
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "idle_contexts": len(self._idle),
+            "browser_connected": bool(self._browser and self._browser.is_connected()),
+        }
+
+    async def _shutdown(self) -> None:
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+        while self._idle:
+            await self._retire(self._idle.pop())
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self, timeout: float = 30) -> None:
+        """保存状态并关闭浏览器，停止后台事件循环"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self.submit(self._shutdown, timeout=timeout)
+        except Exception as e:
+            logger.error(f"关闭浏览器池时出错: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+
+_pools: Dict[Tuple[str, str, bool], BrowserPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(options: Optional[SearchOptions] = None) -> BrowserPool:
+    """按状态文件和语言获取（或创建）进程内共享的浏览器池"""
+    options = options or SearchOptions()
+    state_file = options.state_file or "./browser-state.json"
+    locale = options.locale or "zh-CN"
+    no_save_state = bool(options.no_save_state)
+    key = (os.path.abspath(state_file), locale, no_save_state)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = BrowserPool(state_file, locale, no_save_state)
+            _pools[key] = pool
+        return pool
+
+
+@atexit.register
+def shutdown_browser_pools() -> None:
+    """关闭所有浏览器池（进程退出时自动调用）"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
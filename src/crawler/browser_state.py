@@ -0,0 +1,201 @@
+"""
+浏览器指纹、启动参数与状态文件读写（不依赖 playwright，可在未安装浏览器时导入）
+"""
+import json
+import os
+import random
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FingerprintConfig:
+    """浏览器指纹配置"""
+    device_name: str
+    locale: str
+    timezone_id: str
+    color_scheme: str  # "dark" or "light"
+    reduced_motion: str  # "reduce" or "no-preference"
+    forced_colors: str  # "active" or "none"
+
+
+@dataclass
+class SavedState:
+    """保存的状态"""
+    fingerprint: Optional[FingerprintConfig] = None
+    google_domain: Optional[str] = None
+
+
+# Google 域名列表
+GOOGLE_DOMAINS = [
+    "https://www.google.com",
+    "https://www.google.co.uk",
+    "https://www.google.ca",
+    "https://www.google.com.au"
+]
+
+# 设备配置映射（简化版）
+DEVICE_CONFIGS = {
+    "Desktop Chrome": {
+        "viewport": {"width": 1920, "height": 1080},
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    },
+    "Desktop Firefox": {
+        "viewport": {"width": 1920, "height": 1080},
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0"
+    }
+}
+
+BROWSER_LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-features=IsolateOrigins,site-per-process",
+    "--disable-web-security",
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--no-first-run",
+    "--disable-gpu",
+    "--hide-scrollbars",
+    "--mute-audio"
+]
+
+# 反检测脚本
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => false});
+    Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+    Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en', 'zh-CN']});
+    window.chrome = {runtime: {}, loadTimes: function(){}, csi: function(){}, app: {}};
+"""
+
+
+def get_host_machine_config(user_locale: Optional[str] = None) -> FingerprintConfig:
+    """获取宿主机器的实际配置"""
+    import time
+
+    # 获取系统区域设置
+    system_locale = user_locale or os.environ.get('LANG', 'zh-CN')
+
+    # 根据时区推断合适的时区ID
+    timezone_offset = time.timezone
+    timezone_id = "Asia/Shanghai"  # 默认使用上海时区
+
+    # 根据时间推断颜色方案
+    import datetime
+    hour = datetime.datetime.now().hour
+    color_scheme = "dark" if (hour >= 19 or hour < 7) else "light"
+
+    # 其他设置使用合理默认值
+    reduced_motion = "no-preference"
+    forced_colors = "none"
+    device_name = "Desktop Chrome"
+
+    return FingerprintConfig(
+        device_name=device_name,
+        locale=system_locale,
+        timezone_id=timezone_id,
+        color_scheme=color_scheme,
+        reduced_motion=reduced_motion,
+        forced_colors=forced_colors
+    )
+
+
+def fingerprint_file_for(state_file: str) -> str:
+    """指纹配置文件路径"""
+    return state_file.replace(".json", "-fingerprint.json")
+
+
+def load_saved_state(state_file: str) -> Tuple[Optional[str], SavedState]:
+    """读取浏览器状态文件和指纹配置
+
+    Returns:
+        (storage_state 文件路径，不存在时为 None, 保存的指纹与域名)
+    """
+    storage_state = None
+    saved_state = SavedState()
+    fingerprint_file = fingerprint_file_for(state_file)
+
+    if os.path.exists(state_file):
+        logger.info(f"发现浏览器状态文件: {state_file}")
+        storage_state = state_file
+
+        # 尝试加载保存的指纹配置
+        if os.path.exists(fingerprint_file):
+            try:
+                with open(fingerprint_file, 'r', encoding='utf-8') as f:
+                    fingerprint_data = json.load(f)
+                    if fingerprint_data.get('fingerprint'):
+                        fp = fingerprint_data['fingerprint']
+                        saved_state.fingerprint = FingerprintConfig(**fp)
+                    saved_state.google_domain = fingerprint_data.get(
+                        'google_domain')
+                logger.info("已加载保存的浏览器指纹配置")
+            except Exception as e:
+                logger.warning(f"无法加载指纹配置文件: {e}")
+    else:
+        logger.info(f"未找到浏览器状态文件: {state_file}")
+
+    return storage_state, saved_state
+
+
+async def save_browser_state(context: "BrowserContext", state_file: str,
+                             saved_state: SavedState, locale: str) -> None:
+    """保存浏览器上下文状态（cookies 等）和指纹配置"""
+    os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+    await context.storage_state(path=state_file)
+
+    # 保存指纹配置
+    if not saved_state.fingerprint:
+        saved_state.fingerprint = get_host_machine_config(locale)
+
+    fingerprint_data = {
+        'fingerprint': {
+            'device_name': saved_state.fingerprint.device_name,
+            'locale': saved_state.fingerprint.locale,
+            'timezone_id': saved_state.fingerprint.timezone_id,
+            'color_scheme': saved_state.fingerprint.color_scheme,
+            'reduced_motion': saved_state.fingerprint.reduced_motion,
+            'forced_colors': saved_state.fingerprint.forced_colors
+        },
+        'google_domain': saved_state.google_domain
+    }
+
+    with open(fingerprint_file_for(state_file), 'w', encoding='utf-8') as f:
+        json.dump(fingerprint_data, f, ensure_ascii=False, indent=2)
+
+
+def build_context_options(saved_state: SavedState, locale: str,
+                          storage_state: Optional[str] = None) -> Dict[str, Any]:
+    """根据保存的指纹生成浏览器上下文参数"""
+    if saved_state.fingerprint:
+        device_name = saved_state.fingerprint.device_name
+    else:
+        device_name = "Desktop Chrome"
+
+    device_config = DEVICE_CONFIGS.get(
+        device_name, DEVICE_CONFIGS["Desktop Chrome"])
+
+    context_options = {
+        "viewport": device_config["viewport"],
+        "user_agent": device_config["user_agent"],
+        "locale": locale,
+        "timezone_id": "Asia/Shanghai"
+    }
+
+    if storage_state and os.path.exists(storage_state):
+        context_options["storage_state"] = storage_state
+
+    return context_options
+
+
+def choose_google_domain(saved_state: SavedState) -> str:
+    """使用保存的 Google 域名，没有时随机选择一个并记录"""
+    if not saved_state.google_domain:
+        saved_state.google_domain = random.choice(GOOGLE_DOMAINS)
+    return saved_state.google_domain
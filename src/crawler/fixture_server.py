@@ -0,0 +1,235 @@
+"""
+本地 Google 搜索结果页测试服务，用于离线对比搜索爬虫的完整模式和快速模式
+
+/search 返回与真实结果页结构一致的 HTML（#search / #rso 容器、h3 标题、.VwiC3b 摘要），
+并引用大量带延迟的图片、字体、样式和跟踪请求，模拟真实页面的子资源开销。
+
+使用方法:
+    # 启动测试服务，然后在 SearchOptions.google_domain 中指向它
+    python -m src.crawler.fixture_server serve --port 8002 --asset-latency 0.3
+
+    # 在进程内启动测试服务，用浏览器池分别以完整模式和快速模式搜索并输出耗时分解
+    python -m src.crawler.fixture_server bench --queries 20 --concurrency 2
+"""
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from html import escape
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, Response
+
+# 1x1 透明 PNG
+_PIXEL = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082")
+
+_ASSET_TYPES = {
+    "png": "image/png",
+    "css": "text/css",
+    "woff2": "font/woff2",
+    "js": "application/javascript",
+}
+
+
+@dataclass
+class FixtureConfig:
+    """测试页面配置
+
+    - results: 每页搜索结果数
+    - images: 每页引用的图片数
+    - asset_latency: 每个子资源（图片、字体、样式、脚本、跟踪请求）的响应延迟（秒）
+    - page_latency: 文档本身的响应延迟（秒）
+    """
+    results: int = 10
+    images: int = 20
+    asset_latency: float = 0.2
+    page_latency: float = 0.0
+
+
+def _home_page() -> str:
+    return """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Google</title>
+<link rel="stylesheet" href="/assets/style.css"></head>
+<body><form action="/search" method="get">
+<textarea name="q" title="Search"></textarea>
+</form></body></html>"""
+
+
+def _results_page(query: str, config: FixtureConfig) -> str:
+    items = []
+    for i in range(config.results):
+        items.append(
+            f'<div data-hveid="CA{i}"><a href="https://finance.sina.com.cn/stock/fixture/{i}.shtml">'
+            f'<h3>{escape(query)} 相关新闻 {i + 1}</h3></a>'
+            f'<div class="VwiC3b">第 {i + 1} 条测试摘要：{escape(query)} 的最新财经资讯。</div>'
+            f'<img src="/assets/thumb-{i}.png"></div>')
+    images = "".join(f'<img src="/assets/image-{i}.png">' for i in range(config.images))
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{escape(query)} - Google 搜索</title>
+<link rel="stylesheet" href="/assets/style.css">
+<style>@font-face {{ font-family: fixture; src: url(/assets/font.woff2); }} body {{ font-family: fixture; }}</style>
+<script src="/assets/app.js"></script>
+<script async src="/gen_204?ev=script"></script>
+</head><body>
+<div id="search"><div id="rso">{''.join(items)}</div></div>
+{images}
+<img src="/gen_204?ev=load">
+</body></html>"""
+
+
+class FixtureSite:
+    """测试页面状态：记录各类请求数"""
+
+    def __init__(self, config: FixtureConfig):
+        self.config = config
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            self._counts[kind] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+def create_app(config: Optional[FixtureConfig] = None) -> FastAPI:
+    """创建测试页面服务的 FastAPI 应用"""
+    site = FixtureSite(config or FixtureConfig())
+    app = FastAPI(title="Search results fixture", version="0.1.0")
+    app.state.site = site
+
+    @app.get("/", response_class=HTMLResponse)
+    async def home():
+        site.count("document")
+        return _home_page()
+
+    @app.get("/search", response_class=HTMLResponse)
+    async def search(q: str = "", num: int = 10):
+        site.count("document")
+        if site.config.page_latency:
+            await asyncio.sleep(site.config.page_latency)
+        return _results_page(q, site.config)
+
+    @app.get("/assets/{name}")
+    async def asset(name: str):
+        site.count("asset")
+        await asyncio.sleep(site.config.asset_latency)
+        ext = name.rsplit(".", 1)[-1]
+        body = _PIXEL if ext == "png" else b""
+        return Response(body, media_type=_ASSET_TYPES.get(ext, "application/octet-stream"))
+
+    @app.get("/gen_204")
+    async def tracker():
+        site.count("tracker")
+        await asyncio.sleep(site.config.asset_latency)
+        return Response(status_code=204)
+
+    @app.get("/stats")
+    def stats():
+        return site.stats()
+
+    return app
+
+
+def start_in_thread(config: Optional[FixtureConfig] = None, host: str = "127.0.0.1", port: int = 0):
+    """在后台线程中启动测试服务，返回 (server, base_url)；port 为 0 时自动选择空闲端口"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port,
+                                           log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{bound_port}"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def _summarize(responses) -> Dict:
+    timings = [r.timings for r in responses if r.timings is not None]
+    summary = {"searches": len(responses),
+               "results": sum(len(r.results) for r in responses)}
+    for name in ("acquire", "navigate", "wait_results", "extract", "total"):
+        values = [getattr(t, name) for t in timings]
+        summary[name] = {"p50": round(_percentile(values, 0.5), 3),
+                         "p95": round(_percentile(values, 0.95), 3)}
+    summary["requests"] = sum(t.requests for t in timings)
+    summary["blocked_requests"] = sum(t.blocked_requests for t in timings)
+    return summary
+
+
+def benchmark(config: FixtureConfig, queries: int = 20, concurrency: int = 2,
+              modes: tuple = ("full", "fast")) -> Dict:
+    """在进程内启动测试服务，分别以完整模式和快速模式搜索并统计耗时分解"""
+    from src.crawler.browser_pool import BrowserPool, PoolConfig
+    from src.crawler.search import SearchOptions, _search_with_pool
+
+    server, base_url = start_in_thread(config)
+    site = server.config.app.state.site
+    state_dir = tempfile.mkdtemp(prefix="search-fixture-")
+    pool = BrowserPool(f"{state_dir}/browser-state.json", no_save_state=True,
+                       config=PoolConfig(size=concurrency, health_check_interval=0))
+    report = {"base_url": base_url}
+    try:
+        for mode in modes:
+            options = SearchOptions(limit=config.results, timeout=30000, no_save_state=True,
+                                    fast=(mode == "fast"), google_domain=base_url)
+
+            async def run_all():
+                return await asyncio.gather(*(
+                    _search_with_pool(pool, f"fixture query {i}", options) for i in range(queries)))
+
+            before = site.stats()
+            started = time.perf_counter()
+            responses = pool.submit(run_all)
+            elapsed = time.perf_counter() - started
+            after = site.stats()
+            report[mode] = {**_summarize(responses), "seconds": round(elapsed, 3),
+                            "server": {k: after.get(k, 0) - before.get(k, 0) for k in after}}
+        report["pool"] = pool.stats()
+        return report
+    finally:
+        pool.close()
+        server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Google 搜索结果页测试服务")
+    parser.add_argument("command", choices=["serve", "bench"], nargs="?", default="serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--results", type=int, default=10, help="每页搜索结果数")
+    parser.add_argument("--images", type=int, default=20, help="每页引用的图片数")
+    parser.add_argument("--asset-latency", type=float, default=0.2, help="子资源响应延迟（秒）")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="文档响应延迟（秒）")
+    parser.add_argument("--queries", type=int, default=20, help="bench: 每种模式的搜索次数")
+    parser.add_argument("--concurrency", type=int, default=2, help="bench: 浏览器池大小")
+    args = parser.parse_args()
+    config = FixtureConfig(results=args.results, images=args.images,
+                           asset_latency=args.asset_latency, page_latency=args.page_latency)
+
+    if args.command == "bench":
+        print(json.dumps(benchmark(config, args.queries, args.concurrency),
+                         ensure_ascii=False, indent=2))
+        return
+
+    import uvicorn
+    print(f"搜索结果测试页: http://{args.host}:{args.port}/search?q=test")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from src.crawler.browser_state import load_saved_state
+# 限速和结果合并不依赖 playwright，在此重新导出以保持原有导入路径
+from src.crawler.rate_limit import DomainRateLimiter, TokenBucket, domain_rate_limiter
+from src.crawler.results import MultiSearchResponse, merge_results, normalize_link
+from src.crawler.search import (
+    SearchOptions, SearchResponse, SearchResult, _search_with_pool, google_search)
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+
+def _search_concurrency(default: int) -> int:
+    return int(os.getenv("SEARCH_MULTI_CONCURRENCY", default))
+
+
+async def _search_many(queries: List[str], search: Callable[[str], Awaitable[SearchResponse]],
+                       concurrency: int, domain: str,
+                       limiter: Optional[DomainRateLimiter] = None) -> MultiSearchResponse:
+    """并发执行多个查询：并发数受 concurrency 限制，每次导航前按域名限速"""
+    limiter = limiter or domain_rate_limiter
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(query: str) -> SearchResponse:
+        async with semaphore:
+            await limiter.acquire(domain)
+            return await search(query)
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(one(query) for query in queries))
+    elapsed = time.perf_counter() - started
+    results = merge_results(responses)
+    logger.info(f"并发执行 {len(queries)} 个搜索查询，耗时 {elapsed:.2f}s，"
+                f"合并去重后 {len(results)} 条结果")
+    return MultiSearchResponse(queries=list(queries), responses=list(responses),
+                               results=results, seconds=elapsed)
+
+
+async def _search_many_with_pool(pool, queries: List[str], options: SearchOptions,
+                                 concurrency: Optional[int] = None,
+                                 limiter: Optional[DomainRateLimiter] = None) -> MultiSearchResponse:
+    """在浏览器池的事件循环中并发执行多个查询"""
+    return await _search_many(
+        queries, lambda query: _search_with_pool(pool, query, options),
+        concurrency or _search_concurrency(pool.config.size),
+        options.google_domain or pool.google_domain, limiter)
+
+
+async def _search_many_without_pool(queries: List[str], options: SearchOptions,
+                                    concurrency: Optional[int] = None,
+                                    limiter: Optional[DomainRateLimiter] = None) -> MultiSearchResponse:
+    """浏览器池关闭时，每个查询各自启动浏览器搜索，并发数和限速规则与池模式相同"""
+    from src.crawler.browser_pool import PoolConfig
+
+    _, saved_state = load_saved_state(options.state_file or "./browser-state.json")
+    domain = options.google_domain or saved_state.google_domain or "google"
+    return await _search_many(
+        queries, lambda query: google_search(query, options),
+        concurrency or _search_concurrency(PoolConfig.from_env().size), domain, limiter)
+
+
+async def google_search_many(queries: List[str], options: Optional[SearchOptions] = None,
+                             concurrency: Optional[int] = None) -> MultiSearchResponse:
+    """
+    通过浏览器池并发执行多个 Google 搜索（可在任意事件循环中调用）
+
+    并发数受 SEARCH_MULTI_CONCURRENCY（默认等于浏览器池大小）限制，每次页面导航前
+    按搜索域名的令牌桶限速（SEARCH_DOMAIN_RATE / SEARCH_DOMAIN_BURST）。
+    SEARCH_BROWSER_POOL_ENABLED=false 时不使用浏览器池，每个查询启动新的浏览器。
+
+    Args:
+        options: 每个查询共用的搜索选项，limit 为单个查询的结果数
+        concurrency: 覆盖最大并发数
+    """
+    from src.crawler.browser_pool import browser_pool_enabled, get_browser_pool
+
+    options = options or SearchOptions()
+    if not browser_pool_enabled():
+        return await _search_many_without_pool(queries, options, concurrency)
+    pool = get_browser_pool(options)
+    return await pool.submit_async(
+        lambda: _search_many_with_pool(pool, queries, options, concurrency))
+
+
+def google_search_many_sync(queries: List[str], options: Optional[SearchOptions] = None,
+                            concurrency: Optional[int] = None) -> MultiSearchResponse:
+    """google_search_many 的同步版本"""
+    from src.crawler.browser_pool import browser_pool_enabled, get_browser_pool
+
+    options = options or SearchOptions()
+    if not browser_pool_enabled():
+        return asyncio.run(_search_many_without_pool(queries, options, concurrency))
+    pool = get_browser_pool(options)
+    return pool.submit(lambda: _search_many_with_pool(pool, queries, options, concurrency))
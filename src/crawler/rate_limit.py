@@ -0,0 +1,71 @@
+"""
+按域名的令牌桶限速（不依赖 playwright）
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """令牌桶限速器（线程安全，与事件循环无关）
+
+    每秒补充 rate 个令牌，最多积累 capacity 个。reserve 立即预留一个令牌并返回
+    需要等待的秒数，令牌不足时预留排队到未来，因此并发调用方会被依次错开。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class DomainRateLimiter:
+    """按域名限速：每个域名一个令牌桶"""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self.rate = rate if rate is not None else float(os.getenv("SEARCH_DOMAIN_RATE", 0.5))
+        self.burst = burst if burst is not None else float(os.getenv("SEARCH_DOMAIN_BURST", 3))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waited: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                bucket = self._buckets[domain] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    async def acquire(self, url: str) -> float:
+        """等待 url 所在域名的令牌，返回等待的秒数"""
+        domain = urlparse(url).netloc or url
+        delay = self._bucket(domain).reserve()
+        if delay > 0:
+            with self._lock:
+                self._waited[domain] = self._waited.get(domain, 0.0) + delay
+            await asyncio.sleep(delay)
+        return delay
+
+    def stats(self) -> Dict[str, float]:
+        """各域名累计的限速等待时间（秒）"""
+        with self._lock:
+            return {domain: round(seconds, 3) for domain, seconds in self._waited.items()}
+
+
+# 进程内共享，连续多次搜索也遵守同一个速率
+domain_rate_limiter = DomainRateLimiter()
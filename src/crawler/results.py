@@ -0,0 +1,55 @@
+"""
+多查询搜索结果的合并与去重（不依赖 playwright）
+"""
+from dataclasses import dataclass, field
+from typing import List
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from src.crawler.search_types import SearchResponse, SearchResult
+
+
+@dataclass
+class MultiSearchResponse:
+    """多查询搜索响应
+
+    responses 与 queries 一一对应；results 为合并去重后的结果
+    """
+    queries: List[str]
+    responses: List[SearchResponse]
+    results: List[SearchResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+# 去重时忽略的跟踪参数
+_TRACKING_PARAMS = {"spm", "from", "share_token"}
+
+
+def normalize_link(link: str) -> str:
+    """去掉协议差异、片段、末尾斜杠和跟踪参数，用于判断重复链接"""
+    parsed = urlparse(link)
+    query = [(k, v) for k, v in parse_qsl(parsed.query)
+             if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS]
+    netloc = parsed.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return urlunparse(("", netloc, parsed.path.rstrip("/"), "", urlencode(query), ""))
+
+
+def merge_results(responses: List[SearchResponse]) -> List[SearchResult]:
+    """按查询顺序合并多个搜索结果，按链接和标题去重，跳过失败占位结果"""
+    merged: List[SearchResult] = []
+    seen_links = set()
+    seen_titles = set()
+    for response in responses:
+        for result in response.results:
+            if not result.link:
+                continue
+            link = normalize_link(result.link)
+            title = result.title.strip()
+            if link in seen_links or (title and title in seen_titles):
+                continue
+            seen_links.add(link)
+            if title:
+                seen_titles.add(title)
+            merged.append(result)
+    return merged
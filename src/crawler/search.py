@@ -2,9 +2,9 @@ import asyncio
 import json
 import os
 import tempfile
-from dataclasses import dataclass, field
+import time
 from typing import List, Optional, Dict, Any
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlencode
 import logging
 
 try:
@@ -13,81 +13,296 @@ except ImportError:
     raise ImportError(
         "请安装 playwright: pip install playwright && playwright install chromium")
 
+# 数据结构和浏览器状态工具不依赖 playwright，在此重新导出以保持原有导入路径
+from src.crawler.search_types import (
+    SearchResult, SearchTimings, SearchResponse, SearchOptions, SearchBlockedError)
+from src.crawler.browser_state import (
+    FingerprintConfig, SavedState, GOOGLE_DOMAINS, DEVICE_CONFIGS, BROWSER_LAUNCH_ARGS,
+    STEALTH_SCRIPT, get_host_machine_config, fingerprint_file_for, load_saved_state,
+    save_browser_state, build_context_options, choose_google_domain)
+
 # 设置日志
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class SearchResult:
-    """搜索结果"""
-    title: str
-    link: str
-    snippet: str
-
-
-@dataclass
-class SearchResponse:
-    """搜索响应"""
-    query: str
-    results: List[SearchResult]
-
-
-@dataclass
-class SearchOptions:
-    """搜索选项"""
-    limit: Optional[int] = 10
-    timeout: Optional[int] = 60000
-    state_file: Optional[str] = "./browser-state.json"
-    no_save_state: Optional[bool] = False
-    locale: Optional[str] = "zh-CN"
-
-
-@dataclass
-class FingerprintConfig:
-    """浏览器指纹配置"""
-    device_name: str
-    locale: str
-    timezone_id: str
-    color_scheme: str  # "dark" or "light"
-    reduced_motion: str  # "reduce" or "no-preference"
-    forced_colors: str  # "active" or "none"
-
-
-@dataclass
-class SavedState:
-    """保存的状态"""
-    fingerprint: Optional[FingerprintConfig] = None
-    google_domain: Optional[str] = None
-
-
-def get_host_machine_config(user_locale: Optional[str] = None) -> FingerprintConfig:
-    """获取宿主机器的实际配置"""
-    import time
-
-    # 获取系统区域设置
-    system_locale = user_locale or os.environ.get('LANG', 'zh-CN')
-
-    # 根据时区推断合适的时区ID
-    timezone_offset = time.timezone
-    timezone_id = "Asia/Shanghai"  # 默认使用上海时区
-
-    # 根据时间推断颜色方案
-    import datetime
-    hour = datetime.datetime.now().hour
-    color_scheme = "dark" if (hour >= 19 or hour < 7) else "light"
-
-    # 其他设置使用合理默认值
-    reduced_motion = "no-preference"
-    forced_colors = "none"
-    device_name = "Desktop Chrome"
-
-    return FingerprintConfig(
-        device_name=device_name,
-        locale=system_locale,
-        timezone_id=timezone_id,
-        color_scheme=color_scheme,
-        reduced_motion=reduced_motion,
-        forced_colors=forced_colors
+SORRY_PATTERNS = ["google.com/sorry", "recaptcha", "captcha", "unusual traffic"]
+
+SEARCH_INPUT_SELECTORS = [
+    "textarea[name='q']",
+    "input[name='q']",
+    "textarea[title='Search']",
+    "input[title='Search']"
+]
+
+RESULT_SELECTORS = ["#search", "#rso", ".g", "[data-sokoban-container]"]
+
+# 快速模式只等待的结果容器
+RESULT_CONTAINER_SELECTOR = "#search, #rso"
+
+# 快速模式下拦截的资源类型，可通过 SEARCH_BLOCK_RESOURCE_TYPES 覆盖（逗号分隔）
+DEFAULT_BLOCKED_RESOURCE_TYPES = "image,media,font,stylesheet"
+
+# 快速模式下拦截的跟踪/统计请求（URL 包含以下任一片段）
+TRACKER_URL_PATTERNS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "/gen_204",
+    "/client_204",
+    "/log?",
+]
+
+# 提取搜索结果（参数为最大结果数）
+EXTRACT_RESULTS_SCRIPT = """
+(maxResults) => {
+    const results = [];
+    const seenUrls = new Set();
+    
+    // 定义选择器组合
+    const selectorSets = [
+        { container: '#search div[data-hveid]', title: 'h3', snippet: '.VwiC3b' },
+        { container: '#rso div[data-hveid]', title: 'h3', snippet: '[data-sncf="1"]' },
+        { container: '.g', title: 'h3', snippet: 'div[style*="webkit-line-clamp"]' },
+        { container: 'div[jscontroller][data-hveid]', title: 'h3', snippet: 'div[role="text"]' }
+    ];
+    
+    // 备用摘要选择器
+    const alternativeSnippetSelectors = [
+        '.VwiC3b', '[data-sncf="1"]', 'div[style*="webkit-line-clamp"]', 'div[role="text"]'
+    ];
+    
+    // 尝试每组选择器
+    for (const selectors of selectorSets) {
+        if (results.length >= maxResults) break;
+        
+        const containers = document.querySelectorAll(selectors.container);
+        
+        for (const container of containers) {
+            if (results.length >= maxResults) break;
+            
+            const titleElement = container.querySelector(selectors.title);
+            if (!titleElement) continue;
+            
+            const title = (titleElement.textContent || "").trim();
+            
+            // 查找链接
+            let link = '';
+            const linkInTitle = titleElement.querySelector('a');
+            if (linkInTitle) {
+                link = linkInTitle.href;
+            } else {
+                let current = titleElement;
+                while (current && current.tagName !== 'A') {
+                    current = current.parentElement;
+                }
+                if (current && current instanceof HTMLAnchorElement) {
+                    link = current.href;
+                } else {
+                    const containerLink = container.querySelector('a');
+                    if (containerLink) {
+                        link = containerLink.href;
+                    }
+                }
+            }
+            
+            // 过滤无效链接
+            if (!link || !link.startsWith('http') || seenUrls.has(link)) continue;
+            
+            // 查找摘要
+            let snippet = '';
+            const snippetElement = container.querySelector(selectors.snippet);
+            if (snippetElement) {
+                snippet = (snippetElement.textContent || "").trim();
+            } else {
+                for (const altSelector of alternativeSnippetSelectors) {
+                    const element = container.querySelector(altSelector);
+                    if (element) {
+                        snippet = (element.textContent || "").trim();
+                        break;
+                    }
+                }
+                
+                if (!snippet) {
+                    const textNodes = Array.from(container.querySelectorAll('div')).filter(el =>
+                        !el.querySelector('h3') && (el.textContent || "").trim().length > 20
+                    );
+                    if (textNodes.length > 0) {
+                        snippet = (textNodes[0].textContent || "").trim();
+                    }
+                }
+            }
+            
+            if (title && link) {
+                results.push({ title, link, snippet });
+                seenUrls.add(link);
+            }
+        }
+    }
+    
+    return results.slice(0, maxResults);
+}
+
+"""
+
+
+def is_blocked_url(url: str) -> bool:
+    """当前页面是否为人机验证页面"""
+    return any(pattern in url for pattern in SORRY_PATTERNS)
+
+
+def build_search_url(domain: str, query: str, limit: int, locale: str) -> str:
+    """直接访问的搜索结果页 URL"""
+    return f"{domain}/search?{urlencode({'q': query, 'num': limit, 'hl': locale})}"
+
+
+async def _find_search_input(page: Page):
+    for selector in SEARCH_INPUT_SELECTORS:
+        try:
+            search_input = await page.wait_for_selector(selector, timeout=5000)
+            if search_input:
+                logger.info(f"找到搜索框: {selector}")
+                return search_input
+        except:
+            continue
+    return None
+
+
+async def _wait_for_results(page: Page) -> bool:
+    for selector in RESULT_SELECTORS:
+        try:
+            await page.wait_for_selector(selector, timeout=10000)
+            logger.info(f"找到搜索结果: {selector}")
+            return True
+        except:
+            continue
+    return False
+
+
+def fast_mode_enabled(options: Optional[SearchOptions] = None) -> bool:
+    """是否使用快速模式（SearchOptions.fast 优先，其次 SEARCH_FAST_MODE，默认开启）"""
+    if options is not None and options.fast is not None:
+        return options.fast
+    return os.getenv("SEARCH_FAST_MODE", "true").lower() != "false"
+
+
+def blocked_resource_types() -> set:
+    raw = os.getenv("SEARCH_BLOCK_RESOURCE_TYPES", DEFAULT_BLOCKED_RESOURCE_TYPES)
+    return {t.strip() for t in raw.split(",") if t.strip()}
+
+
+def is_tracker_url(url: str) -> bool:
+    return any(pattern in url for pattern in TRACKER_URL_PATTERNS)
+
+
+async def install_resource_blocking(page: Page, timings: Optional[SearchTimings] = None) -> None:
+    """拦截页面中不需要的资源（图片、字体、样式、跟踪请求），只放行文档和脚本等请求"""
+    blocked_types = blocked_resource_types()
+
+    async def handle(route):
+        request = route.request
+        if timings is not None:
+            timings.requests += 1
+        if request.resource_type in blocked_types or is_tracker_url(request.url):
+            if timings is not None:
+                timings.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle)
+
+
+async def search_on_page(page: Page, query: str, limit: int, timeout: int, domain: str,
+                         locale: str = "zh-CN", direct: bool = False,
+                         headless: bool = True, fast: bool = False,
+                         timings: Optional[SearchTimings] = None) -> List[SearchResult]:
+    """在已打开的页面中执行一次搜索并提取结果
+
+    Args:
+        direct: True 时直接访问搜索结果页（一次页面导航），否则打开首页后输入查询
+        headless: 无头模式下遇到人机验证抛出 SearchBlockedError，有头模式下等待手动完成
+        fast: 快速模式，拦截非必要资源，只等待结果容器而不等待 networkidle
+        timings: 传入时记录各阶段耗时
+    """
+    timings = timings if timings is not None else SearchTimings()
+    started = time.perf_counter()
+    if fast:
+        await install_resource_blocking(page, timings)
+    else:
+        page.on("request", lambda request: setattr(timings, "requests", timings.requests + 1))
+
+    # 快速模式在文档解析完成后即返回，不等待子资源
+    wait_until = "domcontentloaded" if fast else "load"
+    if direct:
+        logger.info(f"访问 Google 搜索结果页: {domain}")
+        await page.goto(build_search_url(domain, query, limit, locale),
+                        timeout=timeout, wait_until=wait_until)
+    else:
+        logger.info(f"访问 Google 搜索页面: {domain}")
+        await page.goto(domain, timeout=timeout, wait_until=wait_until)
+
+    # 检查是否遇到人机验证
+    if is_blocked_url(page.url):
+        if headless:
+            raise SearchBlockedError(f"检测到人机验证: {page.url}")
+        logger.warning("检测到人机验证，请手动完成")
+        await page.wait_for_navigation(timeout=timeout * 2)
+
+    if not direct:
+        # 查找搜索框
+        search_input = await _find_search_input(page)
+        if not search_input:
+            raise Exception("无法找到搜索框")
+
+        # 输入搜索查询
+        await search_input.click()
+        await page.keyboard.type(query, delay=50)
+        await page.keyboard.press("Enter")
+    navigated = time.perf_counter()
+    timings.navigate = navigated - started
+
+    # 等待搜索结果
+    if fast:
+        try:
+            await page.wait_for_selector(RESULT_CONTAINER_SELECTOR, timeout=timeout)
+        except Exception:
+            logger.warning("未找到搜索结果元素")
+    else:
+        await page.wait_for_load_state("networkidle", timeout=timeout)
+
+    if direct and is_blocked_url(page.url):
+        raise SearchBlockedError(f"检测到人机验证: {page.url}")
+
+    if not fast and not await _wait_for_results(page):
+        logger.warning("未找到搜索结果元素")
+    waited = time.perf_counter()
+    timings.wait_results = waited - navigated
+
+    # 提取搜索结果
+    results = await page.evaluate(EXTRACT_RESULTS_SCRIPT, limit)
+    timings.extract = time.perf_counter() - waited
+    timings.total = time.perf_counter() - started
+    logger.info(f"成功获取到 {len(results)} 条搜索结果，耗时 {timings.total:.2f}s "
+                f"(导航 {timings.navigate:.2f}s，等待结果 {timings.wait_results:.2f}s，"
+                f"提取 {timings.extract:.2f}s，拦截请求 {timings.blocked_requests}/{timings.requests})")
+
+    # 转换结果格式
+    return [
+        SearchResult(title=r['title'], link=r['link'], snippet=r['snippet'])
+        for r in results
+    ]
+
+
+def _failed_response(query: str, error: Exception) -> SearchResponse:
+    return SearchResponse(
+        query=query,
+        results=[SearchResult(
+            title="搜索失败",
+            link="",
+            snippet=f"无法完成搜索，错误信息: {str(error)}"
+        )]
     )
 
 
@@ -99,6 +314,9 @@ async def google_search(
     """
     执行 Google 搜索并返回结构化结果
 
+    每次调用都会新建浏览器上下文（未提供 existing_browser 时还会启动新的浏览器），
+    适合单次搜索；多次搜索请使用 google_search_sync / google_search_pooled 复用浏览器池。
+
     Args:
         query: 搜索查询字符串
         options: 搜索选项
@@ -120,51 +338,7 @@ async def google_search(
     logger.info(f"正在初始化浏览器搜索: {query}")
 
     # 检查状态文件
-    storage_state = None
-    saved_state = SavedState()
-
-    # 指纹配置文件路径
-    fingerprint_file = state_file.replace(".json", "-fingerprint.json")
-
-    if os.path.exists(state_file):
-        logger.info(f"发现浏览器状态文件: {state_file}")
-        storage_state = state_file
-
-        # 尝试加载保存的指纹配置
-        if os.path.exists(fingerprint_file):
-            try:
-                with open(fingerprint_file, 'r', encoding='utf-8') as f:
-                    fingerprint_data = json.load(f)
-                    if fingerprint_data.get('fingerprint'):
-                        fp = fingerprint_data['fingerprint']
-                        saved_state.fingerprint = FingerprintConfig(**fp)
-                    saved_state.google_domain = fingerprint_data.get(
-                        'google_domain')
-                logger.info("已加载保存的浏览器指纹配置")
-            except Exception as e:
-                logger.warning(f"无法加载指纹配置文件: {e}")
-    else:
-        logger.info(f"未找到浏览器状态文件: {state_file}")
-
-    # Google 域名列表
-    google_domains = [
-        "https://www.google.com",
-        "https://www.google.co.uk",
-        "https://www.google.ca",
-        "https://www.google.com.au"
-    ]
-
-    # 设备配置映射（简化版）
-    device_configs = {
-        "Desktop Chrome": {
-            "viewport": {"width": 1920, "height": 1080},
-            "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        },
-        "Desktop Firefox": {
-            "viewport": {"width": 1920, "height": 1080},
-            "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0"
-        }
-    }
+    storage_state, saved_state = load_saved_state(state_file)
 
     async def perform_search(headless: bool = True) -> SearchResponse:
         """执行实际的搜索操作"""
@@ -175,20 +349,7 @@ async def google_search(
             # 启动新的浏览器
             async with async_playwright() as p:
                 browser = await p.chromium.launch(
-                    headless=headless,
-                    args=[
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-features=IsolateOrigins,site-per-process",
-                        "--disable-web-security",
-                        "--no-sandbox",
-                        "--disable-setuid-sandbox",
-                        "--disable-dev-shm-usage",
-                        "--no-first-run",
-                        "--disable-gpu",
-                        "--hide-scrollbars",
-                        "--mute-audio"
-                    ]
-                )
+                    headless=headless, args=BROWSER_LAUNCH_ARGS)
                 return await _perform_search_with_browser(browser, browser_was_provided, headless)
         else:
             return await _perform_search_with_browser(browser, browser_was_provided, headless)
@@ -196,235 +357,33 @@ async def google_search(
     async def _perform_search_with_browser(browser: Browser, browser_was_provided: bool, headless: bool = True) -> SearchResponse:
         """使用给定浏览器执行搜索"""
         try:
-            # 获取设备配置
-            if saved_state.fingerprint:
-                device_name = saved_state.fingerprint.device_name
-            else:
-                device_name = "Desktop Chrome"
-
-            device_config = device_configs.get(
-                device_name, device_configs["Desktop Chrome"])
-
             # 创建浏览器上下文
-            context_options = {
-                "viewport": device_config["viewport"],
-                "user_agent": device_config["user_agent"],
-                "locale": locale,
-                "timezone_id": "Asia/Shanghai"
-            }
-
-            if storage_state and os.path.exists(storage_state):
-                context_options["storage_state"] = storage_state
-
-            context = await browser.new_context(**context_options)
+            context = await browser.new_context(
+                **build_context_options(saved_state, locale, storage_state))
 
             # 添加反检测脚本
-            await context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => false});
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
-                Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en', 'zh-CN']});
-                window.chrome = {runtime: {}, loadTimes: function(){}, csi: function(){}, app: {}};
-            """)
+            await context.add_init_script(STEALTH_SCRIPT)
 
             page = await context.new_page()
 
-            # 选择 Google 域名
-            if saved_state.google_domain:
-                selected_domain = saved_state.google_domain
-            else:
-                import random
-                selected_domain = random.choice(google_domains)
-                saved_state.google_domain = selected_domain
-
-            logger.info(f"访问 Google 搜索页面: {selected_domain}")
-
-            # 访问 Google
-            await page.goto(selected_domain, timeout=timeout)
-
-            # 检查是否遇到人机验证
-            current_url = page.url
-            sorry_patterns = ["google.com/sorry",
-                              "recaptcha", "captcha", "unusual traffic"]
-            is_blocked = any(
-                pattern in current_url for pattern in sorry_patterns)
-
-            if is_blocked and headless:
+            timings = SearchTimings()
+            try:
+                search_results = await search_on_page(
+                    page, query, limit, timeout,
+                    options.google_domain or choose_google_domain(saved_state),
+                    locale=locale, headless=headless, fast=fast_mode_enabled(options),
+                    timings=timings)
+            except SearchBlockedError:
                 logger.warning("检测到人机验证，切换到有头模式")
                 await context.close()
                 if not browser_was_provided:
                     await browser.close()
                 return await perform_search(headless=False)
-            elif is_blocked:
-                logger.warning("检测到人机验证，请手动完成")
-                await page.wait_for_navigation(timeout=timeout * 2)
-
-            # 查找搜索框
-            search_selectors = [
-                "textarea[name='q']",
-                "input[name='q']",
-                "textarea[title='Search']",
-                "input[title='Search']"
-            ]
-
-            search_input = None
-            for selector in search_selectors:
-                try:
-                    search_input = await page.wait_for_selector(selector, timeout=5000)
-                    if search_input:
-                        logger.info(f"找到搜索框: {selector}")
-                        break
-                except:
-                    continue
-
-            if not search_input:
-                raise Exception("无法找到搜索框")
-
-            # 输入搜索查询
-            await search_input.click()
-            await page.keyboard.type(query, delay=50)
-            await page.keyboard.press("Enter")
-
-            # 等待搜索结果
-            await page.wait_for_load_state("networkidle", timeout=timeout)
-
-            # 等待搜索结果元素
-            result_selectors = ["#search", "#rso",
-                                ".g", "[data-sokoban-container]"]
-            results_found = False
-
-            for selector in result_selectors:
-                try:
-                    await page.wait_for_selector(selector, timeout=10000)
-                    results_found = True
-                    logger.info(f"找到搜索结果: {selector}")
-                    break
-                except:
-                    continue
-
-            if not results_found:
-                logger.warning("未找到搜索结果元素")
-
-            # 提取搜索结果
-            results = await page.evaluate(f"""
-                () => {{
-                    const results = [];
-                    const maxResults = {limit};
-                    const seenUrls = new Set();
-                    
-                    // 定义选择器组合
-                    const selectorSets = [
-                        {{ container: '#search div[data-hveid]', title: 'h3', snippet: '.VwiC3b' }},
-                        {{ container: '#rso div[data-hveid]', title: 'h3', snippet: '[data-sncf="1"]' }},
-                        {{ container: '.g', title: 'h3', snippet: 'div[style*="webkit-line-clamp"]' }},
-                        {{ container: 'div[jscontroller][data-hveid]', title: 'h3', snippet: 'div[role="text"]' }}
-                    ];
-                    
-                    // 备用摘要选择器
-                    const alternativeSnippetSelectors = [
-                        '.VwiC3b', '[data-sncf="1"]', 'div[style*="webkit-line-clamp"]', 'div[role="text"]'
-                    ];
-                    
-                    // 尝试每组选择器
-                    for (const selectors of selectorSets) {{
-                        if (results.length >= maxResults) break;
-                        
-                        const containers = document.querySelectorAll(selectors.container);
-                        
-                        for (const container of containers) {{
-                            if (results.length >= maxResults) break;
-                            
-                            const titleElement = container.querySelector(selectors.title);
-                            if (!titleElement) continue;
-                            
-                            const title = (titleElement.textContent || "").trim();
-                            
-                            // 查找链接
-                            let link = '';
-                            const linkInTitle = titleElement.querySelector('a');
-                            if (linkInTitle) {{
-                                link = linkInTitle.href;
-                            }} else {{
-                                let current = titleElement;
-                                while (current && current.tagName !== 'A') {{
-                                    current = current.parentElement;
-                                }}
-                                if (current && current instanceof HTMLAnchorElement) {{
-                                    link = current.href;
-                                }} else {{
-                                    const containerLink = container.querySelector('a');
-                                    if (containerLink) {{
-                                        link = containerLink.href;
-                                    }}
-                                }}
-                            }}
-                            
-                            // 过滤无效链接
-                            if (!link || !link.startsWith('http') || seenUrls.has(link)) continue;
-                            
-                            // 查找摘要
-                            let snippet = '';
-                            const snippetElement = container.querySelector(selectors.snippet);
-                            if (snippetElement) {{
-                                snippet = (snippetElement.textContent || "").trim();
-                            }} else {{
-                                for (const altSelector of alternativeSnippetSelectors) {{
-                                    const element = container.querySelector(altSelector);
-                                    if (element) {{
-                                        snippet = (element.textContent || "").trim();
-                                        break;
-                                    }}
-                                }}
-                                
-                                if (!snippet) {{
-                                    const textNodes = Array.from(container.querySelectorAll('div')).filter(el =>
-                                        !el.querySelector('h3') && (el.textContent || "").trim().length > 20
-                                    );
-                                    if (textNodes.length > 0) {{
-                                        snippet = (textNodes[0].textContent || "").trim();
-                                    }}
-                                }}
-                            }}
-                            
-                            if (title && link) {{
-                                results.push({{ title, link, snippet }});
-                                seenUrls.add(link);
-                            }}
-                        }}
-                    }}
-                    
-                    return results.slice(0, maxResults);
-                }}
-            """)
-
-            logger.info(f"成功获取到 {len(results)} 条搜索结果")
 
             # 保存浏览器状态
             if not no_save_state:
                 try:
-                    os.makedirs(os.path.dirname(state_file), exist_ok=True)
-                    await context.storage_state(path=state_file)
-
-                    # 保存指纹配置
-                    if not saved_state.fingerprint:
-                        saved_state.fingerprint = get_host_machine_config(
-                            locale)
-
-                    fingerprint_data = {
-                        'fingerprint': {
-                            'device_name': saved_state.fingerprint.device_name,
-                            'locale': saved_state.fingerprint.locale,
-                            'timezone_id': saved_state.fingerprint.timezone_id,
-                            'color_scheme': saved_state.fingerprint.color_scheme,
-                            'reduced_motion': saved_state.fingerprint.reduced_motion,
-                            'forced_colors': saved_state.fingerprint.forced_colors
-                        },
-                        'google_domain': saved_state.google_domain
-                    }
-
-                    with open(fingerprint_file, 'w', encoding='utf-8') as f:
-                        json.dump(fingerprint_data, f,
-                                  ensure_ascii=False, indent=2)
-
+                    await save_browser_state(context, state_file, saved_state, locale)
                     logger.info("浏览器状态保存成功")
                 except Exception as e:
                     logger.error(f"保存浏览器状态时出错: {e}")
@@ -433,14 +392,7 @@ async def google_search(
             if not browser_was_provided:
                 await browser.close()
 
-            # 转换结果格式
-            search_results = [
-                SearchResult(title=r['title'],
-                             link=r['link'], snippet=r['snippet'])
-                for r in results
-            ]
-
-            return SearchResponse(query=query, results=search_results)
+            return SearchResponse(query=query, results=search_results, timings=timings)
 
         except Exception as e:
             logger.error(f"搜索过程中发生错误: {e}")
@@ -461,18 +413,48 @@ async def google_search(
                 pass
 
             # 返回错误结果
-            return SearchResponse(
-                query=query,
-                results=[SearchResult(
-                    title="搜索失败",
-                    link="",
-                    snippet=f"无法完成搜索，错误信息: {str(e)}"
-                )]
-            )
+            return _failed_response(query, e)
 
     # 首先尝试无头模式
     return await perform_search(headless=True)
 
+
+async def _search_with_pool(pool, query: str, options: SearchOptions) -> SearchResponse:
+    """在浏览器池所在的事件循环中执行搜索"""
+    limit = options.limit or 10
+    timeout = options.timeout or 60000
+    timings = SearchTimings()
+    started = time.perf_counter()
+    try:
+        async with pool.page() as page:
+            timings.acquire = time.perf_counter() - started
+            results = await search_on_page(
+                page, query, limit, timeout, options.google_domain or pool.google_domain,
+                locale=pool.locale, direct=True, fast=fast_mode_enabled(options),
+                timings=timings)
+        timings.total += timings.acquire
+        return SearchResponse(query=query, results=results, timings=timings)
+    except SearchBlockedError as e:
+        # 人机验证需要有头浏览器，回退到单次搜索流程
+        logger.warning(f"{e}，回退到单次浏览器搜索")
+        return await google_search(query, options)
+    except Exception as e:
+        logger.error(f"搜索过程中发生错误: {e}")
+        return _failed_response(query, e)
+
+
+async def google_search_pooled(query: str, options: Optional[SearchOptions] = None) -> SearchResponse:
+    """
+    使用常驻浏览器池执行 Google 搜索（可在任意事件循环中调用）
+
+    浏览器和上下文在后台事件循环中复用，每次搜索只需打开一个页面并导航一次。
+    """
+    from src.crawler.browser_pool import get_browser_pool
+
+    options = options or SearchOptions()
+    pool = get_browser_pool(options)
+    return await pool.submit_async(lambda: _search_with_pool(pool, query, options))
+
 # 同步包装函数
 
 
@@ -482,5 +464,14 @@ def google_search_sync(
 ) -> SearchResponse:
     """
     同步版本的 Google 搜索函数
+
+    浏览器池启用时（SEARCH_BROWSER_POOL_ENABLED，默认开启）复用常驻浏览器，
+    否则每次调用启动新的浏览器。
     """
-    return asyncio.run(google_search(query, options))
+    from src.crawler.browser_pool import browser_pool_enabled, get_browser_pool
+
+    options = options or SearchOptions()
+    if not browser_pool_enabled():
+        return asyncio.run(google_search(query, options))
+    pool = get_browser_pool(options)
+    return pool.submit(lambda: _search_with_pool(pool, query, options))
@@ -0,0 +1,62 @@
+"""
+搜索结果与选项的数据结构（不依赖 playwright，可在未安装浏览器时导入）
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class SearchResult:
+    """搜索结果"""
+    title: str
+    link: str
+    snippet: str
+
+
+@dataclass
+class SearchTimings:
+    """单次搜索的耗时分解（秒）"""
+    acquire: float = 0.0  # 等待浏览器池的页面
+    navigate: float = 0.0  # 页面导航（含输入查询）
+    wait_results: float = 0.0  # 等待搜索结果出现
+    extract: float = 0.0  # 提取搜索结果
+    total: float = 0.0
+    requests: int = 0  # 页面发出的请求数
+    blocked_requests: int = 0  # 快速模式下拦截的请求数
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "acquire": round(self.acquire, 3),
+            "navigate": round(self.navigate, 3),
+            "wait_results": round(self.wait_results, 3),
+            "extract": round(self.extract, 3),
+            "total": round(self.total, 3),
+            "requests": self.requests,
+            "blocked_requests": self.blocked_requests,
+        }
+
+
+@dataclass
+class SearchResponse:
+    """搜索响应"""
+    query: str
+    results: List[SearchResult]
+    timings: Optional[SearchTimings] = None
+
+
+@dataclass
+class SearchOptions:
+    """搜索选项"""
+    limit: Optional[int] = 10
+    timeout: Optional[int] = 60000
+    state_file: Optional[str] = "./browser-state.json"
+    no_save_state: Optional[bool] = False
+    locale: Optional[str] = "zh-CN"
+    # 快速模式：拦截图片/字体/样式/跟踪请求，只等待结果容器；None 时读取 SEARCH_FAST_MODE
+    fast: Optional[bool] = None
+    # 覆盖使用的 Google 域名（例如本地测试页面服务器）
+    google_domain: Optional[str] = None
+
+
+class SearchBlockedError(Exception):
+    """搜索页面遇到人机验证"""
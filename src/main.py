@@ -8,23 +8,28 @@ from datetime import datetime, timedelta
 # Removed START as it's implicit with set_entry_point
 from langgraph.graph import END, StateGraph
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
 import pandas as pd
 import akshare as ak
 
+# 在导入各 Agent 之前加载 .env，使模块级读取的配置生效
+from src.tools.openrouter_config import load_project_env
+load_project_env(override=True)
+
 # --- Agent Imports ---
 from src.agents.valuation import valuation_agent
 from src.agents.state import AgentState
-from src.agents.sentiment import sentiment_agent
+from src.agents.sentiment import sentiment_agent, sentiment_agent_async
 from src.agents.risk_manager import risk_management_agent
 from src.agents.technicals import technical_analyst_agent
-from src.agents.portfolio_manager import portfolio_management_agent
+from src.agents.portfolio_manager import portfolio_management_agent, portfolio_management_agent_async
 from src.agents.market_data import market_data_agent
 from src.agents.fundamentals import fundamentals_agent
 from src.agents.researcher_bull import researcher_bull_agent
 from src.agents.researcher_bear import researcher_bear_agent
-from src.agents.debate_room import debate_room_agent
-from src.agents.macro_analyst import macro_analyst_agent
-from src.agents.macro_news_agent import macro_news_agent
+from src.agents.debate_room import debate_room_agent, debate_room_agent_async
+from src.agents.macro_analyst import macro_analyst_agent, macro_analyst_agent_async
+from src.agents.macro_news_agent import macro_news_agent, macro_news_agent_async
 
 # --- Logging and Backend Imports ---
 from src.utils.output_logger import OutputLogger
@@ -61,7 +66,7 @@ logger = setup_logger('main_workflow')
 # --- Run the Hedge Fund Workflow ---
 
 
-def run_hedge_fund(run_id: str, ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool = False, num_of_news: int = 5, show_summary: bool = False):
+def _build_initial_state(run_id: str, ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool, num_of_news: int, show_summary: bool, indicator_state):
     print(f"--- Starting Workflow Run ID: {run_id} ---")
     try:
         from backend.state import api_state
@@ -86,31 +91,65 @@ def run_hedge_fund(run_id: str, ticker: str, start_date: str, end_date: str, por
         }
     }
 
+    # 逐日运行（如回测）时传入增量指标状态，技术分析只需处理新增的K线
+    if indicator_state is not None:
+        initial_state["data"]["indicator_state"] = indicator_state
+    return initial_state
+
+
+def _report_final_state(run_id: str, final_state, show_reasoning: bool, show_summary: bool):
+    print(f"--- Finished Workflow Run ID: {run_id} ---")
+
+    if HAS_SUMMARY_REPORT and show_summary:
+        store_final_state(final_state)
+        enhanced_state = get_enhanced_final_state()
+        print_summary_report(enhanced_state)
+
+    if HAS_STRUCTURED_OUTPUT and show_reasoning:
+        print_structured_output(final_state)
+
+
+def run_hedge_fund(run_id: str, ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool = False, num_of_news: int = 5, show_summary: bool = False, indicator_state=None):
+    initial_state = _build_initial_state(
+        run_id, ticker, start_date, end_date, portfolio, show_reasoning, num_of_news, show_summary, indicator_state)
+
     try:
         from backend.utils.context_managers import workflow_run
         with workflow_run(run_id):
             final_state = app.invoke(initial_state)
-            print(f"--- Finished Workflow Run ID: {run_id} ---")
-
-            if HAS_SUMMARY_REPORT and show_summary:
-                store_final_state(final_state)
-                enhanced_state = get_enhanced_final_state()
-                print_summary_report(enhanced_state)
-
-            if HAS_STRUCTURED_OUTPUT and show_reasoning:
-                print_structured_output(final_state)
+            _report_final_state(run_id, final_state,
+                                show_reasoning, show_summary)
     except ImportError:
         final_state = app.invoke(initial_state)
-        print(f"--- Finished Workflow Run ID: {run_id} ---")
+        _report_final_state(run_id, final_state, show_reasoning, show_summary)
+        try:
+            from backend.state import api_state
+            api_state.complete_run(run_id, "completed")
+        except Exception:
+            pass
+    return final_state["messages"][-1].content
+
 
-        if HAS_SUMMARY_REPORT and show_summary:
-            store_final_state(final_state)
-            enhanced_state = get_enhanced_final_state()
-            print_summary_report(enhanced_state)
+async def run_hedge_fund_async(run_id: str, ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool = False, num_of_news: int = 5, show_summary: bool = False, indicator_state=None):
+    """run_hedge_fund 的异步版本，通过 app.ainvoke 执行工作流
 
-        if HAS_STRUCTURED_OUTPUT and show_reasoning:
-            print_structured_output(final_state)
+    调用 LLM 的节点使用异步实现，等待模型回答时不占用线程，
+    因此同一个事件循环可以同时驱动多个运行。
+    """
+    initial_state = _build_initial_state(
+        run_id, ticker, start_date, end_date, portfolio, show_reasoning, num_of_news, show_summary, indicator_state)
+
+    try:
+        from backend.utils.context_managers import workflow_run
+        with workflow_run(run_id):
+            final_state = await app.ainvoke(initial_state)
+            _report_final_state(run_id, final_state,
+                                show_reasoning, show_summary)
+    except ImportError:
+        final_state = await app.ainvoke(initial_state)
+        _report_final_state(run_id, final_state, show_reasoning, show_summary)
         try:
+            from backend.state import api_state
             api_state.complete_run(run_id, "completed")
         except Exception:
             pass
@@ -121,18 +160,24 @@ def run_hedge_fund(run_id: str, ticker: str, start_date: str, end_date: str, por
 workflow = StateGraph(AgentState)
 
 # Add nodes
+# 调用 LLM 的节点同时注册异步实现：app.invoke 走同步函数，app.ainvoke 走协程
 workflow.add_node("market_data_agent", market_data_agent)
 workflow.add_node("technical_analyst_agent", technical_analyst_agent)
 workflow.add_node("fundamentals_agent", fundamentals_agent)
-workflow.add_node("sentiment_agent", sentiment_agent)
+workflow.add_node("sentiment_agent", RunnableLambda(
+    sentiment_agent, afunc=sentiment_agent_async))
 workflow.add_node("valuation_agent", valuation_agent)
-workflow.add_node("macro_news_agent", macro_news_agent)  # 新闻 agent
+workflow.add_node("macro_news_agent", RunnableLambda(
+    macro_news_agent, afunc=macro_news_agent_async))  # 新闻 agent
 workflow.add_node("researcher_bull_agent", researcher_bull_agent)
 workflow.add_node("researcher_bear_agent", researcher_bear_agent)
-workflow.add_node("debate_room_agent", debate_room_agent)
+workflow.add_node("debate_room_agent", RunnableLambda(
+    debate_room_agent, afunc=debate_room_agent_async))
 workflow.add_node("risk_management_agent", risk_management_agent)
-workflow.add_node("macro_analyst_agent", macro_analyst_agent)
-workflow.add_node("portfolio_management_agent", portfolio_management_agent)
+workflow.add_node("macro_analyst_agent", RunnableLambda(
+    macro_analyst_agent, afunc=macro_analyst_agent_async))
+workflow.add_node("portfolio_management_agent", RunnableLambda(
+    portfolio_management_agent, afunc=portfolio_management_agent_async))
 
 # Set entry point
 workflow.set_entry_point("market_data_agent")
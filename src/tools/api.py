@@ -1,14 +1,31 @@
 from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import contextvars
+import os
+import time
 import pandas as pd
 import akshare as ak
 from datetime import datetime, timedelta
 import json
 import numpy as np
 from src.utils.logging_config import setup_logger
+from src.tools.spot_snapshot import get_spot_snapshot, get_spot_row
+from src.tools.price_store import PriceHistoryStore
+from src.tools.indicators import get_indicator_context
+from src.tools.price_columns import PriceColumns
 
 # 设置日志记录
 logger = setup_logger('api')
 
+# 财务报表：(新浪报表名称, 日志名称)
+_FINANCIAL_REPORTS = [
+    ("资产负债表", "balance sheet"),
+    ("利润表", "income statement"),
+    ("现金流量表", "cash flow statement"),
+]
+# 获取全部报表的总超时时间（秒）
+FINANCIAL_REPORT_TIMEOUT = float(os.getenv("FINANCIAL_REPORT_TIMEOUT", "30"))
+
 
 def get_financial_metrics(symbol: str) -> Dict[str, Any]:
     """获取财务指标数据"""
@@ -16,17 +33,16 @@ def get_financial_metrics(symbol: str) -> Dict[str, Any]:
     try:
         # 获取实时行情数据（用于市值和估值比率）
         logger.info("Fetching real-time quotes...")
-        realtime_data = ak.stock_zh_a_spot_em()
+        realtime_data = get_spot_snapshot()
         if realtime_data is None or realtime_data.empty:
             logger.warning("No real-time quotes data available")
             return [{}]
 
-        stock_data = realtime_data[realtime_data['代码'] == symbol]
-        if stock_data.empty:
+        stock_data = get_spot_row(symbol)
+        if stock_data is None:
             logger.warning(f"No real-time quotes found for {symbol}")
             return [{}]
 
-        stock_data = stock_data.iloc[0]
         logger.info("✓ Real-time quotes fetched")
 
         # 获取新浪财务指标
@@ -149,72 +165,58 @@ def get_financial_metrics(symbol: str) -> Dict[str, Any]:
         return [{}]
 
 
+def _fetch_financial_report(symbol: str, report: str, label: str):
+    """获取单张新浪财务报表，返回 (最新一期, 上一期)，失败时返回空 Series"""
+    logger.info(f"Fetching {label}...")
+    try:
+        statement = ak.stock_financial_report_sina(
+            stock=f"sh{symbol}", symbol=report)
+        if not statement.empty:
+            latest = statement.iloc[0]
+            previous = statement.iloc[1] if len(
+                statement) > 1 else statement.iloc[0]
+            logger.info(f"✓ {label.capitalize()} fetched")
+            return latest, previous
+        logger.warning(f"Failed to get {label}")
+        logger.error(f"No {label} data found")
+    except Exception as e:
+        logger.warning(f"Failed to get {label}")
+        logger.error(f"Error getting {label}: {e}")
+    return pd.Series(), pd.Series()
+
+
 def get_financial_statements(symbol: str) -> Dict[str, Any]:
     """获取财务报表数据"""
     logger.info(f"Getting financial statements for {symbol}...")
     try:
-        # 获取资产负债表数据
-        logger.info("Fetching balance sheet...")
-        try:
-            balance_sheet = ak.stock_financial_report_sina(
-                stock=f"sh{symbol}", symbol="资产负债表")
-            if not balance_sheet.empty:
-                latest_balance = balance_sheet.iloc[0]
-                previous_balance = balance_sheet.iloc[1] if len(
-                    balance_sheet) > 1 else balance_sheet.iloc[0]
-                logger.info("✓ Balance sheet fetched")
-            else:
-                logger.warning("Failed to get balance sheet")
-                logger.error("No balance sheet data found")
-                latest_balance = pd.Series()
-                previous_balance = pd.Series()
-        except Exception as e:
-            logger.warning("Failed to get balance sheet")
-            logger.error(f"Error getting balance sheet: {e}")
-            latest_balance = pd.Series()
-            previous_balance = pd.Series()
-
-        # 获取利润表数据
-        logger.info("Fetching income statement...")
+        # 三张报表相互独立，并发获取；每次调用使用自己的线程池，
+        # 所有报表共享同一个截止时间，整体耗时不超过 FINANCIAL_REPORT_TIMEOUT
+        executor = ThreadPoolExecutor(
+            max_workers=len(_FINANCIAL_REPORTS), thread_name_prefix="financial_report")
         try:
-            income_statement = ak.stock_financial_report_sina(
-                stock=f"sh{symbol}", symbol="利润表")
-            if not income_statement.empty:
-                latest_income = income_statement.iloc[0]
-                previous_income = income_statement.iloc[1] if len(
-                    income_statement) > 1 else income_statement.iloc[0]
-                logger.info("✓ Income statement fetched")
-            else:
-                logger.warning("Failed to get income statement")
-                logger.error("No income statement data found")
-                latest_income = pd.Series()
-                previous_income = pd.Series()
-        except Exception as e:
-            logger.warning("Failed to get income statement")
-            logger.error(f"Error getting income statement: {e}")
-            latest_income = pd.Series()
-            previous_income = pd.Series()
-
-        # 获取现金流量表数据
-        logger.info("Fetching cash flow statement...")
-        try:
-            cash_flow = ak.stock_financial_report_sina(
-                stock=f"sh{symbol}", symbol="现金流量表")
-            if not cash_flow.empty:
-                latest_cash_flow = cash_flow.iloc[0]
-                previous_cash_flow = cash_flow.iloc[1] if len(
-                    cash_flow) > 1 else cash_flow.iloc[0]
-                logger.info("✓ Cash flow statement fetched")
-            else:
-                logger.warning("Failed to get cash flow statement")
-                logger.error("No cash flow data found")
-                latest_cash_flow = pd.Series()
-                previous_cash_flow = pd.Series()
-        except Exception as e:
-            logger.warning("Failed to get cash flow statement")
-            logger.error(f"Error getting cash flow statement: {e}")
-            latest_cash_flow = pd.Series()
-            previous_cash_flow = pd.Series()
+            futures = {
+                symbol_name: executor.submit(
+                    contextvars.copy_context().run,
+                    _fetch_financial_report, symbol, symbol_name, label)
+                for symbol_name, label in _FINANCIAL_REPORTS
+            }
+            deadline = time.monotonic() + FINANCIAL_REPORT_TIMEOUT
+            reports = {}
+            for symbol_name, label in _FINANCIAL_REPORTS:
+                try:
+                    reports[symbol_name] = futures[symbol_name].result(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except FutureTimeoutError:
+                    logger.warning(f"Failed to get {label}")
+                    logger.error(
+                        f"Timed out getting {label} after {FINANCIAL_REPORT_TIMEOUT}s")
+                    reports[symbol_name] = (pd.Series(), pd.Series())
+        finally:
+            executor.shutdown(wait=False)
+
+        latest_balance, previous_balance = reports["资产负债表"]
+        latest_income, previous_income = reports["利润表"]
+        latest_cash_flow, previous_cash_flow = reports["现金流量表"]
 
         # 构建财务数据
         line_items = []
@@ -282,9 +284,11 @@ def get_financial_statements(symbol: str) -> Dict[str, Any]:
 def get_market_data(symbol: str) -> Dict[str, Any]:
     """获取市场数据"""
     try:
-        # 获取实时行情
-        realtime_data = ak.stock_zh_a_spot_em()
-        stock_data = realtime_data[realtime_data['代码'] == symbol].iloc[0]
+        # 获取实时行情（共享全市场快照）
+        stock_data = get_spot_row(symbol)
+        if stock_data is None:
+            logger.warning(f"No real-time quotes found for {symbol}")
+            return {}
 
         return {
             "market_cap": float(stock_data.get("总市值", 0)),
@@ -300,6 +304,43 @@ def get_market_data(symbol: str) -> Dict[str, Any]:
         return {}
 
 
+def _fetch_price_history(symbol: str, start_date: datetime, end_date: datetime, adjust: str) -> pd.DataFrame:
+    """从 akshare 获取日线数据并处理，包括重命名列等操作"""
+    df = ak.stock_zh_a_hist(
+        symbol=symbol,
+        period="daily",
+        start_date=start_date.strftime("%Y%m%d"),
+        end_date=end_date.strftime("%Y%m%d"),
+        adjust=adjust
+    )
+
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    # 重命名列以匹配技术分析代理的需求
+    df = df.rename(columns={
+        "日期": "date",
+        "开盘": "open",
+        "最高": "high",
+        "最低": "low",
+        "收盘": "close",
+        "成交量": "volume",
+        "成交额": "amount",
+        "振幅": "amplitude",
+        "涨跌幅": "pct_change",
+        "涨跌额": "change_amount",
+        "换手率": "turnover"
+    })
+
+    # 确保日期列为datetime类型
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+# 本地列式日线存储，按 (股票代码, 复权类型) 增量更新
+_price_store = PriceHistoryStore(_fetch_price_history)
+
+
 def get_price_history(symbol: str, start_date: str = None, end_date: str = None, adjust: str = "qfq") -> pd.DataFrame:
     """获取历史价格数据
 
@@ -363,36 +404,8 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
         logger.info(f"End date: {end_date.strftime('%Y-%m-%d')}")
 
         def get_and_process_data(start_date, end_date):
-            """获取并处理数据，包括重命名列等操作"""
-            df = ak.stock_zh_a_hist(
-                symbol=symbol,
-                period="daily",
-                start_date=start_date.strftime("%Y%m%d"),
-                end_date=end_date.strftime("%Y%m%d"),
-                adjust=adjust
-            )
-
-            if df is None or df.empty:
-                return pd.DataFrame()
-
-            # 重命名列以匹配技术分析代理的需求
-            df = df.rename(columns={
-                "日期": "date",
-                "开盘": "open",
-                "最高": "high",
-                "最低": "low",
-                "收盘": "close",
-                "成交量": "volume",
-                "成交额": "amount",
-                "振幅": "amplitude",
-                "涨跌幅": "pct_change",
-                "涨跌额": "change_amount",
-                "换手率": "turnover"
-            })
-
-            # 确保日期列为datetime类型
-            df["date"] = pd.to_datetime(df["date"])
-            return df
+            """获取数据，优先使用本地存储，只从网络获取缺失的区间"""
+            return _price_store.get_history(symbol, start_date, end_date, adjust)
 
         # 获取历史行情数据
         df = get_and_process_data(start_date, end_date)
@@ -417,24 +430,36 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
                 logger.warning(
                     f"Warning: Even with extended time range, insufficient data ({len(df)} days)")
 
+        # 按日期升序排序
+        df = df.sort_values("date")
+
+        # 重置索引
+        df = df.reset_index(drop=True)
+        df.attrs["symbol"] = symbol
+        df.attrs["adjust"] = adjust
+
+        # 通过共享的指标引擎计算，结果会被 technicals / data_analyzer 复用
+        indicators = get_indicator_context(df, symbol)
+
         # 计算动量指标
-        df["momentum_1m"] = df["close"].pct_change(periods=20)  # 20个交易日约等于1个月
-        df["momentum_3m"] = df["close"].pct_change(periods=60)  # 60个交易日约等于3个月
-        df["momentum_6m"] = df["close"].pct_change(
-            periods=120)  # 120个交易日约等于6个月
+        df["momentum_1m"] = indicators.get(
+            "returns", periods=20)  # 20个交易日约等于1个月
+        df["momentum_3m"] = indicators.get(
+            "returns", periods=60)  # 60个交易日约等于3个月
+        df["momentum_6m"] = indicators.get(
+            "returns", periods=120)  # 120个交易日约等于6个月
 
         # 计算成交量动量（相对于20日平均成交量的变化）
-        df["volume_ma20"] = df["volume"].rolling(window=20).mean()
+        df["volume_ma20"] = indicators.get(
+            "rolling", source="volume", window=20, stat="mean")
         df["volume_momentum"] = df["volume"] / df["volume_ma20"]
 
         # 计算波动率指标
-        # 1. 历史波动率 (20日)
-        returns = df["close"].pct_change()
-        df["historical_volatility"] = returns.rolling(
-            window=20).std() * np.sqrt(252)  # 年化
+        # 1. 历史波动率 (20日，年化)
+        df["historical_volatility"] = indicators.get("volatility", window=20)
 
         # 2. 波动率区间 (相对于过去120天的波动率的位置)
-        volatility_120d = returns.rolling(window=120).std() * np.sqrt(252)
+        volatility_120d = indicators.get("volatility", window=120)
         vol_min = volatility_120d.rolling(window=120).min()
         vol_max = volatility_120d.rolling(window=120).max()
         vol_range = vol_max - vol_min
@@ -451,87 +476,21 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
             df["historical_volatility"] - vol_mean) / vol_std
 
         # 4. ATR比率
-        tr = pd.DataFrame()
-        tr["h-l"] = df["high"] - df["low"]
-        tr["h-pc"] = abs(df["high"] - df["close"].shift(1))
-        tr["l-pc"] = abs(df["low"] - df["close"].shift(1))
-        tr["tr"] = tr[["h-l", "h-pc", "l-pc"]].max(axis=1)
-        df["atr"] = tr["tr"].rolling(window=14).mean()
+        df["atr"] = indicators.get("atr", period=14)
         df["atr_ratio"] = df["atr"] / df["close"]
 
         # 计算统计套利指标
-        # 1. 赫斯特指数 (使用过去120天的数据)
-        def calculate_hurst(series):
-            """
-            计算Hurst指数。
-
-            Args:
-                series: 价格序列
-
-            Returns:
-                float: Hurst指数，或在计算失败时返回np.nan
-            """
-            try:
-                series = series.dropna()
-                if len(series) < 30:  # 降低最小数据点要求
-                    return np.nan
-
-                # 使用对数收益率
-                log_returns = np.log(series / series.shift(1)).dropna()
-                if len(log_returns) < 30:  # 降低最小数据点要求
-                    return np.nan
-
-                # 使用更小的lag范围
-                # 减少lag范围到2-10天
-                lags = range(2, min(11, len(log_returns) // 4))
-
-                # 计算每个lag的标准差
-                tau = []
-                for lag in lags:
-                    # 计算滚动标准差
-                    std = log_returns.rolling(window=lag).std().dropna()
-                    if len(std) > 0:
-                        tau.append(np.mean(std))
-
-                # 基本的数值检查
-                if len(tau) < 3:  # 进一步降低最小要求
-                    return np.nan
-
-                # 使用对数回归
-                lags_log = np.log(list(lags))
-                tau_log = np.log(tau)
-
-                # 计算回归系数
-                reg = np.polyfit(lags_log, tau_log, 1)
-                hurst = reg[0] / 2.0
-
-                # 只保留基本的数值检查
-                if np.isnan(hurst) or np.isinf(hurst):
-                    return np.nan
-
-                return hurst
-
-            except Exception as e:
-                return np.nan
-
-        # 使用对数收益率计算Hurst指数
-        log_returns = np.log(df["close"] / df["close"].shift(1))
-        df["hurst_exponent"] = log_returns.rolling(
-            window=120,
-            min_periods=60  # 要求至少60个数据点
-        ).apply(calculate_hurst)
+        # 1. 赫斯特指数 (使用过去120天的对数收益率，要求至少60个数据点)
+        df["hurst_exponent"] = indicators.get(
+            "hurst", window=120, min_periods=60)
 
         # 2. 偏度 (20日)
-        df["skewness"] = returns.rolling(window=20).skew()
+        df["skewness"] = indicators.get(
+            "rolling", source="returns", window=20, stat="skew")
 
         # 3. 峰度 (20日)
-        df["kurtosis"] = returns.rolling(window=20).kurt()
-
-        # 按日期升序排序
-        df = df.sort_values("date")
-
-        # 重置索引
-        df = df.reset_index(drop=True)
+        df["kurtosis"] = indicators.get(
+            "rolling", source="returns", window=20, stat="kurt")
 
         logger.info(
             f"Successfully fetched price history data ({len(df)} records)")
@@ -552,9 +511,15 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
 
 
 def prices_to_df(prices):
-    """Convert price data to DataFrame with standardized column names"""
+    """Convert price data to DataFrame with standardized column names
+
+    prices 可以是 PriceColumns（零拷贝视图）或逐行记录列表。
+    """
     try:
-        df = pd.DataFrame(prices)
+        if isinstance(prices, PriceColumns):
+            df = prices.to_dataframe()
+        else:
+            df = pd.DataFrame(prices)
 
         # 标准化列名映射
         column_mapping = {
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.tools.openrouter_config import (
+    get_cache_identity, get_chat_completion, get_chat_completion_async)
+from src.utils.llm_cache import get_llm_cache, make_cache_key
+from src.utils.logging_config import setup_logger
+from src.utils.prompt_budget import (
+    get_max_item_tokens, get_token_budget, pack_batches, routed_model, truncate_to_tokens)
+
+# 设置日志记录
+logger = setup_logger('article_sentiment')
+
+ARTICLE_SENTIMENT_SYSTEM_PROMPT = """你是一个专业的A股市场分析师，擅长解读新闻对股票走势的影响。你需要分别评估每一条新闻的情感倾向，给出一个介于-1到1之间的分数：
+- 1表示极其积极（例如：重大利好消息、超预期业绩、行业政策支持）
+- 0.5到0.9表示积极（例如：业绩增长、新项目落地、获得订单）
+- 0.1到0.4表示轻微积极（例如：小额合同签订、日常经营正常）
+- 0表示中性（例如：日常公告、人事变动、无重大影响的新闻）
+- -0.1到-0.4表示轻微消极（例如：小额诉讼、非核心业务亏损）
+- -0.5到-0.9表示消极（例如：业绩下滑、重要客户流失、行业政策收紧）
+- -1表示极其消极（例如：重大违规、核心业务严重亏损、被监管处罚）
+
+每条新闻独立评分，只考虑该新闻本身对相关公司基本面和A股市场的实际影响。"""
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def article_key(news: Dict) -> str:
+    """单篇新闻的内容哈希（标题 + 正文），与新闻来源和抓取时间无关"""
+    text = f"{news.get('title', '').strip()}\n{news.get('content', '').strip()}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _score_cache_key(identity, key: str) -> str:
+    provider, model, params = identity
+    return make_cache_key(provider, model, {"task": "article_sentiment", "article": key}, params)
+
+
+def _cache_context():
+    """返回 (cache, identity)；缓存禁用或无法确定模型时返回 (None, None)"""
+    cache = get_llm_cache()
+    if cache is None:
+        return None, None
+    try:
+        return cache, get_cache_identity(route="sentiment")
+    except Exception as e:
+        logger.warning(f"无法确定缓存的 provider/模型，本次不使用单篇得分缓存: {e}")
+        return None, None
+
+
+def _lookup_scores(news_list: List[Dict]):
+    """查询单篇得分缓存，返回 (keys, 已缓存的得分, 需要评分的新闻 {key: news}, cache, identity)"""
+    cache, identity = _cache_context()
+    keys = [article_key(news) for news in news_list]
+    scores: Dict[str, float] = {}
+    pending: Dict[str, Dict] = {}
+    for key, news in zip(keys, news_list):
+        if key in scores or key in pending:
+            continue
+        cached = cache.get(_score_cache_key(identity, key)) if cache else None
+        if cached is not None:
+            scores[key] = float(cached)
+        else:
+            pending[key] = news
+    logger.info(f"单篇新闻情感得分: 缓存命中 {len(scores)} 篇，需评分 {len(pending)} 篇")
+    return keys, scores, pending, cache, identity
+
+
+def _render_article(index: int, news: Dict, max_item_tokens: int, model: Optional[str] = None) -> str:
+    return (f"[{index}] 标题：{news.get('title', '')}\n"
+            f"时间：{news.get('publish_time', '')}\n"
+            f"内容：{truncate_to_tokens(news.get('content', ''), max_item_tokens, model=model)}")
+
+
+def _pending_batches(pending: Dict[str, Dict]) -> List[Dict[str, Dict]]:
+    """将未缓存的新闻按 token 预算（PROMPT_TOKEN_BUDGET_SENTIMENT_BATCH）拆分为若干请求"""
+    if not pending:
+        return []
+    max_item_tokens = get_max_item_tokens()
+    model = routed_model("sentiment")
+    batches = pack_batches(
+        list(pending.items()), lambda item: _render_article(0, item[1], max_item_tokens, model),
+        get_token_budget("sentiment_batch"), model=model)
+    if len(batches) > 1:
+        logger.info(f"{len(pending)} 篇新闻超过单次请求的 token 预算，拆分为 {len(batches)} 个请求")
+    return [dict(batch) for batch in batches]
+
+
+def _scoring_messages(pending: Dict[str, Dict]) -> list:
+    """将一批未缓存的新闻放入同一个请求，按编号返回各自的得分"""
+    max_item_tokens = get_max_item_tokens()
+    model = routed_model("sentiment")
+    articles = "\n\n".join(
+        _render_article(i, news, max_item_tokens, model)
+        for i, news in enumerate(pending.values(), 1)
+    )
+    user_message = {
+        "role": "user",
+        "content": f"请分别评估以下{len(pending)}条A股上市公司相关新闻的情感倾向：\n\n{articles}\n\n"
+                   f"请只返回一个JSON对象，键为新闻编号，值为该新闻的得分，例如：{{\"1\": 0.5, \"2\": -0.2}}。"
+    }
+    return [{"role": "system", "content": ARTICLE_SENTIMENT_SYSTEM_PROMPT}, user_message]
+
+
+def _parse_scores(result, count: int) -> Dict[int, float]:
+    """解析 {编号: 得分}，无效或缺失的编号被忽略"""
+    if not result:
+        logger.error("单篇新闻评分失败，LLM 未返回结果")
+        return {}
+    match = re.search(r'\{.*\}', result, re.DOTALL)
+    try:
+        raw = json.loads(match.group(0)) if match else {}
+    except json.JSONDecodeError:
+        logger.error(f"无法解析单篇新闻评分结果: {result[:200]}")
+        return {}
+    parsed = {}
+    for index, score in raw.items():
+        try:
+            index = int(index)
+            if 1 <= index <= count:
+                parsed[index] = max(-1.0, min(1.0, float(score)))
+        except (TypeError, ValueError):
+            continue
+    return parsed
+
+
+def _store_scores(pending: Dict[str, Dict], parsed: Dict[int, float], scores: Dict[str, float],
+                  cache, identity) -> None:
+    for i, key in enumerate(pending, 1):
+        if i not in parsed:
+            continue
+        scores[key] = parsed[i]
+        if cache is not None:
+            provider, model, _ = identity
+            cache.set(_score_cache_key(identity, key), str(parsed[i]),
+                      provider=provider, model=model)
+
+
+def score_articles(news_list: List[Dict]) -> List[Optional[float]]:
+    """逐篇评估新闻情感，未缓存的新闻合并为批量 LLM 请求（超出 token 预算时拆分）
+
+    news_list 可以包含多只股票的新闻，相同内容的新闻只评分一次。
+
+    Returns:
+        与 news_list 等长的得分列表，评分失败的新闻为 None
+    """
+    keys, scores, pending, cache, identity = _lookup_scores(news_list)
+    for batch in _pending_batches(pending):
+        # 批量结果按单篇拆分缓存，整批回答本身不再写入缓存
+        result = get_chat_completion(_scoring_messages(batch), use_cache=False, route="sentiment")
+        _store_scores(batch, _parse_scores(result, len(batch)), scores, cache, identity)
+    return [scores.get(key) for key in keys]
+
+
+async def score_articles_async(news_list: List[Dict]) -> List[Optional[float]]:
+    """score_articles 的异步版本"""
+    keys, scores, pending, cache, identity = _lookup_scores(news_list)
+    batches = _pending_batches(pending)
+    results = await asyncio.gather(*(
+        get_chat_completion_async(_scoring_messages(batch), use_cache=False, route="sentiment") for batch in batches))
+    for batch, result in zip(batches, results):
+        _store_scores(batch, _parse_scores(result, len(batch)), scores, cache, identity)
+    return [scores.get(key) for key in keys]
+
+
+def _parse_time(news: Dict) -> Optional[datetime]:
+    try:
+        return datetime.strptime(news.get('publish_time', ''), DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def aggregate_scores(news_list: List[Dict], scores: List[Optional[float]],
+                     method: Optional[str] = None, half_life_days: Optional[float] = None) -> float:
+    """将单篇得分聚合为整体情感得分
+
+    - mean: 简单平均
+    - recency（默认）: 按时间衰减加权平均，距最新一篇新闻每过 half_life_days 天权重减半；
+      无法解析发布时间的新闻按最新处理
+    """
+    method = method or os.getenv("SENTIMENT_AGGREGATION", "recency")
+    if half_life_days is None:
+        half_life_days = float(os.getenv("SENTIMENT_RECENCY_HALF_LIFE_DAYS", 2))
+
+    scored = [(news, score) for news, score in zip(news_list, scores) if score is not None]
+    if not scored:
+        return 0.0
+    if method == "mean":
+        return sum(score for _, score in scored) / len(scored)
+
+    times = [_parse_time(news) for news, _ in scored]
+    newest = max((t for t in times if t is not None), default=None)
+    total_weight = weighted = 0.0
+    for (_, score), published in zip(scored, times):
+        age_days = (newest - published).total_seconds() / 86400 if newest and published else 0.0
+        weight = 0.5 ** (age_days / half_life_days) if half_life_days > 0 else 1.0
+        total_weight += weight
+        weighted += weight * score
+    return max(-1.0, min(1.0, weighted / total_weight))
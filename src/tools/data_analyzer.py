@@ -1,7 +1,7 @@
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 from src.tools.api import get_price_history
+from src.tools.indicators import get_indicator_context
 
 
 def analyze_stock_data(symbol: str, start_date: str = None, end_date: str = None):
@@ -20,48 +20,46 @@ def analyze_stock_data(symbol: str, start_date: str = None, end_date: str = None
         print("未获取到数据")
         return
 
-    # 计算额外的技术指标
+    # 计算额外的技术指标（与 get_price_history / technicals 共享指标引擎的缓存）
+    indicators = get_indicator_context(df, symbol)
+    # 上下文缓存持有原始数据，在副本上添加列，避免污染其他使用方看到的数据
+    df = df.copy()
+
     # 1. 移动平均线
-    df['ma5'] = df['close'].rolling(window=5).mean()
-    df['ma10'] = df['close'].rolling(window=10).mean()
-    df['ma20'] = df['close'].rolling(window=20).mean()
-    df['ma60'] = df['close'].rolling(window=60).mean()
+    for window in (5, 10, 20, 60):
+        df[f'ma{window}'] = indicators.get(
+            "rolling", source="close", window=window, stat="mean")
 
     # 2. MACD
-    exp1 = df['close'].ewm(span=12, adjust=False).mean()
-    exp2 = df['close'].ewm(span=26, adjust=False).mean()
-    df['macd'] = exp1 - exp2
-    df['signal_line'] = df['macd'].ewm(span=9, adjust=False).mean()
-    df['macd_hist'] = df['macd'] - df['signal_line']
+    macd = indicators.get("macd")
+    df['macd'] = macd['macd']
+    df['signal_line'] = macd['signal']
+    df['macd_hist'] = macd['hist']
 
     # 3. RSI
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['rsi'] = 100 - (100 / (1 + rs))
+    df['rsi'] = indicators.get("rsi", period=14)
 
     # 4. 布林带
-    df['bb_middle'] = df['close'].rolling(window=20).mean()
-    bb_std = df['close'].rolling(window=20).std()
-    df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-    df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
+    bollinger = indicators.get("bollinger", window=20)
+    df['bb_middle'] = bollinger['middle']
+    df['bb_upper'] = bollinger['upper']
+    df['bb_lower'] = bollinger['lower']
 
     # 5. 成交量相关指标
-    df['volume_ma5'] = df['volume'].rolling(window=5).mean()
-    df['volume_ma20'] = df['volume'].rolling(window=20).mean()
+    df['volume_ma5'] = indicators.get(
+        "rolling", source="volume", window=5, stat="mean")
+    df['volume_ma20'] = indicators.get(
+        "rolling", source="volume", window=20, stat="mean")
     df['volume_ratio'] = df['volume'] / df['volume_ma5']
 
     # 6. 价格动量指标
-    df['price_momentum'] = df['close'].pct_change(periods=5)
+    df['price_momentum'] = indicators.get("returns", periods=5)
     df['price_acceleration'] = df['price_momentum'].diff()
 
     # 7. 波动率指标
-    df['daily_return'] = df['close'].pct_change()
-    df['volatility_5d'] = df['daily_return'].rolling(
-        window=5).std() * np.sqrt(252)
-    df['volatility_20d'] = df['daily_return'].rolling(
-        window=20).std() * np.sqrt(252)
+    df['daily_return'] = indicators.get("returns")
+    df['volatility_5d'] = indicators.get("volatility", window=5)
+    df['volatility_20d'] = indicators.get("volatility", window=20)
 
     # 保存为CSV文件
     output_file = f"{symbol}_analysis_{datetime.now().strftime('%Y%m%d')}.csv"
@@ -0,0 +1,358 @@
+import copy
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 计算 Hurst 指数时保留的最近收盘价数量
+HURST_LOOKBACK = 252
+
+
+class EWMState:
+    """与 `Series.ewm(span=..., adjust=...).mean()` 等价的单步更新
+
+    逐步实现 pandas 的 ewma 递推（ignore_na=False）：缺失值不更新均值，
+    但仍会使历史权重衰减。
+    """
+
+    def __init__(self, span: int, adjust: bool = False):
+        self.alpha = 2.0 / (span + 1.0)
+        self.adjust = adjust
+        self.weighted = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        is_obs = not math.isnan(value)
+        self.nobs += is_obs
+        new_wt = 1.0 if self.adjust else self.alpha
+        if not math.isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + new_wt * value) / \
+                        (self.old_wt + new_wt)
+                if self.adjust:
+                    self.old_wt += new_wt
+                else:
+                    self.old_wt = 1.0
+        elif is_obs:
+            self.weighted = value
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.weighted if self.nobs >= 1 else math.nan
+
+
+class RollingWindow:
+    """固定长度滚动窗口，O(1) 更新 sum/mean/std/skew/kurt
+
+    与 pandas rolling 的语义一致：NaN 不计入有效个数，有效个数少于
+    min_periods 时结果为 NaN。窗口内维护相对于参考值的各阶幂和（平移后
+    计算中心矩，减小相消误差），每 window 次更新从缓冲区重算一次以消除
+    累积误差。
+    """
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.buffer: deque = deque(maxlen=window)
+        self._since_rebuild = 0
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        valid = [v for v in self.buffer if not math.isnan(v)]
+        self.shift = valid[0] if valid else 0.0
+        self.count = len(valid)
+        self.sums = [0.0, 0.0, 0.0, 0.0]
+        for v in valid:
+            self._accumulate(v, 1.0)
+        self._since_rebuild = 0
+
+    def _accumulate(self, value: float, sign: float) -> None:
+        d = value - self.shift
+        d2 = d * d
+        self.sums[0] += sign * d
+        self.sums[1] += sign * d2
+        self.sums[2] += sign * d2 * d
+        self.sums[3] += sign * d2 * d2
+
+    def update(self, value: float) -> None:
+        value = float(value)
+        if len(self.buffer) == self.window:
+            old = self.buffer[0]
+            if not math.isnan(old):
+                self.count -= 1
+                self._accumulate(old, -1.0)
+        self.buffer.append(value)
+        if not math.isnan(value):
+            self.count += 1
+            self._accumulate(value, 1.0)
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+
+    def _ready(self, minimum: int = 1) -> bool:
+        return self.count >= max(self.min_periods, minimum)
+
+    def sum(self) -> float:
+        if not self._ready():
+            return math.nan
+        return self.sums[0] + self.count * self.shift
+
+    def mean(self) -> float:
+        if not self._ready():
+            return math.nan
+        return self.sums[0] / self.count + self.shift
+
+    def _central_moments(self):
+        n = self.count
+        a = self.sums[0] / n
+        b = self.sums[1] / n - a * a
+        c = self.sums[2] / n - a ** 3 - 3 * a * b
+        d = self.sums[3] / n - a ** 4 - 6 * b * a * a - 4 * c * a
+        return a, b, c, d
+
+    def std(self) -> float:
+        if not self._ready(2):
+            return math.nan
+        n = self.count
+        _, b, _, _ = self._central_moments()
+        return math.sqrt(max(b * n / (n - 1), 0.0))
+
+    def skew(self) -> float:
+        if not self._ready(3):
+            return math.nan
+        n = self.count
+        _, b, c, _ = self._central_moments()
+        if b <= 1e-14:
+            return math.nan
+        return math.sqrt(n * (n - 1)) * c / ((n - 2) * b ** 1.5)
+
+    def kurt(self) -> float:
+        if not self._ready(4):
+            return math.nan
+        n = self.count
+        _, b, _, d = self._central_moments()
+        if b <= 1e-14:
+            return math.nan
+        k = (n * n - 1.0) * d / (b * b) - 3.0 * (n - 1.0) ** 2
+        return k / ((n - 2.0) * (n - 3.0))
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    """按 NumPy 语义做除法（除以 0 得到 inf/NaN，而不是抛异常）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(numerator) / np.float64(denominator))
+
+
+class IncrementalIndicatorState:
+    """技术分析指标的增量计算状态
+
+    每根新 K 线以 O(1) 代价推进 technicals 所需的全部指标（EMA/MACD、RSI、
+    布林带、ADX、ATR、OBV、动量、波动率、偏度/峰度等），`latest()` 返回与
+    `technicals.latest_indicator_values` 相同键的最新值，数值在浮点误差范围内
+    与全量计算一致。EMA/ADX 从第一次预热的 K 线开始连续累积；Hurst 指数只使用
+    最近 HURST_LOOKBACK 根收盘价计算，历史超过该长度时与全量计算的结果不同。
+
+    状态可以通过 `snapshot()` / `restore()` 保存和恢复，便于回测或实时监控
+    在不同进程间接续。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.bars = 0
+        self.last_date = None
+
+        self.closes: deque = deque(maxlen=HURST_LOOKBACK)
+        self.prev_high = math.nan
+        self.prev_low = math.nan
+        self.volume = math.nan
+
+        self.ema = {span: EWMState(span) for span in (8, 12, 21, 26, 55)}
+        self.macd_signal = EWMState(9)
+        self.macd_history: deque = deque(maxlen=2)
+        self.signal_history: deque = deque(maxlen=2)
+
+        self.gain = {period: RollingWindow(period) for period in (14, 28)}
+        self.loss = {period: RollingWindow(period) for period in (14, 28)}
+        self.close_20 = RollingWindow(20)
+        self.close_50 = RollingWindow(50)
+
+        self.plus_dm = EWMState(14, adjust=True)
+        self.minus_dm = EWMState(14, adjust=True)
+        self.tr_ewm = EWMState(14, adjust=True)
+        self.dx = EWMState(14, adjust=True)
+        self.atr = RollingWindow(14, min_periods=7)
+
+        self.obv_history: deque = deque(maxlen=6)
+
+        self.mom_1m = RollingWindow(21, min_periods=5)
+        self.mom_3m = RollingWindow(63, min_periods=42)
+        self.mom_6m = RollingWindow(126, min_periods=63)
+        self.volume_21 = RollingWindow(21, min_periods=10)
+        self.returns_21 = RollingWindow(21, min_periods=10)
+        self.hist_vol_42 = RollingWindow(42, min_periods=21)
+        self.returns_42 = RollingWindow(42, min_periods=21)
+
+    def update(self, close: float, high: float, low: float, volume: float,
+               date=None) -> None:
+        """推进一根 K 线"""
+        close, high, low, volume = float(close), float(high), float(low), float(volume)
+        with self._lock:
+            prev_close = self.closes[-1] if self.closes else math.nan
+            self.closes.append(close)
+            self.volume = volume
+
+            # EMA 与 MACD
+            for ema in self.ema.values():
+                ema.update(close)
+            macd = self.ema[12].value - self.ema[26].value
+            self.macd_history.append(macd)
+            self.signal_history.append(self.macd_signal.update(macd))
+
+            # RSI：与全量计算一样把首日的缺失涨跌视为 0
+            delta = close - prev_close
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            for period in self.gain:
+                self.gain[period].update(gain)
+                self.loss[period].update(loss)
+
+            self.close_20.update(close)
+            self.close_50.update(close)
+
+            # ADX / ATR
+            true_range = np.nanmax([high - low, abs(high - prev_close),
+                                    abs(low - prev_close)])
+            up_move = high - self.prev_high
+            down_move = self.prev_low - low
+            plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+            minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+            tr_ewm = self.tr_ewm.update(true_range)
+            plus_di = 100 * _ratio(self.plus_dm.update(plus_dm), tr_ewm)
+            minus_di = 100 * _ratio(self.minus_dm.update(minus_dm), tr_ewm)
+            self.dx.update(100 * _ratio(abs(plus_di - minus_di), plus_di + minus_di))
+            self.plus_di, self.minus_di = plus_di, minus_di
+            self.atr.update(true_range)
+            self.prev_high, self.prev_low = high, low
+
+            # OBV
+            obv = self.obv_history[-1] if self.obv_history else 0.0
+            if close > prev_close:
+                obv += volume
+            elif close < prev_close:
+                obv -= volume
+            self.obv_history.append(obv)
+
+            # 收益率相关的滚动统计
+            ret = _ratio(close - prev_close, prev_close)
+            for window in (self.mom_1m, self.mom_3m, self.mom_6m,
+                           self.returns_21, self.returns_42):
+                window.update(ret)
+            self.volume_21.update(volume)
+            self.hist_vol_42.update(self.returns_21.std() * math.sqrt(252))
+
+            self.bars += 1
+            self.last_date = date
+
+    def update_from_dataframe(self, prices_df: pd.DataFrame) -> int:
+        """用 DataFrame 中比当前状态更新的 K 线推进状态，返回新增的 K 线数
+
+        有 `date` 列时按日期判断新 K 线，否则按已处理的 K 线数量。
+        """
+        with self._lock:
+            if "date" in prices_df.columns:
+                dates = pd.to_datetime(prices_df["date"])
+                start = 0 if self.last_date is None else int(
+                    np.searchsorted(dates.to_numpy(), np.datetime64(self.last_date), side='right'))
+            else:
+                dates = None
+                start = self.bars
+
+            columns = [prices_df[c].to_numpy(dtype=float)
+                       for c in ("close", "high", "low", "volume")]
+            for i in range(start, len(prices_df)):
+                date = dates.iloc[i] if dates is not None else None
+                self.update(columns[0][i], columns[1][i], columns[2][i],
+                            columns[3][i], date=date)
+            return max(len(prices_df) - start, 0)
+
+    def latest(self) -> Dict[str, float]:
+        """最新一根 K 线上的指标值，键与 technicals.latest_indicator_values 一致"""
+        # 避免与 technicals 模块循环导入
+        from src.agents.technicals import calculate_hurst_exponent
+
+        with self._lock:
+            if self.bars < 2:
+                raise ValueError("IncrementalIndicatorState needs at least 2 bars")
+            closes = list(self.closes)
+            std_20 = self.close_20.std()
+            middle = self.close_20.mean()
+            obv = list(self.obv_history)
+            obv_diffs = np.diff(obv)[-5:]
+            return {
+                "close": closes[-1],
+                "close_5": closes[-5] if len(closes) >= 5 else math.nan,
+                "volume": self.volume,
+                "macd": self.macd_history[-1],
+                "macd_prev": self.macd_history[-2],
+                "macd_signal": self.signal_history[-1],
+                "macd_signal_prev": self.signal_history[-2],
+                "rsi_14": self._rsi(14),
+                "rsi_28": self._rsi(28),
+                "bb_upper": middle + std_20 * 2,
+                "bb_lower": middle - std_20 * 2,
+                "obv_slope": float(np.mean(obv_diffs)) if len(obv_diffs) else math.nan,
+                "ema_8": self.ema[8].value,
+                "ema_21": self.ema[21].value,
+                "ema_55": self.ema[55].value,
+                "adx": self.dx.value,
+                "ma_50": self.close_50.mean(),
+                "std_50": self.close_50.std(),
+                "mom_1m": self.mom_1m.sum(),
+                "mom_3m": self.mom_3m.sum(),
+                "mom_6m": self.mom_6m.sum(),
+                "volume_ma": self.volume_21.mean(),
+                "hist_vol": self.returns_21.std() * math.sqrt(252),
+                "vol_ma": self.hist_vol_42.mean(),
+                "vol_std": self.hist_vol_42.std(),
+                "atr": self.atr.mean(),
+                "skew": self.returns_42.skew(),
+                "kurt": self.returns_42.kurt(),
+                "hurst": calculate_hurst_exponent(pd.Series(closes), max_lag=10),
+            }
+
+    def _rsi(self, period: int) -> float:
+        rs = _ratio(self.gain[period].mean(), self.loss[period].mean())
+        return 100 - _ratio(100, 1 + rs)
+
+    def snapshot(self) -> "IncrementalIndicatorState":
+        """返回当前状态的独立副本"""
+        with self._lock:
+            lock, self._lock = self._lock, None
+            try:
+                state = copy.deepcopy(self)
+            finally:
+                self._lock = lock
+            state._lock = threading.RLock()
+            return state
+
+    def restore(self, snapshot: "IncrementalIndicatorState") -> None:
+        """恢复到 `snapshot()` 得到的状态"""
+        restored = snapshot.snapshot()
+        with self._lock:
+            lock = self._lock
+            self.__dict__.update(restored.__dict__)
+            self._lock = lock
+
+    def to_dict(self) -> Dict[str, Any]:
+        """供状态序列化/API 展示的摘要"""
+        return {
+            "bars": self.bars,
+            "last_date": None if self.last_date is None else str(self.last_date),
+        }
@@ -0,0 +1,330 @@
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 指标注册表：名称 -> (计算函数, 函数签名)
+_INDICATORS: Dict[str, Tuple[Callable, inspect.Signature]] = {}
+
+# 按 (股票代码, 首尾K线, 长度, 最新收盘价) 缓存的指标上下文，供各个使用方共享
+_MAX_CACHED_CONTEXTS = 32
+_contexts: "OrderedDict[Tuple, IndicatorContext]" = OrderedDict()
+_contexts_lock = threading.Lock()
+
+
+def indicator(name: str):
+    """注册指标的装饰器
+
+    被注册的函数签名为 `func(ctx, **params)`，通过 `ctx.get(...)` 获取其依赖的
+    其它指标，参数的默认值即该指标的默认参数。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        _INDICATORS[name] = (func, signature)
+        return func
+    return decorator
+
+
+class IndicatorContext:
+    """单个价格序列上的指标计算上下文
+
+    每个指标按 (名称, 完整参数) 只计算一次，中间结果（如收益率序列）在
+    依赖它的所有指标之间复用。返回的 Series/DataFrame 是共享对象，调用方
+    不应原地修改。
+
+    df 也可以是 (字段, 股票) 两级列的面板数据（见 get_panel_context），
+    此时数据列为 日期 x 股票 的 DataFrame，各指标按列同时计算所有股票。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache: Dict[Tuple, Any] = {}
+        self._lock = threading.RLock()
+
+    def series(self, source: str) -> pd.Series:
+        """获取数据列或无参数指标"""
+        if source in self.df.columns:
+            return self.df[source]
+        return self.get(source)
+
+    def get(self, name: str, **params) -> Any:
+        """获取指标值，已计算过的直接返回缓存结果"""
+        if name not in _INDICATORS:
+            raise KeyError(f"Unknown indicator: {name}")
+        func, signature = _INDICATORS[name]
+        bound = signature.bind(self, **params)
+        bound.apply_defaults()
+        key = (name, tuple(sorted(
+            (k, v) for k, v in bound.arguments.items() if k != "ctx")))
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = func(self, **params)
+            return self._cache[key]
+
+
+def _context_key(df: pd.DataFrame, symbol: str) -> Tuple:
+    # 复权类型不同（或复权因子变化）时区间端点可能相同而历史价格不同，
+    # 因此带上复权类型和整列收盘价的哈希
+    dates = df["date"] if "date" in df.columns else df.index.to_series()
+    close_hash = (int(pd.util.hash_pandas_object(df["close"], index=False).sum())
+                  if "close" in df.columns else None)
+    return (symbol, df.attrs.get("adjust"), len(df), dates.iloc[0], dates.iloc[-1], close_hash)
+
+
+def get_indicator_context(df: pd.DataFrame, symbol: Optional[str] = None) -> IndicatorContext:
+    """获取价格序列对应的指标上下文
+
+    股票代码取自参数或 `df.attrs["symbol"]`。同一股票、相同复权类型和K线的数据在
+    不同使用方（get_price_history、technicals、data_analyzer）之间共享同一个
+    上下文；没有股票代码或数据为空时返回一个不共享的新上下文。
+    """
+    symbol = symbol or df.attrs.get("symbol")
+    if not symbol or df.empty:
+        return IndicatorContext(df)
+
+    key = _context_key(df, symbol)
+    with _contexts_lock:
+        ctx = _contexts.get(key)
+        if ctx is not None and ctx.df.index.equals(df.index):
+            _contexts.move_to_end(key)
+            return ctx
+        ctx = IndicatorContext(df)
+        _contexts[key] = ctx
+        while len(_contexts) > _MAX_CACHED_CONTEXTS:
+            _contexts.popitem(last=False)
+        return ctx
+
+
+def get_panel_context(fields: Dict[str, pd.DataFrame]) -> IndicatorContext:
+    """多只股票的面板指标上下文
+
+    fields 为字段名（close/high/low/volume）到 日期 x 股票 矩阵的映射，各矩阵的
+    索引和列相同。单值指标返回 日期 x 股票 的 DataFrame；多列指标（macd、
+    bollinger、adx）返回 (分量, 股票) 两级列的 DataFrame，按分量名取出的
+    仍是 日期 x 股票 矩阵。面板上下文不在使用方之间共享。
+    """
+    return IndicatorContext(pd.concat(fields, axis=1))
+
+
+def _combine(components: Dict[str, Any]) -> pd.DataFrame:
+    """将同索引的多个分量合并为 DataFrame；面板数据按 (分量, 股票) 两级列合并"""
+    if all(isinstance(value, pd.Series) for value in components.values()):
+        return pd.DataFrame(components)
+    return pd.concat(components, axis=1)
+
+
+# ---------------------------------------------------------------------------
+# 指标定义
+# ---------------------------------------------------------------------------
+
+
+@indicator("returns")
+def _returns(ctx, column: str = "close", periods: int = 1) -> pd.Series:
+    return ctx.series(column).pct_change(periods=periods)
+
+
+@indicator("log_returns")
+def _log_returns(ctx, column: str = "close") -> pd.Series:
+    prices = ctx.series(column)
+    return np.log(prices / prices.shift(1))
+
+
+@indicator("rolling")
+def _rolling(ctx, source: str = "close", window: int = 20,
+             min_periods: Optional[int] = None, stat: str = "mean") -> pd.Series:
+    rolling = ctx.series(source).rolling(window=window, min_periods=min_periods)
+    return getattr(rolling, stat)()
+
+
+@indicator("ema")
+def _ema(ctx, column: str = "close", span: int = 12) -> pd.Series:
+    return ctx.series(column).ewm(span=span, adjust=False).mean()
+
+
+@indicator("volatility")
+def _volatility(ctx, window: int = 20, min_periods: Optional[int] = None) -> pd.Series:
+    """年化历史波动率"""
+    return ctx.get("rolling", source="returns", window=window,
+                   min_periods=min_periods, stat="std") * np.sqrt(252)
+
+
+@indicator("macd")
+def _macd(ctx, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
+    macd_line = ctx.get("ema", span=fast) - ctx.get("ema", span=slow)
+    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+    return _combine({
+        "macd": macd_line,
+        "signal": signal_line,
+        "hist": macd_line - signal_line
+    })
+
+
+@indicator("rsi")
+def _rsi(ctx, period: int = 14) -> pd.Series:
+    delta = ctx.series("close").diff()
+    gain = (delta.where(delta > 0, 0)).fillna(0)
+    loss = (-delta.where(delta < 0, 0)).fillna(0)
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+@indicator("bollinger")
+def _bollinger(ctx, window: int = 20, num_std: float = 2) -> pd.DataFrame:
+    middle = ctx.get("rolling", source="close", window=window, stat="mean")
+    std_dev = ctx.get("rolling", source="close", window=window, stat="std")
+    return _combine({
+        "upper": middle + (std_dev * num_std),
+        "middle": middle,
+        "lower": middle - (std_dev * num_std)
+    })
+
+
+@indicator("true_range")
+def _true_range(ctx) -> pd.Series:
+    high, low, close = ctx.series("high"), ctx.series("low"), ctx.series("close")
+    # 逐元素取最大值，忽略缺失的前一日收盘价
+    return np.fmax(np.fmax(high - low, abs(high - close.shift())),
+                   abs(low - close.shift()))
+
+
+@indicator("atr")
+def _atr(ctx, period: int = 14, min_periods: Optional[int] = None) -> pd.Series:
+    return ctx.get("rolling", source="true_range", window=period,
+                   min_periods=min_periods, stat="mean")
+
+
+@indicator("obv")
+def _obv(ctx) -> pd.Series:
+    """能量潮指标：按收盘价涨跌方向累加成交量，首日为 0"""
+    direction = np.sign(ctx.series("close").diff()).fillna(0)
+    obv = (direction * ctx.series("volume")).cumsum()
+    return obv.rename("OBV") if isinstance(obv, pd.Series) else obv
+
+
+@indicator("adx")
+def _adx(ctx, period: int = 14) -> pd.DataFrame:
+    high, low = ctx.series("high"), ctx.series("low")
+    up_move = high - high.shift()
+    down_move = low.shift() - low
+
+    plus_dm = up_move.where((up_move > down_move) & (up_move > 0), 0)
+    minus_dm = down_move.where((down_move > up_move) & (down_move > 0), 0)
+
+    tr_ewm = ctx.get("true_range").ewm(span=period).mean()
+    plus_di = 100 * (plus_dm.ewm(span=period).mean() / tr_ewm)
+    minus_di = 100 * (minus_dm.ewm(span=period).mean() / tr_ewm)
+    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
+    return _combine({
+        "adx": dx.ewm(span=period).mean(),
+        "+di": plus_di,
+        "-di": minus_di
+    })
+
+
+@indicator("hurst")
+def _hurst(ctx, window: int = 120, min_periods: int = 60) -> pd.Series:
+    return rolling_hurst_exponent(ctx.get("log_returns"), window=window,
+                                  min_periods=min_periods)
+
+
+def rolling_hurst_exponent(log_returns: pd.Series, window: int = 120,
+                           min_periods: int = 60, max_lag: int = 11,
+                           min_points: int = 30) -> pd.Series:
+    """批量计算滚动 Hurst 指数
+
+    与 `log_returns.rolling(window, min_periods).apply(calculate_hurst)` 的结果
+    一致，但一次性对全序列完成计算：每个窗口内的序列 y 为相邻对数收益率之比
+    的对数（丢弃 NaN），对每个 lag 计算 y 的滚动标准差均值 tau，再以
+    log(lag) 对 log(tau) 做最小二乘，斜率 / 2 即为 Hurst 指数。
+
+    由于 y 的每个元素只依赖相邻两个收益率，任意窗口内的 y 都是全局序列的
+    一个连续切片，因此每个 lag 的滚动标准差只需在全局序列上算一次
+    (sliding_window_view)，窗口均值通过累加和得到，斜率使用闭式解。
+
+    Args:
+        log_returns: 对数收益率序列
+        window: 滚动窗口长度
+        min_periods: 窗口内最少的非空收益率个数
+        max_lag: lag 上限（不含）
+        min_points: 窗口内最少的有效数据点
+
+    Returns:
+        pd.Series: 与输入索引对齐的 Hurst 指数，无法计算的位置为 NaN
+    """
+    x = np.asarray(log_returns, dtype=float)
+    n = len(x)
+    result = np.full(n, np.nan)
+    if n == 0:
+        return pd.Series(result, index=log_returns.index)
+
+    ends = np.arange(n)
+    starts = np.maximum(ends - window + 1, 0)
+
+    # 窗口内非 NaN 收益率的个数
+    valid = ~np.isnan(x)
+    valid_cum = np.concatenate(([0], np.cumsum(valid)))
+    counts = valid_cum[ends + 1] - valid_cum[starts]
+
+    # 相邻有效收益率之比的对数，记录每一对的起止位置
+    positions = np.flatnonzero(valid)
+    values = x[valid]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.log(values[1:] / values[:-1])
+    keep = ~np.isnan(ratios)
+    y = ratios[keep]
+    pair_starts = positions[:-1][keep]
+    pair_ends = positions[1:][keep]
+
+    # 每个窗口对应 y 的切片 [k0, k1)
+    k0 = np.searchsorted(pair_starts, starts, side='left')
+    k1 = np.searchsorted(pair_ends, ends, side='right')
+    m = np.maximum(k1 - k0, 0)
+
+    eligible = (counts >= min_periods) & (counts >= min_points) & (m >= min_points)
+    upper = np.minimum(max_lag, m // 4)
+
+    lags = np.arange(2, max_lag)
+    log_tau = np.full((n, len(lags)), np.nan)
+    for j, lag in enumerate(lags):
+        if len(y) < lag:
+            continue
+        with np.errstate(invalid='ignore'):
+            stds = np.std(sliding_window_view(y, lag), axis=1, ddof=1)
+        finite = np.isfinite(stds)
+        std_cum = np.concatenate(([0.0], np.cumsum(np.where(finite, stds, 0.0))))
+        finite_cum = np.concatenate(([0], np.cumsum(finite)))
+
+        # 窗口内可用的标准差下标区间 [k0, k1 - lag]
+        hi = np.clip(k1 - lag + 1, 0, len(stds))
+        lo = np.minimum(k0, hi)
+        total = std_cum[hi] - std_cum[lo]
+        num = finite_cum[hi] - finite_cum[lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tau = total / num
+            log_tau[:, j] = np.where((num > 0) & (tau > 0), np.log(tau), np.nan)
+
+    # 每个窗口只使用 lag < upper 的部分，做闭式最小二乘
+    log_lags = np.log(lags)
+    in_fit = lags[None, :] < upper[:, None]
+    n_fit = in_fit.sum(axis=1)
+    eligible &= n_fit >= 3
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = (log_lags[None, :] * in_fit).sum(axis=1) / n_fit
+        x_dev = np.where(in_fit, log_lags[None, :] - x_mean[:, None], 0.0)
+        y_fit = np.where(in_fit, log_tau, 0.0)
+        # 参与拟合的 tau 任一无效时 polyfit 会失败，对应结果为 NaN
+        missing = (in_fit & np.isnan(log_tau)).any(axis=1)
+        slope = (x_dev * y_fit).sum(axis=1) / (x_dev ** 2).sum(axis=1)
+
+    hurst = slope / 2.0
+    ok = eligible & ~missing & np.isfinite(hurst)
+    result[ok] = hurst[ok]
+    return pd.Series(result, index=log_returns.index)
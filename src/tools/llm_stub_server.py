@@ -0,0 +1,302 @@
+"""
+本地 OpenAI 兼容 LLM 桩服务，用于离线压测和延迟测试
+
+按请求内容识别调用方 Agent，返回符合各 Agent 解析格式的固定回答（情感分数、
+辩论 JSON、投资决策 JSON 等），并可配置延迟分布和错误率。
+
+使用方法:
+    # 启动桩服务，然后在 .env 中将 OPENAI_COMPATIBLE_BASE_URL 指向它
+    python -m src.tools.llm_stub_server serve --port 8001 --latency lognormal:1.2,0.5 --error-rate 0.02
+
+    # 在进程内启动桩服务并压测 LLM 调用链路，输出吞吐量和延迟分位数
+    python -m src.tools.llm_stub_server bench --requests 200 --concurrency 20
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+STUB_MODEL = "stub-model"
+
+
+@dataclass
+class LatencyDistribution:
+    """延迟分布（秒）
+
+    支持的格式:
+        fixed:<秒>
+        uniform:<最小>,<最大>
+        lognormal:<中位数>,<sigma>   （长尾，适合模拟真实 LLM 延迟）
+    """
+    kind: str = "fixed"
+    params: List[float] = field(default_factory=lambda: [0.0])
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, raw = spec.partition(":")
+        params = [float(p) for p in raw.split(",") if p] if raw else []
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"无效的延迟分布: {spec}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * rng.lognormvariate(0, sigma)
+        return self.params[0]
+
+
+@dataclass
+class StubConfig:
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    # 按 Agent 覆盖延迟分布，例如 {"macro_news": lognormal:5,0.4}
+    agent_latency: Dict[str, LatencyDistribution] = field(default_factory=dict)
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    # 返回空内容的概率（用于测试空回答重试）
+    empty_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+def classify_prompt(messages: List[Dict]) -> str:
+    """根据请求内容识别调用方 Agent"""
+    text = "\n".join(str(m.get("content", "")) for m in messages)
+    if "portfolio manager" in text:
+        return "portfolio_management"
+    if '"analysis"' in text and '"score"' in text:
+        return "debate_room"
+    if "macro_environment" in text:
+        return "macro_analyst"
+    if "键为新闻编号" in text:
+        return "article_sentiment"
+    if "### 股票" in text and "JSON数组" in text:
+        return "sentiment_batch"
+    if "请直接返回一个数字" in text:
+        return "sentiment"
+    if "沪深300" in text:
+        return "macro_news"
+    return "generic"
+
+
+def canned_response(agent: str, messages: List[Dict], rng: random.Random) -> str:
+    """返回符合该 Agent 解析格式的回答"""
+    text = str(messages[-1].get("content", "")) if messages else ""
+    score = round(rng.uniform(-0.6, 0.6), 2)
+    if agent == "portfolio_management":
+        action = "buy" if score > 0.2 else "sell" if score < -0.2 else "hold"
+        signals = ["technical_analysis", "fundamental_analysis", "sentiment_analysis",
+                   "valuation_analysis", "risk_management", "selected_stock_macro_analysis",
+                   "market_wide_news_summary(沪深300指数)"]
+        return json.dumps({
+            "action": action,
+            "quantity": 0 if action == "hold" else 100,
+            "confidence": round(abs(score) + 0.3, 2),
+            "agent_signals": [{"agent_name": name, "signal": "neutral", "confidence": 0.5}
+                              for name in signals],
+            "reasoning": "Stub decision for load testing.",
+        }, ensure_ascii=False)
+    if agent == "debate_room":
+        return json.dumps({"analysis": "Stub analysis of both perspectives.",
+                           "score": score, "reasoning": "Stub reasoning."})
+    if agent == "macro_analyst":
+        return json.dumps({"macro_environment": "neutral", "impact_on_stock": "neutral",
+                           "key_factors": ["货币政策", "市场情绪"], "reasoning": "桩服务生成的宏观分析。"},
+                          ensure_ascii=False)
+    if agent == "article_sentiment":
+        count = len(re.findall(r"^\[(\d+)\] ", text, re.MULTILINE))
+        return json.dumps({str(i): round(rng.uniform(-1, 1), 2) for i in range(1, count + 1)})
+    if agent == "sentiment_batch":
+        tickers = re.findall(r"### 股票 (\S+)", text)
+        return json.dumps([{"ticker": t, "score": round(rng.uniform(-1, 1), 2)} for t in tickers])
+    if agent == "sentiment":
+        return str(score)
+    if agent == "macro_news":
+        return "1. **市场情绪解读**：谨慎。\n2. **热点板块识别**：科技。\n3. **潜在风险提示**：外部不确定性。"
+    return "Stub response."
+
+
+class StubLLM:
+    """桩服务的状态：配置、随机数发生器和调用统计"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.calls = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors)}
+
+    async def complete(self, body: Dict):
+        messages = body.get("messages", [])
+        agent = classify_prompt(messages)
+        with self._lock:
+            self.calls[agent] += 1
+            distribution = self.config.agent_latency.get(agent, self.config.latency)
+            delay = distribution.sample(self.rng)
+            failed = self.rng.random() < self.config.error_rate
+            status = self.rng.choice(self.config.error_statuses) if failed else 200
+            empty = not failed and self.rng.random() < self.config.empty_rate
+            content = "" if empty or failed else canned_response(agent, messages, self.rng)
+            if failed:
+                self.errors[agent] += 1
+
+        await asyncio.sleep(delay)
+        if failed:
+            return JSONResponse(status_code=status, content={"error": {
+                "message": f"stub injected error ({status})", "type": "stub_error", "code": status}})
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        return {
+            "id": f"chatcmpl-stub-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", STUB_MODEL),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                      "total_tokens": prompt_tokens + len(content) // 4},
+        }
+
+
+def create_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """创建桩服务的 FastAPI 应用"""
+    stub = StubLLM(config or StubConfig())
+    app = FastAPI(title="OpenAI-compatible LLM stub", version="0.1.0")
+    app.state.stub = stub
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await stub.complete(await request.json())
+
+    @app.get("/v1/models")
+    def list_models():
+        return {"object": "list", "data": [{"id": STUB_MODEL, "object": "model", "owned_by": "stub"}]}
+
+    @app.get("/stats")
+    def stats():
+        return stub.stats()
+
+    return app
+
+
+def start_in_thread(config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+    """在后台线程中启动桩服务，返回 (server, base_url)；port 为 0 时自动选择空闲端口"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port,
+                                           log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{bound_port}/v1"
+
+
+# 压测使用的各 Agent 典型请求
+BENCH_PROMPTS = {
+    "sentiment": [{"role": "user", "content": "请分析以下A股上市公司相关新闻的情感倾向：\n\n标题：示例\n\n请直接返回一个数字，范围是-1到1，无需解释。"}],
+    "debate_room": [{"role": "user", "content": '请提供以下格式的 JSON 回复: {"analysis": "...", "score": 0.5, "reasoning": "..."}'}],
+    "portfolio_management": [{"role": "system", "content": "You are a portfolio manager making final trading decisions."},
+                             {"role": "user", "content": "Output JSON only."}],
+}
+
+
+async def _run_benchmark(total: int, concurrency: int) -> Dict:
+    from src.tools.openrouter_config import get_chat_completion_async
+    from src.utils.llm_metrics import (
+        latency_snapshot, reset_latency_histograms, reset_route_metrics, route_snapshot)
+
+    reset_latency_histograms()
+    reset_route_metrics()
+    semaphore = asyncio.Semaphore(concurrency)
+    prompts = list(BENCH_PROMPTS.items())
+    failures = 0
+
+    async def one(i):
+        nonlocal failures
+        route, messages = prompts[i % len(prompts)]
+        async with semaphore:
+            result = await get_chat_completion_async(messages, use_cache=False, route=route)
+            if result is None:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    return {"requests": total, "failures": failures, "seconds": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2), "latency": latency_snapshot(),
+            "routes": route_snapshot()}
+
+
+def benchmark(config: StubConfig, total: int = 100, concurrency: int = 10) -> Dict:
+    """在进程内启动桩服务，通过 get_chat_completion_async 发出请求并统计吞吐量和延迟"""
+    import os
+    from src.tools.openrouter_config import load_project_env
+
+    # 先加载 .env 中的其他配置，再指向桩服务（之后首次调用 LLM 时不会再加载 .env）
+    load_project_env()
+    server, base_url = start_in_thread(config)
+    os.environ.update(OPENAI_COMPATIBLE_API_KEY="stub", OPENAI_COMPATIBLE_BASE_URL=base_url,
+                      OPENAI_COMPATIBLE_MODEL=STUB_MODEL, LLM_HEDGING_ENABLED="false")
+    try:
+        report = asyncio.run(_run_benchmark(total, concurrency))
+        report["server"] = server.config.app.state.stub.stats()
+        return report
+    finally:
+        server.should_exit = True
+
+
+def _parse_config(args) -> StubConfig:
+    agent_latency = {}
+    for item in args.agent_latency or []:
+        agent, _, spec = item.partition("=")
+        agent_latency[agent] = LatencyDistribution.parse(spec)
+    return StubConfig(latency=LatencyDistribution.parse(args.latency), agent_latency=agent_latency,
+                      error_rate=args.error_rate, empty_rate=args.empty_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 兼容的本地 LLM 桩服务")
+    parser.add_argument("command", choices=["serve", "bench"], nargs="?", default="serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="延迟分布：fixed:<秒> | uniform:<最小>,<最大> | lognormal:<中位数>,<sigma>")
+    parser.add_argument("--agent-latency", action="append",
+                        help="按 Agent 覆盖延迟分布，例如 macro_news=lognormal:5,0.4（可重复）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 429/500/503 的概率")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="返回空内容的概率")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--requests", type=int, default=100, help="bench: 请求总数")
+    parser.add_argument("--concurrency", type=int, default=10, help="bench: 并发数")
+    args = parser.parse_args()
+    config = _parse_config(args)
+
+    if args.command == "bench":
+        print(json.dumps(benchmark(config, args.requests, args.concurrency),
+                         ensure_ascii=False, indent=2))
+        return
+
+    import uvicorn
+    print(f"LLM 桩服务: http://{args.host}:{args.port}/v1")
+    print(f"设置 OPENAI_COMPATIBLE_BASE_URL=http://{args.host}:{args.port}/v1 "
+          f"OPENAI_COMPATIBLE_MODEL={STUB_MODEL} OPENAI_COMPATIBLE_API_KEY=stub")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,25 @@
 import os
 import sys
 import json
+import asyncio
 from datetime import datetime, timedelta
 import time
 import pandas as pd
 from urllib.parse import urlparse
-from src.tools.openrouter_config import get_chat_completion, logger as api_logger
+from src.tools.openrouter_config import get_chat_completion, get_chat_completion_async, logger as api_logger
+from src.utils.prompt_budget import build_item_list, get_token_budget, pack_batches, render_news, routed_model
+from src.tools.article_sentiment import score_articles, score_articles_async, aggregate_scores
 
 # 导入新的搜索模块
 try:
     from src.crawler.search import google_search_sync, SearchOptions
+    from src.crawler.multi_search import google_search_many_sync, merge_results
 except ImportError:
     print("警告: 无法导入新的搜索模块，将回退到 akshare")
     google_search_sync = None
     SearchOptions = None
+    google_search_many_sync = None
+    merge_results = None
 
 # 保留 akshare 作为备用
 try:
@@ -25,6 +31,16 @@ except ImportError:
     ak = None
 
 
+# 主要财经新闻网站
+NEWS_SITES = [
+    "sina.com.cn",
+    "163.com",
+    "eastmoney.com",
+    "cnstock.com",
+    "hexun.com"
+]
+
+
 def build_search_query(symbol: str, date: str = None) -> str:
     """
     构建针对股票新闻的 Google 搜索查询
@@ -52,13 +68,7 @@ def build_search_query(symbol: str, date: str = None) -> str:
             print(f"日期格式错误: {date}，忽略时间限制")
 
     # 限制新闻网站 - 只选择主要的财经网站
-    news_sites = [
-        "site:sina.com.cn",
-        "site:163.com",
-        "site:eastmoney.com",
-        "site:cnstock.com",
-        "site:hexun.com"
-    ]
+    news_sites = [f"site:{site}" for site in NEWS_SITES]
 
     # 添加网站限制
     query = f"{base_query} ({' OR '.join(news_sites)})"
@@ -66,6 +76,77 @@ def build_search_query(symbol: str, date: str = None) -> str:
     return query
 
 
+def _search_date_windows(date: str = None, days: int = 7, windows: int = None) -> list:
+    """将截止日期前 days 天平均拆分为若干时间窗口，返回 [(开始日期, 结束日期)]
+
+    未指定日期或日期格式错误时返回 [(None, None)]（不限制时间）
+    """
+    windows = windows or int(os.getenv("SEARCH_DATE_WINDOWS", 2))
+    if not date:
+        return [(None, None)]
+    try:
+        end_date = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        print(f"日期格式错误: {date}，忽略时间限制")
+        return [(None, None)]
+    windows = max(1, min(windows, days))
+    bounds = [end_date - timedelta(days=days * (windows - i) // windows)
+              for i in range(windows)] + [end_date]
+    return [(bounds[i].strftime("%Y-%m-%d"), bounds[i + 1].strftime("%Y-%m-%d"))
+            for i in range(windows)]
+
+
+def build_search_queries(symbols: list, date: str = None, sites: list = None,
+                         windows: int = None) -> list:
+    """
+    构建多查询搜索计划：每只股票 × 每个新闻网站 × 每个时间窗口一个查询
+
+    与 build_search_query 把所有网站 OR 在一个查询中相比，拆分后每个查询的结果数
+    不会被单个网站占满，较新的时间窗口也能单独返回结果。
+
+    Returns:
+        [(股票代码, 查询字符串)]
+    """
+    queries = []
+    for symbol in symbols:
+        for site in sites or NEWS_SITES:
+            for start, end in _search_date_windows(date, windows=windows):
+                query = f"{symbol} 股票 新闻 财经"
+                if start and end:
+                    query += f" after:{start} before:{end}"
+                queries.append((symbol, f"{query} site:{site}"))
+    return queries
+
+
+def _multi_query_mode() -> bool:
+    return os.getenv("SEARCH_NEWS_MODE", "single") == "multi"
+
+
+def search_news_multi(symbols: list, date: str = None, max_news: int = 10) -> dict:
+    """
+    通过浏览器池并发执行多查询搜索，返回 {股票代码: 新闻列表}
+
+    所有股票的查询一起并发执行（受浏览器池大小和按域名限速约束），每只股票的结果
+    按链接和标题合并去重后转换为新闻格式。
+    """
+    if not google_search_many_sync:
+        return {}
+    plan = build_search_queries(symbols, date)
+    # 每个查询的结果数：总数至少为需要条数的两倍，便于过滤
+    per_query = max(10, -(-max_news * 2 * len(symbols) // len(plan)))
+    options = SearchOptions(limit=per_query, timeout=30000, locale="zh-CN")
+    response = google_search_many_sync([query for _, query in plan], options)
+
+    news_by_symbol = {}
+    for symbol in symbols:
+        responses = [r for (s, _), r in zip(plan, response.responses) if s == symbol]
+        news_by_symbol[symbol] = convert_search_results_to_news_format(
+            merge_results(responses), symbol)
+    print(f"多查询搜索: {len(plan)} 个查询，耗时 {response.seconds:.2f}s，"
+          + "，".join(f"{s} {len(n)} 条" for s, n in news_by_symbol.items()))
+    return news_by_symbol
+
+
 def extract_domain(url: str) -> str:
     """从 URL 提取域名作为新闻来源"""
     try:
@@ -293,7 +374,16 @@ def get_stock_news(symbol: str, max_news: int = 10, date: str = None) -> list:
 
     # 优先尝试使用新的 Google 搜索方法
     new_news_list = []
-    if google_search_sync and SearchOptions:
+    multi_query = _multi_query_mode() and google_search_many_sync is not None
+    if multi_query:
+        try:
+            print("使用多查询并发 Google 搜索获取新闻...")
+            new_news_list = search_news_multi([symbol], date, fetch_count).get(symbol, [])
+            if not new_news_list:
+                print("多查询搜索未返回有效结果，尝试回退到 akshare")
+        except Exception as e:
+            print(f"多查询搜索获取新闻时出错: {e}，回退到 akshare")
+    elif google_search_sync and SearchOptions:
         try:
             print("使用 Google 搜索获取新闻...")
 
@@ -360,8 +450,11 @@ def get_stock_news(symbol: str, max_news: int = 10, date: str = None) -> list:
         try:
             save_data = {
                 "date": cache_date,
-                "method": "online_search" if new_news_list and google_search_sync else "akshare",
-                "query": build_search_query(symbol, date) if new_news_list and google_search_sync else None,
+                "method": ("online_search_multi" if multi_query else "online_search")
+                if new_news_list and google_search_sync else "akshare",
+                "query": ([query for _, query in build_search_queries([symbol], date)] if multi_query
+                          else build_search_query(symbol, date))
+                if new_news_list and google_search_sync else None,
                 "news": combined_news,  # 保存所有新闻，不只是返回的部分
                 "cached_count": len(cached_news),
                 "new_count": len(new_news_list),
@@ -377,6 +470,11 @@ def get_stock_news(symbol: str, max_news: int = 10, date: str = None) -> list:
     return final_news_list
 
 
+def _per_article_mode() -> bool:
+    """SENTIMENT_SCORING_MODE: combined（整体评分一次，默认）或 per_article（逐篇评分并缓存，需显式开启）"""
+    return os.getenv("SENTIMENT_SCORING_MODE", "combined").lower() == "per_article"
+
+
 def get_news_sentiment(news_list: list, num_of_news: int = 5) -> float:
     """分析新闻情感得分
 
@@ -390,42 +488,185 @@ def get_news_sentiment(news_list: list, num_of_news: int = 5) -> float:
     if not news_list:
         return 0.0
 
-    # # 获取项目根目录
-    # project_root = os.path.dirname(os.path.dirname(
-    #     os.path.dirname(os.path.abspath(__file__))))
+    if _per_article_mode():
+        try:
+            # 逐篇评分（单篇得分按内容缓存），再按时间加权聚合
+            articles = news_list[:num_of_news]
+            return aggregate_scores(articles, score_articles(articles))
+        except Exception as e:
+            print(f"Error analyzing news sentiment: {e}")
+            return 0.0
+
+    messages = _sentiment_messages(news_list, num_of_news)
+    try:
+        # 获取LLM分析结果
+        result = get_chat_completion(messages, route="sentiment", validate=_is_sentiment_score)
+        return _parse_sentiment_score(result)
+    except Exception as e:
+        print(f"Error analyzing news sentiment: {e}")
+        return 0.0  # 出错时返回中性分数
 
-    # 检查是否有缓存的情感分析结果
-    # 检查是否有缓存的情感分析结果
-    cache_file = "src/data/sentiment_cache.json"
-    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
 
-    # 生成新闻内容的唯一标识
-    news_key = "|".join([
-        f"{news['title']}|{news['content'][:100]}|{news['publish_time']}"
-        for news in news_list[:num_of_news]
-    ])
+async def get_news_sentiment_async(news_list: list, num_of_news: int = 5) -> float:
+    """get_news_sentiment 的异步版本，参数和返回值相同"""
+    if not news_list:
+        return 0.0
 
-    # 检查缓存
-    if os.path.exists(cache_file):
-        print("发现情感分析缓存文件")
+    if _per_article_mode():
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache = json.load(f)
-                if news_key in cache:
-                    print("使用缓存的情感分析结果")
-                    return cache[news_key]
-                print("未找到匹配的情感分析缓存")
+            articles = news_list[:num_of_news]
+            return aggregate_scores(articles, await score_articles_async(articles))
         except Exception as e:
-            print(f"读取情感分析缓存出错: {e}")
-            cache = {}
-    else:
-        print("未找到情感分析缓存文件，将创建新文件")
-        cache = {}
+            print(f"Error analyzing news sentiment: {e}")
+            return 0.0
 
-    # 准备系统消息
-    system_message = {
-        "role": "system",
-        "content": """你是一个专业的A股市场分析师，擅长解读新闻对股票走势的影响。你需要分析一组新闻的情感倾向，并给出一个介于-1到1之间的分数：
+    messages = _sentiment_messages(news_list, num_of_news)
+    try:
+        result = await get_chat_completion_async(messages, route="sentiment", validate=_is_sentiment_score)
+        return _parse_sentiment_score(result)
+    except Exception as e:
+        print(f"Error analyzing news sentiment: {e}")
+        return 0.0  # 出错时返回中性分数
+
+
+def get_news_sentiment_batch(news_by_ticker: dict, num_of_news: int = 5) -> dict:
+    """批量分析多只股票的新闻情感得分
+
+    - per_article 模式：所有股票的新闻合并逐篇评分（跨股票去重，未缓存的新闻合并请求），
+      再按股票分别聚合
+    - combined 模式：多只股票的新闻放入同一个结构化请求，返回每只股票的得分；
+      超出 token 预算（PROMPT_TOKEN_BUDGET_SENTIMENT_BATCH）时自动拆分为多个请求
+
+    Args:
+        news_by_ticker (dict): {股票代码: 新闻列表}
+        num_of_news (int): 每只股票用于分析的新闻数量
+
+    Returns:
+        dict: {股票代码: 情感得分}，得分范围[-1, 1]
+    """
+    scores = {ticker: 0.0 for ticker, news_list in news_by_ticker.items() if not news_list}
+    pending = {ticker: news_list for ticker, news_list in news_by_ticker.items() if news_list}
+    if not pending:
+        return scores
+
+    if _per_article_mode():
+        articles = {ticker: news_list[:num_of_news] for ticker, news_list in pending.items()}
+        try:
+            flat_scores = iter(score_articles(
+                [news for news_list in articles.values() for news in news_list]))
+        except Exception as e:
+            print(f"Error analyzing news sentiment: {e}")
+            return {**scores, **{ticker: 0.0 for ticker in pending}}
+        return {**scores, **_aggregate_by_ticker(articles, flat_scores)}
+
+    for batch in _ticker_batches(pending, num_of_news):
+        tickers = [ticker for ticker, _ in batch]
+        try:
+            result = get_chat_completion(_batch_sentiment_messages(batch), route="sentiment",
+                                         validate=lambda r: bool(_parse_batch_scores(r, tickers)))
+        except Exception as e:
+            print(f"Error analyzing news sentiment: {e}")
+            result = None
+        parsed = _parse_batch_scores(result, tickers)
+        for ticker in tickers:
+            # 批量结果中缺失的股票单独重试
+            scores[ticker] = parsed[ticker] if ticker in parsed else get_news_sentiment(
+                pending[ticker], num_of_news=num_of_news)
+    return scores
+
+
+async def get_news_sentiment_batch_async(news_by_ticker: dict, num_of_news: int = 5) -> dict:
+    """get_news_sentiment_batch 的异步版本，拆分后的多个请求并发发出"""
+    scores = {ticker: 0.0 for ticker, news_list in news_by_ticker.items() if not news_list}
+    pending = {ticker: news_list for ticker, news_list in news_by_ticker.items() if news_list}
+    if not pending:
+        return scores
+
+    if _per_article_mode():
+        articles = {ticker: news_list[:num_of_news] for ticker, news_list in pending.items()}
+        try:
+            flat_scores = iter(await score_articles_async(
+                [news for news_list in articles.values() for news in news_list]))
+        except Exception as e:
+            print(f"Error analyzing news sentiment: {e}")
+            return {**scores, **{ticker: 0.0 for ticker in pending}}
+        return {**scores, **_aggregate_by_ticker(articles, flat_scores)}
+
+    async def score_batch(batch):
+        tickers = [ticker for ticker, _ in batch]
+        try:
+            result = await get_chat_completion_async(
+                _batch_sentiment_messages(batch), route="sentiment",
+                validate=lambda r: bool(_parse_batch_scores(r, tickers)))
+        except Exception as e:
+            print(f"Error analyzing news sentiment: {e}")
+            result = None
+        parsed = _parse_batch_scores(result, tickers)
+        for ticker in tickers:
+            scores[ticker] = parsed[ticker] if ticker in parsed else await get_news_sentiment_async(
+                pending[ticker], num_of_news=num_of_news)
+
+    await asyncio.gather(*(score_batch(batch) for batch in _ticker_batches(pending, num_of_news)))
+    return scores
+
+
+def _aggregate_by_ticker(articles: dict, flat_scores) -> dict:
+    """将合并评分的结果按股票拆回并聚合"""
+    return {
+        ticker: aggregate_scores(news_list, [next(flat_scores) for _ in news_list])
+        for ticker, news_list in articles.items()
+    }
+
+
+def _ticker_batches(news_by_ticker: dict, num_of_news: int) -> list:
+    """为每只股票渲染新闻段落，并按 token 预算装入若干批次"""
+    blocks = []
+    for ticker, news_list in news_by_ticker.items():
+        news_content, _ = build_item_list(
+            "sentiment", news_list[:num_of_news], render=render_news,
+            priority=lambda news: news.get("publish_time", ""), model=routed_model("sentiment"))
+        blocks.append((ticker, f"### 股票 {ticker}\n\n{news_content}"))
+    batches = pack_batches(blocks, lambda block: block[1], get_token_budget("sentiment_batch"),
+                           model=routed_model("sentiment"))
+    if len(batches) > 1:
+        print(f"{len(blocks)} 只股票的新闻超过单次请求的 token 预算，拆分为 {len(batches)} 个请求")
+    return batches
+
+
+def _batch_sentiment_messages(batch: list) -> list:
+    """构建多只股票的结构化情感分析请求"""
+    news_content = "\n\n".join(block for _, block in batch)
+    user_message = {
+        "role": "user",
+        "content": f"请分别分析以下{len(batch)}只A股上市公司相关新闻的情感倾向，每只股票给出一个范围是-1到1的分数：\n\n"
+                   f"{news_content}\n\n"
+                   f"请只返回一个JSON数组，每只股票一个元素，例如：[{{\"ticker\": \"600519\", \"score\": 0.3}}]，无需解释。"
+    }
+    return [{"role": "system", "content": SENTIMENT_SYSTEM_PROMPT}, user_message]
+
+
+def _parse_batch_scores(result, tickers: list) -> dict:
+    """解析 [{"ticker": ..., "score": ...}]，只保留请求中的股票"""
+    if not result:
+        return {}
+    start, end = result.find('['), result.rfind(']') + 1
+    try:
+        items = json.loads(result[start:end]) if 0 <= start < end else []
+    except json.JSONDecodeError:
+        print(f"Error parsing batch sentiment scores: {result[:200]}")
+        return {}
+    parsed = {}
+    for item in items:
+        try:
+            ticker = str(item["ticker"])
+            if ticker in tickers:
+                parsed[ticker] = max(-1.0, min(1.0, float(item["score"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return parsed
+
+
+SENTIMENT_SYSTEM_PROMPT = """你是一个专业的A股市场分析师，擅长解读新闻对股票走势的影响。你需要分析一组新闻的情感倾向，并给出一个介于-1到1之间的分数：
         - 1表示极其积极（例如：重大利好消息、超预期业绩、行业政策支持）
         - 0.5到0.9表示积极（例如：业绩增长、新项目落地、获得订单）
         - 0.1到0.4表示轻微积极（例如：小额合同签订、日常经营正常）
@@ -448,50 +689,54 @@ def get_news_sentiment(news_list: list, num_of_news: int = 5) -> float:
         2. 新闻的时效性和影响范围
         3. 对公司基本面的实际影响
         4. A股市场的特殊反应规律"""
+
+
+def _sentiment_messages(news_list: list, num_of_news: int) -> list:
+    """构建新闻情感分析的 LLM 消息"""
+    # 相同新闻的情感分析结果由 get_chat_completion 的共享 LLM 缓存直接返回
+
+    # 准备系统消息
+    system_message = {
+        "role": "system",
+        "content": SENTIMENT_SYSTEM_PROMPT
     }
 
     # 准备新闻内容
-    news_content = "\n\n".join([
-        f"标题：{news['title']}\n"
-        f"来源：{news['source']}\n"
-        f"时间：{news['publish_time']}\n"
-        f"内容：{news['content']}"
-        for news in news_list[:num_of_news]  # 使用指定数量的新闻
-    ])
+    # 使用指定数量的新闻，并按 token 预算（PROMPT_TOKEN_BUDGET_SENTIMENT）截断
+    news_content, _ = build_item_list(
+        "sentiment", news_list[:num_of_news], render=render_news,
+        priority=lambda news: news.get("publish_time", ""), model=routed_model("sentiment"))
 
     user_message = {
         "role": "user",
         "content": f"请分析以下A股上市公司相关新闻的情感倾向：\n\n{news_content}\n\n请直接返回一个数字，范围是-1到1，无需解释。"
     }
 
-    try:
-        # 获取LLM分析结果
-        result = get_chat_completion([system_message, user_message])
-        if result is None:
-            print("Error: PI error occurred, LLM returned None")
-            return 0.0
+    return [system_message, user_message]
 
-        # 提取数字结果
-        try:
-            sentiment_score = float(result.strip())
-        except ValueError as e:
-            print(f"Error parsing sentiment score: {e}")
-            print(f"Raw result: {result}")
-            return 0.0
 
-        # 确保分数在-1到1之间
-        sentiment_score = max(-1.0, min(1.0, sentiment_score))
+def _is_sentiment_score(result) -> bool:
+    """回答能否解析为情感得分（无法解析的回答不写入 LLM 缓存）"""
+    try:
+        float(result.strip())
+        return True
+    except (AttributeError, ValueError):
+        return False
+
 
-        # 缓存结果
-        cache[news_key] = sentiment_score
-        try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error writing cache: {e}")
+def _parse_sentiment_score(result) -> float:
+    """将 LLM 返回的文本解析为 [-1, 1] 之间的情感得分"""
+    if result is None:
+        print("Error: PI error occurred, LLM returned None")
+        return 0.0
 
-        return sentiment_score
+    # 提取数字结果
+    try:
+        sentiment_score = float(result.strip())
+    except ValueError as e:
+        print(f"Error parsing sentiment score: {e}")
+        print(f"Raw result: {result}")
+        return 0.0
 
-    except Exception as e:
-        print(f"Error analyzing news sentiment: {e}")
-        return 0.0  # 出错时返回中性分数
+    # 确保分数在-1到1之间
+    return max(-1.0, min(1.0, sentiment_score))
@@ -1,11 +1,13 @@
 import os
 import time
-from google import genai
-from dotenv import load_dotenv
+import threading
 from dataclasses import dataclass
-import backoff
-from src.utils.logging_config import setup_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
-from src.utils.llm_clients import LLMClientFactory
+from src.utils.logging_config import setup_logger, SUCCESS_ICON, ERROR_ICON
+from src.utils.llm_clients import LLMClientFactory, hedging_enabled
+from src.utils.llm_cache import get_llm_cache, make_cache_key
+from src.utils.llm_metrics import record_route_call, route_scope
+from src.utils.llm_routing import get_route, resolve_model
+from src.utils.llm_singleflight import llm_single_flight, single_flight_enabled
 
 # 设置日志记录
 logger = setup_logger('api_calls')
@@ -31,98 +33,211 @@ project_root = os.path.dirname(os.path.dirname(
     os.path.dirname(os.path.abspath(__file__))))
 env_path = os.path.join(project_root, '.env')
 
-# 加载环境变量
-if os.path.exists(env_path):
-    load_dotenv(env_path, override=True)
-    logger.info(f"{SUCCESS_ICON} 已加载环境变量: {env_path}")
-else:
-    logger.warning(f"{ERROR_ICON} 未找到环境变量文件: {env_path}")
-
-# 验证环境变量
-api_key = os.getenv("GEMINI_API_KEY")
-model = os.getenv("GEMINI_MODEL")
-
-if not api_key:
-    logger.error(f"{ERROR_ICON} 未找到 GEMINI_API_KEY 环境变量")
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-if not model:
-    model = "gemini-1.5-flash"
-    logger.info(f"{WAIT_ICON} 使用默认模型: {model}")
-
-# 初始化 Gemini 客户端
-client = genai.Client(api_key=api_key)
-logger.info(f"{SUCCESS_ICON} Gemini 客户端初始化成功")
-
-
-@backoff.on_exception(
-    backoff.expo,
-    (Exception),
-    max_tries=5,
-    max_time=300,
-    giveup=lambda e: "AFC is enabled" not in str(e)
-)
-def generate_content_with_retry(model, contents, config=None):
-    """带重试机制的内容生成函数"""
-    try:
-        logger.info(f"{WAIT_ICON} 正在调用 Gemini API...")
-        logger.debug(f"请求内容: {contents}")
-        logger.debug(f"请求配置: {config}")
-
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=config
-        )
-
-        logger.info(f"{SUCCESS_ICON} API 调用成功")
-        logger.debug(f"响应内容: {response.text[:500]}...")
-        return response
-    except Exception as e:
-        error_msg = str(e)
-        if "location" in error_msg.lower():
-            # 使用红色感叹号和红色文字提示
-            logger.info(f"\033[91m❗ Gemini API 地理位置限制错误: 请使用美国节点VPN后重试\033[0m")
-            logger.error(f"详细错误: {error_msg}")
-        elif "AFC is enabled" in error_msg:
-            logger.warning(f"{ERROR_ICON} 触发 API 限制，等待重试... 错误: {error_msg}")
-            time.sleep(5)
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_project_env(override: bool = False) -> None:
+    """加载项目根目录下的 .env（进程内只执行一次）
+
+    导入本模块不会读取环境变量或创建客户端：入口脚本在启动时调用本函数
+    （override=True，.env 中的配置优先）；首次调用 LLM 时也会自动调用，此时
+    不覆盖已设置的环境变量（如后端配置或测试中设置的变量）。provider 客户端
+    在首次使用时才创建。
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv
+        if os.path.exists(env_path):
+            load_dotenv(env_path, override=override)
+            logger.info(f"{SUCCESS_ICON} 已加载环境变量: {env_path}")
         else:
-            logger.error(f"{ERROR_ICON} API 调用失败: {error_msg}")
-        raise e
+            logger.warning(f"{ERROR_ICON} 未找到环境变量文件: {env_path}")
+        _env_loaded = True
+
+
+def _get_client(client_type, api_key, base_url, model, secondary_model=None):
+    # 获取复用的客户端（同一配置共享连接池），首次使用时才加载配置并创建
+    load_project_env()
+    return LLMClientFactory.get_client(
+        client_type=client_type,
+        api_key=api_key,
+        base_url=base_url,
+        model=model,
+        secondary_model=secondary_model
+    )
 
 
-def get_chat_completion(messages, model=None, max_retries=3, initial_retry_delay=1,
-                        client_type="auto", api_key=None, base_url=None):
+def get_chat_completion(messages, model=None, max_retries=None, initial_retry_delay=None,
+                        client_type="auto", api_key=None, base_url=None, use_cache=True, route=None,
+                        validate=None):
     """
     获取聊天完成结果，包含重试逻辑
 
     Args:
         messages: 消息列表，OpenAI 格式
-        model: 模型名称（可选）
-        max_retries: 最大重试次数
-        initial_retry_delay: 初始重试延迟（秒）
+        model: 模型名称（可选，优先于路由表）
+        max_retries: 最大尝试次数（默认读取 LLM_RETRY_MAX_ATTEMPTS）
+        initial_retry_delay: 退避基数（秒，默认读取 LLM_RETRY_BASE_DELAY）
         client_type: 客户端类型 ("auto", "gemini", "openai_compatible")
         api_key: API 密钥（可选，仅用于 OpenAI Compatible API）
         base_url: API 基础 URL（可选，仅用于 OpenAI Compatible API）
+        use_cache: 是否使用共享的 LLM 回答缓存（相同 provider/模型/消息/max_tokens 直接返回缓存）
+        route: 路由名称（通常是 Agent 名称），按路由表选择 provider/模型/max_tokens/超时，
+            并按路由统计延迟和 token 用量
+        validate: 可选的回答校验函数（如能否解析为 JSON）；校验失败的回答照常返回给
+            调用方，但不写入缓存，已缓存的此类回答视为未命中
 
     Returns:
         str: 模型回答内容或 None（如果出错）
     """
-    try:
-        # 创建客户端
-        client = LLMClientFactory.create_client(
-            client_type=client_type,
-            api_key=api_key,
-            base_url=base_url,
-            model=model
-        )
-
-        # 获取回答
-        return client.get_completion(
-            messages=messages,
-            max_retries=max_retries,
-            initial_retry_delay=initial_retry_delay
-        )
-    except Exception as e:
-        logger.error(f"{ERROR_ICON} get_chat_completion 发生错误: {str(e)}")
-        return None
+    start = time.monotonic()
+    client = None
+    with route_scope(route):
+        try:
+            client, route_config = _get_routed_client(route, client_type, api_key, base_url, model)
+
+            request_key = _request_key(client, messages, route_config)
+            cache, cached = _lookup_cache(client, request_key, use_cache, validate)
+            if cached is not None:
+                _record_route(route, start, client, cached, cache_hit=True)
+                return cached
+
+            def fetch():
+                result = client.get_completion(
+                    messages=messages,
+                    max_retries=max_retries,
+                    initial_retry_delay=initial_retry_delay,
+                    max_tokens=route_config.max_tokens,
+                    timeout=route_config.timeout
+                )
+                _store_cache(cache, request_key, client, result, validate)
+                return result
+
+            # 获取回答；进行中的相同请求只发出一次，其余调用方共享结果
+            if single_flight_enabled():
+                result, shared = llm_single_flight.do(request_key, fetch)
+            else:
+                result, shared = fetch(), False
+            _record_route(route, start, client, result, coalesced=shared)
+            return result
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} get_chat_completion 发生错误: {str(e)}")
+            _record_route(route, start, client, None)
+            return None
+
+
+async def get_chat_completion_async(messages, model=None, max_retries=None, initial_retry_delay=None,
+                                    client_type="auto", api_key=None, base_url=None, use_cache=True,
+                                    route=None, validate=None):
+    """
+    get_chat_completion 的异步版本，参数和返回值相同
+
+    使用 AsyncOpenAI / Gemini aio 接口，等待模型回答时不占用线程，
+    适合在事件循环中并发驱动多个运行。
+    """
+    start = time.monotonic()
+    client = None
+    with route_scope(route):
+        try:
+            client, route_config = _get_routed_client(route, client_type, api_key, base_url, model)
+
+            request_key = _request_key(client, messages, route_config)
+            cache, cached = _lookup_cache(client, request_key, use_cache, validate)
+            if cached is not None:
+                _record_route(route, start, client, cached, cache_hit=True)
+                return cached
+
+            async def fetch():
+                result = await client.get_completion_async(
+                    messages=messages,
+                    max_retries=max_retries,
+                    initial_retry_delay=initial_retry_delay,
+                    max_tokens=route_config.max_tokens,
+                    timeout=route_config.timeout
+                )
+                _store_cache(cache, request_key, client, result, validate)
+                return result
+
+            if single_flight_enabled():
+                result, shared = await llm_single_flight.do_async(request_key, fetch)
+            else:
+                result, shared = await fetch(), False
+            _record_route(route, start, client, result, coalesced=shared)
+            return result
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} get_chat_completion_async 发生错误: {str(e)}")
+            _record_route(route, start, client, None)
+            return None
+
+
+def _get_routed_client(route, client_type, api_key, base_url, model):
+    """按路由表选择客户端，返回 (client, Route)；显式传入的参数优先于路由表"""
+    load_project_env()
+    route_config = get_route(route)
+    if client_type == "auto" and route_config.provider:
+        client_type = route_config.provider
+    secondary_model = None
+    if model is None and not (api_key or base_url):
+        pair = LLMClientFactory.hedge_pair()
+        if pair is not None and (client_type == "hedged" or
+                                 (client_type == "auto" and hedging_enabled())):
+            # 对冲模式下主、备 provider 各自按路由选择模型
+            model = resolve_model(route_config, pair[0])
+            secondary_model = resolve_model(route_config, pair[1])
+        else:
+            provider = client_type if client_type != "auto" else LLMClientFactory.configured_provider()
+            model = resolve_model(route_config, provider)
+    return _get_client(client_type, api_key, base_url, model, secondary_model), route_config
+
+
+def _request_params(route_config):
+    """影响回答内容的请求参数，计入缓存键"""
+    return {"max_tokens": route_config.max_tokens}
+
+
+def _request_key(client, messages, route_config):
+    """缓存和合并请求共用的键：同一 provider（含 base_url）、模型、消息和回答长度限制的请求视为相同"""
+    return make_cache_key(client.provider_name, client.model, messages,
+                          _request_params(route_config))
+
+
+def _record_route(route, start, client, result, cache_hit=False, coalesced=False):
+    if coalesced:
+        logger.info(f"{SUCCESS_ICON} 合并了进行中的相同 LLM 请求 ({route or 'default'})")
+    record_route_call(route, time.monotonic() - start, result is not None, cache_hit=cache_hit,
+                      provider=getattr(client, "provider_name", None),
+                      model=getattr(client, "model", None), coalesced=coalesced)
+
+
+def get_cache_identity(model=None, client_type="auto", api_key=None, base_url=None, route=None):
+    """返回当前配置下缓存键使用的 (provider, model, params)，供按内容缓存派生结果（如单篇新闻得分）"""
+    client, route_config = _get_routed_client(route, client_type, api_key, base_url, model)
+    return client.provider_name, client.model, _request_params(route_config)
+
+
+def _lookup_cache(client, cache_key, use_cache, validate=None):
+    """查询共享的 LLM 回答缓存，返回 (cache, 命中的回答)"""
+    cache = get_llm_cache() if use_cache else None
+    if cache is None:
+        return None, None
+    cached = cache.get(cache_key)
+    if cached is not None and validate is not None and not validate(cached):
+        logger.warning(f"{ERROR_ICON} 缓存的回答未通过校验，重新请求 ({client.provider_name}/{client.model})")
+        cached = None
+    if cached is not None:
+        logger.info(f"{SUCCESS_ICON} 命中 LLM 缓存 ({client.provider_name}/{client.model})")
+    return cache, cached
+
+
+def _store_cache(cache, cache_key, client, result, validate=None):
+    if cache is None or result is None:
+        return
+    if validate is not None and not validate(result):
+        logger.warning(f"{ERROR_ICON} 回答未通过校验，不写入缓存 ({client.provider_name}/{client.model})")
+        return
+    cache.set(cache_key, result, provider=client.provider_name, model=client.model)
@@ -0,0 +1,88 @@
+import math
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+
+class PriceColumns:
+    """在 AgentState 中传递的列式价格数据
+
+    每一列是一个只读的 NumPy 数组，各个 agent 通过 `to_dataframe()` 得到共享
+    同一份内存的 DataFrame（不逐行构造字典，也不复制数据）。由于数组只读，
+    原地修改会直接报错，新增列不受影响。
+
+    `to_dict()` 返回与原先 `to_dict('records')` 结构相同、可直接 JSON 序列化
+    的记录列表，供 API 层和状态序列化使用。
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {lengths}")
+
+        self._columns: Dict[str, np.ndarray] = {}
+        for name, values in columns.items():
+            array = np.asarray(values)
+            array.flags.writeable = False
+            self._columns[name] = array
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "PriceColumns":
+        """从 DataFrame 构建，每列复制一次以获得独立的只读数组"""
+        return cls({str(name): df[name].to_numpy(copy=True) for name in df.columns})
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """返回与本容器共享内存的 DataFrame 视图"""
+        return pd.DataFrame(self._columns, copy=False)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        names = list(self._columns)
+        converted = [_to_json_values(self._columns[name]) for name in names]
+        for row in zip(*converted):
+            yield dict(zip(names, row))
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        """JSON 友好的逐行记录（日期为 ISO 字符串，NaN 为 None）"""
+        return list(self.iter_records())
+
+    def __repr__(self) -> str:
+        return f"PriceColumns(rows={self._length}, columns={self.columns})"
+
+
+def _to_json_values(values: np.ndarray) -> List[Any]:
+    """将一列转换为 JSON 原生类型"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return [None if pd.isna(v) else pd.Timestamp(v).isoformat() for v in values]
+    result = values.tolist()
+    if values.dtype.kind == 'f':
+        return [None if math.isnan(v) else v for v in result]
+    if values.dtype.kind == 'O':
+        return [_to_json_scalar(v) for v in result]
+    return result
+
+
+def _to_json_scalar(value: Any) -> Any:
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return None if math.isnan(value) else value
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return _to_json_scalar(value.item())
+    return str(value)
@@ -0,0 +1,183 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from src.utils.logging_config import setup_logger
+
+# 设置日志记录
+logger = setup_logger('price_store')
+
+# Parquet 读写依赖 pyarrow，未安装时本地存储自动关闭，直接走网络获取
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+class PriceHistoryStore:
+    """按 (股票代码, 复权类型) 存储的本地列式日线数据
+
+    每个 key 对应一个 Parquet 文件和一个记录已覆盖日期区间的 JSON 元数据文件。
+    请求的区间已被覆盖时不产生任何网络请求；否则只获取缺失的头部/尾部区间。
+    增量获取时会多取一根与本地重叠的 K 线，若其收盘价与本地不一致（例如前复权
+    因子因分红送转发生变化），则整体重新下载该区间。
+    元数据只记录实际取到 K 线的区间，数据源返回空数据（临时故障或尚未发布）的
+    日期不视为已覆盖，下次请求时会重新获取。
+    """
+
+    def __init__(self, fetcher: Callable[[str, datetime, datetime, str], pd.DataFrame],
+                 root: Optional[str] = None, enabled: Optional[bool] = None):
+        self._fetcher = fetcher
+        self.root = root or os.getenv(
+            "PRICE_STORE_DIR", os.path.join("src", "data", "price_store"))
+        if enabled is None:
+            enabled = os.getenv("PRICE_STORE_ENABLED",
+                                "true").lower() != "false"
+        self.enabled = enabled and HAS_PYARROW
+        if enabled and not HAS_PYARROW:
+            logger.warning("pyarrow 未安装，本地行情存储已禁用")
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _paths(self, symbol: str, adjust: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, f"{symbol}_{adjust or 'none'}")
+        return f"{base}.parquet", f"{base}.json"
+
+    def _load(self, symbol: str, adjust: str):
+        data_path, meta_path = self._paths(symbol, adjust)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            df = pd.read_parquet(data_path)
+            covered = (datetime.strptime(meta["start"], DATE_FORMAT),
+                       datetime.strptime(meta["end"], DATE_FORMAT))
+            return df, covered
+        except Exception as e:
+            logger.warning(f"读取本地行情存储失败 {data_path}: {e}")
+            return None, None
+
+    def _save(self, symbol: str, adjust: str, df: pd.DataFrame,
+              covered: Tuple[datetime, datetime]) -> None:
+        data_path, meta_path = self._paths(symbol, adjust)
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            # 先写临时文件再替换，避免读到写了一半的文件
+            df.to_parquet(data_path + ".tmp", index=False)
+            os.replace(data_path + ".tmp", data_path)
+            meta = {
+                "symbol": symbol,
+                "adjust": adjust,
+                "start": covered[0].strftime(DATE_FORMAT),
+                "end": covered[1].strftime(DATE_FORMAT),
+                "rows": len(df),
+                "last_updated": datetime.now().isoformat()
+            }
+            with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(meta_path + ".tmp", meta_path)
+        except Exception as e:
+            logger.warning(f"写入本地行情存储失败 {data_path}: {e}")
+
+    def _fetch(self, symbol: str, start: datetime, end: datetime, adjust: str) -> pd.DataFrame:
+        logger.info(
+            f"Fetching {symbol} ({adjust or 'none'}) bars "
+            f"{start.strftime(DATE_FORMAT)} ~ {end.strftime(DATE_FORMAT)}")
+        df = self._fetcher(symbol, start, end, adjust)
+        return df if df is not None else pd.DataFrame()
+
+    @staticmethod
+    def _overlap_matches(stored: pd.DataFrame, fetched: pd.DataFrame, date) -> bool:
+        """比较重叠 K 线的收盘价，判断复权基准是否变化"""
+        old = stored.loc[stored["date"] == date, "close"]
+        new = fetched.loc[fetched["date"] == date, "close"]
+        if old.empty or new.empty:
+            return True
+        old_close, new_close = float(old.iloc[-1]), float(new.iloc[-1])
+        return abs(old_close - new_close) <= 1e-6 * max(abs(old_close), 1.0)
+
+    def get_history(self, symbol: str, start: datetime, end: datetime,
+                    adjust: str = "qfq") -> pd.DataFrame:
+        """获取 [start, end] 区间的日线数据，只从网络获取本地缺失的部分"""
+        if not self.enabled:
+            return self._fetch(symbol, start, end, adjust)
+
+        start = datetime(start.year, start.month, start.day)
+        end = datetime(end.year, end.month, end.day)
+
+        with self._lock_for((symbol, adjust)):
+            stored, covered = self._load(symbol, adjust)
+
+            if stored is None or stored.empty:
+                merged = self._fetch(symbol, start, end, adjust)
+                covered = None
+                changed = True
+            else:
+                covered_start, covered_end = covered
+                pieces = [stored]
+                rebuild = False
+
+                if start < covered_start:
+                    first_bar = stored["date"].min()
+                    head = self._fetch(symbol, start, first_bar, adjust)
+                    if not head.empty:
+                        if not self._overlap_matches(stored, head, first_bar):
+                            rebuild = True
+                        if head["date"].min() < first_bar:
+                            pieces.insert(0, head)
+
+                if end > covered_end and not rebuild:
+                    last_bar = stored["date"].max()
+                    tail = self._fetch(symbol, last_bar, end, adjust)
+                    if not tail.empty:
+                        if not self._overlap_matches(stored, tail, last_bar):
+                            rebuild = True
+                        if tail["date"].max() > last_bar:
+                            pieces.append(tail)
+
+                changed = rebuild or len(pieces) > 1
+                merged = stored
+                if rebuild:
+                    logger.info(f"{symbol} 复权数据已变化，重新获取完整区间")
+                    rebuilt = self._fetch(
+                        symbol, min(start, covered_start), max(end, covered_end), adjust)
+                    if rebuilt.empty:
+                        # 重新获取失败时保留本地数据，下次再尝试
+                        logger.warning(f"{symbol} 重新获取失败，继续使用本地数据")
+                        changed = False
+                    else:
+                        merged = rebuilt
+                elif changed:
+                    merged = pd.concat(pieces, ignore_index=True)
+                    merged = merged.drop_duplicates(
+                        subset="date", keep="last")
+
+            if merged.empty:
+                return merged
+
+            if changed:
+                merged = merged.sort_values("date").reset_index(drop=True)
+                # 只记录实际取到数据的区间：数据源暂时返回空或尚未发布的日期不算已覆盖，
+                # 下次请求时会重新获取
+                new_covered = (merged["date"].min().to_pydatetime(),
+                               merged["date"].max().to_pydatetime())
+                if covered is not None:
+                    new_covered = (min(new_covered[0], covered[0]),
+                                   max(new_covered[1], covered[1]))
+                self._save(symbol, adjust, merged, new_covered)
+
+        mask = (merged["date"] >= start) & (
+            merged["date"] < end + timedelta(days=1))
+        return merged.loc[mask].reset_index(drop=True)
@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+import pandas as pd
+import akshare as ak
+
+from src.utils.logging_config import setup_logger
+
+# 设置日志记录
+logger = setup_logger('spot_snapshot')
+
+# 全市场快照默认有效期（秒），可通过环境变量 SPOT_SNAPSHOT_TTL 配置
+DEFAULT_SPOT_SNAPSHOT_TTL = 60.0
+# 刷新失败后等待多久再重试（秒），可通过环境变量 SPOT_SNAPSHOT_RETRY_BACKOFF 配置
+DEFAULT_SPOT_SNAPSHOT_RETRY_BACKOFF = 10.0
+# 刷新失败时旧快照最多还能使用多久（秒，从下载时算起），可通过环境变量 SPOT_SNAPSHOT_MAX_STALE 配置
+DEFAULT_SPOT_SNAPSHOT_MAX_STALE = 600.0
+
+
+class _Snapshot(NamedTuple):
+    """一次下载的快照：数据、代码索引和时间戳作为一个整体替换，无锁读取也不会不一致"""
+    frame: pd.DataFrame
+    rows: Dict[str, int]
+    fetched_at: float
+    expires_at: float
+
+
+class SpotSnapshotCache:
+    """进程内共享的 A 股全市场实时行情快照 (stock_zh_a_spot_em)
+
+    - 在 TTL 内所有调用方共享同一份下载结果
+    - 并发刷新时只有一个线程真正发起下载（single-flight），其余线程等待其结果
+    - 按 `代码` 建立索引，单只股票查询为 O(1)
+    - 刷新失败后在 retry_backoff 秒内不再重试，期间使用旧快照；旧快照超过
+      max_stale 秒后不再使用
+    """
+
+    def __init__(self, ttl: Optional[float] = None, fetcher=None,
+                 retry_backoff: Optional[float] = None, max_stale: Optional[float] = None):
+        if ttl is None:
+            ttl = float(os.getenv("SPOT_SNAPSHOT_TTL",
+                        DEFAULT_SPOT_SNAPSHOT_TTL))
+        if retry_backoff is None:
+            retry_backoff = float(os.getenv("SPOT_SNAPSHOT_RETRY_BACKOFF",
+                                  DEFAULT_SPOT_SNAPSHOT_RETRY_BACKOFF))
+        if max_stale is None:
+            max_stale = float(os.getenv("SPOT_SNAPSHOT_MAX_STALE",
+                              DEFAULT_SPOT_SNAPSHOT_MAX_STALE))
+        self.ttl = ttl
+        self.retry_backoff = retry_backoff
+        self.max_stale = max_stale
+        self._fetcher = fetcher or ak.stock_zh_a_spot_em
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._retry_at = 0.0
+
+    def _refresh(self) -> _Snapshot:
+        """下载全市场快照并重建代码索引（调用方需持有锁）"""
+        logger.info("Fetching full-market spot snapshot...")
+        frame = self._fetcher()
+        if frame is None or frame.empty:
+            raise ValueError("Empty spot snapshot returned")
+
+        frame = frame.reset_index(drop=True)
+        # 代码 -> 行号，重复代码保留第一条，与原先 iloc[0] 的行为一致
+        codes = frame['代码'].astype(str)
+        rows = {}
+        for position, code in enumerate(codes):
+            rows.setdefault(code, position)
+
+        now = time.monotonic()
+        self._snapshot = _Snapshot(frame, rows, now, now + self.ttl)
+        self._retry_at = 0.0
+        logger.info(f"✓ Spot snapshot refreshed ({len(frame)} records)")
+        return self._snapshot
+
+    def _stale(self, snapshot: Optional[_Snapshot], now: float) -> Optional[_Snapshot]:
+        """无法刷新时可以使用的旧快照，超过 max_stale 后返回 None"""
+        if snapshot is None or now - snapshot.fetched_at > self.max_stale:
+            return None
+        return snapshot
+
+    def _current(self) -> Optional[_Snapshot]:
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now < snapshot.expires_at:
+            return snapshot
+        if now < self._retry_at:
+            return self._stale(snapshot, now)
+
+        with self._lock:
+            # 等锁期间其他线程可能已完成刷新或刚刚刷新失败
+            snapshot = self._snapshot
+            now = time.monotonic()
+            if snapshot is not None and now < snapshot.expires_at:
+                return snapshot
+            if now < self._retry_at:
+                return self._stale(snapshot, now)
+            try:
+                return self._refresh()
+            except Exception as e:
+                self._retry_at = time.monotonic() + self.retry_backoff
+                stale = self._stale(snapshot, now)
+                if stale is None:
+                    logger.error(f"Error fetching spot snapshot: {e}")
+                else:
+                    logger.warning(
+                        f"Spot snapshot refresh failed, using stale data: {e}")
+                return stale
+
+    def get_snapshot(self) -> Optional[pd.DataFrame]:
+        """获取全市场快照，过期时刷新；刷新失败时在 max_stale 内退回到上一份快照"""
+        snapshot = self._current()
+        return None if snapshot is None else snapshot.frame
+
+    def get_row(self, symbol: str) -> Optional[pd.Series]:
+        """按股票代码查询快照中的单行数据，找不到时返回 None"""
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        position = snapshot.rows.get(str(symbol))
+        if position is None:
+            return None
+        return snapshot.frame.iloc[position]
+
+    def invalidate(self) -> None:
+        """使当前快照失效，下次访问时重新下载"""
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot._replace(expires_at=0.0)
+            self._retry_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "ttl": self.ttl,
+            "records": 0 if snapshot is None else len(snapshot.frame),
+            "age": None if snapshot is None else time.monotonic() - snapshot.fetched_at,
+        }
+
+
+_spot_cache = SpotSnapshotCache()
+
+
+def get_spot_snapshot() -> Optional[pd.DataFrame]:
+    """获取共享的全市场实时行情快照"""
+    return _spot_cache.get_snapshot()
+
+
+def get_spot_row(symbol: str) -> Optional[pd.Series]:
+    """获取单只股票的实时行情（来自共享快照）"""
+    return _spot_cache.get_row(symbol)
@@ -0,0 +1,50 @@
+import io
+import sys
+
+from src.utils.api_utils import _ContextRedirect
+
+
+class _FakeTerminal(io.StringIO):
+    encoding = "utf-8"
+    errors = "strict"
+
+    def isatty(self):
+        return True
+
+    def fileno(self):
+        return 1
+
+
+def test_redirect_exposes_wrapped_stream_attributes():
+    redirect = _ContextRedirect(_FakeTerminal(), 0)
+    assert redirect.encoding == "utf-8"
+    assert redirect.errors == "strict"
+    assert redirect.isatty() is True
+    assert redirect.fileno() == 1
+    assert redirect.writable()
+
+    real = _ContextRedirect(sys.__stdout__, 0)
+    assert real.encoding == sys.__stdout__.encoding
+    assert real.fileno() == sys.__stdout__.fileno()
+
+
+def test_logs_from_context_copying_workers_are_captured():
+    import contextvars
+    import logging
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.utils.api_utils import _AgentRun
+
+    logger = logging.getLogger("capture_probe")
+    logger.setLevel(logging.INFO)
+    executor = ThreadPoolExecutor(max_workers=1)
+    run = _AgentRun("capture_probe_agent", {"metadata": {}})
+    try:
+        executor.submit(contextvars.copy_context().run, logger.info, "from worker").result()
+        executor.submit(logger.info, "from bare worker").result()
+    finally:
+        run._stop_capture()
+        executor.shutdown()
+    captured = "".join(run.terminal_outputs)
+    assert "from worker" in captured
+    assert "from bare worker" not in captured
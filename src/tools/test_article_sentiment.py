@@ -0,0 +1,49 @@
+import re
+
+import pytest
+
+from src.tools import article_sentiment
+from src.utils.llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def scorer(tmp_path, monkeypatch):
+    """用临时缓存和假 LLM 替换真实调用，记录每次请求中的新闻标题"""
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"))
+    requests = []
+
+    def fake_completion(messages, **kwargs):
+        titles = re.findall(r"标题：(\S+)", messages[-1]["content"])
+        requests.append(titles)
+        # 标题中带“涨”的新闻为积极，其余为消极
+        return str({str(i): (0.8 if "涨" in title else -0.4)
+                    for i, title in enumerate(titles, 1)}).replace("'", '"')
+
+    monkeypatch.setattr(article_sentiment, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(article_sentiment, "get_cache_identity", lambda **kwargs: ("fake", "model", {}))
+    monkeypatch.setattr(article_sentiment, "get_chat_completion", fake_completion)
+    return requests
+
+
+def _news(title, day):
+    return {"title": title, "content": f"{title}正文", "publish_time": f"2024-01-{day:02d} 09:30:00"}
+
+
+def test_only_uncached_articles_are_scored_in_one_request(scorer):
+    day1 = [_news("股价大涨", 1), _news("业绩下滑", 1)]
+    assert article_sentiment.score_articles(day1) == [0.8, -0.4]
+    # 第二天的窗口与第一天重叠，只对新增的一篇发起请求
+    day2 = day1 + [_news("订单上涨", 2)]
+    assert article_sentiment.score_articles(day2) == [0.8, -0.4, 0.8]
+    assert scorer == [["股价大涨", "业绩下滑"], ["订单上涨"]]
+    # 全部命中缓存时不再调用 LLM
+    article_sentiment.score_articles(day2[::-1])
+    assert len(scorer) == 2
+
+
+def test_recency_weighted_aggregation():
+    news = [_news("旧", 1), _news("新", 3)]
+    assert article_sentiment.aggregate_scores(news, [1.0, -1.0], method="mean") == 0
+    # 半衰期 2 天：两天前的新闻权重为一半
+    assert article_sentiment.aggregate_scores(news, [1.0, -1.0], half_life_days=2) == pytest.approx(-1 / 3)
+    assert article_sentiment.aggregate_scores(news, [None, None]) == 0.0
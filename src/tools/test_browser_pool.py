@@ -0,0 +1,187 @@
+import os
+
+import pytest
+
+from src.crawler import browser_pool
+from src.crawler.browser_pool import BrowserPool, PoolConfig
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+        self.pages = 0
+
+    async def new_page(self):
+        if self.broken:
+            raise RuntimeError("context closed")
+        self.pages += 1
+        return FakePage()
+
+    async def add_init_script(self, script):
+        pass
+
+    async def storage_state(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{}")
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeChromium:
+    def __init__(self):
+        self.browsers = []
+
+    async def launch(self, **options):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    playwright = FakePlaywright()
+    monkeypatch.setattr(browser_pool, "async_playwright", lambda: playwright)
+    return playwright
+
+
+@pytest.fixture
+def pool(tmp_path, fake_playwright):
+    pool = BrowserPool(str(tmp_path / "browser-state.json"),
+                       config=PoolConfig(size=1, max_pages_per_context=2, health_check_interval=0))
+    yield pool
+    pool.close()
+
+
+def use_page(pool, fail=False):
+    async def run():
+        async with pool.page() as page:
+            if fail:
+                raise RuntimeError("search failed")
+            return page
+
+    return pool.submit(run)
+
+
+def test_context_is_recycled_after_max_pages(pool, fake_playwright):
+    for _ in range(3):
+        use_page(pool)
+
+    stats = pool.stats()
+    assert stats["searches"] == 3
+    assert stats["contexts_created"] == 2
+    assert stats["contexts_recycled"] == 1
+    assert stats["browser_launches"] == 1
+    first, second = fake_playwright.chromium.browsers[0].contexts
+    assert first.closed and first.pages == 2
+    assert not second.closed and second.pages == 1
+    # 回收时保存状态，之后新建的上下文从状态文件恢复
+    assert os.path.exists(pool.state_file)
+    assert pool._storage_state == pool.state_file
+
+
+def test_context_is_retired_when_the_search_fails(pool, fake_playwright):
+    with pytest.raises(RuntimeError, match="search failed"):
+        use_page(pool, fail=True)
+    use_page(pool)
+
+    first, second = fake_playwright.chromium.browsers[0].contexts
+    assert first.closed
+    assert not second.closed
+    assert pool.stats()["contexts_created"] == 2
+    assert pool.stats()["contexts_recycled"] == 1
+
+
+def test_broken_idle_context_is_replaced_on_checkout(pool, fake_playwright):
+    use_page(pool)
+    first = fake_playwright.chromium.browsers[0].contexts[0]
+    first.broken = True
+    use_page(pool)
+
+    assert first.closed
+    assert pool.stats()["contexts_created"] == 2
+
+
+def test_browser_is_relaunched_after_disconnect(pool, fake_playwright):
+    use_page(pool)
+    fake_playwright.chromium.browsers[0].connected = False
+    use_page(pool)
+
+    assert len(fake_playwright.chromium.browsers) == 2
+    stats = pool.stats()
+    assert stats["browser_launches"] == 2
+    assert stats["browser_connected"]
+    assert stats["idle_contexts"] == 1
+    assert len(fake_playwright.chromium.browsers[1].contexts) == 1
+
+
+def test_health_check_removes_broken_idle_contexts(tmp_path, fake_playwright):
+    pool = BrowserPool(str(tmp_path / "browser-state.json"),
+                       config=PoolConfig(size=2, max_pages_per_context=10, health_check_interval=0))
+    try:
+        async def use_two():
+            async with pool.page():
+                async with pool.page():
+                    pass
+
+        pool.submit(use_two)
+        good, bad = fake_playwright.chromium.browsers[0].contexts
+        bad.broken = True
+
+        assert pool.submit(pool.health_check) == {"removed": 1, "idle": 1}
+        assert bad.closed and not good.closed
+        assert pool._idle[0].context is good
+
+        fake_playwright.chromium.browsers[0].connected = False
+        assert pool.submit(pool.health_check) == {"removed": 0, "idle": 0}
+        assert pool.stats()["idle_contexts"] == 0
+    finally:
+        pool.close()
+
+
+def test_launch_without_playwright_raises_import_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser_pool, "async_playwright", None)
+    pool = BrowserPool(str(tmp_path / "browser-state.json"),
+                       config=PoolConfig(size=1, health_check_interval=0))
+    try:
+        with pytest.raises(ImportError, match="playwright"):
+            use_page(pool)
+    finally:
+        pool.close()
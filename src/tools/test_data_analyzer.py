@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from src.tools import data_analyzer
+from src.tools.indicators import get_indicator_context
+
+
+def test_analysis_columns_do_not_leak_into_the_shared_context(monkeypatch, tmp_path):
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0, 1, 80))
+    prices = pd.DataFrame({
+        "date": pd.bdate_range("2024-01-01", periods=80),
+        "open": close, "high": close + 1, "low": close - 1, "close": close,
+        "volume": rng.integers(1_000, 5_000, 80).astype(float),
+    })
+    columns = list(prices.columns)
+    monkeypatch.setattr(data_analyzer, "get_price_history", lambda *args, **kwargs: prices)
+    monkeypatch.chdir(tmp_path)
+
+    data_analyzer.analyze_stock_data("000001", "2024-01-01", "2024-04-19")
+
+    assert list(prices.columns) == columns
+    assert list(get_indicator_context(prices, "000001").df.columns) == columns
+    written = pd.read_csv(next(tmp_path.glob("000001_analysis_*.csv")))
+    assert {"ma20", "macd", "rsi", "bb_upper", "volatility_20d"} <= set(written.columns)
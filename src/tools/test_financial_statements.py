@@ -0,0 +1,32 @@
+import time
+
+import pandas as pd
+
+from src.tools import api
+
+
+def test_financial_reports_share_one_deadline(monkeypatch):
+    def slow_report(symbol, report, label):
+        time.sleep(1)
+        return pd.Series({"净利润": 1.0}), pd.Series({"净利润": 1.0})
+
+    monkeypatch.setattr(api, "_fetch_financial_report", slow_report)
+    monkeypatch.setattr(api, "FINANCIAL_REPORT_TIMEOUT", 0.2)
+
+    started = time.monotonic()
+    line_items = api.get_financial_statements("600000")
+    # 三张报表共享 0.2 秒的截止时间，而不是各等 0.2 秒
+    assert time.monotonic() - started < 0.5
+    assert line_items[0]["net_income"] == 0
+
+
+def test_financial_reports_are_fetched_concurrently(monkeypatch):
+    def report(symbol, report, label):
+        time.sleep(0.3)
+        return pd.Series({"净利润": 2.0}), pd.Series({"净利润": 1.0})
+
+    monkeypatch.setattr(api, "_fetch_financial_report", report)
+    started = time.monotonic()
+    line_items = api.get_financial_statements("600000")
+    assert time.monotonic() - started < 0.8
+    assert [item["net_income"] for item in line_items] == [2.0, 1.0]
@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from src.agents import technicals
+from src.agents.technicals import latest_indicator_values
+from src.tools.incremental_indicators import HURST_LOOKBACK, IncrementalIndicatorState
+
+
+def make_ohlcv(n, seed):
+    rng = np.random.default_rng(seed)
+    close = np.round(1800 * np.cumprod(1 + rng.normal(0, 0.02, n)), 2)
+    idx = rng.choice(np.arange(1, n), size=10, replace=False)
+    close[idx] = close[idx - 1]
+    return pd.DataFrame({
+        "date": pd.bdate_range("2023-01-02", periods=n),
+        "open": close * (1 + rng.normal(0, 0.005, n)),
+        "high": close * (1 + rng.uniform(0, 0.03, n)),
+        "low": close * (1 - rng.uniform(0, 0.03, n)),
+        "close": close,
+        "volume": rng.integers(1000, 100000, n).astype(float),
+    })
+
+
+def assert_values_close(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if math.isnan(value):
+            assert math.isnan(actual[key]), key
+        else:
+            assert math.isclose(actual[key], value, rel_tol=1e-7, abs_tol=1e-9), \
+                (key, actual[key], value)
+
+
+def test_incremental_matches_full_history():
+    df = make_ohlcv(400, 0)
+    state = IncrementalIndicatorState()
+    assert state.update_from_dataframe(df.iloc[:30]) == 30
+    for end in (30, 31, 80, 200, 400):
+        state.update_from_dataframe(df.iloc[:end])
+        assert_values_close(state.latest(), latest_indicator_values(df.iloc[:end]))
+
+
+def test_update_skips_known_bars_with_sliding_window():
+    df = make_ohlcv(300, 1)
+    state = IncrementalIndicatorState()
+    state.update_from_dataframe(df.iloc[:250])
+    # 回测中窗口起点随日期前移，只有最新一根是新的
+    assert state.update_from_dataframe(df.iloc[10:251]) == 1
+    assert state.bars == 251
+
+
+def test_snapshot_and_restore():
+    df = make_ohlcv(200, 2)
+    state = IncrementalIndicatorState()
+    state.update_from_dataframe(df.iloc[:150])
+    saved = state.snapshot()
+    before = state.latest()
+
+    state.update_from_dataframe(df)
+    assert state.bars == 200
+    state.restore(saved)
+    assert state.bars == 150
+    assert_values_close(state.latest(), before)
+
+
+def positional_hurst(price_series, max_lag=10):
+    """不截断范围的 Hurst 斜率，按位置而不是索引对齐相减"""
+    returns = np.log(price_series / price_series.shift(1)).dropna().to_numpy()
+    lags = range(2, max_lag)
+    tau = [np.sqrt(np.std(returns[lag:] - returns[:-lag])) for lag in lags]
+    return float(np.polyfit(np.log(lags), np.log(tau), 1)[0])
+
+
+def test_hurst_uses_lookback_window_and_diverges_from_full_history(monkeypatch):
+    # calculate_hurst_exponent 对按索引对齐的 Series 相减，结果恒为 0（再截断到
+    # [0, 1]），上面的全量对比因此无法区分回看窗口；这里换成按位置计算的版本
+    monkeypatch.setattr(technicals, "calculate_hurst_exponent", positional_hurst)
+    df = make_ohlcv(400, 0)
+    state = IncrementalIndicatorState()
+
+    # 不超过回看窗口时与全量计算一致
+    state.update_from_dataframe(df.iloc[:HURST_LOOKBACK])
+    assert math.isclose(state.latest()["hurst"],
+                        latest_indicator_values(df.iloc[:HURST_LOOKBACK])["hurst"], rel_tol=1e-9)
+
+    # 超过回看窗口后只使用最近 HURST_LOOKBACK 根收盘价，与全量历史的结果不同
+    state.update_from_dataframe(df)
+    incremental = state.latest()["hurst"]
+    assert math.isclose(incremental, positional_hurst(df["close"].iloc[-HURST_LOOKBACK:]), rel_tol=1e-9)
+    full_history = latest_indicator_values(df)["hurst"]
+    assert 0 < abs(full_history) < 1 and 0 < abs(incremental) < 1
+    assert not math.isclose(incremental, full_history, rel_tol=1e-3)
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+from src.tools.indicators import get_indicator_context, get_panel_context, rolling_hurst_exponent
+
+
+def legacy_calculate_hurst(series):
+    """get_price_history 中原先逐窗口调用的 Hurst 实现，用于等价性对比"""
+    try:
+        series = series.dropna()
+        if len(series) < 30:
+            return np.nan
+
+        log_returns = np.log(series / series.shift(1)).dropna()
+        if len(log_returns) < 30:
+            return np.nan
+
+        lags = range(2, min(11, len(log_returns) // 4))
+
+        tau = []
+        for lag in lags:
+            std = log_returns.rolling(window=lag).std().dropna()
+            if len(std) > 0:
+                tau.append(np.mean(std))
+
+        if len(tau) < 3:
+            return np.nan
+
+        lags_log = np.log(list(lags))
+        tau_log = np.log(tau)
+
+        reg = np.polyfit(lags_log, tau_log, 1)
+        hurst = reg[0] / 2.0
+
+        if np.isnan(hurst) or np.isinf(hurst):
+            return np.nan
+
+        return hurst
+
+    except Exception:
+        return np.nan
+
+
+def make_close(n, seed, flat_days=0):
+    rng = np.random.default_rng(seed)
+    close = 10 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    close = np.round(close, 2)
+    if flat_days:
+        # A股常见的平盘（含停牌）日，收益率为 0
+        idx = rng.choice(np.arange(1, n), size=flat_days, replace=False)
+        close[idx] = close[idx - 1]
+    return pd.Series(close)
+
+
+def assert_matches_legacy(close):
+    log_returns = np.log(close / close.shift(1))
+    expected = log_returns.rolling(
+        window=120, min_periods=60).apply(legacy_calculate_hurst)
+    actual = rolling_hurst_exponent(log_returns, window=120, min_periods=60)
+
+    assert actual.index.equals(expected.index)
+    assert (actual.isna() == expected.isna()).all()
+    np.testing.assert_allclose(
+        actual.dropna().values, expected.dropna().values, rtol=1e-9, atol=1e-12)
+
+
+def test_rolling_hurst_matches_legacy():
+    for seed in range(3):
+        assert_matches_legacy(make_close(400, seed))
+
+
+def test_rolling_hurst_matches_legacy_with_flat_days():
+    for seed in range(3):
+        assert_matches_legacy(make_close(300, seed, flat_days=15))
+
+
+def test_rolling_hurst_short_series():
+    assert_matches_legacy(make_close(50, 7))
+    assert rolling_hurst_exponent(pd.Series([], dtype=float)).empty
+
+
+def make_prices(n=200, seed=0, symbol="600519"):
+    close = make_close(n, seed)
+    df = pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=n, freq="B"),
+        "open": close, "high": close * 1.01, "low": close * 0.99,
+        "close": close, "volume": np.full(n, 1e6)
+    })
+    df.attrs["symbol"] = symbol
+    return df
+
+
+def test_indicator_context_is_shared_and_memoized():
+    df = make_prices()
+    ctx = get_indicator_context(df)
+    assert get_indicator_context(df.copy()) is ctx
+
+    # 默认参数与显式参数命中同一个缓存项
+    assert ctx.get("rsi") is ctx.get("rsi", period=14)
+    assert ctx.get("volatility", window=20) is ctx.get("volatility")
+
+    expected = df["close"].pct_change().rolling(20).std() * np.sqrt(252)
+    pd.testing.assert_series_equal(ctx.get("volatility"), expected)
+
+
+def test_indicator_context_not_shared_across_bars():
+    df = make_prices()
+    ctx = get_indicator_context(df)
+    assert get_indicator_context(df.iloc[:-1]) is not ctx
+    df_unnamed = df.copy()
+    df_unnamed.attrs = {}
+    assert get_indicator_context(df_unnamed) is not ctx
+
+
+def test_indicator_context_not_shared_across_adjust_types_or_history():
+    df = make_prices()
+    df.attrs["adjust"] = "qfq"
+    ctx = get_indicator_context(df)
+
+    unadjusted = df.copy()
+    unadjusted.attrs["adjust"] = ""
+    assert get_indicator_context(unadjusted) is not ctx
+
+    # 端点（首尾日期、最后收盘价）相同，但中间的历史价格不同
+    rewritten = df.copy()
+    rewritten.loc[1:len(df) - 2, "close"] *= 0.5
+    assert rewritten["close"].iloc[-1] == df["close"].iloc[-1]
+    other = get_indicator_context(rewritten)
+    assert other is not ctx
+    assert not other.get("rsi").equals(ctx.get("rsi"))
+
+
+def test_panel_context_matches_single_ticker_indicators():
+    rng = np.random.default_rng(0)
+    frames = {}
+    for seed, ticker in enumerate(["600000", "600001", "600002"]):
+        df = make_prices(seed=seed, symbol=None)
+        df["high"] = df["close"] * (1 + rng.uniform(0, 0.03, len(df)))
+        df["low"] = df["close"] * (1 - rng.uniform(0, 0.03, len(df)))
+        df["volume"] = rng.uniform(1e5, 1e6, len(df))
+        frames[ticker] = df
+    panel = get_panel_context({
+        field: pd.DataFrame({t: df[field] for t, df in frames.items()})
+        for field in ("close", "high", "low", "volume")})
+
+    for ticker, df in frames.items():
+        single = get_indicator_context(df)
+        for name, params in [("rsi", {}), ("ema", {"span": 21}), ("obv", {}),
+                             ("true_range", {}), ("atr", {"min_periods": 7}),
+                             ("volatility", {"window": 21, "min_periods": 10})]:
+            np.testing.assert_allclose(panel.get(name, **params)[ticker],
+                                       single.get(name, **params), rtol=1e-12)
+        # 多列指标按分量名取出 日期 x 股票 矩阵
+        for name, column in [("macd", "signal"), ("bollinger", "upper"), ("adx", "adx")]:
+            np.testing.assert_allclose(panel.get(name)[column][ticker],
+                                       single.get(name)[column], rtol=1e-12)
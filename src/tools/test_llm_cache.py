@@ -0,0 +1,37 @@
+import time
+
+from src.utils.llm_cache import LLMResponseCache, make_cache_key
+
+
+def test_key_is_content_addressed():
+    messages = [{"role": "user", "content": "你好"}]
+    key = make_cache_key("GeminiClient", "gemini-1.5-flash", messages)
+    assert key == make_cache_key("GeminiClient", "gemini-1.5-flash", list(messages))
+    assert key != make_cache_key("GeminiClient", "gemini-2.0-flash", messages)
+    assert key != make_cache_key("GeminiClient", "gemini-1.5-flash",
+                                 [{"role": "user", "content": "您好"}])
+
+
+def test_hit_miss_and_expiry(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_entries=10, max_age=60)
+    assert cache.get("a") is None
+    cache.set("a", "0.5")
+    assert cache.get("a") == "0.5"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    cache.max_age = 0
+    time.sleep(0.01)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_entries=3, max_age=3600)
+    for key in "abcd":
+        cache.set(key, key)
+        time.sleep(0.01)
+    cache.get("a")  # a 最近被访问，b 成为最久未使用
+    cache.evict()
+    assert cache.stats()["entries"] == 3
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+from src.utils.llm_clients import HedgedLLMClient, LLMClient
+from src.utils.llm_metrics import LatencyHistogram, reset_latency_histograms
+
+
+class SleepyClient(LLMClient):
+    def __init__(self, name, delay, answer):
+        self.provider_name = name
+        self.model = name
+        self.delay = delay
+        self.answer = answer
+        self.calls = 0
+        self.cancelled = False
+
+    def get_completion(self, messages, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.answer
+
+    async def get_completion_async(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.answer
+
+
+def _hedged(primary, secondary):
+    reset_latency_histograms()
+    return HedgedLLMClient(primary, secondary, min_samples=1000, default_delay=0.1)
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram()
+    for seconds in [0.1] * 90 + [5.0] * 10:
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) < 0.2
+    assert 3.0 < histogram.quantile(0.95) <= 6.0
+    assert histogram.snapshot()["count"] == 100
+
+
+def test_fast_primary_is_not_hedged():
+    primary = SleepyClient("p", 0.0, "primary")
+    secondary = SleepyClient("s", 0.0, "secondary")
+    client = _hedged(primary, secondary)
+    assert client.get_completion([]) == "primary"
+    assert asyncio.run(client.get_completion_async([])) == "primary"
+    assert secondary.calls == 0
+    assert client.stats["hedged"] == 0
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary = SleepyClient("p", 5.0, "primary")
+    secondary = SleepyClient("s", 0.0, "secondary")
+    client = _hedged(primary, secondary)
+    start = time.monotonic()
+    assert asyncio.run(client.get_completion_async([])) == "secondary"
+    assert time.monotonic() - start < 2
+    assert primary.cancelled
+    assert client.stats["hedged"] == 1
+    assert client.stats["secondary_wins"] == 1
+
+
+def test_failed_primary_fails_over():
+    primary = SleepyClient("p", 0.0, None)
+    secondary = SleepyClient("s", 0.0, "secondary")
+    client = _hedged(primary, secondary)
+    assert client.get_completion([]) == "secondary"
+    assert client.stats["failovers"] == 1
+
+
+def test_sync_slow_primary_is_hedged():
+    primary = SleepyClient("p", 1.0, "primary")
+    secondary = SleepyClient("s", 0.0, "secondary")
+    client = _hedged(primary, secondary)
+    start = time.monotonic()
+    assert client.get_completion([]) == "secondary"
+    assert time.monotonic() - start < 0.9
+
+
+def test_losing_sync_requests_do_not_exhaust_workers():
+    primary = SleepyClient("p", 3.0, "primary")
+    secondary = SleepyClient("s", 0.0, "secondary")
+    client = HedgedLLMClient(primary, secondary, min_samples=1000, default_delay=0.05)
+    start = time.monotonic()
+    # 落后的主请求仍在各自线程中运行，后续调用不需要等待它们
+    for _ in range(12):
+        assert client.get_completion([]) == "secondary"
+    assert time.monotonic() - start < 2
+
+
+def test_hedge_delay_uses_single_attempt_latency_per_model(monkeypatch):
+    from src.utils.llm_clients import GeminiClient
+    from src.utils.llm_metrics import get_latency_histogram
+    from src.utils.llm_retry import reset_circuit_breakers
+
+    calls = []
+
+    class FakeModels:
+        def generate_content(self, model, contents, config):
+            calls.append(model)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                raise TimeoutError("slow")
+            return type("Response", (), {"text": "ok", "usage_metadata": None})()
+
+    gemini = GeminiClient.__new__(GeminiClient)
+    gemini.model = "small"
+    gemini.provider_name = "gemini-latency-test"
+    gemini.client = type("FakeGenai", (), {"models": FakeModels()})()
+    monkeypatch.setenv("LLM_RETRY_BASE_DELAY", "0")
+    reset_circuit_breakers()
+    reset_latency_histograms()
+
+    assert gemini.get_completion([{"role": "user", "content": "hi"}]) == "ok"
+    histogram = get_latency_histogram("gemini-latency-test", "small")
+    # 只记录成功的那次尝试，失败的尝试和退避等待不计入
+    assert histogram.count == 1 and histogram.quantile(0.5) < 0.3
+    assert get_latency_histogram("gemini-latency-test", "large").count == 0
+
+    hedged = HedgedLLMClient(gemini, SleepyClient("s", 0.0, "s"), min_samples=1,
+                             default_delay=10.0, min_delay=0.0)
+    assert hedged.hedge_delay() < 0.3
+
+
+def test_hedged_route_resolves_model_for_both_providers(monkeypatch):
+    from src.tools import openrouter_config
+    from src.utils.llm_clients import client_registry
+
+    monkeypatch.setattr(openrouter_config, "_env_loaded", True)
+    monkeypatch.setenv("LLM_HEDGING_ENABLED", "true")
+    monkeypatch.setenv("LLM_HEDGE_PRIMARY", "openai_compatible")
+    monkeypatch.setenv("GEMINI_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_API_KEY", "x")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_BASE_URL", "http://127.0.0.1:9/v1")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_MODEL", "big-openai")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_SMALL_MODEL", "small-openai")
+    monkeypatch.setenv("GEMINI_SMALL_MODEL", "small-gemini")
+    client_registry.clear()
+    try:
+        client, _ = openrouter_config._get_routed_client("sentiment", "auto", None, None, None)
+        assert isinstance(client, HedgedLLMClient)
+        assert client.primary.model == "small-openai"
+        assert client.secondary.model == "small-gemini"
+
+        client, _ = openrouter_config._get_routed_client(None, "auto", None, None, None)
+        assert client.primary.model == "big-openai"
+        assert client.secondary.model != "small-gemini"
+    finally:
+        client_registry.clear()
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from src.utils.llm_retry import (
+    CircuitBreaker, CircuitOpenError, EmptyResponseError, RetryPolicy,
+    call_with_retry, call_with_retry_async, is_retryable)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _flaky(failures, exc=EmptyResponseError("empty")):
+    calls = []
+
+    def func(timeout):
+        calls.append(timeout)
+        if len(calls) <= failures:
+            raise exc
+        return "ok"
+    return func, calls
+
+
+def test_retries_retryable_errors_until_success():
+    func, calls = _flaky(2)
+    policy = RetryPolicy(max_attempts=4, deadline=30, base_delay=0, max_delay=0)
+    assert call_with_retry(func, policy) == "ok"
+    assert len(calls) == 3
+    # 每次尝试都拿到剩余的时间预算
+    assert all(0 < t <= 30 for t in calls)
+
+
+def test_non_retryable_error_is_raised_immediately():
+    func, calls = _flaky(5, exc=ValueError("bad request"))
+    policy = RetryPolicy(max_attempts=4, deadline=30, base_delay=0, max_delay=0)
+    assert not is_retryable(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        call_with_retry(func, policy)
+    assert len(calls) == 1
+
+
+def test_deadline_stops_retrying_before_backoff_overruns():
+    func, calls = _flaky(5)
+    policy = RetryPolicy(max_attempts=10, deadline=0.5, base_delay=10, max_delay=10)
+    # 退避时间在 [0, 10] 内随机，几乎必然超过 0.5 秒的总时限
+    with pytest.raises(EmptyResponseError):
+        call_with_retry(func, policy)
+    assert len(calls) < 10
+
+
+def test_circuit_breaker_opens_and_recovers_through_half_open_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+    policy = RetryPolicy(max_attempts=1, deadline=30, base_delay=0, max_delay=0)
+
+    failing, _ = _flaky(100)
+    for _ in range(2):
+        with pytest.raises(EmptyResponseError):
+            call_with_retry(failing, policy, breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # 熔断期间直接失败，不发出请求
+    func, calls = _flaky(0)
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(func, policy, breaker)
+    assert calls == []
+
+    # 超过 reset_timeout 后放行一个探测请求，成功则关闭
+    clock.now = 11
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert call_with_retry(func, policy, breaker) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_error_does_not_close_half_open_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=clock)
+    policy = RetryPolicy(max_attempts=1, deadline=30, base_delay=0, max_delay=0)
+    with pytest.raises(EmptyResponseError):
+        call_with_retry(_flaky(1)[0], policy, breaker)
+
+    # 半开探测遇到 400 一类的错误：熔断器保持半开，并放行下一个探测请求
+    clock.now = 11
+    with pytest.raises(ValueError):
+        call_with_retry(_flaky(1, exc=ValueError("bad request"))[0], policy, breaker)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert call_with_retry(_flaky(0)[0], policy, breaker) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_gemini_passes_per_attempt_timeout_to_request(monkeypatch):
+    from src.utils.llm_clients import GeminiClient
+    from src.utils.llm_retry import reset_circuit_breakers
+
+    configs = []
+
+    class FakeModels:
+        def generate_content(self, model, contents, config):
+            configs.append(config)
+            if len(configs) < 2:
+                raise TimeoutError("slow")
+            return type("Response", (), {"text": "ok", "usage_metadata": None})()
+
+    client = GeminiClient.__new__(GeminiClient)
+    client.model = "gemini-test"
+    client.provider_name = "gemini-timeout-test"
+    client.client = type("FakeGenai", (), {"models": FakeModels()})()
+    monkeypatch.setenv("LLM_RETRY_BASE_DELAY", "0")
+    reset_circuit_breakers()
+
+    assert client.get_completion([{"role": "user", "content": "hi"}], timeout=5) == "ok"
+    timeouts = [config["http_options"]["timeout"] for config in configs]
+    # 每次尝试的超时不超过剩余的总时限（毫秒）
+    assert len(timeouts) == 2 and all(0 < t <= 5000 for t in timeouts)
+    assert timeouts[1] <= timeouts[0]
+
+
+def test_async_retry_uses_same_policy():
+    calls = []
+
+    async def func(timeout):
+        calls.append(timeout)
+        if len(calls) < 2:
+            raise TimeoutError("slow")
+        return "ok"
+
+    policy = RetryPolicy(max_attempts=3, deadline=30, base_delay=0, max_delay=0)
+    assert asyncio.run(call_with_retry_async(func, policy)) == "ok"
+    assert len(calls) == 2
+
+
+def test_cancelled_half_open_probe_releases_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=clock)
+    policy = RetryPolicy(max_attempts=1, deadline=30, base_delay=0, max_delay=0)
+    with pytest.raises(EmptyResponseError):
+        call_with_retry(_flaky(1)[0], policy, breaker)
+    clock.now = 11
+
+    async def slow(timeout):
+        await asyncio.sleep(10)
+        return "late"
+
+    async def cancel_probe():
+        # 对冲请求取消落败一方时，半开探测会被取消
+        task = asyncio.ensure_future(call_with_retry_async(slow, policy, breaker))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,89 @@
+import pytest
+
+from src.tools.llm_stub_server import StubConfig, start_in_thread
+from src.tools.openrouter_config import get_chat_completion
+from src.utils.llm_metrics import reset_route_metrics, route_snapshot
+from src.utils.llm_routing import Route, get_route, resolve_model
+
+
+@pytest.fixture(autouse=True)
+def skip_project_env(monkeypatch):
+    # 不加载开发者的 .env，避免请求发往真实 provider
+    from src.tools import openrouter_config
+    monkeypatch.setattr(openrouter_config, "_env_loaded", True)
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server, base_url = start_in_thread(StubConfig(seed=0))
+    yield base_url
+    server.should_exit = True
+
+
+def test_route_table_defaults_and_overrides(monkeypatch):
+    assert get_route("sentiment").tier == "small"
+    assert get_route("unknown") == Route()
+    # 辩论评分的 JSON 回答较长，默认不截断
+    assert get_route("debate_room").max_tokens is None
+    monkeypatch.setenv("LLM_ROUTES", '{"portfolio_management": {"model": "big", "timeout": 30}}')
+    assert get_route("portfolio_management") == Route(model="big", timeout=30)
+    assert get_route("sentiment").tier == "small"
+
+    monkeypatch.delenv("OPENAI_COMPATIBLE_SMALL_MODEL", raising=False)
+    assert resolve_model(get_route("sentiment"), "openai_compatible") is None
+    monkeypatch.setenv("OPENAI_COMPATIBLE_SMALL_MODEL", "small")
+    assert resolve_model(get_route("sentiment"), "openai_compatible") == "small"
+
+
+def test_routes_select_models_and_report_metrics(monkeypatch, stub_url):
+    monkeypatch.setenv("OPENAI_COMPATIBLE_API_KEY", "stub")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_BASE_URL", stub_url)
+    monkeypatch.setenv("OPENAI_COMPATIBLE_MODEL", "large")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_SMALL_MODEL", "small")
+    monkeypatch.setenv("LLM_HEDGING_ENABLED", "false")
+    reset_route_metrics()
+
+    sentiment = [{"role": "user", "content": "请直接返回一个数字"}]
+    decision = [{"role": "system", "content": "You are a portfolio manager"}]
+    assert get_chat_completion(sentiment, use_cache=False, route="sentiment") is not None
+    assert get_chat_completion(decision, use_cache=False, route="portfolio_management") is not None
+
+    routes = route_snapshot()
+    assert routes["sentiment"]["model"] == "small"
+    assert routes["portfolio_management"]["model"] == "large"
+    for route in ("sentiment", "portfolio_management"):
+        assert routes[route]["calls"] == 1
+        assert routes[route]["prompt_tokens"] > 0
+        assert routes[route]["latency"]["count"] == 1
+
+
+def test_cache_key_includes_provider_and_max_tokens_and_skips_invalid_replies(monkeypatch, stub_url):
+    from src.tools import openrouter_config
+    from src.utils.llm_cache import LLMResponseCache
+
+    monkeypatch.setenv("OPENAI_COMPATIBLE_API_KEY", "stub")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_BASE_URL", stub_url)
+    monkeypatch.setenv("OPENAI_COMPATIBLE_MODEL", "large")
+    monkeypatch.setenv("LLM_HEDGING_ENABLED", "false")
+    monkeypatch.setenv("LLM_ROUTES", '{"short": {"max_tokens": 16}, "long": {}}')
+    cache = LLMResponseCache(":memory:")
+    monkeypatch.setattr(openrouter_config, "get_llm_cache", lambda: cache)
+
+    messages = [{"role": "user", "content": "cache key probe"}]
+    get_chat_completion(messages, route="short")
+    get_chat_completion(messages, route="long")
+    # 回答长度限制不同的路由不共享缓存
+    assert cache.misses == 2 and cache.hits == 0
+    get_chat_completion(messages, route="long")
+    assert cache.hits == 1
+
+    # 同名模型、不同 base_url 的 provider 不共享缓存
+    provider, model, params = openrouter_config.get_cache_identity(route="short")
+    assert provider == f"openai_compatible:{stub_url}" and model == "large"
+    assert params == {"max_tokens": 16}
+
+    # 未通过校验的回答不写入缓存
+    other = [{"role": "user", "content": "unparseable probe"}]
+    get_chat_completion(other, route="long", validate=lambda reply: False)
+    get_chat_completion(other, route="long", validate=lambda reply: False)
+    assert cache.hits == 1 and cache.misses == 4
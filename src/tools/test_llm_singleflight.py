@@ -0,0 +1,83 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from src.tools.llm_stub_server import LatencyDistribution, StubConfig, start_in_thread
+from src.tools.openrouter_config import get_chat_completion, get_chat_completion_async
+from src.utils.llm_singleflight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["result"] * 5
+    assert sum(shared for _, shared in results) == 4
+    assert flight.in_flight() == 0
+
+
+def test_leader_error_reaches_waiters_and_key_is_released():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.1)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async("k", failing) for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(run()))
+    assert flight.do("k", lambda: "fresh") == ("fresh", False)
+
+
+@pytest.fixture(autouse=True)
+def skip_project_env(monkeypatch):
+    # 不加载开发者的 .env，避免请求发往真实 provider
+    from src.tools import openrouter_config
+    monkeypatch.setattr(openrouter_config, "_env_loaded", True)
+
+
+@pytest.fixture
+def slow_stub(monkeypatch):
+    server, base_url = start_in_thread(StubConfig(latency=LatencyDistribution("fixed", [0.5])))
+    monkeypatch.setenv("OPENAI_COMPATIBLE_API_KEY", "stub")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_BASE_URL", base_url)
+    monkeypatch.setenv("OPENAI_COMPATIBLE_MODEL", "stub-model")
+    monkeypatch.setenv("LLM_HEDGING_ENABLED", "false")
+    yield server.config.app.state.stub
+    server.should_exit = True
+
+
+def test_identical_in_flight_prompts_send_one_upstream_request(slow_stub):
+    messages = [{"role": "user", "content": "请直接返回一个数字"}]
+
+    async def many():
+        return await asyncio.gather(*(
+            get_chat_completion_async(messages, use_cache=False) for _ in range(5)))
+
+    results = asyncio.run(many())
+    # 同步调用方与另一个事件循环中的调用同时进行，也共享同一个请求
+    thread = threading.Thread(target=lambda: results.append(
+        get_chat_completion(messages, use_cache=False)))
+    thread.start()
+    results.append(asyncio.run(get_chat_completion_async(messages, use_cache=False)))
+    thread.join()
+
+    assert len(set(results)) <= 2 and None not in results
+    assert slow_stub.stats()["calls"]["sentiment"] == 2
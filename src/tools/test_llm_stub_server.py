@@ -0,0 +1,54 @@
+import random
+
+from fastapi.testclient import TestClient
+
+from src.agents.debate_room import _parse_llm_analysis
+from src.tools import article_sentiment, news_crawler
+from src.tools.llm_stub_server import (
+    LatencyDistribution, StubConfig, canned_response, classify_prompt, create_app)
+
+
+def _reply(messages):
+    agent = classify_prompt(messages)
+    return agent, canned_response(agent, messages, random.Random(0))
+
+
+def test_canned_responses_parse_with_agent_parsers():
+    agent, reply = _reply(news_crawler._sentiment_messages(
+        [{"title": "t", "source": "s", "publish_time": "", "content": "c"}], 1))
+    assert agent == "sentiment"
+    assert -1 <= news_crawler._parse_sentiment_score(reply) <= 1
+
+    pending = {"a": {"title": "t1", "content": "c"}, "b": {"title": "t2", "content": "c"}}
+    agent, reply = _reply(article_sentiment._scoring_messages(pending))
+    assert agent == "article_sentiment"
+    assert set(article_sentiment._parse_scores(reply, 2)) == {1, 2}
+
+    agent, reply = _reply(news_crawler._batch_sentiment_messages(
+        [("600000", "### 股票 600000\n\nx"), ("600001", "### 股票 600001\n\ny")]))
+    assert agent == "sentiment_batch"
+    assert set(news_crawler._parse_batch_scores(reply, ["600000", "600001"])) == {"600000", "600001"}
+
+    agent, reply = _reply([{"role": "user", "content": '请提供 JSON: {"analysis": "", "score": 0.5}'}])
+    assert agent == "debate_room"
+    assert _parse_llm_analysis(reply)[0]["reasoning"]
+
+
+def test_server_returns_openai_schema_and_injected_errors():
+    client = TestClient(create_app(StubConfig(seed=1)))
+    response = client.post("/v1/chat/completions", json={
+        "model": "m", "messages": [{"role": "system", "content": "You are a portfolio manager"}]})
+    assert response.status_code == 200
+    assert '"action"' in response.json()["choices"][0]["message"]["content"]
+
+    failing = TestClient(create_app(StubConfig(error_rate=1.0, error_statuses=[503])))
+    assert failing.post("/v1/chat/completions", json={"messages": []}).status_code == 503
+    assert failing.get("/stats").json()["errors"] == {"generic": 1}
+
+
+def test_latency_distributions():
+    rng = random.Random(0)
+    assert LatencyDistribution.parse("fixed:0.2").sample(rng) == 0.2
+    assert 1 <= LatencyDistribution.parse("uniform:1,2").sample(rng) <= 2
+    samples = sorted(LatencyDistribution.parse("lognormal:1,0.5").sample(rng) for _ in range(1000))
+    assert 0.8 < samples[500] < 1.2 and samples[990] > 2
@@ -0,0 +1,58 @@
+import asyncio
+
+from src.agents import macro_news_agent as agent
+
+
+def _news(i):
+    return {"title": f"新闻{i}", "content": f"内容{i}", "publish_time": f"2024-01-01 {i // 60:02d}:{i % 60:02d}:00"}
+
+
+def test_new_articles_only_change_the_last_chunk():
+    news = [_news(i) for i in range(100)]
+    before = agent._chunk_news(news, chunk_size=10)
+    after = agent._chunk_news(news + [_news(100), _news(101)], chunk_size=10)
+    assert len(before) > 1
+    assert all(len(chunk) <= 20 for chunk in before)
+    assert after[:len(before) - 1] == before[:-1]
+
+
+def test_map_reduce_summarizes_chunks_then_reduces(monkeypatch):
+    prompts = []
+
+    def fake_completion(messages, **kwargs):
+        prompts.append(messages[0]["content"])
+        return f"要点{len(prompts)}"
+
+    async def fake_completion_async(messages, **kwargs):
+        return fake_completion(messages)
+
+    monkeypatch.setattr(agent, "get_chat_completion", fake_completion)
+    monkeypatch.setattr(agent, "get_chat_completion_async", fake_completion_async)
+    chunks = agent._chunk_news([_news(i) for i in range(60)], chunk_size=10)
+
+    assert agent._map_reduce_summary("macro_news_agent", chunks) == f"要点{len(chunks) + 1}"
+    # 最后一次调用是合并阶段，包含所有分块的要点
+    assert all(f"要点{i}" in prompts[-1] for i in range(1, len(chunks) + 1))
+
+    prompts.clear()
+    asyncio.run(agent._map_reduce_summary_async("macro_news_agent", chunks))
+    assert len(prompts) == len(chunks) + 1
+
+
+def test_auto_mode_splits_only_when_news_exceed_token_budget(monkeypatch):
+    monkeypatch.setenv("MACRO_NEWS_SUMMARY_MODE", "auto")
+    monkeypatch.setattr(agent, "count_tokens", lambda text, **kwargs: len(text))
+    news = [_news(i) for i in range(60)]
+    chunks = agent._chunk_news(news, chunk_size=10)
+    assert len(chunks) > 1
+
+    # 多个分块但全部新闻在预算内：单次调用
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET_MACRO_NEWS", "1000000")
+    assert not agent._use_map_reduce(news, chunks)
+    # 超出预算：分块总结，避免单次调用丢弃新闻
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET_MACRO_NEWS", "100")
+    assert agent._use_map_reduce(news, chunks)
+    assert not agent._use_map_reduce(news[:1], chunks[:1])
+
+    monkeypatch.setenv("MACRO_NEWS_SUMMARY_MODE", "single")
+    assert not agent._use_map_reduce(news, chunks)
@@ -0,0 +1,72 @@
+import pytest
+
+from src.crawler.rate_limit import TokenBucket
+from src.crawler.results import merge_results
+from src.crawler.search_types import SearchOptions, SearchResponse, SearchResult
+from src.tools.news_crawler import NEWS_SITES, _search_date_windows, build_search_queries
+
+
+def test_date_windows_split_the_week_before_the_end_date():
+    assert _search_date_windows("2024-06-10", windows=2) == [
+        ("2024-06-03", "2024-06-07"), ("2024-06-07", "2024-06-10")]
+    assert _search_date_windows("2024-06-10", windows=1) == [("2024-06-03", "2024-06-10")]
+    assert _search_date_windows(None) == [(None, None)]
+    assert _search_date_windows("20240610") == [(None, None)]
+
+
+def test_query_plan_covers_every_ticker_site_and_window():
+    plan = build_search_queries(["300059", "600519"], "2024-06-10", windows=2)
+
+    assert len(plan) == 2 * len(NEWS_SITES) * 2
+    assert len({query for _, query in plan}) == len(plan)
+    assert plan[0] == ("300059", "300059 股票 新闻 财经 after:2024-06-03 before:2024-06-07 site:sina.com.cn")
+    assert all(query.startswith(symbol) and " OR " not in query for symbol, query in plan)
+
+
+def test_token_bucket_spaces_out_requests_after_the_burst():
+    bucket = TokenBucket(rate=2, capacity=2)
+    delays = [bucket.reserve() for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.5, abs=0.05)
+    assert delays[3] == pytest.approx(1.0, abs=0.05)
+    assert TokenBucket(rate=0, capacity=1).reserve() == 0.0
+
+
+def test_merge_results_dedupes_links_and_titles_and_skips_failures():
+    first = SearchResponse("a", [
+        SearchResult("东方财富发布公告", "https://www.eastmoney.com/a/1.html?utm_source=x", ""),
+        SearchResult("搜索失败", "", "无法完成搜索"),
+    ])
+    second = SearchResponse("b", [
+        SearchResult("另一个标题", "http://eastmoney.com/a/1.html/", ""),
+        SearchResult("东方财富发布公告", "https://finance.sina.com.cn/b.html", ""),
+        SearchResult("新浪财经快讯", "https://finance.sina.com.cn/c.html", ""),
+    ])
+
+    merged = merge_results([first, second])
+    assert [r.title for r in merged] == ["东方财富发布公告", "新浪财经快讯"]
+
+
+def test_multi_search_honours_disabled_browser_pool(monkeypatch, tmp_path):
+    pytest.importorskip("playwright")
+    from src.crawler import browser_pool, multi_search
+
+    searched = []
+
+    async def fake_google_search(query, options=None):
+        searched.append(query)
+        return SearchResponse(query, [SearchResult(query, f"https://example.com/{len(searched)}", "")])
+
+    def no_pool(options=None):
+        raise AssertionError("浏览器池已关闭，不应创建")
+
+    monkeypatch.setenv("SEARCH_BROWSER_POOL_ENABLED", "false")
+    monkeypatch.setattr(multi_search, "google_search", fake_google_search)
+    monkeypatch.setattr(browser_pool, "get_browser_pool", no_pool)
+
+    options = SearchOptions(state_file=str(tmp_path / "browser-state.json"), google_domain="https://g.test")
+    response = multi_search.google_search_many_sync(["a", "b", "c"], options, concurrency=2)
+
+    assert sorted(searched) == ["a", "b", "c"]
+    assert [r.query for r in response.responses] == ["a", "b", "c"]
+    assert len(response.results) == 3
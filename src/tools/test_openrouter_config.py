@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+# 项目根目录
+project_root = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+
+# 导入时不应加载的 SDK 模块
+SDK_MODULES = ["openai", "google.genai", "httpx", "dotenv"]
+
+_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {sdk!r} if m in sys.modules]}}))
+"""
+
+
+def _run_probe(module: str, env_overrides=None) -> dict:
+    """在全新的解释器中导入 module，返回导入耗时和已加载的 SDK 模块"""
+    env = {k: v for k, v in os.environ.items()
+           if not k.startswith(("GEMINI_", "OPENAI_COMPATIBLE_"))}
+    env["PYTHONPATH"] = project_root
+    env.update(env_overrides or {})
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, sdk=SDK_MODULES)],
+        cwd=project_root, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_is_lazy_and_does_not_require_api_keys():
+    # 未配置任何 API Key 时也能导入，且不加载 SDK、不创建客户端
+    result = _run_probe("src.tools.openrouter_config")
+    assert result["loaded"] == []
+
+
+def test_lazy_env_load_does_not_override_existing_variables(tmp_path, monkeypatch):
+    from src.tools import openrouter_config
+
+    env_file = tmp_path / ".env"
+    env_file.write_text("OPENAI_COMPATIBLE_BASE_URL=http://from-dotenv\nLLM_TEST_ONLY_IN_DOTENV=1\n")
+    monkeypatch.setattr(openrouter_config, "env_path", str(env_file))
+    monkeypatch.setattr(openrouter_config, "_env_loaded", False)
+    monkeypatch.setenv("OPENAI_COMPATIBLE_BASE_URL", "http://set-by-test")
+    monkeypatch.delenv("LLM_TEST_ONLY_IN_DOTENV", raising=False)
+
+    openrouter_config.load_project_env()
+    assert os.environ["OPENAI_COMPATIBLE_BASE_URL"] == "http://set-by-test"
+    assert os.environ["LLM_TEST_ONLY_IN_DOTENV"] == "1"
+    monkeypatch.delenv("LLM_TEST_ONLY_IN_DOTENV")
+
+
+def benchmark_import_time(runs: int = 5) -> dict:
+    """比较导入 openrouter_config 与导入各 provider SDK 的耗时（秒，中位数）"""
+    targets = {
+        "src.tools.openrouter_config": "src.tools.openrouter_config",
+        "openai SDK": "openai",
+        "google-genai SDK": "google.genai",
+    }
+    return {
+        name: statistics.median(_run_probe(module)["seconds"] for _ in range(runs))
+        for name, module in targets.items()
+    }
+
+
+if __name__ == "__main__":
+    for name, seconds in benchmark_import_time().items():
+        print(f"{name:<32} {seconds * 1000:8.1f} ms")
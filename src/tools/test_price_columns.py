@@ -0,0 +1,36 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tools.api import prices_to_df
+from src.tools.price_columns import PriceColumns
+
+
+def make_prices():
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=3, freq="B"),
+        "close": [10.0, np.nan, 10.5],
+        "volume": [100, 200, 300],
+    })
+
+
+def test_dataframe_view_shares_memory_and_is_read_only():
+    columns = PriceColumns.from_dataframe(make_prices())
+    df = prices_to_df(columns)
+
+    assert np.shares_memory(df["close"].to_numpy(), columns["close"])
+    with pytest.raises(ValueError):
+        df.loc[0, "close"] = 1.0
+
+    # 新增列不受只读限制
+    df["ma"] = df["close"].rolling(2).mean()
+    assert "ma" not in columns
+
+
+def test_to_dict_is_json_records():
+    records = PriceColumns.from_dataframe(make_prices()).to_dict()
+    assert records[0] == {"date": "2024-01-01T00:00:00", "close": 10.0, "volume": 100}
+    assert records[1]["close"] is None
+    json.dumps(records)
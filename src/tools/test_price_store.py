@@ -0,0 +1,175 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.tools.price_store import PriceHistoryStore
+
+
+class FakeFetcher:
+    """按工作日生成日线，close 为日序号乘以复权因子，记录每次请求的区间"""
+
+    def __init__(self, factor: float = 1.0):
+        self.factor = factor
+        self.calls = []
+        # 模拟数据源临时返回空数据，或只发布到某一天
+        self.empty = False
+        self.published_until = None
+
+    def __call__(self, symbol, start, end, adjust):
+        self.calls.append((start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+        if self.empty:
+            return pd.DataFrame()
+        if self.published_until is not None:
+            end = min(end, self.published_until)
+        dates = pd.bdate_range(start, end)
+        close = [(d - pd.Timestamp("2024-01-01")).days * self.factor for d in dates]
+        return pd.DataFrame({"date": dates, "close": close})
+
+
+def make_store(tmp_path, fetcher):
+    return PriceHistoryStore(fetcher, root=str(tmp_path), enabled=True)
+
+
+def read_meta(tmp_path, name="600519_qfq"):
+    with open(tmp_path / f"{name}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_covered_range_is_served_from_disk(tmp_path):
+    fetcher = FakeFetcher()
+    store = make_store(tmp_path, fetcher)
+
+    first = store.get_history("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+    second = store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 15, 15, 30))
+
+    assert fetcher.calls == [("2024-03-01", "2024-03-29")]
+    assert len(first) == 21
+    assert second["date"].min() == pd.Timestamp("2024-03-04")
+    assert second["date"].max() == pd.Timestamp("2024-03-15")
+    meta = read_meta(tmp_path)
+    assert (meta["start"], meta["end"], meta["rows"]) == ("2024-03-01", "2024-03-29", 21)
+    assert (meta["symbol"], meta["adjust"]) == ("600519", "qfq")
+
+
+def test_only_missing_head_and_tail_are_fetched(tmp_path):
+    fetcher = FakeFetcher()
+    store = make_store(tmp_path, fetcher)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 15))
+
+    df = store.get_history("600519", datetime(2024, 2, 26), datetime(2024, 3, 22))
+
+    # 头部取到本地第一根 K 线、尾部从本地最后一根 K 线开始，各多取一根用于比对
+    assert fetcher.calls == [("2024-03-04", "2024-03-15"),
+                             ("2024-02-26", "2024-03-04"),
+                             ("2024-03-15", "2024-03-22")]
+    assert len(df) == 20
+    assert df["date"].is_monotonic_increasing and df["date"].is_unique
+    meta = read_meta(tmp_path)
+    assert (meta["start"], meta["end"], meta["rows"]) == ("2024-02-26", "2024-03-22", 20)
+
+    store.get_history("600519", datetime(2024, 2, 26), datetime(2024, 3, 22))
+    assert len(fetcher.calls) == 3
+
+
+def test_changed_adjustment_rebuilds_the_whole_range(tmp_path):
+    fetcher = FakeFetcher()
+    store = make_store(tmp_path, fetcher)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 15))
+
+    # 分红送转后前复权价格整体变化，重叠 K 线的收盘价与本地不一致
+    fetcher.factor = 0.5
+    df = store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 22))
+
+    assert fetcher.calls[1:] == [("2024-03-15", "2024-03-22"), ("2024-03-04", "2024-03-22")]
+    expected = [(d - pd.Timestamp("2024-01-01")).days * 0.5 for d in df["date"]]
+    assert df["close"].tolist() == expected
+    meta = read_meta(tmp_path)
+    assert (meta["start"], meta["end"], meta["rows"]) == ("2024-03-04", "2024-03-22", 15)
+
+
+def test_adjust_types_are_stored_separately(tmp_path):
+    fetcher = FakeFetcher()
+    store = make_store(tmp_path, fetcher)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 8))
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 8), adjust="")
+
+    assert len(fetcher.calls) == 2
+    assert read_meta(tmp_path, "600519_none")["adjust"] == ""
+
+
+def test_disabled_store_always_fetches(tmp_path):
+    fetcher = FakeFetcher()
+    store = PriceHistoryStore(fetcher, root=str(tmp_path), enabled=False)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 8))
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 8))
+
+    assert len(fetcher.calls) == 2
+    assert not list(tmp_path.iterdir())
+
+
+def test_empty_or_unpublished_tail_is_not_recorded_as_covered(tmp_path):
+    fetcher = FakeFetcher()
+    store = make_store(tmp_path, fetcher)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 15))
+
+    # 数据源临时返回空数据：覆盖区间不变，下次请求重新获取尾部
+    fetcher.empty = True
+    df = store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 22))
+    assert df["date"].max() == pd.Timestamp("2024-03-15")
+    assert read_meta(tmp_path)["end"] == "2024-03-15"
+
+    # 只发布到 3 月 20 日：覆盖区间只延伸到实际取到的最后一根 K 线
+    fetcher.empty = False
+    fetcher.published_until = datetime(2024, 3, 20)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 22))
+    assert read_meta(tmp_path)["end"] == "2024-03-20"
+
+    fetcher.published_until = None
+    df = store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 22))
+    assert fetcher.calls[-1] == ("2024-03-20", "2024-03-22")
+    assert df["date"].max() == pd.Timestamp("2024-03-22")
+    assert read_meta(tmp_path)["end"] == "2024-03-22"
+
+
+def test_empty_head_is_not_recorded_as_covered(tmp_path):
+    fetcher = FakeFetcher()
+    store = make_store(tmp_path, fetcher)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 15))
+
+    fetcher.empty = True
+    store.get_history("600519", datetime(2024, 2, 26), datetime(2024, 3, 15))
+    assert read_meta(tmp_path)["start"] == "2024-03-04"
+
+    fetcher.empty = False
+    df = store.get_history("600519", datetime(2024, 2, 26), datetime(2024, 3, 15))
+    assert fetcher.calls[-1] == ("2024-02-26", "2024-03-04")
+    assert df["date"].min() == pd.Timestamp("2024-02-26")
+    assert read_meta(tmp_path)["start"] == "2024-02-26"
+
+
+def test_failed_rebuild_keeps_the_stored_history(tmp_path):
+    fetcher = FakeFetcher()
+    store = make_store(tmp_path, fetcher)
+    store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 15))
+
+    class RebuildFails(FakeFetcher):
+        def __call__(self, symbol, start, end, adjust):
+            # 尾部增量返回变化后的价格，触发重建；重建请求返回空数据
+            if self.calls:
+                self.calls.append((start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+                return pd.DataFrame()
+            return super().__call__(symbol, start, end, adjust)
+
+    failing = RebuildFails(factor=0.5)
+    store._fetcher = failing
+    df = store.get_history("600519", datetime(2024, 3, 4), datetime(2024, 3, 22))
+
+    assert failing.calls == [("2024-03-15", "2024-03-22"), ("2024-03-04", "2024-03-22")]
+    assert len(df) == 10
+    assert df["close"].tolist() == [(d - pd.Timestamp("2024-01-01")).days for d in df["date"]]
+    meta = read_meta(tmp_path)
+    assert (meta["start"], meta["end"], meta["rows"]) == ("2024-03-04", "2024-03-15", 10)
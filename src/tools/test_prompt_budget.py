@@ -0,0 +1,81 @@
+import json
+
+from src.utils.prompt_budget import (
+    build_item_list, compact_json, compact_json_text, count_tokens, fit_sections,
+    truncate_to_tokens)
+
+PROVIDER = "gemini"
+
+
+def _news(i, content):
+    return {"title": f"新闻{i}", "content": content, "publish_time": f"2024-01-{i:02d} 10:00:00"}
+
+
+def test_count_and_truncate():
+    text = "沪深300指数今日上涨" * 50
+    assert count_tokens("上涨" * 10, PROVIDER) == 20
+    assert count_tokens("a" * 40, PROVIDER) == 10
+    shortened = truncate_to_tokens(text, 20, PROVIDER)
+    assert count_tokens(shortened, PROVIDER) <= 20
+    assert shortened.endswith("…")
+    assert truncate_to_tokens("short", 20, PROVIDER) == "short"
+
+
+def test_compact_json_is_smaller_and_equivalent():
+    data = [_news(1, "央行宣布降准"), _news(2, "Quarterly GDP grew 5%")]
+    pretty = json.dumps(data, ensure_ascii=False, indent=2)
+    assert json.loads(compact_json(data)) == data
+    assert count_tokens(compact_json(data), PROVIDER) < count_tokens(pretty, PROVIDER)
+    assert compact_json_text(pretty) == compact_json(data)
+    assert compact_json_text("不是JSON") == "不是JSON"
+
+
+def test_item_list_keeps_newest_items_within_budget_in_original_order():
+    items = [_news(i, "内容" * 200) for i in range(1, 11)]
+    text, stats = build_item_list(
+        "macro_news", items, render=compact_json, separator=",", budget=400,
+        max_item_tokens=100, priority=lambda news: news["publish_time"], provider=PROVIDER)
+    kept = json.loads(f"[{text}]")
+    assert stats.final_tokens <= 400
+    assert 0 < stats.items_kept < 10
+    assert stats.items_truncated > 0
+    assert stats.tokens_saved > 0
+    # 保留的是最新的新闻，且保持原始顺序
+    assert [news["title"] for news in kept] == [f"新闻{i}" for i in range(11 - len(kept), 11)]
+
+
+def test_fit_sections_truncates_only_long_sections():
+    sections = {"short": "信号：看多", "long": "理由" * 1000}
+    result, stats = fit_sections("portfolio_management", sections, budget=200, provider=PROVIDER)
+    assert result["short"] == sections["short"]
+    assert stats.final_tokens <= 200
+    assert stats.items_truncated == 1
+
+
+def test_routed_model_selects_the_tokenizer(monkeypatch):
+    from src.utils import prompt_budget
+
+    requested = []
+
+    class FakeEncoding:
+        def encode(self, text):
+            return list(text)
+
+    class FakeTiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            requested.append(model)
+            return FakeEncoding()
+
+    monkeypatch.setattr(prompt_budget, "tiktoken", FakeTiktoken)
+    monkeypatch.setattr(prompt_budget, "_encodings", {})
+    monkeypatch.setenv("OPENAI_COMPATIBLE_MODEL", "big-model")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_SMALL_MODEL", "small-model")
+    monkeypatch.delenv("LLM_ROUTES", raising=False)
+
+    # sentiment 路由使用小模型，按小模型的编码计数
+    model = prompt_budget.routed_model("sentiment", "openai_compatible")
+    assert model == "small-model"
+    assert prompt_budget.count_tokens("abc", "openai_compatible", model) == 3
+    assert prompt_budget.count_tokens("abc", "openai_compatible") == 3
+    assert requested == ["small-model", "big-model"]
@@ -0,0 +1,38 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.crawler.fixture_server import FixtureConfig, create_app
+
+
+def test_results_page_matches_extractor_selectors():
+    client = TestClient(create_app(FixtureConfig(results=7, images=3, asset_latency=0)))
+    html = client.get("/search", params={"q": "300059 新闻"}).text
+
+    assert 'id="search"' in html and 'id="rso"' in html
+    assert len(re.findall(r'<div data-hveid="[^"]+"><a href="https?://[^"]+"><h3>', html)) == 7
+    assert html.count('class="VwiC3b"') == 7
+    assert "300059 新闻" in html
+    # 图片、字体、样式和跟踪请求都会被页面引用
+    assert len(re.findall(r'<img src="/assets/', html)) == 7 + 3
+    assert "/assets/font.woff2" in html and "/assets/style.css" in html and "/gen_204" in html
+
+
+def test_assets_are_counted_and_served():
+    client = TestClient(create_app(FixtureConfig(asset_latency=0)))
+    assert client.get("/assets/image-0.png").headers["content-type"] == "image/png"
+    assert client.get("/gen_204", params={"ev": "load"}).status_code == 204
+    client.get("/")
+    assert client.get("/stats").json() == {"asset": 1, "tracker": 1, "document": 1}
+
+
+def test_fast_mode_blocks_subresources_and_keeps_results():
+    pytest.importorskip("playwright")
+    from src.crawler.fixture_server import benchmark
+
+    report = benchmark(FixtureConfig(results=5, images=5, asset_latency=0.05),
+                       queries=2, concurrency=1)
+    assert report["full"]["results"] == report["fast"]["results"] == 10
+    assert report["fast"]["blocked_requests"] > 0
+    assert report["fast"]["server"].get("asset", 0) < report["full"]["server"]["asset"]
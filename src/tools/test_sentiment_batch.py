@@ -0,0 +1,54 @@
+import re
+import json
+import asyncio
+
+from src.tools import news_crawler
+
+
+def _news(ticker, i):
+    return {"title": f"{ticker}新闻{i}", "source": "test", "content": "内容" * 50,
+            "publish_time": f"2024-01-0{i + 1} 09:30:00"}
+
+
+def _fake_llm(requests):
+    def fake_completion(messages, **kwargs):
+        tickers = re.findall(r"### 股票 (\d+)", messages[-1]["content"])
+        requests.append(tickers)
+        return json.dumps([{"ticker": t, "score": int(t) % 3 / 2 - 0.5} for t in tickers])
+
+    async def fake_completion_async(messages, **kwargs):
+        return fake_completion(messages)
+    return fake_completion, fake_completion_async
+
+
+def test_combined_batch_packs_tickers_and_splits_over_budget(monkeypatch):
+    requests = []
+    sync_fake, async_fake = _fake_llm(requests)
+    monkeypatch.setenv("SENTIMENT_SCORING_MODE", "combined")
+    monkeypatch.setattr(news_crawler, "get_chat_completion", sync_fake)
+    monkeypatch.setattr(news_crawler, "get_chat_completion_async", async_fake)
+    news_by_ticker = {t: [_news(t, i) for i in range(3)] for t in ["600000", "600001", "600002"]}
+    news_by_ticker["600003"] = []
+
+    scores = news_crawler.get_news_sentiment_batch(news_by_ticker, num_of_news=3)
+    assert requests == [["600000", "600001", "600002"]]
+    assert scores == {"600000": -0.5, "600001": 0.0, "600002": 0.5, "600003": 0.0}
+
+    # 预算只够放下一只股票时，每只股票单独成批
+    requests.clear()
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET_SENTIMENT_BATCH", "10")
+    assert asyncio.run(news_crawler.get_news_sentiment_batch_async(
+        news_by_ticker, num_of_news=3)) == scores
+    assert sorted(requests) == [["600000"], ["600001"], ["600002"]]
+
+
+def test_batch_parse_ignores_unknown_and_invalid_entries():
+    result = 'x [{"ticker": "1", "score": 3}, {"ticker": "9", "score": 0}, {"ticker": "2"}] y'
+    assert news_crawler._parse_batch_scores(result, ["1", "2"]) == {"1": 1.0}
+
+
+def test_combined_scoring_is_the_default(monkeypatch):
+    monkeypatch.delenv("SENTIMENT_SCORING_MODE", raising=False)
+    assert not news_crawler._per_article_mode()
+    monkeypatch.setenv("SENTIMENT_SCORING_MODE", "per_article")
+    assert news_crawler._per_article_mode()
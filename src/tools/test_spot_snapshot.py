@@ -0,0 +1,121 @@
+import threading
+from types import SimpleNamespace
+
+import pandas as pd
+
+from src.tools import spot_snapshot
+from src.tools.spot_snapshot import SpotSnapshotCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("spot api down")
+        return pd.DataFrame({"代码": ["600519", "000001", "600519"],
+                             "最新价": [1500.0 + self.calls, 10.0, 0.0]})
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(spot_snapshot, "time", SimpleNamespace(monotonic=clock))
+    fetcher = FakeFetcher()
+    cache = SpotSnapshotCache(ttl=60, fetcher=fetcher, retry_backoff=10, max_stale=300, **kwargs)
+    return cache, fetcher, clock
+
+
+def test_rows_are_indexed_and_shared_within_ttl(monkeypatch):
+    cache, fetcher, clock = make_cache(monkeypatch)
+
+    assert cache.get_row("600519")["最新价"] == 1501.0
+    assert cache.get_row(1) is None
+    clock.now += 59
+    assert cache.get_row("000001")["最新价"] == 10.0
+    assert fetcher.calls == 1
+
+    clock.now += 2
+    assert cache.get_row("600519")["最新价"] == 1502.0
+    assert fetcher.calls == 2
+
+
+def test_failed_refresh_backs_off_and_serves_stale_rows(monkeypatch):
+    cache, fetcher, clock = make_cache(monkeypatch)
+    cache.get_snapshot()
+    fetcher.fail = True
+
+    clock.now += 61
+    assert cache.get_row("600519")["最新价"] == 1501.0
+    clock.now += 9
+    assert cache.get_row("600519")["最新价"] == 1501.0
+    # 退避期内不再重试
+    assert fetcher.calls == 2
+
+    clock.now += 2
+    cache.get_row("600519")
+    assert fetcher.calls == 3
+
+    fetcher.fail = False
+    clock.now += 10
+    assert cache.get_row("600519")["最新价"] == 1504.0
+
+
+def test_stale_snapshot_expires_after_max_stale(monkeypatch):
+    cache, fetcher, clock = make_cache(monkeypatch)
+    cache.get_snapshot()
+    fetcher.fail = True
+
+    clock.now += 301
+    assert cache.get_snapshot() is None
+    assert cache.get_row("600519") is None
+    assert fetcher.calls == 2
+
+
+def test_invalidate_forces_refresh_even_during_backoff(monkeypatch):
+    cache, fetcher, clock = make_cache(monkeypatch)
+    cache.get_snapshot()
+    fetcher.fail = True
+    clock.now += 61
+    cache.get_snapshot()
+
+    fetcher.fail = False
+    cache.invalidate()
+    assert cache.get_row("600519")["最新价"] == 1503.0
+    assert cache.stats()["records"] == 3
+
+
+def test_concurrent_refresh_downloads_once():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_fetcher():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return pd.DataFrame({"代码": ["600519"], "最新价": [1500.0]})
+
+    cache = SpotSnapshotCache(ttl=60, fetcher=slow_fetcher)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_row("600519")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert [row["最新价"] for row in results] == [1500.0] * 4
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from src.agents.technicals import (
+    STRATEGY_WEIGHTS,
+    calculate_adx,
+    calculate_mean_reversion_signals,
+    calculate_momentum_signals,
+    calculate_obv,
+    calculate_panel_signals,
+    calculate_stat_arb_signals,
+    calculate_trend_signals,
+    calculate_volatility_signals,
+    weighted_signal_combination,
+)
+
+
+def legacy_calculate_obv(prices_df):
+    """原先逐行 iloc 的 OBV 实现，用于等价性对比"""
+    obv = [0]
+    for i in range(1, len(prices_df)):
+        if prices_df['close'].iloc[i] > prices_df['close'].iloc[i - 1]:
+            obv.append(obv[-1] + prices_df['volume'].iloc[i])
+        elif prices_df['close'].iloc[i] < prices_df['close'].iloc[i - 1]:
+            obv.append(obv[-1] - prices_df['volume'].iloc[i])
+        else:
+            obv.append(obv[-1])
+    prices_df['OBV'] = obv
+    return prices_df['OBV']
+
+
+def legacy_calculate_adx(df, period=14):
+    """原先原地添加中间列的 ADX 实现，用于等价性对比"""
+    df['high_low'] = df['high'] - df['low']
+    df['high_close'] = abs(df['high'] - df['close'].shift())
+    df['low_close'] = abs(df['low'] - df['close'].shift())
+    df['tr'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
+    df['up_move'] = df['high'] - df['high'].shift()
+    df['down_move'] = df['low'].shift() - df['low']
+    df['plus_dm'] = np.where(
+        (df['up_move'] > df['down_move']) & (df['up_move'] > 0), df['up_move'], 0)
+    df['minus_dm'] = np.where(
+        (df['down_move'] > df['up_move']) & (df['down_move'] > 0), df['down_move'], 0)
+    df['+di'] = 100 * (df['plus_dm'].ewm(span=period).mean() /
+                       df['tr'].ewm(span=period).mean())
+    df['-di'] = 100 * (df['minus_dm'].ewm(span=period).mean() /
+                       df['tr'].ewm(span=period).mean())
+    df['dx'] = 100 * abs(df['+di'] - df['-di']) / (df['+di'] + df['-di'])
+    df['adx'] = df['dx'].ewm(span=period).mean()
+    return df[['adx', '+di', '-di']]
+
+
+def make_ohlcv(n, seed, flat_days=10):
+    rng = np.random.default_rng(seed)
+    close = np.round(10 * np.cumprod(1 + rng.normal(0, 0.02, n)), 2)
+    # 平盘日 OBV 不变
+    idx = rng.choice(np.arange(1, n), size=flat_days, replace=False)
+    close[idx] = close[idx - 1]
+    return pd.DataFrame({
+        "open": close * (1 + rng.normal(0, 0.005, n)),
+        "high": close * (1 + rng.uniform(0, 0.03, n)),
+        "low": close * (1 - rng.uniform(0, 0.03, n)),
+        "close": close,
+        "volume": rng.integers(1000, 100000, n).astype(float),
+    })
+
+
+def test_obv_matches_legacy():
+    for seed in range(3):
+        df = make_ohlcv(300, seed)
+        expected = legacy_calculate_obv(df.copy())
+        actual = calculate_obv(df)
+        pd.testing.assert_series_equal(actual, expected, check_dtype=False)
+        # 不再向调用方的 DataFrame 写入 OBV 列
+        assert 'OBV' not in df.columns
+
+
+def test_obv_with_missing_close():
+    df = make_ohlcv(50, 0)
+    df.loc[[5, 6, 20], 'close'] = np.nan
+    pd.testing.assert_series_equal(
+        calculate_obv(df), legacy_calculate_obv(df.copy()), check_dtype=False)
+
+
+def test_adx_matches_legacy_without_mutation():
+    for seed in range(3):
+        df = make_ohlcv(300, seed)
+        columns = list(df.columns)
+        expected = legacy_calculate_adx(df.copy())
+        pd.testing.assert_frame_equal(calculate_adx(df, 14), expected)
+        assert list(df.columns) == columns
+
+
+def test_panel_signals_match_single_ticker():
+    tickers = [f"60000{i}" for i in range(6)]
+    frames = {ticker: make_ohlcv(260, seed) for seed, ticker in enumerate(tickers)}
+    panel = {field: pd.DataFrame({t: frames[t][field] for t in tickers})
+             for field in ("close", "high", "low", "volume")}
+
+    result = calculate_panel_signals(
+        panel["close"], panel["high"], panel["low"], panel["volume"])
+    assert list(result.index) == tickers
+
+    for ticker, df in frames.items():
+        strategies = {
+            'trend': calculate_trend_signals(df),
+            'mean_reversion': calculate_mean_reversion_signals(df),
+            'momentum': calculate_momentum_signals(df),
+            'volatility': calculate_volatility_signals(df),
+            'stat_arb': calculate_stat_arb_signals(df),
+        }
+        row = result.loc[ticker]
+        for name, strategy in strategies.items():
+            assert row[f'{name}_signal'] == strategy['signal']
+            np.testing.assert_allclose(
+                row[f'{name}_confidence'], strategy['confidence'], rtol=1e-9)
+
+        combined = weighted_signal_combination(strategies, STRATEGY_WEIGHTS)
+        assert row['signal'] == combined['signal']
+        np.testing.assert_allclose(row['confidence'], combined['confidence'], rtol=1e-9)
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.dependencies import get_log_storage
+
+
+def _digest(messages) -> str:
+    return hashlib.md5(json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+
+def _fake_reply(messages, route):
+    """按路由返回各 Agent 能解析的回答；回答中带有 prompt 摘要，两条路径的 prompt 不同则最终状态不同"""
+    digest = _digest(messages)
+    if route == "sentiment":
+        return "0.6"
+    if route == "macro_news":
+        return f"宏观新闻总结 {digest}：市场情绪谨慎乐观。"
+    if route == "debate_room":
+        return json.dumps({"analysis": f"辩论分析 {digest}", "score": 0.4, "reasoning": digest})
+    if route == "macro_analyst":
+        return json.dumps({"macro_environment": "positive", "impact_on_stock": "positive",
+                           "key_factors": ["政策支持"], "reasoning": digest}, ensure_ascii=False)
+    if route == "portfolio_management":
+        return json.dumps({"action": "buy", "quantity": 100, "confidence": 0.7,
+                           "agent_signals": [], "reasoning": f"决策 {digest}"}, ensure_ascii=False)
+    raise AssertionError(f"unexpected route {route}")
+
+
+# (同步/异步, 路由)，用于确认 ainvoke 走的是异步实现
+llm_calls = []
+
+
+def fake_chat_completion(messages=None, route=None, **kwargs):
+    llm_calls.append(("sync", route))
+    print(f"[fake-llm {route}]")
+    return _fake_reply(messages, route)
+
+
+async def fake_chat_completion_async(messages=None, route=None, **kwargs):
+    await asyncio.sleep(0)
+    llm_calls.append(("async", route))
+    print(f"[fake-llm {route}]")
+    return _fake_reply(messages, route)
+
+
+def fake_price_history(symbol, start, end, adjust):
+    print("[fake-prices]")
+    dates = pd.bdate_range(start, end)
+    close = 20 + np.sin(np.arange(len(dates)) / 9) * 3 + np.arange(len(dates)) * 0.01
+    return pd.DataFrame({
+        "date": dates, "open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+        "volume": 1e6 + (np.arange(len(dates)) % 7) * 1e4, "amount": close * 1e6,
+        "amplitude": 2.0, "pct_change": 0.1, "change_amount": 0.02, "turnover": 1.0,
+    })
+
+
+def fake_financial_metrics(symbol):
+    return [{"return_on_equity": 0.18, "net_margin": 0.22, "operating_margin": 0.25,
+             "revenue_growth": 0.12, "earnings_growth": 0.1, "book_value_growth": 0.08,
+             "current_ratio": 1.8, "debt_to_equity": 0.4, "free_cash_flow_per_share": 2.0,
+             "earnings_per_share": 2.5, "pe_ratio": 18, "price_to_book": 2.5, "price_to_sales": 3}]
+
+
+def fake_financial_statements(symbol):
+    item = {"net_income": 1e9, "operating_revenue": 5e9, "operating_profit": 1.2e9,
+            "working_capital": 2e9, "depreciation_and_amortization": 2e8,
+            "capital_expenditure": 3e8, "free_cash_flow": 9e8}
+    return [item, {**item, "working_capital": 1.8e9}]
+
+
+def fake_market_data(symbol):
+    return {"market_cap": 2e10, "volume": 1e6, "average_volume": 1e6,
+            "fifty_two_week_high": 25, "fifty_two_week_low": 15}
+
+
+def fake_stock_news(symbol, max_news=10, date=None):
+    print("[fake-stock-news]")
+    # 发布时间需在最近 7 天内，否则会被 Agent 过滤
+    published = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    return [{"title": f"{symbol} 新闻 {i}", "content": f"公司经营正常，第 {i} 条。",
+             "source": "fixture", "url": f"https://example.com/{i}", "publish_time": published}
+            for i in range(3)]
+
+
+def fake_index_news(symbol):
+    print("[fake-index-news]")
+    return pd.DataFrame({"新闻标题": ["指数新闻 1", "指数新闻 2"],
+                         "新闻内容": ["市场平稳。", "政策支持。"],
+                         "发布时间": ["2024-06-03 09:00:00", "2024-06-04 09:00:00"]})
+
+
+@pytest.fixture
+def workflow(monkeypatch, tmp_path):
+    # src.main 在导入时替换 sys.stdout，测试结束后恢复
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    monkeypatch.setattr(sys, "stderr", sys.stderr)
+    main = pytest.importorskip("src.main")
+
+    from src.agents import (debate_room, macro_analyst, macro_news_agent, market_data,
+                            portfolio_manager, sentiment)
+    from src.tools import api, news_crawler
+    from src.tools.price_store import PriceHistoryStore
+
+    monkeypatch.setenv("SENTIMENT_SCORING_MODE", "combined")
+    monkeypatch.setenv("MACRO_NEWS_SUMMARY_MODE", "single")
+    monkeypatch.setattr(api, "_price_store", PriceHistoryStore(fake_price_history, enabled=False))
+    monkeypatch.setattr(market_data, "get_financial_metrics", fake_financial_metrics)
+    monkeypatch.setattr(market_data, "get_financial_statements", fake_financial_statements)
+    monkeypatch.setattr(market_data, "get_market_data", fake_market_data)
+    monkeypatch.setattr(sentiment, "get_stock_news", fake_stock_news)
+    monkeypatch.setattr(macro_analyst, "get_stock_news", fake_stock_news)
+    monkeypatch.setattr(macro_news_agent, "ak", SimpleNamespace(stock_news_em=fake_index_news))
+    llm_calls.clear()
+    for module in (news_crawler, macro_news_agent, macro_analyst, debate_room, portfolio_manager):
+        monkeypatch.setattr(module, "get_chat_completion", fake_chat_completion)
+        monkeypatch.setattr(module, "get_chat_completion_async", fake_chat_completion_async)
+    return main
+
+
+def _initial_state(main, run_id):
+    return main._build_initial_state(
+        run_id, "600519", "2023-06-01", "2024-06-07", {"cash": 100000.0, "stock": 0},
+        show_reasoning=False, num_of_news=5, show_summary=False, indicator_state=None)
+
+
+def _comparable(final_state):
+    messages = [(message.name, message.content) for message in final_state["messages"]]
+    data = {key: value for key, value in final_state["data"].items() if key != "prices"}
+    metadata = {key: value for key, value in final_state["metadata"].items() if key != "run_id"}
+    return messages, json.dumps(data, sort_keys=True, default=str), json.dumps(metadata, sort_keys=True, default=str)
+
+
+def test_ainvoke_matches_invoke_and_attributes_output(workflow, monkeypatch, tmp_path):
+    # 宏观新闻总结按日期缓存到 src/data，两次运行使用各自的工作目录以免第二次命中缓存
+    (tmp_path / "sync").mkdir()
+    (tmp_path / "async").mkdir()
+    monkeypatch.chdir(tmp_path / "sync")
+    sync_state = workflow.app.invoke(_initial_state(workflow, "run-sync"))
+    sync_calls = list(llm_calls)
+    llm_calls.clear()
+    monkeypatch.chdir(tmp_path / "async")
+    async_state = asyncio.run(workflow.app.ainvoke(_initial_state(workflow, "run-async")))
+
+    routes = {"sentiment", "macro_news", "debate_room", "macro_analyst", "portfolio_management"}
+    assert {kind for kind, _ in sync_calls} == {"sync"}
+    assert {kind for kind, _ in llm_calls} == {"async"}
+    assert {route for _, route in sync_calls} == {route for _, route in llm_calls} == routes
+
+    assert json.loads(async_state["messages"][-1].content)["action"] == "buy"
+    assert _comparable(async_state) == _comparable(sync_state)
+
+    # 并发执行的 Agent 各自只捕获自己（及其工作线程）的输出
+    expected = {
+        "market_data": ["[fake-prices]"],
+        "sentiment": ["[fake-stock-news]", "[fake-llm sentiment]"],
+        "macro_news_agent": ["[fake-index-news]", "[fake-llm macro_news]"],
+        "debate_room": ["[fake-llm debate_room]"],
+        "macro_analyst": ["[fake-stock-news]", "[fake-llm macro_analyst]"],
+        "portfolio_management": ["[fake-llm portfolio_management]"],
+    }
+    markers = {marker for values in expected.values() for marker in values}
+    for run_id in ("run-sync", "run-async"):
+        logs = get_log_storage().get_agent_logs(run_id=run_id)
+        outputs = {log.agent_name: "".join(log.terminal_outputs) for log in logs}
+        assert set(expected) <= set(outputs)
+        for agent_name, output in outputs.items():
+            found = {marker for marker in markers if marker in output}
+            assert found == set(expected.get(agent_name, [])), (run_id, agent_name, output)
+
+
+def test_run_hedge_fund_async_returns_the_decision(workflow, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    decision = asyncio.run(workflow.run_hedge_fund_async(
+        "run-async-entry", "600519", "2023-06-01", "2024-06-07", {"cash": 100000.0, "stock": 0}))
+    assert json.loads(decision)["action"] == "buy"
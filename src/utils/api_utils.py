@@ -25,6 +25,7 @@ import uvicorn  # Used in start_api_server
 # import builtins # Unused
 import sys
 import io
+import contextvars
 
 # 导入重构后的模块
 from backend.models.api_models import (
@@ -248,10 +249,194 @@ def log_llm_interaction(state):
     return decorator
 
 
+# 当前执行上下文（线程或 asyncio 任务）中正在捕获输出的 (stdout, stderr, log) 缓冲区
+_capture_buffers: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar(
+    "agent_output_capture", default=None)
+
+
+class _ContextRedirect(io.TextIOBase):
+    """按执行上下文分发输出的 stdout/stderr 代理
+
+    并行或并发（asyncio）执行的多个Agent各自只捕获自己的输出；
+    不在Agent内的输出直接写入原始流。
+    """
+
+    def __init__(self, stream, index: int):
+        self.stream = stream
+        self.index = index
+
+    def write(self, s):
+        buffers = _capture_buffers.get()
+        if buffers is not None:
+            return buffers[self.index].write(s)
+        return self.stream.write(s)
+
+    def flush(self):
+        self.stream.flush()
+
+    # TextIOBase 自带的以下属性和方法会优先于 __getattr__，需要显式转发到原始流
+    @property
+    def encoding(self):
+        return self.stream.encoding
+
+    @property
+    def errors(self):
+        return self.stream.errors
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    def fileno(self):
+        return self.stream.fileno()
+
+    def writable(self):
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def _install_redirects():
+    if not isinstance(sys.stdout, _ContextRedirect):
+        sys.stdout = _ContextRedirect(sys.stdout, 0)
+    if not isinstance(sys.stderr, _ContextRedirect):
+        sys.stderr = _ContextRedirect(sys.stderr, 1)
+
+
+class _AgentRun:
+    """一次Agent执行的记录上下文（输出捕获、计时和输入状态）"""
+
+    def __init__(self, agent_name: str, state):
+        self.agent_name = agent_name
+
+        # 更新Agent状态为运行中
+        api_state.update_agent_state(agent_name, "running")
+
+        # 添加当前agent名称到状态元数据
+        if "metadata" not in state:
+            state["metadata"] = {}
+        state["metadata"]["current_agent_name"] = agent_name
+
+        # 确保run_id在元数据中，这对日志记录至关重要
+        self.run_id = state.get("metadata", {}).get("run_id")
+        # 记录输入状态
+        self.timestamp_start = datetime.now(UTC)
+        self.serialized_input = serialize_agent_state(state)
+        api_state.update_agent_data(
+            agent_name, "input_state", self.serialized_input)
+
+        self.terminal_outputs = []  # Capture terminal output
+
+        # Capture stdout/stderr and logs during agent execution
+        self.redirect_stdout = io.StringIO()
+        self.redirect_stderr = io.StringIO()
+        self.log_stream = io.StringIO()
+        buffers = (self.redirect_stdout, self.redirect_stderr, self.log_stream)
+
+        self.log_handler = logging.StreamHandler(self.log_stream)
+        self.log_handler.setLevel(logging.INFO)
+        # 只记录本次执行上下文产生的日志
+        self.log_handler.addFilter(
+            lambda record: _capture_buffers.get() is buffers)
+        self.root_logger = logging.getLogger()
+        self.root_logger.addHandler(self.log_handler)
+
+        _install_redirects()
+        self._capture_token = _capture_buffers.set(buffers)
+
+    def _stop_capture(self):
+        """停止捕获并收集本次执行的输出"""
+        if self._capture_token is not None:
+            _capture_buffers.reset(self._capture_token)
+            self._capture_token = None
+        self.root_logger.removeHandler(self.log_handler)
+
+        # 获取捕获的输出
+        self.terminal_outputs = []
+        stdout_content = self.redirect_stdout.getvalue()
+        stderr_content = self.redirect_stderr.getvalue()
+        log_content = self.log_stream.getvalue()
+        if stdout_content:
+            self.terminal_outputs.append(stdout_content)
+        if stderr_content:
+            self.terminal_outputs.append(stderr_content)
+        if log_content:
+            self.terminal_outputs.append(log_content)
+
+    def _save_log(self, timestamp_end, output_state, reasoning_details, kind):
+        """添加Agent执行日志到BaseLogStorage"""
+        try:
+            if _has_log_system:
+                log_storage = get_log_storage()
+                if log_storage:
+                    log_entry = AgentExecutionLog(
+                        agent_name=self.agent_name,
+                        run_id=self.run_id,
+                        timestamp_start=self.timestamp_start,
+                        timestamp_end=timestamp_end,
+                        input_state=self.serialized_input,
+                        output_state=output_state,
+                        reasoning_details=reasoning_details,
+                        terminal_outputs=self.terminal_outputs
+                    )
+                    log_storage.add_agent_log(log_entry)
+                    logger.debug(
+                        f"已将Agent{kind}日志保存到存储: {self.agent_name}, run_id: {self.run_id}")
+                else:
+                    logger.warning(
+                        f"无法获取日志存储实例，跳过Agent{kind}日志记录: {self.agent_name}")
+        except Exception as log_err:
+            logger.error(
+                f"保存Agent{kind}日志到存储失败: {self.agent_name}, {str(log_err)}")
+
+    def complete(self, result):
+        """记录成功执行的输出状态和推理细节"""
+        timestamp_end = datetime.now(UTC)
+        self._stop_capture()
+
+        # 序列化输出状态
+        serialized_output = serialize_agent_state(result)
+        api_state.update_agent_data(
+            self.agent_name, "output_state", serialized_output)
+
+        # 从状态中提取推理细节（如果有）
+        reasoning_details = None
+        if result.get("metadata", {}).get("show_reasoning", False):
+            if "agent_reasoning" in result.get("metadata", {}):
+                reasoning_details = result["metadata"]["agent_reasoning"]
+                api_state.update_agent_data(
+                    self.agent_name,
+                    "reasoning",
+                    reasoning_details
+                )
+
+        # 更新Agent状态为已完成
+        api_state.update_agent_state(self.agent_name, "completed")
+        self._save_log(timestamp_end, serialized_output,
+                       reasoning_details, "执行")
+        return result
+
+    def fail(self, exc: Exception):
+        """记录执行错误"""
+        # Record end time even on error
+        timestamp_end = datetime.now(UTC)
+        error = str(exc)
+        self._stop_capture()
+
+        # 更新Agent状态为错误
+        api_state.update_agent_state(self.agent_name, "error")
+        # 记录错误信息
+        api_state.update_agent_data(self.agent_name, "error", error)
+        self._save_log(timestamp_end, {"error": error}, None, "错误")
+
+
 def agent_endpoint(agent_name: str, description: str = ""):
     """
     为Agent创建API端点的装饰器
 
+    同时支持同步函数和协程函数（async def），后者返回的包装器同样是协程，
+    可直接作为 LangGraph 节点的异步实现。
+
     用法:
     @agent_endpoint("sentiment")
     def sentiment_agent(state: AgentState) -> AgentState:
@@ -264,162 +449,30 @@ def agent_endpoint(agent_name: str, description: str = ""):
         # 初始化此agent的LLM调用跟踪
         _agent_llm_calls[agent_name] = False
 
+        if inspect.iscoroutinefunction(agent_func):
+            @functools.wraps(agent_func)
+            async def async_wrapper(state):
+                run = _AgentRun(agent_name, state)
+                try:
+                    # --- 执行Agent核心逻辑 ---
+                    result = await agent_func(state)
+                    return run.complete(result)
+                except Exception as e:
+                    run.fail(e)
+                    # 重新抛出异常
+                    raise
+
+            return async_wrapper
+
         @functools.wraps(agent_func)
         def wrapper(state):
-            # 更新Agent状态为运行中
-            api_state.update_agent_state(agent_name, "running")
-
-            # 添加当前agent名称到状态元数据
-            if "metadata" not in state:
-                state["metadata"] = {}
-            state["metadata"]["current_agent_name"] = agent_name
-
-            # 确保run_id在元数据中，这对日志记录至关重要
-            run_id = state.get("metadata", {}).get("run_id")
-            # 记录输入状态
-            timestamp_start = datetime.now(UTC)
-            serialized_input = serialize_agent_state(state)
-            api_state.update_agent_data(
-                agent_name, "input_state", serialized_input)
-
-            result = None
-            error = None
-            terminal_outputs = []  # Capture terminal output
-
-            # Capture stdout/stderr and logs during agent execution
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-            log_stream = io.StringIO()
-            log_handler = logging.StreamHandler(log_stream)
-            log_handler.setLevel(logging.INFO)
-            root_logger = logging.getLogger()
-            root_logger.addHandler(log_handler)
-
-            redirect_stdout = io.StringIO()
-            redirect_stderr = io.StringIO()
-            sys.stdout = redirect_stdout
-            sys.stderr = redirect_stderr
-
+            run = _AgentRun(agent_name, state)
             try:
                 # --- 执行Agent核心逻辑 ---
-                # 直接调用原始 agent_func
                 result = agent_func(state)
-                # --------------------------
-
-                timestamp_end = datetime.now(UTC)
-
-                # 恢复标准输出/错误
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
-                root_logger.removeHandler(log_handler)
-
-                # 获取捕获的输出
-                stdout_content = redirect_stdout.getvalue()
-                stderr_content = redirect_stderr.getvalue()
-                log_content = log_stream.getvalue()
-                if stdout_content:
-                    terminal_outputs.append(stdout_content)
-                if stderr_content:
-                    terminal_outputs.append(stderr_content)
-                if log_content:
-                    terminal_outputs.append(log_content)
-
-                # 序列化输出状态
-                serialized_output = serialize_agent_state(result)
-                api_state.update_agent_data(
-                    agent_name, "output_state", serialized_output)
-
-                # 从状态中提取推理细节（如果有）
-                reasoning_details = None
-                if result.get("metadata", {}).get("show_reasoning", False):
-                    if "agent_reasoning" in result.get("metadata", {}):
-                        reasoning_details = result["metadata"]["agent_reasoning"]
-                        api_state.update_agent_data(
-                            agent_name,
-                            "reasoning",
-                            reasoning_details
-                        )
-
-                # 更新Agent状态为已完成
-                api_state.update_agent_state(agent_name, "completed")
-
-                # --- 添加Agent执行日志到BaseLogStorage ---
-                try:
-                    if _has_log_system:
-                        log_storage = get_log_storage()
-                        if log_storage:
-                            log_entry = AgentExecutionLog(
-                                agent_name=agent_name,
-                                run_id=run_id,
-                                timestamp_start=timestamp_start,
-                                timestamp_end=timestamp_end,
-                                input_state=serialized_input,
-                                output_state=serialized_output,
-                                reasoning_details=reasoning_details,
-                                terminal_outputs=terminal_outputs
-                            )
-                            log_storage.add_agent_log(log_entry)
-                            logger.debug(
-                                f"已将Agent执行日志保存到存储: {agent_name}, run_id: {run_id}")
-                        else:
-                            logger.warning(
-                                f"无法获取日志存储实例，跳过Agent执行日志记录: {agent_name}")
-                except Exception as log_err:
-                    logger.error(
-                        f"保存Agent执行日志到存储失败: {agent_name}, {str(log_err)}")
-                # -----------------------------------------
-
-                return result
+                return run.complete(result)
             except Exception as e:
-                # Record end time even on error
-                timestamp_end = datetime.now(UTC)
-                error = str(e)
-                # 恢复标准输出/错误
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
-                root_logger.removeHandler(log_handler)
-                # 获取捕获的输出
-                stdout_content = redirect_stdout.getvalue()
-                stderr_content = redirect_stderr.getvalue()
-                log_content = log_stream.getvalue()
-                if stdout_content:
-                    terminal_outputs.append(stdout_content)
-                if stderr_content:
-                    terminal_outputs.append(stderr_content)
-                if log_content:
-                    terminal_outputs.append(log_content)
-
-                # 更新Agent状态为错误
-                api_state.update_agent_state(agent_name, "error")
-                # 记录错误信息
-                api_state.update_agent_data(agent_name, "error", error)
-
-                # --- 添加错误日志到BaseLogStorage ---
-                try:
-                    if _has_log_system:
-                        log_storage = get_log_storage()
-                        if log_storage:
-                            log_entry = AgentExecutionLog(
-                                agent_name=agent_name,
-                                run_id=run_id,
-                                timestamp_start=timestamp_start,
-                                timestamp_end=timestamp_end,
-                                input_state=serialized_input,
-                                output_state={"error": error},
-                                reasoning_details=None,
-                                terminal_outputs=terminal_outputs
-                            )
-                            log_storage.add_agent_log(log_entry)
-                            logger.debug(
-                                f"已将Agent错误日志保存到存储: {agent_name}, run_id: {run_id}")
-                        else:
-                            logger.warning(
-                                f"无法获取日志存储实例，跳过Agent错误日志记录: {agent_name}")
-                except Exception as log_err:
-                    logger.error(
-                        f"保存Agent错误日志到存储失败: {agent_name}, {str(log_err)}")
-                # --------------------------------------
-
+                run.fail(e)
                 # 重新抛出异常
                 raise
 
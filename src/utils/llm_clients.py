@@ -1,15 +1,50 @@
 import os
 import time
-import backoff
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
 from abc import ABC, abstractmethod
-from dotenv import load_dotenv
-from openai import OpenAI
-from google import genai
 from src.utils.logging_config import setup_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
+from src.utils.llm_retry import (
+    RetryPolicy, EmptyResponseError, call_with_retry, call_with_retry_async,
+    get_circuit_breaker)
+from src.utils.llm_metrics import get_latency_histogram, record_latency, record_token_usage
 
 # 设置日志记录
 logger = setup_logger('llm_clients')
 
+# 每个 OpenAI Compatible 客户端连接池的最大连接数
+DEFAULT_LLM_MAX_CONNECTIONS = 10
+
+
+def _http_limits():
+    import httpx
+    max_connections = int(os.getenv("LLM_MAX_CONNECTIONS",
+                                    DEFAULT_LLM_MAX_CONNECTIONS))
+    return httpx.Limits(max_connections=max_connections,
+                        max_keepalive_connections=max_connections)
+
+
+def _timed_attempt(client, func):
+    """包装单次请求：成功时按 (provider, 模型) 记录本次尝试的耗时，不含重试和退避等待"""
+    def attempt(timeout):
+        start = time.monotonic()
+        result = func(timeout)
+        record_latency(client.provider_name, time.monotonic() - start, client.model)
+        return result
+    return attempt
+
+
+def _timed_attempt_async(client, func):
+    """_timed_attempt 的异步版本，func(timeout) 返回 awaitable"""
+    async def attempt(timeout):
+        start = time.monotonic()
+        result = await func(timeout)
+        record_latency(client.provider_name, time.monotonic() - start, client.model)
+        return result
+    return attempt
+
 
 class LLMClient(ABC):
     """LLM 客户端抽象基类"""
@@ -19,6 +54,18 @@ class LLMClient(ABC):
         """获取模型回答"""
         pass
 
+    async def get_completion_async(self, messages, **kwargs):
+        """异步获取模型回答，默认在线程池中执行同步实现"""
+        return await asyncio.to_thread(self.get_completion, messages, **kwargs)
+
+    def close(self):
+        """释放客户端持有的连接"""
+        pass
+
+    async def aclose(self):
+        """释放客户端持有的异步连接"""
+        self.close()
+
 
 class GeminiClient(LLMClient):
     """Google Gemini API 客户端"""
@@ -26,116 +73,144 @@ class GeminiClient(LLMClient):
     def __init__(self, api_key=None, model=None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         self.model = model or os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        self.provider_name = "gemini"
 
         if not self.api_key:
             logger.error(f"{ERROR_ICON} 未找到 GEMINI_API_KEY 环境变量")
             raise ValueError(
                 "GEMINI_API_KEY not found in environment variables")
 
-        # 初始化 Gemini 客户端
+        # 初始化 Gemini 客户端（SDK 在首次创建客户端时才导入）
+        from google import genai
         self.client = genai.Client(api_key=self.api_key)
         logger.info(f"{SUCCESS_ICON} Gemini 客户端初始化成功")
 
-    @backoff.on_exception(
-        backoff.expo,
-        (Exception),
-        max_tries=5,
-        max_time=300,
-        giveup=lambda e: "AFC is enabled" not in str(e)
-    )
-    def generate_content_with_retry(self, contents, config=None):
-        """带重试机制的内容生成函数"""
+    @staticmethod
+    def _log_api_error(e):
+        error_msg = str(e)
+        if "location" in error_msg.lower():
+            logger.info(
+                f"\033[91m❗ Gemini API 地理位置限制错误: 请使用美国节点VPN后重试\033[0m")
+            logger.error(f"详细错误: {error_msg}")
+        elif "AFC is enabled" in error_msg:
+            logger.warning(f"{ERROR_ICON} 触发 API 限制: {error_msg}")
+        else:
+            logger.error(f"{ERROR_ICON} API 调用失败: {error_msg}")
+
+    @staticmethod
+    def _response_text(response):
+        if response is None:
+            raise EmptyResponseError("Gemini API returned an empty response")
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            record_token_usage(usage.prompt_token_count, usage.candidates_token_count)
+        logger.info(f"{SUCCESS_ICON} API 调用成功")
+        logger.debug(f"API 原始响应: {response.text}")
+        return response.text
+
+    def generate_content(self, contents, config=None):
+        """单次调用 Gemini API（不重试），返回回答文本"""
         try:
             logger.info(f"{WAIT_ICON} 正在调用 Gemini API...")
             logger.debug(f"请求内容: {contents}")
             logger.debug(f"请求配置: {config}")
-
             response = self.client.models.generate_content(
                 model=self.model,
                 contents=contents,
                 config=config
             )
+        except Exception as e:
+            self._log_api_error(e)
+            raise
+        return self._response_text(response)
 
-            logger.info(f"{SUCCESS_ICON} API 调用成功")
-            logger.debug(f"响应内容: {response.text[:500]}...")
-            return response
+    async def generate_content_async(self, contents, config=None):
+        """generate_content 的异步版本，使用 genai 的 aio 接口"""
+        try:
+            logger.info(f"{WAIT_ICON} 正在异步调用 Gemini API...")
+            logger.debug(f"请求内容: {contents}")
+            logger.debug(f"请求配置: {config}")
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=config
+            )
         except Exception as e:
-            error_msg = str(e)
-            if "location" in error_msg.lower():
-                logger.info(
-                    f"\033[91m❗ Gemini API 地理位置限制错误: 请使用美国节点VPN后重试\033[0m")
-                logger.error(f"详细错误: {error_msg}")
-            elif "AFC is enabled" in error_msg:
-                logger.warning(
-                    f"{ERROR_ICON} 触发 API 限制，等待重试... 错误: {error_msg}")
-                time.sleep(5)
-            else:
-                logger.error(f"{ERROR_ICON} API 调用失败: {error_msg}")
-            raise e
-
-    def get_completion(self, messages, max_retries=3, initial_retry_delay=1, **kwargs):
-        """获取聊天完成结果，包含重试逻辑"""
+            self._log_api_error(e)
+            raise
+        return self._response_text(response)
+
+    @staticmethod
+    def _convert_messages(messages, max_tokens=None):
+        """将 OpenAI 格式的消息转换为 Gemini 的 prompt 和配置"""
+        prompt = ""
+        system_instruction = None
+
+        for message in messages:
+            role = message["role"]
+            content = message["content"]
+            if role == "system":
+                system_instruction = content
+            elif role == "user":
+                prompt += f"User: {content}\n"
+            elif role == "assistant":
+                prompt += f"Assistant: {content}\n"
+
+        # 准备配置
+        config = {}
+        if system_instruction:
+            config['system_instruction'] = system_instruction
+        if max_tokens:
+            config['max_output_tokens'] = max_tokens
+        return prompt.strip(), config
+
+    @staticmethod
+    def _with_timeout(config, timeout):
+        """为单次请求设置 HTTP 超时（genai 的 http_options.timeout 单位为毫秒）"""
+        config = dict(config or {})
+        if timeout is not None:
+            config['http_options'] = {'timeout': max(1, int(timeout * 1000))}
+        return config
+
+    def get_completion(self, messages, max_retries=None, initial_retry_delay=None,
+                       max_tokens=None, timeout=None, **kwargs):
+        """获取聊天完成结果，按 RetryPolicy 重试，失败时返回 None
+
+        max_tokens 限制回答长度，timeout 为包括重试在内的总时限（秒）
+        """
         try:
             logger.info(f"{WAIT_ICON} 使用 Gemini 模型: {self.model}")
             logger.debug(f"消息内容: {messages}")
+            prompt, config = self._convert_messages(messages, max_tokens)
+            text = call_with_retry(
+                _timed_attempt(self, lambda timeout: self.generate_content(
+                    prompt, self._with_timeout(config, timeout))),
+                RetryPolicy.from_env(max_retries, initial_retry_delay, timeout),
+                get_circuit_breaker(self.provider_name),
+                name="Gemini")
+            logger.info(f"{SUCCESS_ICON} 成功获取 Gemini 响应")
+            return text
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 最终错误: {str(e)}")
+            return None
 
-            for attempt in range(max_retries):
-                try:
-                    # 转换消息格式
-                    prompt = ""
-                    system_instruction = None
-
-                    for message in messages:
-                        role = message["role"]
-                        content = message["content"]
-                        if role == "system":
-                            system_instruction = content
-                        elif role == "user":
-                            prompt += f"User: {content}\n"
-                        elif role == "assistant":
-                            prompt += f"Assistant: {content}\n"
-
-                    # 准备配置
-                    config = {}
-                    if system_instruction:
-                        config['system_instruction'] = system_instruction
-
-                    # 调用 API
-                    response = self.generate_content_with_retry(
-                        contents=prompt.strip(),
-                        config=config
-                    )
-
-                    if response is None:
-                        logger.warning(
-                            f"{ERROR_ICON} 尝试 {attempt + 1}/{max_retries}: API 返回空值")
-                        if attempt < max_retries - 1:
-                            retry_delay = initial_retry_delay * (2 ** attempt)
-                            logger.info(
-                                f"{WAIT_ICON} 等待 {retry_delay} 秒后重试...")
-                            time.sleep(retry_delay)
-                            continue
-                        return None
-
-                    logger.debug(f"API 原始响应: {response.text}")
-                    logger.info(f"{SUCCESS_ICON} 成功获取 Gemini 响应")
-
-                    # 直接返回文本内容
-                    return response.text
-
-                except Exception as e:
-                    logger.error(
-                        f"{ERROR_ICON} 尝试 {attempt + 1}/{max_retries} 失败: {str(e)}")
-                    if attempt < max_retries - 1:
-                        retry_delay = initial_retry_delay * (2 ** attempt)
-                        logger.info(f"{WAIT_ICON} 等待 {retry_delay} 秒后重试...")
-                        time.sleep(retry_delay)
-                    else:
-                        logger.error(f"{ERROR_ICON} 最终错误: {str(e)}")
-                        return None
-
+    async def get_completion_async(self, messages, max_retries=None, initial_retry_delay=None,
+                                   max_tokens=None, timeout=None, **kwargs):
+        """get_completion 的异步版本，等待期间不占用线程"""
+        try:
+            logger.info(f"{WAIT_ICON} 使用 Gemini 模型(异步): {self.model}")
+            logger.debug(f"消息内容: {messages}")
+            prompt, config = self._convert_messages(messages, max_tokens)
+            text = await call_with_retry_async(
+                _timed_attempt_async(self, lambda timeout: self.generate_content_async(
+                    prompt, self._with_timeout(config, timeout))),
+                RetryPolicy.from_env(max_retries, initial_retry_delay, timeout),
+                get_circuit_breaker(self.provider_name),
+                name="Gemini")
+            logger.info(f"{SUCCESS_ICON} 成功获取 Gemini 响应")
+            return text
         except Exception as e:
-            logger.error(f"{ERROR_ICON} get_completion 发生错误: {str(e)}")
+            logger.error(f"{ERROR_ICON} 最终错误: {str(e)}")
             return None
 
 
@@ -162,110 +237,345 @@ class OpenAICompatibleClient(LLMClient):
             raise ValueError(
                 "OPENAI_COMPATIBLE_MODEL not found in environment variables")
 
-        # 初始化 OpenAI 客户端
+        self.provider_name = f"openai_compatible:{self.base_url}"
+
+        # 初始化 OpenAI 客户端，使用支持 keep-alive 的共享连接池
+        # 重试统一由 RetryPolicy 负责，关闭 SDK 内置的重试
+        import httpx
+        from openai import OpenAI
+        self.http_client = httpx.Client(limits=_http_limits())
         self.client = OpenAI(
             base_url=self.base_url,
-            api_key=self.api_key
+            api_key=self.api_key,
+            http_client=self.http_client,
+            max_retries=0
         )
+        # 异步客户端在首次异步调用时按事件循环创建
+        self._async_client = None
+        self._async_loop = None
         logger.info(f"{SUCCESS_ICON} OpenAI Compatible 客户端初始化成功")
 
-    @backoff.on_exception(
-        backoff.expo,
-        (Exception),
-        max_tries=5,
-        max_time=300
-    )
-    def call_api_with_retry(self, messages, stream=False):
-        """带重试机制的 API 调用函数"""
+    def close(self):
+        self.http_client.close()
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+            self._async_loop = None
+
+    def _get_async_client(self):
+        """获取绑定当前事件循环的 AsyncOpenAI 客户端
+
+        httpx.AsyncClient 的连接只能在创建它的事件循环中使用，
+        因此事件循环变化时重新创建。
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            import httpx
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                http_client=httpx.AsyncClient(limits=_http_limits()),
+                max_retries=0
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    @staticmethod
+    def _response_text(response):
+        if response is None or not response.choices:
+            raise EmptyResponseError(
+                "OpenAI Compatible API returned an empty response")
+        content = response.choices[0].message.content
+        if content is None:
+            raise EmptyResponseError(
+                "OpenAI Compatible API returned an empty response")
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            record_token_usage(usage.prompt_tokens, usage.completion_tokens)
+        logger.info(f"{SUCCESS_ICON} API 调用成功")
+        logger.debug(f"API 原始响应: {content[:500]}...")
+        return content
+
+    def call_api(self, messages, timeout=None, max_tokens=None):
+        """单次调用 OpenAI Compatible API（不重试），返回回答文本"""
         try:
             logger.info(f"{WAIT_ICON} 正在调用 OpenAI Compatible API...")
             logger.debug(f"请求内容: {messages}")
-            logger.debug(f"模型: {self.model}, 流式: {stream}")
-
+            logger.debug(f"模型: {self.model}, 超时: {timeout}")
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                stream=stream
+                timeout=timeout,
+                **({"max_tokens": max_tokens} if max_tokens else {})
             )
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} API 调用失败: {str(e)}")
+            raise
+        return self._response_text(response)
 
-            logger.info(f"{SUCCESS_ICON} API 调用成功")
-            return response
+    async def call_api_async(self, messages, timeout=None, max_tokens=None):
+        """call_api 的异步版本"""
+        try:
+            logger.info(f"{WAIT_ICON} 正在异步调用 OpenAI Compatible API...")
+            logger.debug(f"请求内容: {messages}")
+            logger.debug(f"模型: {self.model}, 超时: {timeout}")
+            response = await self._get_async_client().chat.completions.create(
+                model=self.model,
+                messages=messages,
+                timeout=timeout,
+                **({"max_tokens": max_tokens} if max_tokens else {})
+            )
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"{ERROR_ICON} API 调用失败: {error_msg}")
-            raise e
+            logger.error(f"{ERROR_ICON} API 调用失败: {str(e)}")
+            raise
+        return self._response_text(response)
 
-    def get_completion(self, messages, max_retries=3, initial_retry_delay=1, **kwargs):
-        """获取聊天完成结果，包含重试逻辑"""
+    def get_completion(self, messages, max_retries=None, initial_retry_delay=None,
+                       max_tokens=None, timeout=None, **kwargs):
+        """获取聊天完成结果，按 RetryPolicy 重试，失败时返回 None
+
+        max_tokens 限制回答长度，timeout 为包括重试在内的总时限（秒）
+        """
         try:
             logger.info(f"{WAIT_ICON} 使用 OpenAI Compatible 模型: {self.model}")
             logger.debug(f"消息内容: {messages}")
+            content = call_with_retry(
+                _timed_attempt(self, lambda attempt_timeout: self.call_api(
+                    messages, timeout=attempt_timeout, max_tokens=max_tokens)),
+                RetryPolicy.from_env(max_retries, initial_retry_delay, timeout),
+                get_circuit_breaker(self.provider_name),
+                name="OpenAI Compatible")
+            logger.info(f"{SUCCESS_ICON} 成功获取 OpenAI Compatible 响应")
+            return content
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 最终错误: {str(e)}")
+            return None
 
-            for attempt in range(max_retries):
-                try:
-                    # 调用 API
-                    response = self.call_api_with_retry(messages)
-
-                    if response is None:
-                        logger.warning(
-                            f"{ERROR_ICON} 尝试 {attempt + 1}/{max_retries}: API 返回空值")
-                        if attempt < max_retries - 1:
-                            retry_delay = initial_retry_delay * (2 ** attempt)
-                            logger.info(
-                                f"{WAIT_ICON} 等待 {retry_delay} 秒后重试...")
-                            time.sleep(retry_delay)
-                            continue
-                        return None
-
-                    # 打印调试信息
-                    content = response.choices[0].message.content
-                    logger.debug(f"API 原始响应: {content[:500]}...")
-                    logger.info(f"{SUCCESS_ICON} 成功获取 OpenAI Compatible 响应")
-
-                    # 直接返回文本内容
-                    return content
-
-                except Exception as e:
-                    logger.error(
-                        f"{ERROR_ICON} 尝试 {attempt + 1}/{max_retries} 失败: {str(e)}")
-                    if attempt < max_retries - 1:
-                        retry_delay = initial_retry_delay * (2 ** attempt)
-                        logger.info(f"{WAIT_ICON} 等待 {retry_delay} 秒后重试...")
-                        time.sleep(retry_delay)
-                    else:
-                        logger.error(f"{ERROR_ICON} 最终错误: {str(e)}")
-                        return None
-
+    async def get_completion_async(self, messages, max_retries=None, initial_retry_delay=None,
+                                   max_tokens=None, timeout=None, **kwargs):
+        """get_completion 的异步版本，等待期间不占用线程"""
+        try:
+            logger.info(f"{WAIT_ICON} 使用 OpenAI Compatible 模型(异步): {self.model}")
+            logger.debug(f"消息内容: {messages}")
+            content = await call_with_retry_async(
+                _timed_attempt_async(self, lambda attempt_timeout: self.call_api_async(
+                    messages, timeout=attempt_timeout, max_tokens=max_tokens)),
+                RetryPolicy.from_env(max_retries, initial_retry_delay, timeout),
+                get_circuit_breaker(self.provider_name),
+                name="OpenAI Compatible")
+            logger.info(f"{SUCCESS_ICON} 成功获取 OpenAI Compatible 响应")
+            return content
         except Exception as e:
-            logger.error(f"{ERROR_ICON} get_completion 发生错误: {str(e)}")
+            logger.error(f"{ERROR_ICON} 最终错误: {str(e)}")
+            return None
+
+
+# 对冲请求的默认参数：使用主 provider 延迟的 p95 作为等待阈值，
+# 样本不足时使用固定的默认等待时间
+DEFAULT_HEDGE_QUANTILE = 0.95
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+DEFAULT_HEDGE_DELAY = 10.0
+DEFAULT_HEDGE_MIN_DELAY = 0.5
+
+
+def _run_in_thread(func, *args, **kwargs) -> Future:
+    """在独立的守护线程中运行 func，返回 Future
+
+    同步请求无法中途取消，落后的一方会一直运行到自身的超时；使用独立线程
+    而不是共享线程池，落后的请求不会占满线程池、阻塞后续的调用。
+    复制调用方的上下文，使线程中的日志仍归属于当前 Agent。
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(func, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+    return future
+
+
+def hedging_enabled() -> bool:
+    return os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+
+
+class HedgedLLMClient(LLMClient):
+    """在两个 provider 之间做对冲请求和故障转移的客户端
+
+    - 先请求主 provider；若超过其延迟分位数阈值仍未返回，再向备用 provider
+      发出相同请求，采用先返回的结果并取消另一方
+    - 主 provider 直接失败（返回 None，包括熔断打开）时立即转移到备用 provider
+    """
+
+    def __init__(self, primary: LLMClient, secondary: LLMClient, quantile=None,
+                 min_samples=None, default_delay=None, min_delay=None):
+        self.primary = primary
+        self.secondary = secondary
+        self.model = f"{primary.model}|{secondary.model}"
+        self.provider_name = f"hedged:{primary.provider_name}|{secondary.provider_name}"
+        self.quantile = quantile if quantile is not None else float(
+            os.getenv("LLM_HEDGE_QUANTILE", DEFAULT_HEDGE_QUANTILE))
+        self.min_samples = min_samples if min_samples is not None else int(
+            os.getenv("LLM_HEDGE_MIN_SAMPLES", DEFAULT_HEDGE_MIN_SAMPLES))
+        self.default_delay = default_delay if default_delay is not None else float(
+            os.getenv("LLM_HEDGE_DEFAULT_DELAY", DEFAULT_HEDGE_DELAY))
+        self.min_delay = min_delay if min_delay is not None else DEFAULT_HEDGE_MIN_DELAY
+        self.stats = {"requests": 0, "hedged": 0,
+                      "secondary_wins": 0, "failovers": 0}
+        self._stats_lock = threading.Lock()
+        logger.info(
+            f"{SUCCESS_ICON} 对冲客户端初始化成功: {primary.provider_name} -> {secondary.provider_name}")
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def hedge_delay(self) -> float:
+        """根据主 provider 当前模型的单次请求延迟直方图计算发出对冲请求前的等待时间"""
+        histogram = get_latency_histogram(self.primary.provider_name, self.primary.model)
+        if histogram.count < self.min_samples:
+            return self.default_delay
+        return max(histogram.quantile(self.quantile), self.min_delay)
+
+    def get_completion(self, messages, **kwargs):
+        self._count("requests")
+        delay = self.hedge_delay()
+
+        def submit(client):
+            return _run_in_thread(client.get_completion, messages, **kwargs)
+
+        primary = submit(self.primary)
+        try:
+            result = primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        else:
+            if result is not None:
+                return result
+            self._count("failovers")
+            logger.warning(
+                f"{ERROR_ICON} {self.primary.provider_name} 调用失败，转移到 {self.secondary.provider_name}")
+            return self.secondary.get_completion(messages, **kwargs)
+
+        self._count("hedged")
+        logger.info(
+            f"{WAIT_ICON} {self.primary.provider_name} {delay:.1f} 秒未返回，向 {self.secondary.provider_name} 发出对冲请求")
+        secondary = submit(self.secondary)
+        pending = {primary, secondary}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is not None:
+                    if future is secondary:
+                        self._count("secondary_wins")
+                    # 同步调用无法中断正在执行的线程，落后的请求在自己的线程中
+                    # 运行到超时为止，其结果将被丢弃
+                    return result
+        return None
+
+    async def get_completion_async(self, messages, **kwargs):
+        self._count("requests")
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(
+            self.primary.get_completion_async(messages, **kwargs))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                result = primary.result()
+                if result is not None:
+                    return result
+                self._count("failovers")
+                logger.warning(
+                    f"{ERROR_ICON} {self.primary.provider_name} 调用失败，转移到 {self.secondary.provider_name}")
+                return await self.secondary.get_completion_async(messages, **kwargs)
+
+            self._count("hedged")
+            logger.info(
+                f"{WAIT_ICON} {self.primary.provider_name} {delay:.1f} 秒未返回，向 {self.secondary.provider_name} 发出对冲请求")
+            secondary = asyncio.ensure_future(
+                self.secondary.get_completion_async(messages, **kwargs))
+            pending = {primary, secondary}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        if task is secondary:
+                            self._count("secondary_wins")
+                        return result
             return None
+        finally:
+            # 取消仍在进行的请求（落后的一方或调用方被取消时）
+            for task in pending:
+                task.cancel()
 
 
 class LLMClientFactory:
     """LLM 客户端工厂类"""
 
+    @staticmethod
+    def hedge_pair():
+        """返回对冲模式的 (主, 备) 客户端类型；两个 provider 未同时配置时返回 None"""
+        if not (os.getenv("GEMINI_API_KEY") and os.getenv("OPENAI_COMPATIBLE_API_KEY")
+                and os.getenv("OPENAI_COMPATIBLE_BASE_URL") and os.getenv("OPENAI_COMPATIBLE_MODEL")):
+            return None
+        primary = os.getenv("LLM_HEDGE_PRIMARY", "openai_compatible")
+        secondary = "gemini" if primary == "openai_compatible" else "openai_compatible"
+        return primary, secondary
+
+    @staticmethod
+    def configured_provider():
+        """按环境变量判断自动模式下实际使用的 provider（对冲模式返回主 provider），不输出日志"""
+        if hedging_enabled() and LLMClientFactory.hedge_pair() is not None:
+            return LLMClientFactory.hedge_pair()[0]
+        if os.getenv("OPENAI_COMPATIBLE_API_KEY") and os.getenv("OPENAI_COMPATIBLE_BASE_URL") \
+                and os.getenv("OPENAI_COMPATIBLE_MODEL"):
+            return "openai_compatible"
+        return "gemini"
+
+    @staticmethod
+    def resolve_client_type(client_type="auto", **kwargs):
+        """将 "auto" 解析为具体的客户端类型"""
+        if client_type != "auto":
+            return client_type
+        # 开启对冲且两个 provider 均已配置时使用对冲客户端
+        if hedging_enabled() and not (kwargs.get("api_key") or kwargs.get("base_url")) \
+                and LLMClientFactory.hedge_pair() is not None:
+            logger.info(f"{WAIT_ICON} 自动选择对冲模式")
+            return "hedged"
+        # 检查是否提供了 OpenAI Compatible API 相关配置
+        if (kwargs.get("api_key") and kwargs.get("base_url") and kwargs.get("model")) or \
+           (os.getenv("OPENAI_COMPATIBLE_API_KEY") and os.getenv("OPENAI_COMPATIBLE_BASE_URL") and os.getenv("OPENAI_COMPATIBLE_MODEL")):
+            logger.info(f"{WAIT_ICON} 自动选择 OpenAI Compatible API")
+            return "openai_compatible"
+        logger.info(f"{WAIT_ICON} 自动选择 Gemini API")
+        return "gemini"
+
     @staticmethod
     def create_client(client_type="auto", **kwargs):
         """
         创建 LLM 客户端
 
         Args:
-            client_type: 客户端类型 ("auto", "gemini", "openai_compatible")
+            client_type: 客户端类型 ("auto", "gemini", "openai_compatible", "hedged")
             **kwargs: 特定客户端的配置参数
 
         Returns:
             LLMClient: 实例化的 LLM 客户端
         """
         # 如果设置为 auto，自动检测可用的客户端
-        if client_type == "auto":
-            # 检查是否提供了 OpenAI Compatible API 相关配置
-            if (kwargs.get("api_key") and kwargs.get("base_url") and kwargs.get("model")) or \
-               (os.getenv("OPENAI_COMPATIBLE_API_KEY") and os.getenv("OPENAI_COMPATIBLE_BASE_URL") and os.getenv("OPENAI_COMPATIBLE_MODEL")):
-                client_type = "openai_compatible"
-                logger.info(f"{WAIT_ICON} 自动选择 OpenAI Compatible API")
-            else:
-                client_type = "gemini"
-                logger.info(f"{WAIT_ICON} 自动选择 Gemini API")
+        client_type = LLMClientFactory.resolve_client_type(client_type, **kwargs)
 
         if client_type == "gemini":
             return GeminiClient(
@@ -278,5 +588,76 @@ class LLMClientFactory:
                 base_url=kwargs.get("base_url"),
                 model=kwargs.get("model")
             )
+        elif client_type == "hedged":
+            pair = LLMClientFactory.hedge_pair()
+            if pair is None:
+                raise ValueError("对冲模式需要同时配置 Gemini 和 OpenAI Compatible API")
+            primary, secondary = pair
+            # model 作用于主 provider，secondary_model 作用于备用 provider，
+            # 两个子客户端均复用已有连接池
+            return HedgedLLMClient(
+                client_registry.get(primary, model=kwargs.get("model")),
+                client_registry.get(secondary, model=kwargs.get("secondary_model"))
+            )
         else:
             raise ValueError(f"不支持的客户端类型: {client_type}")
+
+    @staticmethod
+    def get_client(client_type="auto", **kwargs):
+        """获取复用的 LLM 客户端（见 LLMClientRegistry）"""
+        return client_registry.get(client_type, **kwargs)
+
+
+class LLMClientRegistry:
+    """按 (provider, base_url, model, api_key) 复用 LLM 客户端
+
+    客户端及其 HTTP 连接池在进程内长期保留，后续请求直接复用已建立的
+    keep-alive 连接，省去每次调用的客户端构造和 TLS 握手。
+    """
+
+    def __init__(self):
+        self._clients = {}
+        # 对冲客户端在创建时会再次从注册表获取子客户端，因此使用可重入锁
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(client_type, api_key=None, base_url=None, model=None, secondary_model=None):
+        if client_type == "hedged":
+            return (client_type, os.getenv("LLM_HEDGE_PRIMARY", "openai_compatible"),
+                    model, secondary_model)
+        if client_type == "gemini":
+            return (client_type, None,
+                    model or os.getenv("GEMINI_MODEL", "gemini-1.5-flash"),
+                    api_key or os.getenv("GEMINI_API_KEY"))
+        return (client_type,
+                base_url or os.getenv("OPENAI_COMPATIBLE_BASE_URL"),
+                model or os.getenv("OPENAI_COMPATIBLE_MODEL"),
+                api_key or os.getenv("OPENAI_COMPATIBLE_API_KEY"))
+
+    def get(self, client_type="auto", **kwargs):
+        client_type = LLMClientFactory.resolve_client_type(client_type, **kwargs)
+        key = self._key(client_type, kwargs.get("api_key"), kwargs.get("base_url"),
+                        kwargs.get("model"), kwargs.get("secondary_model"))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = LLMClientFactory.create_client(client_type, **kwargs)
+                self._clients[key] = client
+            return client
+
+    def clear(self):
+        """关闭并移除所有缓存的客户端"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"关闭 LLM 客户端失败: {e}")
+
+    def __len__(self):
+        return len(self._clients)
+
+
+client_registry = LLMClientRegistry()
@@ -0,0 +1,198 @@
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# 延迟直方图的桶上界（秒）：50ms 起按 1.25 倍递增，覆盖到约 10 分钟
+LATENCY_BUCKETS: List[float] = []
+_bound = 0.05
+while _bound < 600:
+    LATENCY_BUCKETS.append(round(_bound, 4))
+    _bound *= 1.25
+LATENCY_BUCKETS.append(float("inf"))
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图，用于估计各 provider 的延迟分位数
+
+    只保存每个桶的计数，内存占用固定；分位数在所在桶内线性插值。
+    """
+
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = list(buckets or LATENCY_BUCKETS)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[min(index, len(self.counts) - 1)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """返回第 q 分位（0~1）的延迟估计，没有样本时返回 None"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            target = q * self.count
+            cumulative = 0
+            for i, bucket_count in enumerate(self.counts):
+                if bucket_count and cumulative + bucket_count >= target:
+                    lower = self.buckets[i - 1] if i > 0 else 0.0
+                    upper = self.buckets[i]
+                    if upper == float("inf"):
+                        return lower
+                    fraction = (target - cumulative) / bucket_count
+                    return lower + (upper - lower) * fraction
+                cumulative += bucket_count
+            return self.buckets[-2]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def _latency_key(provider: str, model: Optional[str] = None) -> str:
+    return f"{provider}/{model}" if model else provider
+
+
+def get_latency_histogram(provider: str, model: Optional[str] = None) -> LatencyHistogram:
+    """获取（或创建）指定 provider 和模型的延迟直方图，进程内共享"""
+    key = _latency_key(provider, model)
+    with _histograms_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            _histograms[key] = histogram
+        return histogram
+
+
+def record_latency(provider: str, seconds: float, model: Optional[str] = None) -> None:
+    """记录一次成功请求的耗时（单次尝试，不含重试和退避等待）"""
+    get_latency_histogram(provider, model).observe(seconds)
+
+
+def latency_snapshot() -> Dict[str, Dict[str, float]]:
+    """所有 provider/模型 的单次请求延迟统计（次数、均值、p50/p95/p99）"""
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {provider: histogram.snapshot() for provider, histogram in items}
+
+
+def reset_latency_histograms() -> None:
+    with _histograms_lock:
+        _histograms.clear()
+
+
+# 当前 LLM 调用所属的路由（通常是 Agent 名称），客户端上报的 token 用量按它归类
+_current_route: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_route", default="default")
+
+
+class RouteMetrics:
+    """单个路由的调用统计：次数、失败、缓存命中、延迟分布和 token 用量"""
+
+    def __init__(self, provider: str = None, model: str = None):
+        self.provider = provider
+        self.model = model
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "provider": self.provider,
+                "model": self.model,
+                "calls": self.calls,
+                "failures": self.failures,
+                "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+        data["latency"] = self.latency.snapshot()
+        return data
+
+
+_routes: Dict[str, RouteMetrics] = {}
+_routes_lock = threading.Lock()
+
+
+def _get_route_metrics(route: str) -> RouteMetrics:
+    with _routes_lock:
+        metrics = _routes.get(route)
+        if metrics is None:
+            metrics = RouteMetrics()
+            _routes[route] = metrics
+        return metrics
+
+
+@contextmanager
+def route_scope(route: Optional[str]):
+    """在该上下文内发出的 LLM 调用，其 token 用量计入 route"""
+    token = _current_route.set(route or "default")
+    try:
+        yield
+    finally:
+        _current_route.reset(token)
+
+
+def current_route() -> str:
+    return _current_route.get()
+
+
+def record_route_call(route: Optional[str], seconds: float, ok: bool, cache_hit: bool = False,
+                      provider: str = None, model: str = None, coalesced: bool = False) -> None:
+    """记录一次路由调用的结果；缓存命中不计入延迟分布，coalesced 表示共享了进行中的相同请求"""
+    metrics = _get_route_metrics(route or "default")
+    with metrics._lock:
+        metrics.calls += 1
+        metrics.provider = provider or metrics.provider
+        metrics.model = model or metrics.model
+        if coalesced:
+            metrics.coalesced += 1
+        if cache_hit:
+            metrics.cache_hits += 1
+        elif not ok:
+            metrics.failures += 1
+    if ok and not cache_hit:
+        metrics.latency.observe(seconds)
+
+
+def record_token_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    """记录 provider 返回的 token 用量（计入当前路由）"""
+    metrics = _get_route_metrics(current_route())
+    with metrics._lock:
+        metrics.prompt_tokens += prompt_tokens or 0
+        metrics.completion_tokens += completion_tokens or 0
+
+
+def route_snapshot() -> Dict[str, Dict[str, Any]]:
+    """所有路由的调用统计"""
+    with _routes_lock:
+        items = list(_routes.items())
+    return {route: metrics.snapshot() for route, metrics in items}
+
+
+def reset_route_metrics() -> None:
+    with _routes_lock:
+        _routes.clear()
@@ -0,0 +1,271 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+from typing import Callable, Dict, Optional
+
+from src.utils.logging_config import setup_logger, ERROR_ICON, WAIT_ICON
+
+# 设置日志记录
+logger = setup_logger('llm_retry')
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_DEADLINE = 120.0
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 20.0
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 60.0
+
+# 视为临时故障、值得重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class EmptyResponseError(Exception):
+    """模型返回了空结果"""
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发出"""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """判断异常是否为可重试的临时故障（超时、连接错误、限流、5xx）
+
+    认证失败、参数错误等 4xx 错误重试也不会成功，直接返回 False。
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (EmptyResponseError, TimeoutError, ConnectionError,
+                        asyncio.TimeoutError)):
+        return True
+    # SDK 异常只可能来自已导入的模块，这里不主动导入各 SDK
+    openai = sys.modules.get("openai")
+    if openai is not None:
+        if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in RETRYABLE_STATUS_CODES
+    genai_errors = sys.modules.get("google.genai.errors")
+    if genai_errors is not None and isinstance(exc, genai_errors.APIError):
+        return getattr(exc, "code", None) in RETRYABLE_STATUS_CODES
+    httpx = sys.modules.get("httpx")
+    if httpx is not None:
+        if isinstance(exc, httpx.TransportError):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in RETRYABLE_STATUS_CODES
+    # Gemini 自动函数调用（AFC）限流提示
+    return "AFC is enabled" in str(exc)
+
+
+class RetryPolicy:
+    """单次 LLM 调用的重试策略
+
+    - max_attempts: 包含首次请求在内的最大尝试次数
+    - deadline: 整个调用（所有尝试和等待）的总时限（秒）
+    - base_delay / max_delay: 指数退避的基数和上限，实际等待时间为
+      [0, min(max_delay, base_delay * 2^n)] 内的随机值（full jitter）
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, deadline: float = DEFAULT_DEADLINE,
+                 base_delay: float = DEFAULT_BASE_DELAY, max_delay: float = DEFAULT_MAX_DELAY):
+        self.max_attempts = max(1, int(max_attempts))
+        self.deadline = float(deadline)
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+
+    @classmethod
+    def from_env(cls, max_attempts: Optional[int] = None, base_delay: Optional[float] = None,
+                 deadline: Optional[float] = None) -> "RetryPolicy":
+        """从环境变量读取默认值，显式传入的参数优先"""
+        return cls(
+            max_attempts=max_attempts if max_attempts is not None else int(
+                os.getenv("LLM_RETRY_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+            deadline=deadline if deadline is not None else float(
+                os.getenv("LLM_RETRY_DEADLINE", DEFAULT_DEADLINE)),
+            base_delay=base_delay if base_delay is not None else float(
+                os.getenv("LLM_RETRY_BASE_DELAY", DEFAULT_BASE_DELAY)),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", DEFAULT_MAX_DELAY)),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次（从 0 开始）失败后的等待时间"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """按 provider 统计连续失败的熔断器
+
+    连续 failure_threshold 次可重试故障后打开，reset_timeout 秒内的请求
+    直接抛出 CircuitOpenError；之后进入半开状态，只放行一个探测请求，
+    成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 reset_timeout: float = DEFAULT_BREAKER_RESET, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """是否允许发出请求"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # 半开状态只放行一个探测请求
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_neutral(self) -> None:
+        """请求已结束但不说明服务是否健康（如 400/401），只释放半开探测名额"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"{ERROR_ICON} LLM provider {self.name} 连续失败 {self._failures} 次，熔断 {self.reset_timeout:.0f} 秒")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """获取（或创建）指定 provider 的熔断器，进程内共享"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv(
+                    "LLM_BREAKER_FAILURE_THRESHOLD", DEFAULT_BREAKER_THRESHOLD)),
+                reset_timeout=float(os.getenv(
+                    "LLM_BREAKER_RESET_SECONDS", DEFAULT_BREAKER_RESET)))
+            _breakers[name] = breaker
+        return breaker
+
+
+def reset_circuit_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def _before_attempt(breaker: Optional[CircuitBreaker]) -> None:
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError(
+            f"LLM provider {breaker.name} is unavailable (circuit open)")
+
+
+def _after_failure(policy: RetryPolicy, breaker: Optional[CircuitBreaker], exc: Exception,
+                   attempt: int, start: float, name: str) -> Optional[float]:
+    """记录失败，返回下次重试前的等待时间；不应重试时返回 None"""
+    retryable = is_retryable(exc)
+    if breaker is not None:
+        # 不可重试的错误（如 400/401）既不计入熔断，也不能让半开的熔断器关闭
+        if retryable:
+            breaker.record_failure()
+        else:
+            breaker.record_neutral()
+    logger.error(
+        f"{ERROR_ICON} {name} 尝试 {attempt + 1}/{policy.max_attempts} 失败: {str(exc)}")
+    if not retryable or attempt + 1 >= policy.max_attempts:
+        return None
+    delay = policy.backoff(attempt)
+    if time.monotonic() - start + delay >= policy.deadline:
+        logger.error(f"{ERROR_ICON} {name} 已达到总时限 {policy.deadline:.0f} 秒，停止重试")
+        return None
+    logger.info(f"{WAIT_ICON} 等待 {delay:.1f} 秒后重试...")
+    return delay
+
+
+def call_with_retry(func: Callable, policy: RetryPolicy, breaker: Optional[CircuitBreaker] = None,
+                    name: str = "LLM"):
+    """按策略调用 func(timeout)，timeout 为本次尝试剩余的时间预算（秒）
+
+    所有尝试共享同一个总时限；不可重试的错误和熔断直接抛出。
+    """
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        _before_attempt(breaker)
+        try:
+            result = func(max(policy.deadline - (time.monotonic() - start), 0.001))
+            if breaker is not None:
+                breaker.record_success()
+            return result
+        except Exception as e:
+            delay = _after_failure(policy, breaker, e, attempt, start, name)
+            if delay is None:
+                raise
+        except BaseException:
+            # 取消（如对冲请求中落败的一方）或中断：释放半开探测名额，否则熔断器会一直拒绝请求
+            if breaker is not None:
+                breaker.record_neutral()
+            raise
+        time.sleep(delay)
+        attempt += 1
+
+
+async def call_with_retry_async(func: Callable, policy: RetryPolicy, breaker: Optional[CircuitBreaker] = None,
+                                name: str = "LLM"):
+    """call_with_retry 的异步版本，func(timeout) 返回 awaitable"""
+    start = time.monotonic()
+    attempt = 0
+    while True:
+        _before_attempt(breaker)
+        try:
+            remaining = max(policy.deadline - (time.monotonic() - start), 0.001)
+            result = await asyncio.wait_for(func(remaining), timeout=remaining)
+            if breaker is not None:
+                breaker.record_success()
+            return result
+        except Exception as e:
+            delay = _after_failure(policy, breaker, e, attempt, start, name)
+            if delay is None:
+                raise
+        except BaseException:
+            # 取消（如对冲请求中落败的一方）或中断：释放半开探测名额，否则熔断器会一直拒绝请求
+            if breaker is not None:
+                breaker.record_neutral()
+            raise
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,74 @@
+import os
+import json
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from src.utils.logging_config import setup_logger
+
+# 设置日志记录
+logger = setup_logger('llm_routing')
+
+
+@dataclass(frozen=True)
+class Route:
+    """单个路由（通常是一个 Agent）的模型配置
+
+    - provider: "gemini" / "openai_compatible"，为空时自动选择
+    - model: 指定模型；为空时按 tier 选择
+    - tier: "default" 使用 GEMINI_MODEL / OPENAI_COMPATIBLE_MODEL，
+      "small" 使用 GEMINI_SMALL_MODEL / OPENAI_COMPATIBLE_SMALL_MODEL（未配置时回退到默认模型）
+    - max_tokens: 回答的最大 token 数
+    - timeout: 包括重试在内的总时限（秒），为空时使用 LLM_RETRY_DEADLINE
+    """
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    tier: str = "default"
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None
+
+
+# 默认路由表：只需返回分数的情感分析和辩论评分使用小模型
+# 辩论评分要返回带完整分析文字的 JSON，默认不限制长度，避免回答被截断后无法解析
+DEFAULT_ROUTES: Dict[str, Route] = {
+    "sentiment": Route(tier="small", max_tokens=512, timeout=60),
+    "debate_room": Route(tier="small", timeout=60),
+}
+
+SMALL_MODEL_ENV = {
+    "gemini": "GEMINI_SMALL_MODEL",
+    "openai_compatible": "OPENAI_COMPATIBLE_SMALL_MODEL",
+}
+
+
+def load_routes() -> Dict[str, Route]:
+    """默认路由表叠加 LLM_ROUTES（JSON）中的配置
+
+    例如: LLM_ROUTES={"portfolio_management": {"model": "gpt-4o", "timeout": 180}}
+    """
+    routes = dict(DEFAULT_ROUTES)
+    raw = os.getenv("LLM_ROUTES")
+    if not raw:
+        return routes
+    try:
+        overrides = json.loads(raw)
+        for name, fields in overrides.items():
+            routes[name] = replace(routes.get(name, Route()), **fields)
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"LLM_ROUTES 配置无效，使用默认路由表: {e}")
+        return dict(DEFAULT_ROUTES)
+    return routes
+
+
+def get_route(name: Optional[str]) -> Route:
+    if not name:
+        return Route()
+    return load_routes().get(name, Route())
+
+
+def resolve_model(route: Route, provider: str) -> Optional[str]:
+    """返回路由在 provider 上使用的模型，None 表示使用该 provider 的默认模型"""
+    if route.model:
+        return route.model
+    if route.tier == "small":
+        return os.getenv(SMALL_MODEL_ENV.get(provider, "")) or None
+    return None
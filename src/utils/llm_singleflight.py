@@ -0,0 +1,87 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+def single_flight_enabled() -> bool:
+    return os.getenv("LLM_SINGLE_FLIGHT_ENABLED", "true").lower() != "false"
+
+
+def _for_waiters(e: BaseException) -> Exception:
+    """leader 被取消或中断时，等待方收到普通异常而不是被连带取消"""
+    if isinstance(e, Exception):
+        return e
+    return RuntimeError(f"合并的 LLM 请求未完成: {type(e).__name__}")
+
+
+class SingleFlight:
+    """合并进行中的相同请求（single-flight）
+
+    同一个 key 同时只有一个调用方（leader）真正发出请求，其余调用方等待并
+    共享 leader 的结果或异常；请求完成后 key 立即移除，后续请求重新发出。
+
+    结果通过 concurrent.futures.Future 传递，因此同步线程与不同事件循环中的
+    异步调用方可以互相合并。
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """返回 (future, 是否为 leader)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行 func 或等待进行中的相同请求，返回 (结果, 是否为共享结果)"""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(_for_waiters(e))
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._finish(key, future)
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """do 的异步版本"""
+        future, leader = self._join(key)
+        if not leader:
+            # shield: 某个等待方被取消时不影响共享的 future
+            return await asyncio.shield(asyncio.wrap_future(future)), True
+        try:
+            result = await func()
+        except BaseException as e:
+            # 包括 leader 被取消：等待方收到异常，不会一直挂起
+            future.set_exception(_for_waiters(e))
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._finish(key, future)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+llm_single_flight = SingleFlight()
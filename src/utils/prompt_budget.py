@@ -0,0 +1,293 @@
+import os
+import json
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.utils.logging_config import setup_logger
+from src.utils.llm_routing import get_route, resolve_model
+
+# 设置日志记录
+logger = setup_logger('prompt_budget')
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 各 Agent 的默认 prompt token 预算，可通过 PROMPT_TOKEN_BUDGET_<AGENT> 覆盖
+DEFAULT_TOKEN_BUDGETS = {
+    "macro_news": 12000,
+    "macro_analyst": 8000,
+    "sentiment": 4000,
+    "portfolio_management": 6000,
+    "sentiment_batch": 12000,
+}
+DEFAULT_TOKEN_BUDGET = 8000
+# 单条新闻等条目的默认 token 上限
+DEFAULT_MAX_ITEM_TOKENS = 400
+TRUNCATION_MARK = "…"
+
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+
+def get_token_budget(agent: str) -> int:
+    """读取指定 Agent 的 prompt token 预算"""
+    default = DEFAULT_TOKEN_BUDGETS.get(agent, DEFAULT_TOKEN_BUDGET)
+    return int(os.getenv(f"PROMPT_TOKEN_BUDGET_{agent.upper()}", default))
+
+
+def get_max_item_tokens() -> int:
+    return int(os.getenv("PROMPT_MAX_ITEM_TOKENS", DEFAULT_MAX_ITEM_TOKENS))
+
+
+def current_provider() -> str:
+    """当前配置的 provider（与 LLMClientFactory 的自动选择一致）"""
+    from src.utils.llm_clients import LLMClientFactory
+    return LLMClientFactory.configured_provider()
+
+
+def routed_model(route: str, provider: Optional[str] = None) -> Optional[str]:
+    """路由在当前 provider 上使用的模型，None 表示 provider 的默认模型"""
+    return resolve_model(get_route(route), provider or current_provider())
+
+
+def _get_encoding(provider: str, model: Optional[str] = None):
+    """OpenAI 兼容 provider 按实际请求的模型使用 tiktoken 编码；不可用时返回 None"""
+    if tiktoken is None or provider != "openai_compatible":
+        return None
+    model = model or os.getenv("OPENAI_COMPATIBLE_MODEL") or ""
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # 编码文件需要联网下载，失败时回退到估算
+                logger.warning(f"无法加载 tiktoken 编码，使用估算的 token 数: {e}")
+                _encodings[model] = None
+        return _encodings[model]
+
+
+def _is_cjk(char: str) -> bool:
+    code = ord(char)
+    return (0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF
+            or 0x3000 <= code <= 0x303F or 0xFF00 <= code <= 0xFFEF)
+
+
+def _char_cost(char: str) -> float:
+    # 中文字符约 1 token，其余字符约 4 个字符 1 token
+    return 1.0 if _is_cjk(char) else 0.25
+
+
+def count_tokens(text: str, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+    """统计文本的 token 数
+
+    OpenAI 兼容 provider 在安装了 tiktoken 时按 model（默认 OPENAI_COMPATIBLE_MODEL）
+    的编码精确计数，其余情况（包括 Gemini）按字符类型估算。
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(provider or current_provider(), model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(sum(_char_cost(c) for c in text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, provider: Optional[str] = None,
+                       model: Optional[str] = None) -> str:
+    """将文本截断到 max_tokens 以内（截断时末尾追加省略号）"""
+    provider = provider or current_provider()
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, provider, model) <= max_tokens:
+        return text
+    encoding = _get_encoding(provider, model)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens - 1]) + TRUNCATION_MARK
+    budget = max_tokens - 1
+    used = 0.0
+    for i, char in enumerate(text):
+        used += _char_cost(char)
+        if used > budget:
+            return text[:i] + TRUNCATION_MARK
+    return text
+
+
+def compact_json(obj: Any) -> str:
+    """紧凑 JSON 序列化（无缩进和多余空格，保留中文原文）"""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def render_news(news: Dict[str, Any]) -> str:
+    """新闻条目的 prompt 文本（标题、来源、时间、内容）"""
+    return (f"标题：{news['title']}\n"
+            f"来源：{news['source']}\n"
+            f"时间：{news['publish_time']}\n"
+            f"内容：{news['content']}")
+
+
+def compact_json_text(text: str) -> str:
+    """若文本是 JSON 则重新紧凑序列化，否则原样返回"""
+    try:
+        return compact_json(json.loads(text))
+    except (TypeError, ValueError):
+        return text
+
+
+@dataclass
+class PromptStats:
+    """prompt 压缩前后的 token 统计"""
+    agent: str
+    budget: int
+    original_tokens: int
+    final_tokens: int
+    items_total: int = 0
+    items_kept: int = 0
+    items_truncated: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.original_tokens - self.final_tokens, 0)
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "budget": self.budget,
+            "original_tokens": self.original_tokens,
+            "final_tokens": self.final_tokens,
+            "tokens_saved": self.tokens_saved,
+            "items_total": self.items_total,
+            "items_kept": self.items_kept,
+            "items_truncated": self.items_truncated,
+        }
+
+    def log(self) -> None:
+        logger.info(
+            f"{self.agent} prompt: {self.final_tokens}/{self.budget} tokens，"
+            f"原始 {self.original_tokens}，节省 {self.tokens_saved}"
+            + (f"，保留 {self.items_kept}/{self.items_total} 条" if self.items_total else "")
+            + (f"，截断 {self.items_truncated} 条" if self.items_truncated else ""))
+
+
+def build_item_list(agent: str, items: Sequence[Dict[str, Any]], render: Callable[[Dict[str, Any]], str],
+                    budget: Optional[int] = None, separator: str = "\n\n",
+                    priority: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                    truncate_field: Optional[str] = "content", max_item_tokens: Optional[int] = None,
+                    original_render: Optional[Callable[[Sequence[Dict[str, Any]]], str]] = None,
+                    provider: Optional[str] = None, model: Optional[str] = None):
+    """将条目列表（如新闻）渲染为不超过 token 预算的文本
+
+    - 每个条目的 truncate_field 字段先截断到 max_item_tokens 以内
+    - 按 priority 从高到低（默认原顺序）选取条目，直到预算用完
+    - 输出保持条目的原始顺序
+
+    Args:
+        original_render: 未压缩时的渲染方式，仅用于统计节省的 token
+        model: 实际请求的模型（见 routed_model），决定 token 的计数方式
+
+    Returns:
+        (text, PromptStats)
+    """
+    provider = provider or current_provider()
+    budget = budget if budget is not None else get_token_budget(agent)
+    max_item_tokens = max_item_tokens if max_item_tokens is not None else get_max_item_tokens()
+    separator_tokens = count_tokens(separator, provider, model)
+
+    rendered: List[Optional[str]] = [None] * len(items)
+    truncated = 0
+    order = list(range(len(items)))
+    if priority is not None:
+        order.sort(key=lambda i: priority(items[i]), reverse=True)
+
+    used = 0
+    for i in order:
+        item = items[i]
+        if truncate_field and isinstance(item.get(truncate_field), str):
+            shortened = truncate_to_tokens(item[truncate_field], max_item_tokens, provider, model)
+            if shortened != item[truncate_field]:
+                item = {**item, truncate_field: shortened}
+                truncated += 1
+        text = render(item)
+        cost = count_tokens(text, provider, model) + (separator_tokens if used else 0)
+        if used + cost > budget:
+            continue
+        rendered[i] = text
+        used += cost
+
+    kept = [text for text in rendered if text is not None]
+    final_text = separator.join(kept)
+    original_text = original_render(items) if original_render else separator.join(
+        render(item) for item in items)
+    stats = PromptStats(agent=agent, budget=budget,
+                        original_tokens=count_tokens(original_text, provider, model),
+                        final_tokens=count_tokens(final_text, provider, model),
+                        items_total=len(items), items_kept=len(kept),
+                        items_truncated=truncated)
+    stats.log()
+    return final_text, stats
+
+
+def fit_sections(agent: str, sections: Dict[str, str], budget: Optional[int] = None,
+                 original_sections: Optional[Dict[str, str]] = None,
+                 provider: Optional[str] = None, model: Optional[str] = None):
+    """将多个文本段落整体压缩到 token 预算以内
+
+    超出预算时找到统一的上限 cap，使 sum(min(tokens_i, cap)) 不超过预算，
+    只截断超过 cap 的长段落，短段落保持完整。
+
+    Returns:
+        (截断后的段落字典, PromptStats)
+    """
+    provider = provider or current_provider()
+    budget = budget if budget is not None else get_token_budget(agent)
+    tokens = {name: count_tokens(text, provider, model) for name, text in sections.items()}
+    result = dict(sections)
+    truncated = 0
+
+    if sum(tokens.values()) > budget:
+        # 从短到长依次分配，剩余预算平均分给尚未分配的段落
+        remaining = budget
+        names = sorted(tokens, key=tokens.get)
+        for index, name in enumerate(names):
+            cap = remaining // (len(names) - index)
+            if tokens[name] > cap:
+                result[name] = truncate_to_tokens(sections[name], cap, provider, model)
+                truncated += 1
+                remaining -= cap
+            else:
+                remaining -= tokens[name]
+
+    original = original_sections or sections
+    stats = PromptStats(agent=agent, budget=budget,
+                        original_tokens=sum(count_tokens(text, provider, model) for text in original.values()),
+                        final_tokens=sum(count_tokens(text, provider, model) for text in result.values()),
+                        items_total=len(sections), items_kept=len(sections),
+                        items_truncated=truncated)
+    stats.log()
+    return result, stats
+
+
+def pack_batches(items: Sequence[Any], render: Callable[[Any], str], budget: int,
+                 provider: Optional[str] = None, model: Optional[str] = None) -> List[List[Any]]:
+    """按顺序将条目装入若干批次，每批渲染后的 token 总数不超过 budget
+
+    单个条目超过预算时单独成批（由调用方决定是否截断）。
+    """
+    provider = provider or current_provider()
+    batches: List[List[Any]] = []
+    current: List[Any] = []
+    used = 0
+    for item in items:
+        cost = count_tokens(render(item), provider, model)
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches